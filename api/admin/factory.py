@@ -148,6 +148,15 @@ def setup_flask_app() -> Flask:
     PageDown(app_)
     init_login(app_)
     flask_redis.init_app(app_, **redis_config())
+    # registers the ORM listeners invalidating cached responses and appointment
+    # counts, scheduling appointment reminders, marking stale practitioner search
+    # documents and refreshing next availabilities
+    import appointments.services.reminder_scheduler  # noqa: F401
+    import appointments.utils.response_cache  # noqa: F401
+    import global_search.provider_data  # noqa: F401
+    import mpractice.repository.appointment_count_cache  # noqa: F401
+    import providers.service.next_availability  # noqa: F401
+
     register_babel(app_)
     return app_
 
@@ -99,3 +99,45 @@ class TestHighRiskDash:
                 search=None,
                 filters=[],
             )
+
+    def test_list_users_sorted_and_paged_in_sql(self, app, high_risk_view, risk_flags):
+        now = datetime.utcnow()
+        ca_vertical = VerticalFactory(name=CX_VERTICAL_NAME)
+        cc_user = PractitionerUserFactory.create(
+            practitioner_profile__verticals=[ca_vertical],
+        )
+        users = EnterpriseUserFactory.create_batch(size=3)
+        for user in users:
+            MemberRiskService(user.id).set_risk("High")
+            user.add_practitioner_to_care_team(
+                cc_user.id, CareTeamTypes.CARE_COORDINATOR
+            )
+        u1, u2, u3 = users
+        for user, hours_ago in [(u1, 2), (u3, 1)]:
+            AppointmentFactory.create_with_practitioner(
+                member_schedule=user.schedule,
+                practitioner=cc_user,
+                scheduled_start=now - timedelta(hours=hours_ago),
+            )
+
+        def get_list(page, **kwargs):
+            _, result = high_risk_view.get_list(
+                page=page, search=None, filters=[], page_size=2, **kwargs
+            )
+            return result
+
+        with mock.patch(
+            "admin.views.models.users._login_cc_email", return_value=cc_user.email
+        ):
+            with app.test_request_context("/"):
+                assert get_list(
+                    0, sort_column="last_appointment_activity", sort_desc=True
+                ) == [u3, u1]
+                assert u3.last_appointment_activity is not None
+            # The second page starts after u1 rather than at an offset of 2
+            with app.test_request_context(f"/?page=1&after={u1.id}"):
+                assert get_list(1, sort_column=None, sort_desc=False) == [u2, u3]
+            with app.test_request_context(f"/?page=1&after={u1.id}"):
+                assert get_list(
+                    1, sort_column="last_appointment_activity", sort_desc=True
+                ) == [u2]
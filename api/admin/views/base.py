@@ -8,7 +8,7 @@ from typing import Any, Callable, Iterable, Tuple, Type, TypeVar
 
 import flask_login as login
 from dateutil.parser import parse
-from flask import flash, request
+from flask import flash, has_request_context, request
 from flask_admin import expose
 from flask_admin.actions import action
 from flask_admin.contrib.sqla import ModelView
@@ -19,6 +19,7 @@ from flask_admin.form import FormOpts, rules
 from flask_admin.menu import MenuLink
 from flask_admin.model import InlineFormAdmin
 from flask_admin.model.fields import InlineFieldList, InlineModelFormField
+from sqlalchemy import and_, asc, desc, literal_column, or_, text
 from sqlalchemy.orm import class_mapper
 from werkzeug.utils import redirect
 from wtforms import FormField, Label, fields, form, widgets
@@ -150,18 +151,59 @@ class SimpleSortViewMixin:
 
     WARNING: Do NOT use this on model views with large datasets! It relies on
     loading the entire query result in memory and calling the sort function
-    for each model instance.
+    for each model instance. Prefer sql_sorters wherever the value can be
+    expressed in SQL.
+    """
+
+    sql_sorters = {}
+    """
+    Provide a dictionary of {'column_name': expression_func} for sorting on
+    properties that are not columns of the model but can be computed in the
+    database, e.g. a hybrid property or a correlated subquery:
+
+        sql_sorters = {
+            "last_appointment": lambda: (
+                select([func.max(Appointment.scheduled_start)])
+                .where(Appointment.member_schedule_id == Schedule.id)
+                .where(Schedule.user_id == User.id)
+                .correlate(User)
+                .as_scalar()
+            ),
+        }
+
+    Rows are sorted and paged by MySQL, ties are broken by the primary key.
+    """
+
+    keyset_pagination = False
+    """
+    Page through the list by the sort value and primary key of the last row of
+    the previous page, instead of an OFFSET MySQL has to scan past. Used for
+    the default sort (by primary key) and sql_sorters, when following the link
+    to the next page.
+    """
+
+    approximate_count = False
+    """
+    Show the row count MySQL estimates for the table instead of running COUNT(*)
+    over it, when the list is neither searched nor filtered. Only use on views
+    whose get_query selects every row of the model.
     """
 
     def __init__(self, model, *args, **kwargs):  # type: ignore[no-untyped-def] # Function is missing a type annotation
         self._simple_sort_column = None
         self._sort_desc = None
+        # (sort expression or None for the primary key, descending) of the list
+        # being rendered, when it can be paged by keyset
+        self._keyset_order = None
+        # (page, primary key of its last row) of the list being rendered
+        self._keyset_next_page = None
         super().__init__(model, *args, **kwargs)  # type: ignore[call-arg] # Too many arguments for "__init__" of "object"
 
     def get_sortable_columns(self):  # type: ignore[no-untyped-def] # Function is missing a return type annotation
         return {
             **super().get_sortable_columns(),
             **{x: None for x in self.simple_sorters.keys()},
+            **{x: None for x in self.sql_sorters.keys()},
         }
 
     def get_list(  # type: ignore[no-untyped-def] # Function is missing a type annotation
@@ -175,17 +217,99 @@ class SimpleSortViewMixin:
         page_size=None,
     ):
         self._sort_desc = sort_desc
+        self._keyset_order = None
+        self._keyset_next_page = None
         execute = False if sort_column in self.simple_sorters.keys() else execute
-        return super().get_list(
+        count, data = super().get_list(
             page, sort_column, sort_desc, search, filters, execute, page_size
         )
+        if self._keyset_order is not None and isinstance(data, list) and data:
+            self._keyset_next_page = (
+                (page or 0) + 1,
+                getattr(data[-1], self._primary_key),  # type: ignore[attr-defined] # "SimpleSortViewMixin" has no attribute "_primary_key"
+            )
+        return count, data
+
+    def get_count_query(self):  # type: ignore[no-untyped-def] # Function is missing a return type annotation
+        if self.approximate_count and has_request_context():
+            view_args = self._get_list_extra_args()  # type: ignore[attr-defined] # "SimpleSortViewMixin" has no attribute "_get_list_extra_args"
+            if not (view_args.search or view_args.filters):
+                return (
+                    self.session.query(literal_column("TABLE_ROWS"))  # type: ignore[attr-defined] # "SimpleSortViewMixin" has no attribute "session"
+                    .select_from(text("information_schema.TABLES"))
+                    .filter(
+                        text("TABLE_SCHEMA = DATABASE()"),
+                        literal_column("TABLE_NAME") == self.model.__table__.name,  # type: ignore[attr-defined] # "SimpleSortViewMixin" has no attribute "model"
+                    )
+                )
+        return super().get_count_query()
+
+    def _get_list_url(self, view_args):  # type: ignore[no-untyped-def] # Function is missing a type annotation
+        # Only the link to the page after the one being rendered can start
+        # from its last row.
+        extra_args = {k: v for k, v in view_args.extra_args.items() if k != "after"}
+        if self._keyset_next_page and view_args.page == self._keyset_next_page[0]:
+            extra_args["after"] = self._keyset_next_page[1]
+        return super()._get_list_url(view_args.clone(extra_args=extra_args))
+
+    @property
+    def _primary_key_column(self):  # type: ignore[no-untyped-def] # Function is missing a return type annotation
+        if isinstance(self._primary_key, tuple):  # type: ignore[attr-defined] # "SimpleSortViewMixin" has no attribute "_primary_key"
+            return None
+        return getattr(self.model, self._primary_key)  # type: ignore[attr-defined] # "SimpleSortViewMixin" has no attribute "model"
 
     def _apply_sorting(self, query, joins, sort_column, sort_desc):  # type: ignore[no-untyped-def] # Function is missing a type annotation
         if sort_column in self.simple_sorters.keys():
             self._simple_sort_column = sort_column
             return query, joins
+        primary_key = self._primary_key_column
+        if sort_column in self.sql_sorters.keys():
+            expression = self.sql_sorters[sort_column]()
+            query = query.order_by(desc(expression) if sort_desc else asc(expression))
+            if primary_key is not None:
+                # ties keep the order of the default sort
+                query = query.order_by(primary_key)
+                if self.keyset_pagination:
+                    self._keyset_order = (expression, bool(sort_desc))
+            return query, joins
+        if (
+            sort_column is None
+            and self.keyset_pagination
+            and primary_key is not None
+            and not self.column_default_sort  # type: ignore[attr-defined] # "SimpleSortViewMixin" has no attribute "column_default_sort"
+        ):
+            self._keyset_order = (None, False)
+            return query.order_by(primary_key), joins
         return super()._apply_sorting(query, joins, sort_column, sort_desc)
 
+    def _keyset_condition(self, expression, sort_desc, after):  # type: ignore[no-untyped-def] # Function is missing a type annotation
+        """The condition selecting the rows after the row with primary key after."""
+        primary_key = self._primary_key_column
+        after_key = primary_key > after
+        if expression is None:
+            return after_key
+        row = (
+            self.session.query(expression)  # type: ignore[attr-defined] # "SimpleSortViewMixin" has no attribute "session"
+            .select_from(self.model)  # type: ignore[attr-defined] # "SimpleSortViewMixin" has no attribute "model"
+            .filter(primary_key == after)
+            .first()
+        )
+        if row is None:
+            return None
+        value = row[0]
+        # MySQL sorts NULLs first
+        if value is None:
+            if sort_desc:
+                return and_(expression.is_(None), after_key)
+            return or_(expression.isnot(None), after_key)
+        if sort_desc:
+            return or_(
+                expression < value,
+                expression.is_(None),
+                and_(expression == value, after_key),
+            )
+        return or_(expression > value, and_(expression == value, after_key))
+
     def _apply_pagination(self, query, page, page_size):  # type: ignore[no-untyped-def] # Function is missing a type annotation
         if self._simple_sort_column is not None:
             sorted_result = sorted(
@@ -197,6 +321,11 @@ class SimpleSortViewMixin:
             self._simple_sort_column = None
             offset = page * (page_size or self.page_size)  # type: ignore[attr-defined] # "SimpleSortViewMixin" has no attribute "page_size"
             return sorted_result[offset : (page_size or self.page_size) + offset]  # type: ignore[attr-defined] # "SimpleSortViewMixin" has no attribute "page_size"
+        after = request.args.get("after") if has_request_context() else None
+        if self._keyset_order is not None and after:
+            condition = self._keyset_condition(*self._keyset_order, after)
+            if condition is not None:
+                return query.filter(condition).limit(page_size or self.page_size)  # type: ignore[attr-defined] # "SimpleSortViewMixin" has no attribute "page_size"
         return super()._apply_pagination(query, page, page_size)
 
 
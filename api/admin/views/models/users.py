@@ -103,6 +103,7 @@ from health.data_models.risk_flag import RiskFlag
 from health.models.health_profile import HealthProfile
 from health.services.health_profile_service import HealthProfileService
 from members.models.async_encounter_summary import AsyncEncounterSummary
+from messaging.models.messaging import ChannelUsers, Message
 from models import tracks
 from models.enterprise import (
     OnboardingState,
@@ -3309,19 +3310,39 @@ class HighRiskUsersView(SimpleSortViewMixin, MavenAuditedView):
 
     column_sortable_list = ["id", "email"]
 
-    simple_sorters = {
-        "full_name": lambda u: (u.last_name, u.first_name),
-        "member_note": lambda u: (
-            u.member_profile.follow_up_reminder_send_time
-            or datetime.datetime(datetime.MINYEAR, 1, 1)
+    sql_sorters = {
+        "full_name": lambda: func.concat_ws(" ", User.last_name, User.first_name),
+        "member_note": lambda: (
+            sqlalchemy.select([MemberProfile.follow_up_reminder_send_time])
+            .where(MemberProfile.user_id == User.id)
+            .correlate(User)
+            .as_scalar()
         ),
-        "last_message_activity": lambda u: (
-            u.last_message_activity or datetime.datetime(datetime.MINYEAR, 1, 1)
+        "last_message_activity": lambda: (
+            sqlalchemy.select([func.max(Message.created_at)])
+            .select_from(
+                Message.__table__.join(
+                    ChannelUsers.__table__,
+                    ChannelUsers.channel_id == Message.channel_id,
+                )
+            )
+            .where(ChannelUsers.user_id == User.id)
+            .correlate(User)
+            .as_scalar()
         ),
-        "last_appointment_activity": lambda u: (
-            u.last_appointment_activity or datetime.datetime(datetime.MINYEAR, 1, 1)
+        "last_appointment_activity": lambda: (
+            sqlalchemy.select([func.max(Appointment.scheduled_start)])
+            .select_from(
+                Appointment.__table__.join(
+                    Schedule.__table__, Schedule.id == Appointment.member_schedule_id
+                )
+            )
+            .where(Schedule.user_id == User.id)
+            .correlate(User)
+            .as_scalar()
         ),
     }
+    keyset_pagination = True
 
     column_formatters = {
         "user_flags": _risk_flags,
@@ -3345,22 +3366,9 @@ class HighRiskUsersView(SimpleSortViewMixin, MavenAuditedView):
         count, result = super().get_list(
             page, sort_column, sort_desc, search, filters, execute, page_size
         )
-        if self._simple_sort_column not in [
-            "last_message_activity",
-            "last_appointment_activity",
-        ]:
-            self._get_last_activity_info(result)
+        self._get_last_activity_info(result)
         return count, result
 
-    def _apply_pagination(self, query, page, page_size):  # type: ignore[no-untyped-def] # Function is missing a type annotation
-        if self._simple_sort_column in [
-            "last_message_activity",
-            "last_appointment_activity",
-        ]:
-            query = query.all()
-            self._get_last_activity_info(query)
-        return super()._apply_pagination(query, page, page_size)
-
     def _get_last_activity_info(self, users):  # type: ignore[no-untyped-def] # Function is missing a type annotation
         if not users:
             return
@@ -2,6 +2,7 @@ from airflow.utils import check_if_run_in_airflow, with_app_context
 from health.tasks.member_risk_flag_update import (
     update_member_risk_flags,
     update_member_risk_flags_even,
+    update_member_risk_flags_incremental,
     update_member_risk_flags_odd,
 )
 from utils.constants import CronJobName
@@ -23,3 +24,9 @@ def update_member_risk_flags_odd_job() -> None:
 @with_app_context(team_ns="mpractice_core", service_ns="health")
 def update_member_risk_flags_job() -> None:
     update_member_risk_flags()
+
+
+@check_if_run_in_airflow(CronJobName.MEMBER_RISK_FLAGS_INCREMENTAL)
+@with_app_context(team_ns="mpractice_core", service_ns="health")
+def update_member_risk_flags_incremental_job() -> None:
+    update_member_risk_flags_incremental()
@@ -20,7 +20,7 @@ from common.services import healthchecks, ratelimiting
 from common.services.api import create_api
 from l10n.config import register_babel
 from models.marketing import URLRedirect
-from storage import mapper
+from storage import mapper, query_budget, read_routing
 from storage.connection import db
 from utils.log import logger
 from utils.requests_stats import get_request_stats
@@ -60,6 +60,15 @@ def create_app(task_instance=False):  # type: ignore[no-untyped-def] # Function
     db.init_app(app)
     mapper.start_mappers()
     flask_redis.init_app(app, **redis_config())
+    # registers the ORM listeners invalidating cached responses and appointment
+    # counts, scheduling appointment reminders, marking stale practitioner search
+    # documents and refreshing next availabilities
+    import appointments.services.reminder_scheduler  # noqa: F401
+    import appointments.utils.response_cache  # noqa: F401
+    import global_search.provider_data  # noqa: F401
+    import mpractice.repository.appointment_count_cache  # noqa: F401
+    import providers.service.next_availability  # noqa: F401
+
     # register shutdown hook to close db connections
     register_worker_shutdown_hook(app)
     disable_warnings(InsecureRequestWarning)
@@ -116,6 +125,13 @@ def create_app(task_instance=False):  # type: ignore[no-untyped-def] # Function
         def before_request() -> None:
             flask.g.request_stat_doc = get_request_stats(flask.request)
             structlog.contextvars.bind_contextvars(**flask.g.request_stat_doc)
+            read_routing.enable_for_request()
+            flask.g.query_stats = query_budget.start(
+                name=flask.request.url_rule.endpoint
+                if flask.request.url_rule
+                else "unknown",
+                kind="endpoint",
+            )
 
             # set service_ns tag
             # if no active_span, we will try another approach later
@@ -152,6 +168,12 @@ def create_app(task_instance=False):  # type: ignore[no-untyped-def] # Function
             response = inject_view_name_header(response) or response
             return response
 
+        @app.teardown_request
+        def report_query_budget(exc: BaseException | None) -> None:
+            query_stats = flask.g.pop("query_stats", None)
+            if query_stats is not None:
+                query_budget.stop(query_stats)
+
         @app.route("/Join/<path>", strict_slashes=False)
         @app.route("/join/<path>", strict_slashes=False)
         def join(path):  # type: ignore[no-untyped-def] # Function is missing a type annotation
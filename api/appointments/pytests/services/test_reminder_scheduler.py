@@ -0,0 +1,180 @@
+import datetime
+from types import SimpleNamespace
+from unittest import mock
+
+import pytest
+
+from appointments.services import reminder_scheduler
+from appointments.services.reminder_scheduler import (
+    Reminder,
+    ReminderKind,
+    ReminderScheduler,
+    appointment_reminder_scores,
+    no_show_reminder_scores,
+)
+from appointments.utils.flask_redis_ext import CLAIM_DUE_REMINDERS_SCRIPT, flask_redis
+
+NOW = datetime.datetime(2024, 3, 1, 12, 0)
+
+
+@pytest.fixture(autouse=True)
+def scheduler_enabled():
+    with mock.patch.object(reminder_scheduler, "REMINDER_SCHEDULER_ENABLED", True):
+        yield
+
+
+def _score(dt):
+    return (dt - datetime.datetime(1970, 1, 1)).total_seconds()
+
+
+def _appointment(scheduled_start, created_at=NOW, cancelled_at=None, id=42):
+    return SimpleNamespace(
+        id=id,
+        scheduled_start=scheduled_start,
+        created_at=created_at,
+        cancelled_at=cancelled_at,
+    )
+
+
+def test_appointment_reminder_scores():
+    start = NOW + datetime.timedelta(days=2)
+
+    assert appointment_reminder_scores(_appointment(start), NOW) == {
+        "member_sms:42": _score(start - datetime.timedelta(minutes=2)),
+        "practitioner_sms:42": _score(start - datetime.timedelta(minutes=10)),
+        "member_push_1h:42": _score(start - datetime.timedelta(minutes=60)),
+        "advance_booking:42": _score(start - datetime.timedelta(hours=24)),
+    }
+
+
+def test_appointment_reminder_scores_of_soon_and_cancelled_appointments():
+    start = NOW + datetime.timedelta(minutes=55)
+
+    assert appointment_reminder_scores(_appointment(start), NOW) == {
+        "member_sms:42": _score(start - datetime.timedelta(minutes=2)),
+        "practitioner_sms:42": _score(start - datetime.timedelta(minutes=10)),
+        # less than 50 minutes before the start is too late for the 1 hour reminder
+        "member_push_1h:42": None,
+        "advance_booking:42": None,
+    }
+    assert set(
+        appointment_reminder_scores(_appointment(start, cancelled_at=NOW), NOW).values()
+    ) == {None}
+
+
+def test_no_show_reminder_scores():
+    ack = SimpleNamespace(id=7, ack_by=NOW, is_acked=False, is_alerted=False)
+    assert no_show_reminder_scores(ack) == {"practitioner_no_show:7": _score(NOW)}
+
+    ack.is_acked = True
+    assert no_show_reminder_scores(ack) == {"practitioner_no_show:7": None}
+
+
+def test_reminder_window_is_due():
+    window = reminder_scheduler.APPOINTMENT_REMINDER_WINDOWS[
+        ReminderKind.MEMBER_PUSH_1H
+    ]
+    start = NOW + datetime.timedelta(minutes=60)
+
+    assert window.is_due(start, NOW)
+    # rescheduled to a later time
+    assert not window.is_due(start + datetime.timedelta(hours=1), NOW)
+    # too late
+    assert not window.is_due(start, NOW + datetime.timedelta(minutes=11))
+
+
+def test_reminder_from_member():
+    assert Reminder.from_member(b"member_sms:42", str(_score(NOW))) == Reminder(
+        kind=ReminderKind.MEMBER_SMS, entity_id=42, due_at=NOW
+    )
+
+
+@pytest.fixture
+def redis_client():
+    client = mock.MagicMock()
+    with mock.patch.object(flask_redis, "get_client", return_value=client):
+        yield client
+
+
+def test_update(redis_client):
+    pipeline = redis_client.pipeline.return_value
+
+    ReminderScheduler().update({"member_sms:1": 10.0, "member_sms:2": None})
+
+    pipeline.zadd.assert_called_once_with(
+        reminder_scheduler.REMINDERS_KEY, {"member_sms:1": 10.0}
+    )
+    pipeline.zrem.assert_called_once_with(
+        reminder_scheduler.REMINDERS_KEY, "member_sms:2"
+    )
+    pipeline.execute.assert_called_once()
+
+
+def test_update_swallows_errors(redis_client):
+    redis_client.pipeline.return_value.execute.side_effect = Exception("down")
+
+    ReminderScheduler().update({"member_sms:1": 10.0})
+
+
+def test_claim_due(redis_client):
+    with mock.patch.object(
+        flask_redis,
+        "execute_script",
+        return_value=[b"member_sms:1", str(_score(NOW)), b"bad", b"1"],
+    ) as execute_script:
+        reminders = ReminderScheduler().claim_due(NOW, limit=10)
+
+    assert reminders == [
+        Reminder(kind=ReminderKind.MEMBER_SMS, entity_id=1, due_at=NOW)
+    ]
+    execute_script.assert_called_once_with(
+        script_name=CLAIM_DUE_REMINDERS_SCRIPT,
+        client_name=reminder_scheduler.APPOINTMENT_REDIS,
+        keys=[reminder_scheduler.REMINDERS_KEY],
+        args=[_score(NOW), 10],
+    )
+
+
+def test_dispatcher_heartbeat(redis_client):
+    scheduler = ReminderScheduler()
+
+    scheduler.record_dispatcher_heartbeat()
+
+    redis_client.set.assert_called_once_with(
+        reminder_scheduler.DISPATCHER_HEARTBEAT_KEY,
+        1,
+        ex=reminder_scheduler.DISPATCHER_HEARTBEAT_TTL_SECONDS,
+    )
+    redis_client.exists.return_value = 0
+    assert not scheduler.is_dispatcher_running()
+    redis_client.exists.side_effect = Exception("down")
+    assert not scheduler.is_dispatcher_running()
+
+
+def test_flush_collects_and_commit_registers(factories, session):
+    appointment = factories.AppointmentFactory.create(
+        scheduled_start=datetime.datetime.utcnow() + datetime.timedelta(days=3)
+    )
+    session.info.pop(reminder_scheduler._PENDING_REMINDERS_KEY, None)
+
+    appointment.cancelled_at = datetime.datetime.utcnow()
+    session.flush()
+    pending = session.info[reminder_scheduler._PENDING_REMINDERS_KEY]
+
+    with mock.patch.object(reminder_scheduler.reminder_scheduler, "update") as update:
+        reminder_scheduler.register_reminders(session)
+
+    update.assert_called_once_with(pending)
+    assert pending[f"member_sms:{appointment.id}"] is None
+    assert reminder_scheduler._PENDING_REMINDERS_KEY not in session.info
+
+
+def test_rollback_discards_reminder_updates(factories, session):
+    factories.AppointmentFactory.create(
+        scheduled_start=datetime.datetime.utcnow() + datetime.timedelta(days=3)
+    )
+    session.flush()
+
+    reminder_scheduler.discard_reminder_updates(session)
+
+    assert reminder_scheduler._PENDING_REMINDERS_KEY not in session.info
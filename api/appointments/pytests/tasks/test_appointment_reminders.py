@@ -0,0 +1,203 @@
+import datetime
+from unittest import mock
+
+import pytest
+
+import appointments.tasks.appointment_notifications as appointment_notifications
+from appointments.services.reminder_scheduler import Reminder, ReminderKind
+
+
+@pytest.fixture(autouse=True)
+def scheduler_enabled():
+    with mock.patch.object(
+        appointment_notifications, "REMINDER_SCHEDULER_ENABLED", True
+    ):
+        yield
+
+
+@pytest.fixture
+def scheduler():
+    with mock.patch.object(
+        appointment_notifications, "reminder_scheduler"
+    ) as scheduler:
+        scheduler.acquire_send_lock.return_value = True
+        yield scheduler
+
+
+@pytest.fixture
+def send_member_sms():
+    with mock.patch.object(
+        appointment_notifications,
+        "_sms_notify_upcoming_appointment_member",
+        return_value=True,
+    ) as send:
+        yield send
+
+
+def test_send_appointment_reminders(factories, scheduler, send_member_sms):
+    now = datetime.datetime.utcnow()
+    due = factories.AppointmentFactory.create(
+        scheduled_start=now + datetime.timedelta(minutes=2)
+    )
+    rescheduled = factories.AppointmentFactory.create(
+        scheduled_start=now + datetime.timedelta(hours=2)
+    )
+    cancelled = factories.AppointmentFactory.create(
+        scheduled_start=now + datetime.timedelta(minutes=2), cancelled_at=now
+    )
+    due_at = (now - datetime.timedelta(seconds=5)).isoformat()
+
+    with mock.patch.object(appointment_notifications.stats, "increment") as increment:
+        appointment_notifications.send_appointment_reminders(
+            "member_sms",
+            [(due.id, due_at), (rescheduled.id, due_at), (cancelled.id, due_at)],
+        )
+
+    send_member_sms.assert_called_once_with(due)
+    scheduler.acquire_send_lock.assert_called_once_with(ReminderKind.MEMBER_SMS, due.id)
+    increment.assert_called_once_with(
+        metric_name=appointment_notifications.REMINDERS_SENT,
+        pod_name=appointment_notifications.PodNames.VIRTUAL_CARE,
+        tags=["kind:member_sms", "source:scheduler", "on_time:true"],
+    )
+
+
+def test_send_appointment_reminders_releases_failed_reminders(
+    factories, scheduler, send_member_sms
+):
+    now = datetime.datetime.utcnow()
+    appointments = factories.AppointmentFactory.create_batch(
+        size=2, scheduled_start=now + datetime.timedelta(minutes=2)
+    )
+    send_member_sms.side_effect = [True, Exception("twilio is down")]
+
+    appointment_notifications.send_appointment_reminders(
+        "member_sms", [(a.id, now.isoformat()) for a in appointments]
+    )
+
+    assert send_member_sms.call_count == 2
+    # the lock of the failed reminder is released for the reconciliation sweep
+    scheduler.release_send_lock.assert_called_once()
+    assert scheduler.release_send_lock.call_args.args[0] == ReminderKind.MEMBER_SMS
+
+
+def test_send_reminder_skips_reminders_being_sent(scheduler, send_member_sms):
+    scheduler.acquire_send_lock.return_value = False
+
+    assert not appointment_notifications._send_reminder(
+        ReminderKind.MEMBER_SMS, 1, send_member_sms, None
+    )
+    send_member_sms.assert_not_called()
+
+
+def test_sweep_leaves_just_due_reminders_to_the_dispatcher(factories, scheduler):
+    scheduler.is_dispatcher_running.return_value = True
+    now = datetime.datetime.utcnow()
+    # due in the last seconds, the dispatcher sends it
+    just_due = factories.AppointmentFactory.create(
+        scheduled_start=now + datetime.timedelta(minutes=10, seconds=-5)
+    )
+    # still unsent a while after it came due
+    missed = factories.AppointmentFactory.create(
+        scheduled_start=now + datetime.timedelta(minutes=5)
+    )
+
+    with mock.patch.object(
+        appointment_notifications,
+        "_sms_notify_upcoming_appointment_practitioner",
+        return_value=True,
+    ) as send:
+        appointment_notifications.sms_notify_upcoming_appointments_practitioner()
+
+    send.assert_called_once_with(missed)
+    assert just_due.id not in {
+        c.args[1] for c in scheduler.acquire_send_lock.call_args_list
+    }
+
+
+def test_sweep_lag_keeps_two_runs_of_window(scheduler):
+    scheduler.is_dispatcher_running.return_value = True
+    minute = datetime.timedelta(minutes=1)
+
+    assert appointment_notifications._sweep_lag(window=2 * minute) == (
+        datetime.timedelta(0)
+    )
+    assert (
+        appointment_notifications._sweep_lag(window=10 * minute)
+        == appointment_notifications.REMINDER_SWEEP_LAG
+    )
+
+    # without a dispatcher the sweep is the only sender
+    scheduler.is_dispatcher_running.return_value = False
+    assert appointment_notifications._sweep_lag() == datetime.timedelta(0)
+
+
+def test_send_appointment_reminders_keeps_sent_pushes(factories, scheduler):
+    now = datetime.datetime.utcnow()
+    appointments = factories.AppointmentFactory.create_batch(
+        size=2,
+        scheduled_start=now + datetime.timedelta(minutes=60),
+        json={"notified_180m_sms": True},
+    )
+    with mock.patch.object(
+        appointment_notifications.braze_events,
+        "appointment_reminder_member",
+        side_effect=[None, Exception("braze is down")],
+    ), mock.patch.object(
+        appointment_notifications.db.session, "commit"
+    ) as commit, mock.patch.object(
+        appointment_notifications.db.session, "rollback"
+    ) as rollback:
+        session_calls = mock.Mock()
+        session_calls.attach_mock(commit, "commit")
+        session_calls.attach_mock(rollback, "rollback")
+        appointment_notifications.send_appointment_reminders(
+            "member_push_1h", [(a.id, now.isoformat()) for a in appointments]
+        )
+
+    # the first push is committed before the failed one rolls back
+    assert session_calls.mock_calls == [
+        mock.call.commit(),
+        mock.call.rollback(),
+        mock.call.commit(),
+    ]
+
+
+def test_dispatch_due_appointment_reminders(scheduler):
+    now = datetime.datetime.utcnow()
+    scheduler.claim_due.return_value = [
+        Reminder(kind=ReminderKind.MEMBER_SMS, entity_id=1, due_at=now),
+        Reminder(kind=ReminderKind.MEMBER_SMS, entity_id=2, due_at=now),
+        Reminder(kind=ReminderKind.PRACTITIONER_NO_SHOW, entity_id=3, due_at=now),
+    ]
+
+    with mock.patch.object(
+        appointment_notifications.send_appointment_reminders, "delay"
+    ) as delay:
+        appointment_notifications.dispatch_due_appointment_reminders(run_for_seconds=0)
+
+    assert delay.call_args_list == [
+        mock.call(
+            "member_sms",
+            [(1, now.isoformat()), (2, now.isoformat())],
+            team_ns="virtual_care",
+        ),
+        mock.call(
+            "practitioner_no_show", [(3, now.isoformat())], team_ns="virtual_care"
+        ),
+    ]
+
+
+def test_reconcile_appointment_reminders(factories, scheduler):
+    now = datetime.datetime.utcnow()
+    appointment = factories.AppointmentFactory.create(
+        scheduled_start=now + datetime.timedelta(minutes=30)
+    )
+
+    appointment_notifications.reconcile_appointment_reminders()
+
+    (scores,) = scheduler.update.call_args.args
+    assert set(scores) == {
+        f"member_sms:{appointment.id}",
+        f"practitioner_sms:{appointment.id}",
+    }
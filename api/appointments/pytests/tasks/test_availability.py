@@ -111,11 +111,14 @@ def test_delete_recurring_availability_not_found(
     mock_delete_schedule_recurring_block.assert_not_called()
 
 
+@patch("appointments.tasks.availability.NEXT_AVAILABILITY_ENABLED", True)
+@patch("appointments.tasks.availability.request_next_availability_refresh")
 @patch(
     "appointments.tasks.availability.RecurringScheduleAvailabilityService.delete_schedule_recurring_block"
 )
 def test_delete_recurring_availability(
     mock_delete_schedule_recurring_block,
+    mock_request_next_availability_refresh,
     factories,
     practitioner_user,
     schedule,
@@ -128,12 +131,18 @@ def test_delete_recurring_availability(
         until=start_date + datetime.timedelta(weeks=1),
     )
 
+    user = practitioner_user()
+
     delete_recurring_availability(
-        user_id=practitioner_user().id,
+        user_id=user.id,
         schedule_recurring_block_id=recurring_block.id,
     )
 
     mock_delete_schedule_recurring_block.assert_called()
+    # the deleted schedule events aren't seen by the next availability listeners
+    mock_request_next_availability_refresh.assert_called_once_with(
+        [f"practitioner:{user.id}"]
+    )
 
 
 @patch("appointments.tasks.availability.stats.gauge")
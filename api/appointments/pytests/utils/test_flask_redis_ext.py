@@ -112,3 +112,10 @@ class TestCache:
             )
             assert result == "PONG"
             mock_redis.evalsha.assert_called_once_with("sha1-hash", 1, "keys", "value")
+
+    def test_reset_connection_pools(self, redis_extension):
+        redis_extension.reset_connection_pools()
+
+        redis_extension.get_client(
+            APPOINTMENT_REDIS
+        ).connection_pool.reset.assert_called_once_with()
@@ -0,0 +1,231 @@
+import json
+from unittest import mock
+
+import pytest
+
+from appointments.models.appointment import Appointment
+from appointments.utils import response_cache
+from appointments.utils.flask_redis_ext import INVALIDATE_TAGS_SCRIPT, flask_redis
+from appointments.utils.response_cache import (
+    cached_get,
+    changed_entity_tags,
+    entity_tags,
+    invalidate_tags,
+    statement_tags,
+)
+
+
+@pytest.fixture(autouse=True)
+def response_cache_enabled():
+    with mock.patch.object(response_cache, "RESPONSE_CACHE_ENABLED", True):
+        yield
+
+
+class FakeRedis:
+    def __init__(self):
+        self.values = {}
+        self.sets = {}
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def pipeline(self, transaction=True):
+        return self
+
+    def setex(self, key, ttl, value):
+        self.values[key] = value.encode("utf-8")
+
+    def sadd(self, key, value):
+        self.sets.setdefault(key, set()).add(value)
+
+    def expire(self, key, ttl):
+        pass
+
+    def execute(self):
+        pass
+
+
+@pytest.fixture
+def fake_redis():
+    fake = FakeRedis()
+    with mock.patch.object(flask_redis, "get_client", return_value=fake):
+        yield fake
+
+
+class FakeResource:
+    def __init__(self, user, cache_key="/api/v1/foo"):
+        self.user = user
+        self.cache_key = cache_key
+        self.calls = 0
+
+    @cached_get(namespace="foo")
+    def get(self, appointment_id):
+        self.calls += 1
+        appointment = Appointment.query.get(appointment_id)
+        return {"id": appointment.id, "purpose": appointment.purpose}
+
+
+def test_entity_tags(factories):
+    appointment = factories.AppointmentFactory.create()
+
+    assert entity_tags(appointment) == {
+        f"response_cache:tag:appointment:{appointment.id}"
+    }
+
+
+def test_changed_entity_tags_include_foreign_keys(factories):
+    appointment = factories.AppointmentFactory.create()
+
+    assert (
+        f"response_cache:tag:schedule:{appointment.member_schedule_id}"
+        in changed_entity_tags(appointment)
+    )
+
+
+def test_flush_collects_and_commit_invalidates(factories, session):
+    appointment = factories.AppointmentFactory.create()
+    session.info.pop(response_cache._PENDING_INVALIDATIONS_KEY, None)
+
+    appointment.purpose = "changed"
+    session.flush()
+    pending = session.info[response_cache._PENDING_INVALIDATIONS_KEY]
+
+    with mock.patch("appointments.utils.response_cache.invalidate_tags") as invalidate:
+        response_cache.invalidate_responses(session)
+
+    invalidate.assert_called_once_with(pending)
+    assert f"response_cache:tag:appointment:{appointment.id}" in pending
+    assert response_cache._PENDING_INVALIDATIONS_KEY not in session.info
+
+
+def test_flush_collects_when_caching_is_disabled(factories, session):
+    appointment = factories.AppointmentFactory.create()
+    session.info.pop(response_cache._PENDING_INVALIDATIONS_KEY, None)
+
+    with mock.patch.object(response_cache, "RESPONSE_CACHE_ENABLED", False):
+        appointment.purpose = "changed"
+        session.flush()
+
+    assert (
+        f"response_cache:tag:appointment:{appointment.id}"
+        in session.info[response_cache._PENDING_INVALIDATIONS_KEY]
+    )
+
+
+def test_statement_tags():
+    table = Appointment.__table__
+
+    assert statement_tags(
+        table.update(whereclause=table.c.id == 1, values={"purpose": "changed"})
+    ) == {"response_cache:tag:appointment:1"}
+    assert statement_tags(table.delete(whereclause=table.c.id == 1)) == {
+        "response_cache:tag:appointment:1"
+    }
+    assert statement_tags(table.insert(values={"member_schedule_id": 2})) == {
+        "response_cache:tag:schedule:2"
+    }
+    # the schedule it referred to before is unknown
+    assert statement_tags(
+        table.update(whereclause=table.c.id == 1, values={"member_schedule_id": 2})
+    ) == {"response_cache:table:appointment"}
+    assert statement_tags(
+        table.update(whereclause=table.c.purpose == "old", values={"purpose": "new"})
+    ) == {"response_cache:table:appointment"}
+
+
+def test_bulk_and_core_updates_are_collected(factories, session):
+    appointment = factories.AppointmentFactory.create()
+    session.flush()
+    session.info.pop(response_cache._PENDING_INVALIDATIONS_KEY, None)
+
+    Appointment.query.filter(Appointment.id == appointment.id).update(
+        {"purpose": "bulk"}, synchronize_session=False
+    )
+    session.execute(
+        Appointment.__table__.update()
+        .where(Appointment.__table__.c.purpose == "bulk")
+        .values(purpose="core")
+    )
+
+    assert session.info[response_cache._PENDING_INVALIDATIONS_KEY] == {
+        f"response_cache:tag:appointment:{appointment.id}",
+        "response_cache:table:appointment",
+    }
+
+
+def test_rollback_discards_invalidations(factories, session):
+    factories.AppointmentFactory.create()
+    session.flush()
+
+    response_cache.discard_response_invalidations(session)
+
+    assert response_cache._PENDING_INVALIDATIONS_KEY not in session.info
+
+
+def test_invalidate_tags_in_batches():
+    tags = [f"response_cache:tag:appointment:{i}" for i in range(3)]
+    with mock.patch.object(flask_redis, "get_client"), mock.patch.object(
+        flask_redis, "execute_script"
+    ) as execute_script, mock.patch.object(response_cache, "INVALIDATE_BATCH_SIZE", 2):
+        invalidate_tags(tags)
+
+    assert [c.kwargs["keys"] for c in execute_script.call_args_list] == [
+        sorted(tags)[:2],
+        sorted(tags)[2:],
+    ]
+    assert execute_script.call_args.kwargs["script_name"] == INVALIDATE_TAGS_SCRIPT
+
+
+def test_invalidate_tags_swallows_errors():
+    with mock.patch.object(flask_redis, "get_client"), mock.patch.object(
+        flask_redis, "execute_script", side_effect=Exception("down")
+    ):
+        invalidate_tags(["response_cache:tag:appointment:1"])
+
+
+def test_cached_get_miss_then_hit(app, factories, fake_redis):
+    appointment = factories.AppointmentFactory.create()
+    resource = FakeResource(appointment.member_schedule.user)
+
+    with app.test_request_context("/api/v1/foo"):
+        body, status, headers = resource.get(appointment.id)
+    with app.test_request_context("/api/v1/foo"):
+        cached_body, cached_status, cached_headers = resource.get(appointment.id)
+
+    assert resource.calls == 1
+    assert cached_body == body == {"id": appointment.id, "purpose": appointment.purpose}
+    assert cached_status == status == 200
+    assert cached_headers["ETag"] == headers["ETag"]
+    (cache_key,) = fake_redis.values
+    assert (
+        cache_key in fake_redis.sets[f"response_cache:tag:appointment:{appointment.id}"]
+    )
+    assert cache_key in fake_redis.sets["response_cache:table:appointment"]
+    assert json.loads(fake_redis.values[cache_key])["body"] == body
+
+
+def test_cached_get_not_modified(app, factories, fake_redis):
+    appointment = factories.AppointmentFactory.create()
+    resource = FakeResource(appointment.member_schedule.user)
+    with app.test_request_context("/api/v1/foo"):
+        _, _, headers = resource.get(appointment.id)
+
+    with app.test_request_context(
+        "/api/v1/foo", headers={"If-None-Match": headers["ETag"]}
+    ):
+        response = resource.get(appointment.id)
+
+    assert response.status_code == 304
+    assert response.headers["ETag"] == headers["ETag"]
+
+
+def test_cached_get_disabled(app, factories, fake_redis):
+    appointment = factories.AppointmentFactory.create()
+    resource = FakeResource(appointment.member_schedule.user)
+
+    with mock.patch.object(response_cache, "RESPONSE_CACHE_ENABLED", False):
+        with app.test_request_context("/api/v1/foo"):
+            response = resource.get(appointment.id)
+
+    assert response == {"id": appointment.id, "purpose": appointment.purpose}
+    assert fake_redis.values == {}
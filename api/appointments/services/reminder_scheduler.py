@@ -0,0 +1,337 @@
+"""
+Due-time registry of appointment reminders.
+
+When an appointment is booked, rescheduled or cancelled, or a practitioner
+acknowledgement is created or answered, the reminders it needs are written to a
+Redis sorted set scored by the time they are due, e.g. "member_sms:42" two minutes
+before appointment 42 starts. appointment_notifications.dispatch_due_appointment_reminders
+claims the due members in batches and sends them as they come due. The scanning
+reminder jobs keep running as a reconciliation sweep: while the dispatcher runs, they
+pick up reminders up to REMINDER_SWEEP_LAG after they came due, and they skip
+reminders already sent.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import datetime
+import enum
+import os
+from typing import Any, Dict, Iterable, List, Mapping, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from appointments.models.appointment import Appointment
+from appointments.models.practitioner_appointment import PractitionerAppointmentAck
+from appointments.utils.flask_redis_ext import (
+    APPOINTMENT_REDIS,
+    CLAIM_DUE_REMINDERS_SCRIPT,
+    flask_redis,
+)
+from common import stats
+from utils.cache import timestamp_score
+from utils.log import logger
+from utils.query import has_changes
+
+log = logger(__name__)
+
+# needs workers consuming the reminders queue, see dispatch_due_appointment_reminders
+REMINDER_SCHEDULER_ENABLED = (
+    os.environ.get("REMINDER_SCHEDULER_ENABLED", "false").lower() == "true"
+)
+REMINDERS_KEY = "appointment_reminders:due"
+SEND_LOCK_KEY_PREFIX = "appointment_reminders:sending"
+DISPATCHER_HEARTBEAT_KEY = "appointment_reminders:dispatcher_heartbeat"
+# the dispatcher counts as running while it checked in this recently
+DISPATCHER_HEARTBEAT_TTL_SECONDS = 2 * 60
+REMINDER_SCHEDULER_ERRORS = "api.appointments.services.reminder_scheduler.errors"
+# reminders due further ahead than this were rescheduled and are sent by their new entry
+EARLY_REMINDER_TOLERANCE = datetime.timedelta(minutes=1)
+# advance booking reminders are only sent for appointments booked this long before
+ADVANCE_BOOKING_MIN_AGE = datetime.timedelta(hours=12)
+# keeps the dispatcher and the reconciliation sweep from sending the same reminder
+SEND_LOCK_TTL_SECONDS = 5 * 60
+# while the dispatcher runs, the reconciliation sweep leaves reminders to it for up to
+# this long after they come due
+REMINDER_SWEEP_LAG = datetime.timedelta(
+    seconds=int(os.environ.get("REMINDER_SWEEP_LAG_SECONDS", 60))
+)
+
+_PENDING_REMINDERS_KEY = "appointment_reminder_updates"
+
+
+class ReminderKind(str, enum.Enum):
+    MEMBER_SMS = "member_sms"
+    PRACTITIONER_SMS = "practitioner_sms"
+    MEMBER_PUSH_1H = "member_push_1h"
+    ADVANCE_BOOKING = "advance_booking"
+    PRACTITIONER_NO_SHOW = "practitioner_no_show"
+
+
+@dataclasses.dataclass(frozen=True)
+class ReminderWindow:
+    # due this long before the appointment starts
+    due_before_start: datetime.timedelta
+    # and no longer sent once less than this is left
+    expires_before_start: datetime.timedelta = datetime.timedelta(0)
+
+    def due_at(self, scheduled_start: datetime.datetime) -> datetime.datetime:
+        return scheduled_start - self.due_before_start
+
+    def is_due(
+        self, scheduled_start: datetime.datetime, now: datetime.datetime
+    ) -> bool:
+        return (
+            self.due_at(scheduled_start) <= now + EARLY_REMINDER_TOLERANCE
+            and now < scheduled_start - self.expires_before_start
+        )
+
+
+# the windows of the scanning jobs each kind replaces
+APPOINTMENT_REMINDER_WINDOWS: Dict[ReminderKind, ReminderWindow] = {
+    ReminderKind.MEMBER_SMS: ReminderWindow(datetime.timedelta(minutes=2)),
+    ReminderKind.PRACTITIONER_SMS: ReminderWindow(datetime.timedelta(minutes=10)),
+    ReminderKind.MEMBER_PUSH_1H: ReminderWindow(
+        datetime.timedelta(minutes=60), datetime.timedelta(minutes=50)
+    ),
+    ReminderKind.ADVANCE_BOOKING: ReminderWindow(
+        datetime.timedelta(hours=24), datetime.timedelta(hours=23)
+    ),
+}
+
+
+@dataclasses.dataclass(frozen=True)
+class Reminder:
+    kind: ReminderKind
+    # the appointment id, or the practitioner appointment ack id for no-shows
+    entity_id: int
+    due_at: datetime.datetime
+
+    @property
+    def member(self) -> str:
+        return reminder_member(self.kind, self.entity_id)
+
+    @classmethod
+    def from_member(cls, member: str | bytes, score: float) -> Reminder:
+        if isinstance(member, bytes):
+            member = member.decode("utf-8")
+        kind, _, entity_id = member.rpartition(":")
+        return cls(
+            kind=ReminderKind(kind),
+            entity_id=int(entity_id),
+            due_at=datetime.datetime.utcfromtimestamp(float(score)),
+        )
+
+
+def reminder_member(kind: ReminderKind, entity_id: int) -> str:
+    return f"{kind.value}:{entity_id}"
+
+
+def appointment_reminder_scores(
+    appointment: Any, now: datetime.datetime
+) -> Dict[str, Optional[float]]:
+    """
+    The due time of each appointment reminder as a sorted set score, None for the
+    reminders the appointment doesn't need (anymore).
+
+    Takes an Appointment or a row with its id, scheduled_start, created_at and
+    cancelled_at.
+    """
+    scores: Dict[str, Optional[float]] = {}
+    if appointment.scheduled_start is None:
+        return scores
+    for kind, window in APPOINTMENT_REMINDER_WINDOWS.items():
+        due_at = window.due_at(appointment.scheduled_start)
+        needed = appointment.cancelled_at is None and now < (
+            appointment.scheduled_start - window.expires_before_start
+        )
+        if kind == ReminderKind.ADVANCE_BOOKING and appointment.created_at:
+            needed = (
+                needed and appointment.created_at + ADVANCE_BOOKING_MIN_AGE < due_at
+            )
+        scores[reminder_member(kind, appointment.id)] = (
+            timestamp_score(due_at) if needed else None
+        )
+    return scores
+
+
+def no_show_reminder_scores(ack: Any) -> Dict[str, Optional[float]]:
+    """The due time of the no-show alert of a practitioner appointment ack."""
+    needed = not (ack.is_acked or ack.is_alerted)
+    return {
+        reminder_member(ReminderKind.PRACTITIONER_NO_SHOW, ack.id): (
+            timestamp_score(ack.ack_by) if needed else None
+        )
+    }
+
+
+class ReminderScheduler:
+    def __init__(
+        self, key: str = REMINDERS_KEY, redis_name: str = APPOINTMENT_REDIS
+    ) -> None:
+        self.key = key
+        self.redis_name = redis_name
+
+    def update(self, scores: Mapping[str, Optional[float]]) -> None:
+        """Add or move the reminders with a score, and remove the ones with None."""
+        to_add = {m: score for m, score in scores.items() if score is not None}
+        to_remove = [m for m, score in scores.items() if score is None]
+        client = flask_redis.get_client(self.redis_name)
+        if client is None or not (to_add or to_remove):
+            return
+        try:
+            pipeline = client.pipeline(transaction=False)
+            if to_add:
+                pipeline.zadd(self.key, to_add)
+            if to_remove:
+                pipeline.zrem(self.key, *to_remove)
+            pipeline.execute()
+        except Exception as e:
+            # the reconciliation sweep sends what is missed here
+            log.error("Failed to update appointment reminders", error=str(e))
+            self._increment_errors("update")
+
+    def claim_due(self, now: datetime.datetime, limit: int) -> List[Reminder]:
+        """Remove and return up to limit reminders due by now, earliest first."""
+        try:
+            claimed = flask_redis.execute_script(
+                script_name=CLAIM_DUE_REMINDERS_SCRIPT,
+                client_name=self.redis_name,
+                keys=[self.key],
+                args=[timestamp_score(now), limit],
+            )
+        except Exception as e:
+            log.error("Failed to claim due appointment reminders", error=str(e))
+            self._increment_errors("claim")
+            return []
+        reminders = []
+        for member, score in zip(claimed[::2], claimed[1::2]):
+            try:
+                reminders.append(Reminder.from_member(member, score))
+            except ValueError:
+                log.warning("Ignoring invalid appointment reminder", member=member)
+        return reminders
+
+    def next_due_at(self) -> Optional[datetime.datetime]:
+        client = flask_redis.get_client(self.redis_name)
+        if client is None:
+            return None
+        try:
+            first = client.zrange(self.key, 0, 0, withscores=True)
+        except Exception as e:
+            log.warning("Failed to read next appointment reminder", error=str(e))
+            return None
+        if not first:
+            return None
+        return Reminder.from_member(*first[0]).due_at
+
+    def record_dispatcher_heartbeat(self) -> None:
+        client = flask_redis.get_client(self.redis_name)
+        if client is None:
+            return
+        try:
+            client.set(DISPATCHER_HEARTBEAT_KEY, 1, ex=DISPATCHER_HEARTBEAT_TTL_SECONDS)
+        except Exception as e:
+            log.warning("Failed to record reminder dispatcher heartbeat", error=str(e))
+
+    def is_dispatcher_running(self) -> bool:
+        """Whether the dispatcher checked in recently, False when it can't be told."""
+        client = flask_redis.get_client(self.redis_name)
+        if client is None:
+            return False
+        try:
+            return bool(client.exists(DISPATCHER_HEARTBEAT_KEY))
+        except Exception as e:
+            log.warning("Failed to read reminder dispatcher heartbeat", error=str(e))
+            return False
+
+    @staticmethod
+    def _send_lock_key(kind: ReminderKind, entity_id: int) -> str:
+        return f"{SEND_LOCK_KEY_PREFIX}:{reminder_member(kind, entity_id)}"
+
+    def acquire_send_lock(self, kind: ReminderKind, entity_id: int) -> bool:
+        """False when the reminder is being, or was just, sent by someone else."""
+        client = flask_redis.get_client(self.redis_name)
+        if client is None:
+            return True
+        try:
+            return bool(
+                client.set(
+                    self._send_lock_key(kind, entity_id),
+                    1,
+                    nx=True,
+                    ex=SEND_LOCK_TTL_SECONDS,
+                )
+            )
+        except Exception as e:
+            # fall back to the notified flags of the appointment
+            log.warning("Failed to lock appointment reminder", error=str(e))
+            return True
+
+    def release_send_lock(self, kind: ReminderKind, entity_id: int) -> None:
+        client = flask_redis.get_client(self.redis_name)
+        if client is None:
+            return
+        try:
+            client.delete(self._send_lock_key(kind, entity_id))
+        except Exception as e:
+            log.warning("Failed to unlock appointment reminder", error=str(e))
+
+    @staticmethod
+    def _increment_errors(operation: str) -> None:
+        stats.increment(
+            metric_name=REMINDER_SCHEDULER_ERRORS,
+            pod_name=stats.PodNames.VIRTUAL_CARE,
+            tags=[f"operation:{operation}"],
+        )
+
+
+reminder_scheduler = ReminderScheduler()
+
+
+@event.listens_for(Session, "after_flush")
+def collect_reminder_updates(session, flush_context):  # type: ignore[no-untyped-def] # Function is missing a type annotation
+    if not REMINDER_SCHEDULER_ENABLED:
+        return
+    now = datetime.datetime.utcnow()
+    updates: Dict[str, Optional[float]] = {}
+    # new, dirty and deleted still hold the state from before the flush, with the
+    # ids of new instances assigned
+    for instance in session.new:
+        if isinstance(instance, Appointment):
+            scores = appointment_reminder_scores(instance, now)
+        elif isinstance(instance, PractitionerAppointmentAck):
+            scores = no_show_reminder_scores(instance)
+        else:
+            continue
+        # nothing is registered for a new instance yet
+        updates.update((m, score) for m, score in scores.items() if score is not None)
+    for instance in session.dirty:
+        if isinstance(instance, Appointment) and has_changes(
+            instance, ("scheduled_start", "cancelled_at")
+        ):
+            updates.update(appointment_reminder_scores(instance, now))
+        elif isinstance(instance, PractitionerAppointmentAck) and has_changes(
+            instance, ("ack_by", "is_acked", "is_alerted")
+        ):
+            updates.update(no_show_reminder_scores(instance))
+    for instance in session.deleted:
+        if isinstance(instance, Appointment):
+            updates.update(dict.fromkeys(appointment_reminder_scores(instance, now)))
+        elif isinstance(instance, PractitionerAppointmentAck):
+            updates.update(dict.fromkeys(no_show_reminder_scores(instance)))
+    if updates:
+        session.info.setdefault(_PENDING_REMINDERS_KEY, {}).update(updates)
+
+
+@event.listens_for(Session, "after_commit")
+def register_reminders(session):  # type: ignore[no-untyped-def] # Function is missing a type annotation
+    updates = session.info.pop(_PENDING_REMINDERS_KEY, None)
+    if updates:
+        reminder_scheduler.update(updates)
+
+
+@event.listens_for(Session, "after_rollback")
+def discard_reminder_updates(session):  # type: ignore[no-untyped-def] # Function is missing a type annotation
+    session.info.pop(_PENDING_REMINDERS_KEY, None)
@@ -1,6 +1,10 @@
 from __future__ import annotations
 
+import calendar
 import datetime
+import time
+from collections import defaultdict
+from typing import Any, Callable, List, Optional, Tuple
 
 import ddtrace
 from flask import current_app
@@ -10,6 +14,17 @@ from appointments.models.appointment import Appointment
 from appointments.models.constants import APPOINTMENT_STATES, AppointmentTypes
 from appointments.models.member_appointment import MemberAppointmentAck
 from appointments.models.practitioner_appointment import PractitionerAppointmentAck
+from appointments.services.reminder_scheduler import (
+    ADVANCE_BOOKING_MIN_AGE,
+    APPOINTMENT_REMINDER_WINDOWS,
+    EARLY_REMINDER_TOLERANCE,
+    REMINDER_SCHEDULER_ENABLED,
+    REMINDER_SWEEP_LAG,
+    ReminderKind,
+    appointment_reminder_scores,
+    no_show_reminder_scores,
+    reminder_scheduler,
+)
 from appointments.utils.appointment_utils import convert_time_to_message_str
 from authz.models.roles import ROLES
 from common import stats
@@ -54,6 +69,17 @@ log = logger(__name__)
 
 TWILIO_MINIMUM_SEND_AT_DELAY = 900
 
+# reminders claimed from the scheduler per batch, each kind is sent by one job
+REMINDER_DISPATCH_BATCH_SIZE = 500
+# dispatch_due_appointment_reminders runs every minute, for just under a minute, on
+# the reminders queue so it doesn't hold a priority worker
+REMINDER_DISPATCH_RUN_SECONDS = 55
+REMINDER_DISPATCH_MAX_SLEEP_SECONDS = 1.0
+# reminders sent later than this after they were due are not on time
+REMINDER_ON_TIME_SECONDS = 30
+REMINDERS_SENT = "api.appointments.tasks.appointment_notifications.reminders_sent"
+REMINDER_DELAY = "api.appointments.tasks.appointment_notifications.reminder_delay"
+
 
 @job("priority", traced_parameters=("appointment_id",))
 @ddtrace.tracer.wrap()
@@ -546,7 +572,12 @@ def remind_members_about_advance_bookings() -> None:
         db.session.query(Appointment)
         .filter(
             Appointment.scheduled_start > now + datetime.timedelta(hours=23),
-            Appointment.scheduled_start < now + datetime.timedelta(hours=24),
+            Appointment.scheduled_start < now + datetime.timedelta(hours=24)
+            # the window is an hour wide and this runs every 5 minutes
+            - _sweep_lag(
+                window=datetime.timedelta(hours=1),
+                cron_period=datetime.timedelta(minutes=5),
+            ),
             Appointment.created_at < now - datetime.timedelta(hours=12),
             Appointment.cancelled_at.is_(None),
             Appointment.reminder_sent_at.is_(None),
@@ -556,17 +587,35 @@ def remind_members_about_advance_bookings() -> None:
 
     log.info("Got %s appointments to notify about advance booking", len(appointments))
     for appointment in appointments:
-        log.debug(
-            (
-                f"Current time: {now}. Appointment time: {appointment.scheduled_start} "
-                f"Appointment created time: {appointment.created_at}"
-            )
-        )
-        braze_events.appointment_reminder_member(
-            appointment=appointment, event_name=BRAZE_UPCOMING_APPT_REMINDER_24H
+        if _send_reminder(
+            ReminderKind.ADVANCE_BOOKING,
+            appointment.id,
+            _remind_member_about_advance_booking,
+            appointment,
+            now,
+        ):
+            _record_sent_reminder(ReminderKind.ADVANCE_BOOKING, None)
+
+
+def _remind_member_about_advance_booking(
+    appointment: Appointment, now: datetime.datetime
+) -> bool:
+    if appointment.reminder_sent_at is not None or (
+        appointment.created_at >= now - ADVANCE_BOOKING_MIN_AGE
+    ):
+        return False
+    log.debug(
+        (
+            f"Current time: {now}. Appointment time: {appointment.scheduled_start} "
+            f"Appointment created time: {appointment.created_at}"
         )
-        appointment.reminder_sent_at = now
-        db.session.commit()
+    )
+    braze_events.appointment_reminder_member(
+        appointment=appointment, event_name=BRAZE_UPCOMING_APPT_REMINDER_24H
+    )
+    appointment.reminder_sent_at = now
+    db.session.commit()
+    return True
 
 
 @job("priority")
@@ -576,7 +625,7 @@ def notify_about_upcoming_noshows() -> None:
     upcoming = (
         db.session.query(PractitionerAppointmentAck)
         .filter(
-            PractitionerAppointmentAck.ack_by <= now,
+            PractitionerAppointmentAck.ack_by <= now - _sweep_lag(),
             PractitionerAppointmentAck.is_acked == False,
             PractitionerAppointmentAck.is_alerted == False,
         )
@@ -587,40 +636,56 @@ def notify_about_upcoming_noshows() -> None:
 
     log.debug("Got upcoming noshows: %s", upcoming)
     for ack in upcoming:
-        if ack.appointment.cancelled_at:
-            log.debug("Appointment is cancelled, not a no-show...")
-
-            # mark alerted since we don't want to alert here
-            ack.is_alerted = True
-            db.session.add(ack)
-            db.session.commit()
-            continue
-
-        log.debug("Alerting for upcoming noshow for %s", ack.appointment)
+        if _send_reminder(
+            ReminderKind.PRACTITIONER_NO_SHOW,
+            ack.id,
+            _alert_upcoming_noshow,
+            ack,
+            track_svc,
+        ):
+            _record_sent_reminder(ReminderKind.PRACTITIONER_NO_SHOW, None)
 
-        tmpl = (
-            "<!channel> Appointment {id} upcoming practitioner no-show "
-            "for {practitioner_name} - ({phone_number})"
-        )
 
-        practitioner = ack.appointment.practitioner
-        message = tmpl.format(
-            id=ack.appointment.id,
-            practitioner_name=practitioner.full_name,
-            phone_number=ack.phone_number,
-        )
-        notify_bookings_channel(message)
-
-        if track_svc.is_enterprise(user_id=ack.appointment.member.id):
-            notify_enterprise_bookings_channel(message)
-            vip_title = "VIP Appointment No-show"
-            notify_vip_bookings(ack.appointment.member, vip_title, message)
+def _alert_upcoming_noshow(
+    ack: PractitionerAppointmentAck, track_svc: tracks_svc.TrackSelectionService
+) -> bool:
+    if ack.is_acked or ack.is_alerted:
+        return False
+    if ack.appointment.cancelled_at:
+        log.debug("Appointment is cancelled, not a no-show...")
 
+        # mark alerted since we don't want to alert here
         ack.is_alerted = True
         db.session.add(ack)
         db.session.commit()
+        return False
+
+    log.debug("Alerting for upcoming noshow for %s", ack.appointment)
+
+    tmpl = (
+        "<!channel> Appointment {id} upcoming practitioner no-show "
+        "for {practitioner_name} - ({phone_number})"
+    )
+
+    practitioner = ack.appointment.practitioner
+    message = tmpl.format(
+        id=ack.appointment.id,
+        practitioner_name=practitioner.full_name,
+        phone_number=ack.phone_number,
+    )
+    notify_bookings_channel(message)
 
-        log.debug("Alerted channel about upcoming noshow for %s", ack.appointment)
+    if track_svc.is_enterprise(user_id=ack.appointment.member.id):
+        notify_enterprise_bookings_channel(message)
+        vip_title = "VIP Appointment No-show"
+        notify_vip_bookings(ack.appointment.member, vip_title, message)
+
+    ack.is_alerted = True
+    db.session.add(ack)
+    db.session.commit()
+
+    log.debug("Alerted channel about upcoming noshow for %s", ack.appointment)
+    return True
 
 
 @retryable_job("priority", retry_limit=3, team_ns="virtual_care")
@@ -636,7 +701,12 @@ def sms_notify_upcoming_appointments_member() -> None:
         .filter(
             Appointment.scheduled_start > datetime.datetime.utcnow(),
             Appointment.scheduled_start
-            <= datetime.datetime.utcnow() + datetime.timedelta(minutes=2),
+            <= datetime.datetime.utcnow() + datetime.timedelta(minutes=2)
+            # runs every minute
+            - _sweep_lag(
+                window=datetime.timedelta(minutes=2),
+                cron_period=datetime.timedelta(minutes=1),
+            ),
             Appointment.cancelled_at == None,
         )
         .all()
@@ -648,97 +718,109 @@ def sms_notify_upcoming_appointments_member() -> None:
         )
 
     for appointment in appointments:
-        if not appointment.state == APPOINTMENT_STATES.scheduled:
-            log.info(
-                f"Appointment {appointment.id} not scheduled - unable to notify for upcoming appointment"
-            )
-            continue
+        if _send_reminder(
+            ReminderKind.MEMBER_SMS,
+            appointment.id,
+            _sms_notify_upcoming_appointment_member,
+            appointment,
+        ):
+            _record_sent_reminder(ReminderKind.MEMBER_SMS, None)
 
-        # determine if the user was already notified
-        notified = False
-        push_key = _get_push_key(application_name)
-        sms_key = _get_sms_key(application_name)
-        keys = [push_key, sms_key]
-        for notification_key in keys:
-            if appointment.json.get(notification_key):
-                log.info(
-                    f"Already notified {application_name} for appointment {appointment.id}",
-                    notification_key=notification_key,
-                )
-                notified = True
-                break
-
-        if notified:
-            continue
 
+def _sms_notify_upcoming_appointment_member(appointment: Appointment) -> bool:
+    application_name = ROLES.member
+    if not appointment.state == APPOINTMENT_STATES.scheduled:
         log.info(
-            "Attempting to send SMS to member for upcoming appointment",
-            appointment_id=appointment.id,
+            f"Appointment {appointment.id} not scheduled - unable to notify for upcoming appointment"
         )
+        return False
 
-        # get profile
-        profile: MemberProfile | PractitionerProfile
-        user = appointment.member
-        profile = user.member_profile
-        if not profile:
-            log.warning(
-                "Unable to send SMS for upcoming appointment - profile unavailable",
-                application_name=application_name,
-                appointment_id=appointment.id,
-                user_id=user.id,
-                user_role=ROLES.member,
+    # determine if the user was already notified
+    notified = False
+    push_key = _get_push_key(application_name)
+    sms_key = _get_sms_key(application_name)
+    keys = [push_key, sms_key]
+    for notification_key in keys:
+        if appointment.json.get(notification_key):
+            log.info(
+                f"Already notified {application_name} for appointment {appointment.id}",
+                notification_key=notification_key,
             )
+            notified = True
+            break
 
-            stats.increment(
-                metric_name=SMS_MISSING_PROFILE,
-                pod_name=stats.PodNames.VIRTUAL_CARE,
-                tags=[
-                    "result:failure",
-                    "notification_type:appointments",
-                    f"user_role:{ROLES.member}",
-                    "source:sms_notify_upcoming_appointments_member",
-                ],
-            )
-            continue
+    if notified:
+        return False
 
-        elif not profile.phone_number:
-            log.warning(
-                "Unable to send SMS for upcoming appointment - profile number unavailable",
-                application_name=application_name,
-                appointment_id=appointment.id,
-                user_id=user.id,
-                user_role=ROLES.member,
-            )
+    log.info(
+        "Attempting to send SMS to member for upcoming appointment",
+        appointment_id=appointment.id,
+    )
 
-            stats.increment(
-                metric_name=SMS_MISSING_PROFILE_NUMBER,
-                pod_name=stats.PodNames.VIRTUAL_CARE,
-                tags=[
-                    "result:failure",
-                    "notification_type:appointments",
-                    f"user_role:{ROLES.member}",
-                    "source:sms_notify_upcoming_appointments_member",
-                ],
-            )
-            continue
+    # get profile
+    profile: MemberProfile | PractitionerProfile
+    user = appointment.member
+    profile = user.member_profile
+    if not profile:
+        log.warning(
+            "Unable to send SMS for upcoming appointment - profile unavailable",
+            application_name=application_name,
+            appointment_id=appointment.id,
+            user_id=user.id,
+            user_role=ROLES.member,
+        )
 
-        # sms message
-        message = message_with_enforced_locale(
-            user=user, text_key="notify_member_upcoming_appointment"
-        ).format(appointment_start_time_remaining=appointment._starts_in_minutes())
+        stats.increment(
+            metric_name=SMS_MISSING_PROFILE,
+            pod_name=stats.PodNames.VIRTUAL_CARE,
+            tags=[
+                "result:failure",
+                "notification_type:appointments",
+                f"user_role:{ROLES.member}",
+                "source:sms_notify_upcoming_appointments_member",
+            ],
+        )
+        return False
 
-        phone_number = profile.phone_number
-        parsed_phone_number = parse_phone_number(phone_number)
-        # if we were unable to parse the phone number we adhere to the default condition of including the url
-        if not parsed_phone_number or country_accepts_url_in_sms(parsed_phone_number):
-            cta_link = message_with_enforced_locale(
-                user=user, text_key="cta_notify_member_upcoming_appointment_link"
-            ).format(url=f"{current_app.config['BASE_URL']}/my-appointments")
-            message = f"{message} {cta_link}"
+    elif not profile.phone_number:
+        log.warning(
+            "Unable to send SMS for upcoming appointment - profile number unavailable",
+            application_name=application_name,
+            appointment_id=appointment.id,
+            user_id=user.id,
+            user_role=ROLES.member,
+        )
 
-        _send_sms_upcoming_appointment(
-            appointment, profile, sms_key, application_name, message
+        stats.increment(
+            metric_name=SMS_MISSING_PROFILE_NUMBER,
+            pod_name=stats.PodNames.VIRTUAL_CARE,
+            tags=[
+                "result:failure",
+                "notification_type:appointments",
+                f"user_role:{ROLES.member}",
+                "source:sms_notify_upcoming_appointments_member",
+            ],
         )
+        return False
+
+    # sms message
+    message = message_with_enforced_locale(
+        user=user, text_key="notify_member_upcoming_appointment"
+    ).format(appointment_start_time_remaining=appointment._starts_in_minutes())
+
+    phone_number = profile.phone_number
+    parsed_phone_number = parse_phone_number(phone_number)
+    # if we were unable to parse the phone number we adhere to the default condition of including the url
+    if not parsed_phone_number or country_accepts_url_in_sms(parsed_phone_number):
+        cta_link = message_with_enforced_locale(
+            user=user, text_key="cta_notify_member_upcoming_appointment_link"
+        ).format(url=f"{current_app.config['BASE_URL']}/my-appointments")
+        message = f"{message} {cta_link}"
+
+    _send_sms_upcoming_appointment(
+        appointment, profile, sms_key, application_name, message
+    )
+    return True
 
 
 @ddtrace.tracer.wrap()
@@ -984,7 +1066,12 @@ def sms_notify_upcoming_appointments_practitioner() -> None:
         .filter(
             Appointment.scheduled_start > datetime.datetime.utcnow(),
             Appointment.scheduled_start
-            <= datetime.datetime.utcnow() + datetime.timedelta(minutes=10),
+            <= datetime.datetime.utcnow() + datetime.timedelta(minutes=10)
+            # runs every minute
+            - _sweep_lag(
+                window=datetime.timedelta(minutes=10),
+                cron_period=datetime.timedelta(minutes=1),
+            ),
             Appointment.cancelled_at == None,
         )
         .all()
@@ -996,91 +1083,103 @@ def sms_notify_upcoming_appointments_practitioner() -> None:
         )
 
     for appointment in appointments:
-        if not appointment.state == APPOINTMENT_STATES.scheduled:
-            log.info(
-                f"Appointment {appointment.id} not scheduled - unable to notify for upcoming appointment"
-            )
-            continue
-
-        # determine if the user was already notified
-        notified = False
-        push_key = _get_push_key(application_name)
-        sms_key = _get_sms_key(application_name)
-        keys = [push_key, sms_key]
-        for notification_key in keys:
-            if appointment.json.get(notification_key):
-                log.info(
-                    f"Already notified {application_name} for appointment {appointment.id}",
-                    notification_key=notification_key,
-                )
-                notified = True
-                break
+        if _send_reminder(
+            ReminderKind.PRACTITIONER_SMS,
+            appointment.id,
+            _sms_notify_upcoming_appointment_practitioner,
+            appointment,
+        ):
+            _record_sent_reminder(ReminderKind.PRACTITIONER_SMS, None)
 
-        if notified:
-            continue
 
+def _sms_notify_upcoming_appointment_practitioner(appointment: Appointment) -> bool:
+    application_name = ROLES.practitioner
+    if not appointment.state == APPOINTMENT_STATES.scheduled:
         log.info(
-            f"Attempting to send SMS to practitioner for upcoming appointment {appointment.id}",
-            appointment_id=appointment.id,
+            f"Appointment {appointment.id} not scheduled - unable to notify for upcoming appointment"
         )
+        return False
 
-        # get profile
-        profile: MemberProfile | PractitionerProfile
-        user = appointment.practitioner
-        profile = user.practitioner_profile
-        user_role = user.role_name if profile else None
-        if not profile:
-            log.warning(
-                "Unable to send SMS for upcoming appointment - profile unavailable",
-                application_name=application_name,
-                appointment_id=appointment.id,
-                user_id=user.id,
-                user_role=user_role,
+    # determine if the user was already notified
+    notified = False
+    push_key = _get_push_key(application_name)
+    sms_key = _get_sms_key(application_name)
+    keys = [push_key, sms_key]
+    for notification_key in keys:
+        if appointment.json.get(notification_key):
+            log.info(
+                f"Already notified {application_name} for appointment {appointment.id}",
+                notification_key=notification_key,
             )
+            notified = True
+            break
 
-            stats.increment(
-                metric_name=SMS_MISSING_PROFILE,
-                pod_name=stats.PodNames.VIRTUAL_CARE,
-                tags=[
-                    "result:success",
-                    "notification_type:appointments",
-                    f"user_role:{user_role}",
-                    "source:sms_notify_upcoming_appointments_practitioner",
-                ],
-            )
-            continue
-        elif not profile.phone_number:
-            log.warning(
-                "Unable to send SMS for upcoming appointment - profile number unavailable",
-                application_name=application_name,
-                appointment_id=appointment.id,
-                user_id=user.id,
-                user_role=user_role,
-            )
+    if notified:
+        return False
 
-            stats.increment(
-                metric_name=SMS_MISSING_PROFILE_NUMBER,
-                pod_name=stats.PodNames.VIRTUAL_CARE,
-                tags=[
-                    "result:failure",
-                    "notification_type:appointments",
-                    f"user_role:{user_role}",
-                    "source:sms_notify_upcoming_appointments_practitioner",
-                ],
-            )
-            continue
+    log.info(
+        f"Attempting to send SMS to practitioner for upcoming appointment {appointment.id}",
+        appointment_id=appointment.id,
+    )
+
+    # get profile
+    profile: MemberProfile | PractitionerProfile
+    user = appointment.practitioner
+    profile = user.practitioner_profile
+    user_role = user.role_name if profile else None
+    if not profile:
+        log.warning(
+            "Unable to send SMS for upcoming appointment - profile unavailable",
+            application_name=application_name,
+            appointment_id=appointment.id,
+            user_id=user.id,
+            user_role=user_role,
+        )
 
-        # sms message
-        message = f"Your next Maven appointment starts in {appointment._starts_in_minutes()} minutes! Make sure you have good WiFi."
-        parsed_phone_number = parse_phone_number(profile.phone_number)
-        # if we were unable to parse the phone number we adhere to the default condition of including the url
-        if not parsed_phone_number or country_accepts_url_in_sms(parsed_phone_number):
-            deeplink = f"{current_app.config['BASE_URL']}/mp_/my-schedule"
-            message = f"{message} Review appointment details here: {deeplink}"
+        stats.increment(
+            metric_name=SMS_MISSING_PROFILE,
+            pod_name=stats.PodNames.VIRTUAL_CARE,
+            tags=[
+                "result:success",
+                "notification_type:appointments",
+                f"user_role:{user_role}",
+                "source:sms_notify_upcoming_appointments_practitioner",
+            ],
+        )
+        return False
+    elif not profile.phone_number:
+        log.warning(
+            "Unable to send SMS for upcoming appointment - profile number unavailable",
+            application_name=application_name,
+            appointment_id=appointment.id,
+            user_id=user.id,
+            user_role=user_role,
+        )
 
-        _send_sms_upcoming_appointment(
-            appointment, profile, sms_key, application_name, message
+        stats.increment(
+            metric_name=SMS_MISSING_PROFILE_NUMBER,
+            pod_name=stats.PodNames.VIRTUAL_CARE,
+            tags=[
+                "result:failure",
+                "notification_type:appointments",
+                f"user_role:{user_role}",
+                "source:sms_notify_upcoming_appointments_practitioner",
+            ],
         )
+        return False
+
+    # sms message
+    message = f"Your next Maven appointment starts in {appointment._starts_in_minutes()} minutes! Make sure you have good WiFi."
+    parsed_phone_number = parse_phone_number(profile.phone_number)
+    # if we were unable to parse the phone number we adhere to the default condition of including the url
+    if not parsed_phone_number or country_accepts_url_in_sms(parsed_phone_number):
+        deeplink = f"{current_app.config['BASE_URL']}/mp_/my-schedule"
+        message = f"{message} Review appointment details here: {deeplink}"
+
+    _send_sms_upcoming_appointment(
+        appointment, profile, sms_key, application_name, message
+    )
+    return True
 
 
 def _send_sms_upcoming_appointment(
@@ -1727,7 +1826,15 @@ def handle_push_notifications_for_1_hour_reminder() -> None:
 
     # calculate the reminder window with a buffer; give a 10 minute buffer so the cron has 1 chance to miss
     p50 = now + datetime.timedelta(minutes=60 - buffer_minutes)
-    p60 = now + datetime.timedelta(minutes=60)
+    # runs every 5 minutes
+    p60 = (
+        now
+        + datetime.timedelta(minutes=60)
+        - _sweep_lag(
+            window=datetime.timedelta(minutes=buffer_minutes),
+            cron_period=datetime.timedelta(minutes=5),
+        )
+    )
 
     notified_appts = (
         db.session.query(Appointment)
@@ -1740,15 +1847,28 @@ def handle_push_notifications_for_1_hour_reminder() -> None:
     )
 
     for appt in notified_appts:
-        if "notified_60m_push" not in appt.json:
-            braze_events.appointment_reminder_member(
-                appointment=appt, event_name=BRAZE_UPCOMING_APPT_REMINDER_1H
-            )
-            appt.json["notified_60m_push"] = True
-            db.session.add(appt)
+        if _send_reminder(
+            ReminderKind.MEMBER_PUSH_1H, appt.id, _push_1_hour_reminder, appt
+        ):
+            _record_sent_reminder(ReminderKind.MEMBER_PUSH_1H, None)
     db.session.commit()
 
 
+def _push_1_hour_reminder(appt: Appointment) -> bool:
+    # only for appointments that received the 3-hour SMS reminder
+    if "notified_180m_sms" not in appt.json or "notified_60m_push" in appt.json:
+        return False
+    braze_events.appointment_reminder_member(
+        appointment=appt, event_name=BRAZE_UPCOMING_APPT_REMINDER_1H
+    )
+    appt.json["notified_60m_push"] = True
+    db.session.add(appt)
+    # committed right away so a later failure in the batch can't roll back the flag
+    # of a push Braze already has
+    db.session.commit()
+    return True
+
+
 @job("priority")
 def remind_booking_series() -> None:
     """
@@ -2170,3 +2290,234 @@ def cancel_member_appointment_confirmation(appointment_id: int) -> None:
         # Remove the ack from the database
         db.session.delete(ack_to_cancel)
         db.session.commit()
+
+
+def _sweep_lag(
+    window: Optional[datetime.timedelta] = None,
+    cron_period: datetime.timedelta = datetime.timedelta(minutes=1),
+) -> datetime.timedelta:
+    """
+    How long after a reminder comes due the scanning jobs pick it up. While the
+    dispatcher runs they leave it the reminders that just came due, but keep a window
+    of at least two of their runs, so a late run doesn't skip appointments.
+    """
+    if not (REMINDER_SCHEDULER_ENABLED and reminder_scheduler.is_dispatcher_running()):
+        return datetime.timedelta(0)
+    if window is None:
+        return REMINDER_SWEEP_LAG
+    return max(min(REMINDER_SWEEP_LAG, window - 2 * cron_period), datetime.timedelta(0))
+
+
+def _send_reminder(
+    kind: ReminderKind, entity_id: int, send: Callable[..., bool], *args: Any
+) -> bool:
+    """
+    Calls send unless the other of the dispatcher and the reconciliation sweep is
+    sending the same reminder. Returns whether it was sent.
+    """
+    if REMINDER_SCHEDULER_ENABLED and not reminder_scheduler.acquire_send_lock(
+        kind, entity_id
+    ):
+        return False
+    try:
+        sent = send(*args)
+    except Exception:
+        reminder_scheduler.release_send_lock(kind, entity_id)
+        raise
+    if not sent:
+        reminder_scheduler.release_send_lock(kind, entity_id)
+    return sent
+
+
+def _record_sent_reminder(
+    kind: ReminderKind,
+    due_at: Optional[datetime.datetime],
+    now: Optional[datetime.datetime] = None,
+) -> None:
+    """
+    Counts a sent reminder. The on-time rate of a kind is the share of
+    on_time:true in reminders_sent, reminders sent by the reconciliation sweep
+    (due_at None) are never on time.
+    """
+    source = "sweep" if due_at is None else "scheduler"
+    on_time = False
+    if due_at is not None:
+        delay = ((now or datetime.datetime.utcnow()) - due_at).total_seconds()
+        on_time = delay <= REMINDER_ON_TIME_SECONDS
+        stats.histogram(
+            metric_name=REMINDER_DELAY,
+            pod_name=PodNames.VIRTUAL_CARE,
+            metric_value=max(delay, 0),
+            tags=[f"kind:{kind.value}"],
+        )
+    stats.increment(
+        metric_name=REMINDERS_SENT,
+        pod_name=PodNames.VIRTUAL_CARE,
+        tags=[
+            f"kind:{kind.value}",
+            f"source:{source}",
+            f"on_time:{str(on_time).lower()}",
+        ],
+    )
+
+
+@job("reminders")
+def dispatch_due_appointment_reminders(
+    run_for_seconds: float = REMINDER_DISPATCH_RUN_SECONDS,
+) -> None:
+    """
+    Runs every minute. Until the next run starts, claims the reminders of the
+    scheduler as they come due and hands them to send_appointment_reminders, one
+    job per kind and batch.
+    """
+    if not REMINDER_SCHEDULER_ENABLED:
+        return
+    deadline = time.monotonic() + run_for_seconds
+    while True:
+        reminder_scheduler.record_dispatcher_heartbeat()
+        now = datetime.datetime.utcnow()
+        reminders = reminder_scheduler.claim_due(
+            now, limit=REMINDER_DISPATCH_BATCH_SIZE
+        )
+        batches: defaultdict[ReminderKind, List[Tuple[int, str]]] = defaultdict(list)
+        for reminder in reminders:
+            batches[reminder.kind].append(
+                (reminder.entity_id, reminder.due_at.isoformat())
+            )
+        for kind, batch in batches.items():
+            send_appointment_reminders.delay(kind.value, batch, team_ns="virtual_care")
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        # a full batch may have left more due reminders behind
+        if len(reminders) == REMINDER_DISPATCH_BATCH_SIZE:
+            continue
+        sleep = min(remaining, REMINDER_DISPATCH_MAX_SLEEP_SECONDS)
+        next_due_at = reminder_scheduler.next_due_at()
+        if next_due_at is not None:
+            sleep = min(
+                sleep, (next_due_at - datetime.datetime.utcnow()).total_seconds()
+            )
+        if sleep > 0:
+            time.sleep(sleep)
+
+
+@job("priority")
+def send_appointment_reminders(kind: str, reminders: List[Tuple[int, str]]) -> None:
+    """
+    Sends a batch of reminders claimed by dispatch_due_appointment_reminders, given
+    as (appointment or practitioner appointment ack id, due at) pairs.
+    """
+    reminder_kind = ReminderKind(kind)
+    due_at = {
+        entity_id: datetime.datetime.fromisoformat(due) for entity_id, due in reminders
+    }
+    now = datetime.datetime.utcnow()
+
+    if reminder_kind == ReminderKind.PRACTITIONER_NO_SHOW:
+        track_svc = tracks_svc.TrackSelectionService()
+        acks = (
+            db.session.query(PractitionerAppointmentAck)
+            .filter(PractitionerAppointmentAck.id.in_(due_at))
+            .all()
+        )
+        for ack in acks:
+            # moved by an update after it was claimed
+            if ack.ack_by > now + EARLY_REMINDER_TOLERANCE:
+                continue
+            if _send_claimed_reminder(
+                reminder_kind, ack.id, _alert_upcoming_noshow, ack, track_svc
+            ):
+                _record_sent_reminder(reminder_kind, due_at[ack.id], now)
+        return
+
+    senders = {
+        ReminderKind.MEMBER_SMS: _sms_notify_upcoming_appointment_member,
+        ReminderKind.PRACTITIONER_SMS: _sms_notify_upcoming_appointment_practitioner,
+        ReminderKind.MEMBER_PUSH_1H: _push_1_hour_reminder,
+        ReminderKind.ADVANCE_BOOKING: lambda appointment: (
+            _remind_member_about_advance_booking(appointment, now)
+        ),
+    }
+    window = APPOINTMENT_REMINDER_WINDOWS[reminder_kind]
+    appointments = (
+        db.session.query(Appointment).filter(Appointment.id.in_(due_at)).all()
+    )
+    for appointment in appointments:
+        # cancelled or rescheduled after it was claimed
+        if appointment.cancelled_at or not window.is_due(
+            appointment.scheduled_start, now
+        ):
+            continue
+        if _send_claimed_reminder(
+            reminder_kind, appointment.id, senders[reminder_kind], appointment
+        ):
+            _record_sent_reminder(reminder_kind, due_at[appointment.id], now)
+    db.session.commit()
+
+
+def _send_claimed_reminder(
+    kind: ReminderKind, entity_id: int, send: Callable[..., bool], *args: Any
+) -> bool:
+    # one failing reminder doesn't hold up the rest of its batch, the
+    # reconciliation sweep retries it
+    try:
+        return _send_reminder(kind, entity_id, send, *args)
+    except Exception as e:
+        db.session.rollback()
+        log.exception(
+            "Failed to send appointment reminder",
+            kind=kind.value,
+            entity_id=entity_id,
+            error=str(e),
+        )
+        return False
+
+
+@job("priority")
+def reconcile_appointment_reminders() -> None:
+    """
+    Registers the reminders of the upcoming appointments and unanswered
+    practitioner acks again, in case an update of the scheduler was lost.
+    """
+    if not REMINDER_SCHEDULER_ENABLED:
+        return
+    now = datetime.datetime.utcnow()
+    latest_due_before_start = max(
+        window.due_before_start for window in APPOINTMENT_REMINDER_WINDOWS.values()
+    )
+    scores = {}
+    appointments = db.session.query(
+        Appointment.id,
+        Appointment.scheduled_start,
+        Appointment.created_at,
+        Appointment.cancelled_at,
+    ).filter(
+        Appointment.scheduled_start > now,
+        Appointment.scheduled_start <= now + latest_due_before_start,
+        Appointment.cancelled_at.is_(None),
+    )
+    for appointment in appointments:
+        scores.update(appointment_reminder_scores(appointment, now))
+    acks = db.session.query(
+        PractitionerAppointmentAck.id,
+        PractitionerAppointmentAck.ack_by,
+        PractitionerAppointmentAck.is_acked,
+        PractitionerAppointmentAck.is_alerted,
+    ).filter(
+        PractitionerAppointmentAck.ack_by > now,
+        PractitionerAppointmentAck.is_acked == False,
+        PractitionerAppointmentAck.is_alerted == False,
+    )
+    for ack in acks:
+        scores.update(no_show_reminder_scores(ack))
+    # the reminders that are already due are sent by the scanning jobs
+    now_score = calendar.timegm(now.utctimetuple())
+    reminder_scheduler.update(
+        {
+            m: score
+            for m, score in scores.items()
+            if score is not None and score > now_score
+        }
+    )
+    log.info("Reconciled appointment reminders", num_reminders=len(scores))
@@ -32,6 +32,12 @@ from models.profiles import PractitionerProfile
 from models.referrals import ReferralCodeUse  # noqa: F401
 from models.verticals_and_specialties import DOULA_ONLY_VERTICALS, Vertical
 from payments.models.practitioner_contract import PractitionerContract
+from providers.service.next_availability import (
+    NEXT_AVAILABILITY_ENABLED,
+    next_availability_service,
+    refresh_next_availability,
+    request_next_availability_refresh,
+)
 from providers.service.provider import ProviderService
 from storage.connection import db
 from tasks.queues import job
@@ -45,6 +51,19 @@ log = logger(__name__)
 def update_practitioners_next_availability(prac_ids=None):  # type: ignore[no-untyped-def] # Function is missing a type annotation
     if not prac_ids:
         prac_ids = get_prac_ids_with_expired_next_availability()
+    if NEXT_AVAILABILITY_ENABLED and prac_ids:
+        # recomputed in bulk, along with the next availability by product length
+        try:
+            if next_availability_service.mark_stale(
+                f"practitioner:{prac_id}" for prac_id in prac_ids
+            ):
+                refresh_next_availability.delay(team_ns="care_discovery")
+            return
+        except Exception as e:
+            log.warning(
+                "Failed to mark next availability stale, updating one by one",
+                exception=e,
+            )
     for prac_id in prac_ids:
         log.info("Update Practitioner Next Availability", user_id=prac_id)
         update_practitioner_next_availability_job.delay(
@@ -303,6 +322,10 @@ def delete_recurring_availability(  # type: ignore[no-untyped-def] # Function is
             block_until=str(schedule_recurring_block.until),
         )
         update_practitioner_profile_next_availability(user.practitioner_profile)
+        if NEXT_AVAILABILITY_ENABLED:
+            # the block's schedule events are deleted by the database cascade, which
+            # the next availability listeners don't see
+            request_next_availability_refresh([f"practitioner:{user_id}"])
     else:
         log.error(
             "Error, no scheduled_recurring_block found",
@@ -12,12 +12,11 @@ from authz.models.roles import ROLES
 from common import stats
 from l10n.utils import message_with_enforced_locale
 from models.images import Image  # noqa: F401
-from models.profiles import Device
 from models.referrals import ReferralCodeUse  # noqa: F401
+from notification.services.notification_dispatch import NotificationDispatcher
 from storage.connection import db
 from tasks.queues import job
 from utils import braze_events
-from utils.apns import apns_send_bulk_message
 from utils.constants import (
     MAVEN_SMS_DELIVERY_ERROR,
     SMS_MISSING_PROFILE,
@@ -43,6 +42,7 @@ def notify_about_upcoming_availability() -> None:
     )
 
     log.debug("Got %s avails to notify", len(avails))
+    dispatcher = NotificationDispatcher(kind="upcoming_availability")
     for avail in avails:
         # get the previous event for that schedule if any
         previous = (
@@ -69,20 +69,21 @@ def notify_about_upcoming_availability() -> None:
                     int(((avail.starts_at - now).total_seconds()) / 60) + 1
                 )
                 push_message = f"You have upcoming availability on Maven in {avail_starts_in} minutes"
-                devices = Device.for_user(user, ROLES.practitioner)
-                device_ids = [d.device_id for d in devices]
-
                 log.debug(
                     "Sending user [%s] a push notification: %s",
                     user.id,
                     push_message,
                 )
-                apns_send_bulk_message(
-                    device_ids, alert=push_message, application_name=ROLES.practitioner
+                dispatcher.add_push(
+                    user_id=user.id,
+                    alert=push_message,
+                    application_name=ROLES.practitioner,
+                    message_id=str(avail.id),
                 )
                 braze_events.notify_upcoming_availability(
                     avail.schedule.user, avail_starts_in
                 )
+    dispatcher.flush()
 
 
 @job("priority", traced_parameters=("practitioner_id",))
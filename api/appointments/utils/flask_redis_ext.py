@@ -45,6 +45,24 @@ LUA_SCRIPT = """
  end
  redis.call('del', tag)
  """
+INVALIDATE_TAGS_SCRIPT = "invalidate_tags_script"
+INVALIDATE_TAGS_LUA_SCRIPT = """
+ for _, tag in ipairs(KEYS) do
+     local keys = redis.call('smembers', tag)
+     for i = 1, #keys, 1000 do
+         redis.call('del', unpack(keys, i, math.min(i + 999, #keys)))
+     end
+     redis.call('del', tag)
+ end
+ """
+CLAIM_DUE_REMINDERS_SCRIPT = "claim_due_reminders_script"
+CLAIM_DUE_REMINDERS_LUA_SCRIPT = """
+ local due = redis.call('zrangebyscore', KEYS[1], '-inf', ARGV[1], 'WITHSCORES', 'LIMIT', 0, ARGV[2])
+ for i = 1, #due, 2 do
+     redis.call('zrem', KEYS[1], due[i])
+ end
+ return due
+ """
 # ==================================================
 
 
@@ -84,7 +102,11 @@ def redis_config() -> dict:
             max_connections=10,
             socket_timeout=5.0,
             socket_connect_timeout=5.0,
-            scripts={INVALIDATE_WITH_TAG_SCRIPT: LUA_SCRIPT},
+            scripts={
+                INVALIDATE_WITH_TAG_SCRIPT: LUA_SCRIPT,
+                INVALIDATE_TAGS_SCRIPT: INVALIDATE_TAGS_LUA_SCRIPT,
+                CLAIM_DUE_REMINDERS_SCRIPT: CLAIM_DUE_REMINDERS_LUA_SCRIPT,
+            },
         )
     }
 
@@ -128,6 +150,11 @@ class FlaskRedis:
     def get_client(self, name):  # type: ignore[no-untyped-def] # Function is missing a type annotation
         return self._redis_clients.get(name)
 
+    def reset_connection_pools(self) -> None:
+        """Drop the connections inherited from a parent process after a fork."""
+        for client in self._redis_clients.values():
+            client.connection_pool.reset()
+
     def register_lua_script(self, script, script_name, client_name):  # type: ignore[no-untyped-def] # Function is missing a type annotation
         client = self.get_client(client_name)
         try:
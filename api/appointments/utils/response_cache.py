@@ -0,0 +1,406 @@
+"""
+Declarative response cache for the GET handlers of AuthenticatedResources.
+
+Example:
+
+    class FooResource(AuthenticatedResource):
+        @cached_get(namespace="foo")
+        def get(self, foo_id):
+            ...
+
+Responses are cached per user and request URL. While the handler runs, every ORM
+entity it loads, and every entity in the session when it returns, is recorded as a
+dependency tag of the response, e.g. "response_cache:tag:appointment:42". Committing
+a change to an entity invalidates the responses tagged with it and with the rows its
+foreign keys point to, so that adding an appointment invalidates the responses that
+loaded its schedule. Nothing has to be invalidated by hand.
+
+Core statements and bulk query updates and deletes executed through a session are
+tracked too. One that writes a single row by primary key, like the repositories do,
+invalidates the tags of the row, or of the rows an inserted row refers to. Any other
+invalidates every response that loaded a row of its table, which responses are also
+tagged with, e.g. "response_cache:table:appointment". Raw SQL writes are not
+tracked and must invalidate_tags themselves.
+
+Only ORM entities are recorded as dependencies. A handler that reads through Core or
+text(), like the mpractice repositories, records no tags for those rows, and its
+cached responses are not invalidated when they change: don't cache such endpoints,
+or give them a short ttl.
+
+Invalidations are always collected and published when the appointment redis is
+configured, so that responses cached by any process are invalidated by writes from
+every other. RESPONSE_CACHE_ENABLED only switches on reading and storing responses.
+
+Cached responses carry an ETag, a request with a matching If-None-Match header is
+answered with 304 Not Modified.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import functools
+import hashlib
+import json
+import os
+import random
+import weakref
+from typing import Any, Callable, Iterable, Optional, Set
+
+import flask
+from sqlalchemy import event, inspect
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Mapper, Session
+from sqlalchemy.orm.exc import UnmappedColumnError
+from sqlalchemy.pool import Pool
+from sqlalchemy.sql import operators
+from sqlalchemy.sql.expression import (
+    BinaryExpression,
+    BindParameter,
+    ClauseElement,
+    Delete,
+    Insert,
+    UpdateBase,
+)
+from sqlalchemy.sql.schema import Table
+
+from appointments.utils.flask_redis_ext import (
+    APPOINTMENT_REDIS,
+    CACHE_RESPONSE_FAILURES,
+    INVALIDATE_RESPONSE_FAILURES,
+    INVALIDATE_TAGS_SCRIPT,
+    flask_redis,
+)
+from common import stats
+from storage.connection import db
+from utils.log import logger
+
+log = logger(__name__)
+
+RESPONSE_CACHE_ENABLED = (
+    os.environ.get("RESPONSE_CACHE_ENABLED", "false").lower() == "true"
+)
+RESPONSE_CACHE_DEFAULT_TTL = 60 * 60  # 1 hour
+RESPONSE_CACHE_REQUESTS = "api.appointments.utils.response_cache.requests"
+KEY_PREFIX = "response_cache"
+# The number of tags invalidated per script call
+INVALIDATE_BATCH_SIZE = 500
+
+_PENDING_INVALIDATIONS_KEY = "response_cache_pending_invalidations"
+# The session in a transaction on a connection, in the connection's info
+_SESSION_KEY = "response_cache_session"
+
+# The dependency tags of the response being rendered, if any
+_recorded_tags: contextvars.ContextVar[Optional[Set[str]]] = contextvars.ContextVar(
+    "response_cache_recorded_tags", default=None
+)
+
+
+def _tag(table_name: str, primary_key: Any) -> str:
+    return f"{KEY_PREFIX}:tag:{table_name}:{primary_key}"
+
+
+def _table_tag(table_name: str) -> str:
+    return f"{KEY_PREFIX}:table:{table_name}"
+
+
+def entity_tags(instance: Any) -> Set[str]:
+    """The tags of a persistent entity, one per table it is stored in."""
+    state = inspect(instance)
+    if state.identity is None:
+        return set()
+    primary_key = ",".join(str(value) for value in state.identity)
+    return {_tag(table.name, primary_key) for table in state.mapper.tables}
+
+
+def dependency_tags(instance: Any) -> Set[str]:
+    """The tags of a response that used an entity: the entity's and its tables'."""
+    state = inspect(instance)
+    if state.identity is None:
+        return set()
+    return entity_tags(instance) | {
+        _table_tag(table.name) for table in state.mapper.tables
+    }
+
+
+@functools.lru_cache(maxsize=None)
+def _foreign_key_attributes(mapper: Mapper) -> tuple[tuple[str, tuple[str, ...]], ...]:
+    """The attributes of a mapper holding foreign keys, with the tables they refer to."""
+    attributes = []
+    for table in mapper.tables:
+        for column in table.columns:
+            if not column.foreign_keys:
+                continue
+            try:
+                prop = mapper.get_property_by_column(column)
+            except UnmappedColumnError:
+                continue
+            attributes.append(
+                (
+                    prop.key,
+                    tuple(fk.column.table.name for fk in column.foreign_keys),
+                )
+            )
+    return tuple(attributes)
+
+
+def changed_entity_tags(instance: Any) -> Set[str]:
+    """
+    The tags to invalidate when an entity is written: its own, and the ones of the
+    rows it refers to before and after the change.
+    """
+    tags = entity_tags(instance)
+    state = inspect(instance)
+    for key, table_names in _foreign_key_attributes(state.mapper):
+        for value in state.attrs[key].history.sum():
+            if value is None:
+                continue
+            tags.update(_tag(table_name, value) for table_name in table_names)
+    return tags
+
+
+def _primary_key_value(table: Table, where: Any) -> Any:
+    """The primary key value of a "<primary key> = <value>" clause, else None."""
+    if (
+        len(table.primary_key) != 1
+        or not isinstance(where, BinaryExpression)
+        or where.operator is not operators.eq
+        or not isinstance(where.right, BindParameter)
+    ):
+        return None
+    (primary_key,) = table.primary_key
+    # ORM queries compare annotated copies of the column
+    return where.right.value if where.left.compare(primary_key) else None
+
+
+def statement_tags(statement: UpdateBase) -> Set[str]:
+    """
+    The tags to invalidate when a Core statement is committed: the row's when it
+    writes one row by primary key, the ones of the rows an inserted row refers to,
+    and its table's when the written rows or their previous references are unknown.
+    """
+    table = statement.table
+    table_tags = {_table_tag(table.name)}
+    values = {} if isinstance(statement, Delete) else statement.parameters
+    if not isinstance(values, dict):
+        # the values are passed on execution, or are multiple rows
+        return table_tags
+    columns = [table.c.get(getattr(key, "key", key)) for key in values]
+    foreign_key_values = [
+        (column, value)
+        for column, value in zip(columns, values.values())
+        if column is not None and column.foreign_keys
+    ]
+    tags: Set[str] = set()
+    if not isinstance(statement, Insert):
+        primary_key = _primary_key_value(table, statement._whereclause)
+        # the rows an updated foreign key referred to before are unknown
+        if primary_key is None or foreign_key_values:
+            return table_tags
+        tags.add(_tag(table.name, primary_key))
+    for column, value in foreign_key_values:
+        if isinstance(value, ClauseElement):
+            return table_tags
+        if value is not None:
+            tags.update(_tag(fk.column.table.name, value) for fk in column.foreign_keys)
+    return tags
+
+
+def invalidate_tags(tags: Iterable[str], redis_name: str = APPOINTMENT_REDIS) -> None:
+    tags = sorted(tags)
+    if not tags or flask_redis.get_client(redis_name) is None:
+        return
+    try:
+        for i in range(0, len(tags), INVALIDATE_BATCH_SIZE):
+            flask_redis.execute_script(
+                script_name=INVALIDATE_TAGS_SCRIPT,
+                client_name=redis_name,
+                keys=tags[i : i + INVALIDATE_BATCH_SIZE],
+                args=[],
+            )
+    except Exception as e:
+        log.error("Failed to invalidate cached responses", error=str(e))
+        stats.increment(
+            metric_name=INVALIDATE_RESPONSE_FAILURES,
+            tags=[f"namespace:{KEY_PREFIX}", "reason:INVALIDATE_FAILURE"],
+            pod_name=stats.PodNames.CARE_DISCOVERY,
+        )
+
+
+@event.listens_for(Mapper, "load")
+def record_loaded_entity(target, context):  # type: ignore[no-untyped-def] # Function is missing a type annotation
+    tags = _recorded_tags.get()
+    if tags is not None:
+        tags.update(dependency_tags(target))
+
+
+@event.listens_for(Mapper, "refresh")
+def record_refreshed_entity(target, context, attrs):  # type: ignore[no-untyped-def] # Function is missing a type annotation
+    record_loaded_entity(target, context)
+
+
+@event.listens_for(Session, "after_flush")
+def collect_response_invalidations(session, flush_context):  # type: ignore[no-untyped-def] # Function is missing a type annotation
+    # new, dirty and deleted still hold the state from before the flush
+    instances = (*session.new, *session.dirty, *session.deleted)
+    if not instances:
+        return
+    pending = session.info.setdefault(_PENDING_INVALIDATIONS_KEY, set())
+    for instance in instances:
+        pending.update(changed_entity_tags(instance))
+
+
+@event.listens_for(Session, "after_begin")
+def track_session_connection(session, transaction, connection):  # type: ignore[no-untyped-def] # Function is missing a type annotation
+    connection.info[_SESSION_KEY] = weakref.ref(session)
+
+
+@event.listens_for(Pool, "checkin")
+def untrack_session_connection(dbapi_connection, connection_record):  # type: ignore[no-untyped-def] # Function is missing a type annotation
+    if connection_record is not None:
+        connection_record.info.pop(_SESSION_KEY, None)
+
+
+@event.listens_for(Engine, "after_execute")
+def collect_statement_invalidations(conn, clauseelement, multiparams, params, result):  # type: ignore[no-untyped-def] # Function is missing a type annotation
+    if not isinstance(clauseelement, UpdateBase):
+        return
+    session_ref = conn.info.get(_SESSION_KEY)
+    session = session_ref() if session_ref is not None else None
+    # statements of a flush are collected per entity by the flush listener
+    if session is None or session._flushing:
+        return
+    session.info.setdefault(_PENDING_INVALIDATIONS_KEY, set()).update(
+        statement_tags(clauseelement)
+    )
+
+
+@event.listens_for(Session, "after_commit")
+def invalidate_responses(session):  # type: ignore[no-untyped-def] # Function is missing a type annotation
+    invalidate_tags(session.info.pop(_PENDING_INVALIDATIONS_KEY, ()))
+
+
+@event.listens_for(Session, "after_rollback")
+def discard_response_invalidations(session):  # type: ignore[no-untyped-def] # Function is missing a type annotation
+    session.info.pop(_PENDING_INVALIDATIONS_KEY, None)
+
+
+def _increment_requests(endpoint: str, result: str, pod_name: stats.PodNames) -> None:
+    # the hit rate of an endpoint is result:hit over result:hit and result:miss
+    stats.increment(
+        metric_name=RESPONSE_CACHE_REQUESTS,
+        pod_name=pod_name,
+        tags=[f"endpoint:{endpoint}", f"result:{result}"],
+    )
+
+
+def _cache_key(resource: Any, namespace: str) -> str:
+    language = flask.request.accept_languages.best or ""
+    return (
+        f"{KEY_PREFIX}:{namespace}:{resource.user.id}:{resource.cache_key}:{language}"
+    )
+
+
+def _respond(body: Any, etag: str, endpoint: str, pod_name: stats.PodNames) -> Any:
+    if flask.request.if_none_match.contains(etag):
+        _increment_requests(endpoint, "not_modified", pod_name)
+        return flask.Response(status=304, headers={"ETag": f'"{etag}"'})
+    return body, 200, {"ETag": f'"{etag}"'}
+
+
+def cached_get(
+    ttl: int = RESPONSE_CACHE_DEFAULT_TTL,
+    namespace: str | None = None,
+    redis_name: str = APPOINTMENT_REDIS,
+    pod_name: stats.PodNames = stats.PodNames.CARE_DISCOVERY,
+    enabled: bool | Callable[..., bool] = True,
+) -> Callable:
+    """
+    Caches the responses of an AuthenticatedResource GET handler.
+
+    Args:
+        ttl: base time to live of the cached responses, the applied ttl is within
+             +-10% of it
+        namespace: cache key namespace, defaults to the endpoint name
+        redis_name: the redis client registered with flask_redis
+        pod_name: owner team
+        enabled: bool or callable taking the handler arguments, to switch caching
+                 off per request
+    """
+
+    def decorator(f):  # type: ignore[no-untyped-def] # Function is missing a type annotation
+        @functools.wraps(f)
+        def wrapped(resource, *args, **kwargs):  # type: ignore[no-untyped-def] # Function is missing a type annotation
+            is_enabled = enabled(resource, *args, **kwargs) if callable(enabled) else enabled  # type: ignore[operator] # "bool" not callable
+            redis_client = flask_redis.get_client(redis_name)
+            if not (RESPONSE_CACHE_ENABLED and is_enabled and redis_client):
+                return f(resource, *args, **kwargs)
+
+            endpoint = flask.request.endpoint or f.__qualname__
+            cache_key = _cache_key(resource, namespace or endpoint)
+            try:
+                cached = redis_client.get(cache_key)
+            except Exception as e:
+                log.warning("Failed to read cached response", error=str(e))
+                stats.increment(
+                    metric_name=CACHE_RESPONSE_FAILURES,
+                    tags=[f"namespace:{KEY_PREFIX}", "reason:REDIS_GET_EXCEPTION"],
+                    pod_name=pod_name,
+                )
+                cached = None
+            if cached:
+                entry = json.loads(cached)
+                _increment_requests(endpoint, "hit", pod_name)
+                return _respond(entry["body"], entry["etag"], endpoint, pod_name)
+
+            _increment_requests(endpoint, "miss", pod_name)
+            tags: Set[str] = set()
+            token = _recorded_tags.set(tags)
+            try:
+                resp = f(resource, *args, **kwargs)
+            finally:
+                _recorded_tags.reset(token)
+            # errors and responses with their own status or headers are not cached
+            if not isinstance(resp, (dict, list)):
+                return resp
+
+            # entities loaded before the handler ran, e.g. the user, are not
+            # recorded by the load event
+            for instance in list(db.session.identity_map.values()):
+                tags.update(dependency_tags(instance))
+            body = json.dumps(resp, sort_keys=True, default=str)
+            etag = hashlib.sha1(body.encode("utf-8")).hexdigest()
+            _set_entry(redis_client, cache_key, etag, body, tags, ttl, pod_name)
+            return _respond(resp, etag, endpoint, pod_name)
+
+        return wrapped
+
+    return decorator
+
+
+def _set_entry(
+    redis_client: Any,
+    cache_key: str,
+    etag: str,
+    body: str,
+    tags: Set[str],
+    ttl: int,
+    pod_name: stats.PodNames,
+) -> None:
+    ttl_with_jitter = int(ttl + ttl * random.uniform(-0.1, 0.1))
+    try:
+        pipeline = redis_client.pipeline(transaction=False)
+        pipeline.setex(
+            cache_key, ttl_with_jitter, f'{{"etag": "{etag}", "body": {body}}}'
+        )
+        # tags outlive the entries they point to
+        for tag in tags:
+            pipeline.sadd(tag, cache_key)
+            pipeline.expire(tag, int(ttl * 1.1))
+        pipeline.execute()
+    except Exception as e:
+        log.warning("Failed to cache response", error=str(e))
+        stats.increment(
+            metric_name=CACHE_RESPONSE_FAILURES,
+            tags=[f"namespace:{KEY_PREFIX}", "reason:UPDATE_CACHE_FAILED"],
+            pod_name=pod_name,
+        )
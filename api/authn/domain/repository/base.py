@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import functools
+from typing import Literal
 
 import sqlalchemy
 
@@ -25,3 +26,20 @@ class BaseUserRepository(base.BaseRepository[abstract.InstanceT]):
     @functools.lru_cache(maxsize=1)
     def table_columns() -> tuple[sqlalchemy.Column, ...]:
         return ()
+
+    def update(  # type: ignore[no-untyped-def] # Function is missing a return type annotation
+        self, *, instance: abstract.InstanceT, fetch: Literal[True, False] = True
+    ):
+        self.invalidate_principals(instance.id)
+        return super().update(instance=instance, fetch=fetch)
+
+    def delete(self, *, id: int) -> int:
+        self.invalidate_principals(id)
+        return super().delete(id=id)
+
+    def invalidate_principals(self, *user_ids: int) -> None:
+        """The cached principals don't see these Core writes through the ORM events."""
+        # Imported here to avoid a circular import through models.profiles
+        from authn.services import principal_cache
+
+        principal_cache.invalidate_on_write(self.session, user_ids)
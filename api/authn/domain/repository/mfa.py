@@ -35,6 +35,7 @@ class UserMFARepository(base.BaseUserRepository[model.UserMFA]):  # type: ignore
 
     @trace_wrapper
     def delete(self, *, id: int) -> int:
+        self.invalidate_principals(id)
         values = dict(
             sms_phone_number=None,
             authy_id=None,
@@ -1,8 +1,17 @@
+import io
+import json
+import time
 from unittest import mock
 
+import jwt
 import pytest
+from cryptography.hazmat.primitives.asymmetric import rsa
 
 from authn.services.integrations import saml
+from authn.services.integrations.idp.token_validator import (
+    JWKSKeyStore,
+    verified_tokens,
+)
 
 
 @pytest.fixture(scope="module", autouse=True)
@@ -93,3 +102,60 @@ def mock_auth0_authentication():
             "authn.services.integrations.idp.token_client.authentication", new=m
         ):
             yield m
+
+
+class JWKSStub:
+    """A local stand-in for an IdP's JWKS endpoint, able to sign tokens with its keys."""
+
+    domain = "test-domain"
+    audience = "test-audience"
+
+    def __init__(self):
+        self.private_keys = {}
+        self.rotate("key-1")
+
+    def rotate(self, kid):
+        self.private_keys[kid] = rsa.generate_private_key(
+            public_exponent=65537, key_size=2048
+        )
+        self.current_kid = kid
+
+    def jwks(self):
+        keys = []
+        for kid, private_key in self.private_keys.items():
+            key = json.loads(
+                jwt.algorithms.RSAAlgorithm.to_jwk(private_key.public_key())
+            )
+            keys.append({**key, "kid": kid, "use": "sig", "alg": "RS256"})
+        return {"keys": keys}
+
+    def issue(self, user_id=1, expires_in=3600):
+        return jwt.encode(
+            {
+                "iss": f"https://{self.domain}/",
+                "aud": self.audience,
+                "exp": int(time.time()) + expires_in,
+                f"{self.audience}/maven_user_id": user_id,
+            },
+            self.private_keys[self.current_kid],
+            algorithm="RS256",
+            headers={"kid": self.current_kid},
+        )
+
+
+@pytest.fixture
+def jwks_stub():
+    stub = JWKSStub()
+    JWKSKeyStore.clear()
+    verified_tokens.clear()
+    # serve the JWKS in place of the IdP's https endpoint
+    with mock.patch(
+        "jwt.jwks_client.urllib.request.urlopen",
+        side_effect=lambda *args, **kwargs: io.BytesIO(
+            json.dumps(stub.jwks()).encode()
+        ),
+    ) as urlopen:
+        stub.fetches = urlopen
+        yield stub
+    JWKSKeyStore.clear()
+    verified_tokens.clear()
@@ -0,0 +1,26 @@
+import time
+
+from authn.services.integrations.idp import TokenValidator
+from authn.services.integrations.idp.token_validator import verified_tokens
+
+
+def test_bearer_auth_overhead(jwks_stub, mock_idp_env):
+    """Authenticating repeat requests should not refetch the JWKS nor re-verify the token."""
+    validator = TokenValidator()
+    bearer_header = f"Bearer {jwks_stub.issue()}"
+    iterations = 200
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        verified_tokens.clear()
+        TokenValidator().decode_token(bearer_header)
+    verify_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        TokenValidator().decode_token(bearer_header)
+    cached_seconds = time.perf_counter() - start
+
+    assert validator.decode_token(bearer_header)["user_id"] == 1
+    assert jwks_stub.fetches.call_count == 1
+    assert cached_seconds < verify_seconds
@@ -1,10 +1,12 @@
 import os
+import time
 from unittest import mock
 
 import jwt
 import pytest
 
 from authn.services.integrations.idp import TokenValidationError, TokenValidator
+from authn.services.integrations.idp.token_validator import Decoder, VerifiedTokenCache
 
 
 class TestTokenValidation:
@@ -72,3 +74,77 @@ class TestTokenValidation:
 
             # Then
             assert decoded["user_id"] == user_id
+
+
+class TestDecoderCaching:
+    @staticmethod
+    def test_jwks_is_fetched_once(jwks_stub):
+        decoder = Decoder(idp_domain=jwks_stub.domain, idp_audience=jwks_stub.audience)
+
+        for user_id in (1, 2, 3):
+            assert (
+                decoder.decode(jwks_stub.issue(user_id=user_id))["user_id"] == user_id
+            )
+
+        assert jwks_stub.fetches.call_count == 1
+
+    @staticmethod
+    def test_unknown_key_id_refetches_jwks(jwks_stub):
+        decoder = Decoder(idp_domain=jwks_stub.domain, idp_audience=jwks_stub.audience)
+        decoder.decode(jwks_stub.issue())
+
+        jwks_stub.rotate("key-2")
+        decoded = decoder.decode(jwks_stub.issue(user_id=2))
+
+        assert decoded["user_id"] == 2
+        assert jwks_stub.fetches.call_count == 2
+
+    @staticmethod
+    def test_verified_token_is_not_verified_again(jwks_stub):
+        decoder = Decoder(idp_domain=jwks_stub.domain, idp_audience=jwks_stub.audience)
+        token = jwks_stub.issue()
+        decoder.decode(token)
+
+        with mock.patch("jwt.decode") as decode_jwt:
+            assert decoder.decode(token)["user_id"] == 1
+            assert decoder.get_expires_at(token) is not None
+
+        decode_jwt.assert_not_called()
+
+    @staticmethod
+    def test_invalid_token_is_not_cached(jwks_stub):
+        decoder = Decoder(idp_domain=jwks_stub.domain, idp_audience="other-audience")
+        token = jwks_stub.issue()
+
+        for _ in range(2):
+            with pytest.raises(TokenValidationError):
+                decoder.decode(token)
+
+
+class TestVerifiedTokenCache:
+    @staticmethod
+    def test_expired_entries_are_evicted():
+        cache = VerifiedTokenCache(maxsize=10)
+        cache.add("token", {"user_id": 1}, expires_at=time.time() - 1)
+
+        assert cache.get("token") is None
+
+    @staticmethod
+    def test_tokens_without_expiry_are_not_cached():
+        cache = VerifiedTokenCache(maxsize=10)
+        cache.add("token", {"user_id": 1}, expires_at=None)
+
+        assert cache.get("token") is None
+
+    @staticmethod
+    def test_least_recently_used_entry_is_evicted():
+        cache = VerifiedTokenCache(maxsize=2)
+        expires_at = time.time() + 60
+        cache.add("a", {"user_id": 1}, expires_at)
+        cache.add("b", {"user_id": 2}, expires_at)
+        cache.get("a")
+        cache.add("c", {"user_id": 3}, expires_at)
+
+        assert cache.get("a") is not None
+        assert cache.get("b") is None
+        assert cache.get("c") is not None
@@ -0,0 +1,114 @@
+import dataclasses
+from unittest import mock
+
+import pytest
+
+from authn.domain.repository import UserRepository
+from authn.services.principal_cache import (
+    Principal,
+    PrincipalCache,
+    invalidate_principals,
+)
+from authz.models.roles import ROLES
+
+
+@pytest.fixture
+def redis_cache():
+    store = {}
+    cache = mock.MagicMock()
+    cache.get.side_effect = store.get
+    cache.add.side_effect = store.__setitem__
+    cache.delete.side_effect = lambda *keys: [store.pop(key, None) for key in keys]
+    return cache
+
+
+@pytest.fixture
+def principal_cache(redis_cache):
+    cache = PrincipalCache(redis_cache=redis_cache)
+    with mock.patch("authn.services.principal_cache.principal_cache", cache):
+        yield cache
+
+
+@pytest.fixture
+def member(factories):
+    member = factories.MemberFactory.create(sms_phone_number="+1 (212) 555-1515")
+    member.member_profile.phone_number = "+12125550000"
+    return member
+
+
+def test_principal_from_user(member):
+    principal = Principal.from_user(member)
+
+    assert principal.id == member.id
+    assert principal.is_active()
+    assert principal.phone_numbers == ("12125551515", "12125550000")
+    assert [role.name for role in principal.roles] == [ROLES.member]
+
+
+def test_principal_round_trips_through_dict(member):
+    principal = Principal.from_user(member)
+
+    assert Principal.from_dict(principal.to_dict()) == principal
+
+
+def test_get_loads_user_once(principal_cache, member):
+    with mock.patch(
+        "authn.services.principal_cache.Principal.from_user",
+        wraps=Principal.from_user,
+    ) as from_user:
+        first = principal_cache.get(member.id)
+        second = principal_cache.get(str(member.id))
+
+    assert first == second
+    from_user.assert_called_once()
+
+
+def test_get_falls_back_to_redis(principal_cache, member):
+    principal = principal_cache.get(member.id)
+    principal_cache.clear_local()
+
+    with mock.patch("authn.services.principal_cache.Principal.from_user") as from_user:
+        assert principal_cache.get(member.id) == principal
+
+    from_user.assert_not_called()
+
+
+def test_get_unknown_user(principal_cache):
+    assert principal_cache.get(-1) is None
+    assert principal_cache.get("not-an-id") is None
+
+
+def test_user_update_invalidates_principal(session, principal_cache, member):
+    assert principal_cache.get(member.id).is_active()
+
+    member.active = False
+    session.flush()
+
+    assert not principal_cache.get(member.id).is_active()
+
+
+def test_commit_invalidates_redis(session, principal_cache, redis_cache, member):
+    principal_cache.get(member.id)
+
+    member.member_profile.phone_number = "+12125559999"
+    session.flush()
+    # tests flush instead of committing, so run the commit hook directly
+    invalidate_principals(session)
+
+    redis_cache.delete.assert_called_with(member.id)
+    assert "12125559999" in principal_cache.get(member.id).phone_numbers
+
+
+def test_repository_update_invalidates_principal(session, principal_cache, member):
+    assert principal_cache.get(member.id).is_active()
+
+    users = UserRepository(session=session, is_in_uow=True)
+    users.update(
+        instance=dataclasses.replace(users.get(id=member.id), active=False),
+        fetch=False,
+    )
+    # the Core update bypasses the identity map, a commit would expire it
+    session.expire(member)
+
+    assert not principal_cache.get(member.id).is_active()
+    assert member.id in session.info["principal_cache_invalidations"]
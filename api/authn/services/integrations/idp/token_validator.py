@@ -1,8 +1,28 @@
+from __future__ import annotations
+
+import collections
+import hashlib
 import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
 
 import ddtrace
 import jwt
 
+from common import stats
+from utils.log import logger
+
+log = logger(__name__)
+
+METRIC_PREFIX = "api.authn.token_validator"
+# How long a fetched JWKS is trusted before requests block on refetching it.
+JWKS_LIFESPAN_SECONDS = int(os.getenv("JWKS_LIFESPAN_SECONDS", 3600))
+# Once a JWKS is this old it is refetched in the background, while requests keep
+# using the keys already fetched.
+JWKS_REFRESH_AFTER_SECONDS = int(os.getenv("JWKS_REFRESH_AFTER_SECONDS", 900))
+VERIFIED_TOKEN_CACHE_SIZE = int(os.getenv("VERIFIED_TOKEN_CACHE_SIZE", 10_000))
+
 
 class TokenValidator:
     """A JWT Bearer token validator"""
@@ -59,28 +79,19 @@ class Decoder:
 
     def decode(self, token: str):  # type: ignore[no-untyped-def] # Function is missing a return type annotation
         """Checks the validity of the JWT"""
-        try:
-            decoded = jwt.decode(
-                token,
-                self._get_signing_key(token),
-                algorithms=["RS256"],
-                audience=self.idp_audience,
-                options={
-                    "verify_signature": True,
-                    "require": ["exp", "iss", "aud"],
-                },
-                leeway=60,
-            )
-            return _extract_claims(decoded, self.claims)
-        except jwt.exceptions.ExpiredSignatureError as err:
-            raise TokenExpiredError(err) from err
-        except (
-            jwt.exceptions.InvalidTokenError,
-            jwt.exceptions.PyJWKClientError,
-        ) as err:
-            raise TokenValidationError(err) from err
+        claims, _ = self._verify(token)
+        return dict(claims)
 
     def get_expires_at(self, token: str):  # type: ignore[no-untyped-def] # Function is missing a return type annotation
+        _, expires_at = self._verify(token)
+        return expires_at
+
+    def _verify(self, token: str) -> Tuple[dict, Optional[int]]:
+        cache_key = f"{self.idp_domain}:{self.idp_audience}:{token}"
+        cached = verified_tokens.get(cache_key)
+        if cached is not None:
+            return cached
+
         try:
             decoded = jwt.decode(
                 token,
@@ -93,7 +104,6 @@ class Decoder:
                 },
                 leeway=60,
             )
-            return decoded.get("exp")
         except jwt.exceptions.ExpiredSignatureError as err:
             raise TokenExpiredError(err) from err
         except (
@@ -102,14 +112,149 @@ class Decoder:
         ) as err:
             raise TokenValidationError(err) from err
 
+        claims = _extract_claims(decoded, self.claims)
+        expires_at = decoded.get("exp")
+        verified_tokens.add(cache_key, claims, expires_at)
+        return claims, expires_at
+
     @ddtrace.tracer.wrap()
     def _get_signing_key(self, token: str):  # type: ignore[no-untyped-def] # Function is missing a return type annotation
         url = f"https://{self.idp_domain}/.well-known/jwks.json"
-        jwk_client = jwt.PyJWKClient(url)
-        signing_key = jwk_client.get_signing_key_from_jwt(token)
+        signing_key = JWKSKeyStore.for_url(url).get_signing_key_from_jwt(token)
         return signing_key.key
 
 
+class JWKSKeyStore:
+    """
+    A process-wide store of the signing keys published by an IdP's JWKS endpoint.
+
+    Keys are fetched once and shared by every request. A JWKS older than
+    JWKS_REFRESH_AFTER_SECONDS is refetched in a background thread so requests don't
+    wait on the IdP, and a token signed with a key id we haven't seen (ie. the IdP
+    rotated its keys) triggers an immediate refetch.
+    """
+
+    _stores: Dict[str, JWKSKeyStore] = {}
+    _stores_lock = threading.Lock()
+
+    def __init__(
+        self,
+        url: str,
+        lifespan_seconds: int = JWKS_LIFESPAN_SECONDS,
+        refresh_after_seconds: int = JWKS_REFRESH_AFTER_SECONDS,
+    ) -> None:
+        self.url = url
+        self.refresh_after_seconds = refresh_after_seconds
+        # PyJWKClient caches the JWKS for its lifespan and refetches it when asked for
+        # a key id it does not contain.
+        self.client = jwt.PyJWKClient(
+            url, cache_jwk_set=True, lifespan=lifespan_seconds
+        )
+        self._fetched_at: Optional[float] = None
+        self._refreshing = threading.Lock()
+
+    @classmethod
+    def for_url(cls, url: str) -> JWKSKeyStore:
+        store = cls._stores.get(url)
+        if store is None:
+            with cls._stores_lock:
+                store = cls._stores.setdefault(url, cls(url))
+        return store
+
+    @classmethod
+    def clear(cls) -> None:
+        with cls._stores_lock:
+            cls._stores.clear()
+
+    def get_signing_key_from_jwt(self, token: str) -> jwt.PyJWK:
+        if self._fetched_at is None:
+            self._fetched_at = time.monotonic()
+        elif time.monotonic() - self._fetched_at >= self.refresh_after_seconds:
+            self._refresh_in_background()
+        return self.client.get_signing_key_from_jwt(token)
+
+    def _refresh_in_background(self) -> None:
+        if not self._refreshing.acquire(blocking=False):
+            return
+        threading.Thread(target=self._refresh, daemon=True).start()
+
+    def _refresh(self) -> None:
+        try:
+            self.client.get_jwk_set(refresh=True)
+            self._fetched_at = time.monotonic()
+            stats.increment(
+                metric_name=f"{METRIC_PREFIX}.jwks_refresh",
+                pod_name=stats.PodNames.CORE_SERVICES,
+                tags=["result:success"],
+            )
+        except Exception as e:
+            # Keep serving the keys we have, the next request will try again.
+            log.warning("Failed to refresh JWKS", url=self.url, error=str(e))
+            stats.increment(
+                metric_name=f"{METRIC_PREFIX}.jwks_refresh",
+                pod_name=stats.PodNames.CORE_SERVICES,
+                tags=["result:failure"],
+            )
+        finally:
+            self._refreshing.release()
+
+
+class VerifiedTokenCache:
+    """
+    A bounded LRU of tokens whose signature and claims were already verified.
+
+    Entries are keyed by a hash of the token, so raw tokens are never held in memory
+    longer than the request that presented them, and expire at the token's own `exp`.
+    Tokens without an `exp` are never cached.
+    """
+
+    def __init__(self, maxsize: int = VERIFIED_TOKEN_CACHE_SIZE) -> None:
+        self.maxsize = maxsize
+        self._entries: collections.OrderedDict[
+            str, Tuple[dict, int]
+        ] = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _hash(token: str) -> str:
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def get(self, token: str) -> Optional[Tuple[dict, int]]:
+        key = self._hash(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[1] > time.time():
+                    self._entries.move_to_end(key)
+                else:
+                    del self._entries[key]
+                    entry = None
+        stats.increment(
+            metric_name=f"{METRIC_PREFIX}.verified_token_cache",
+            pod_name=stats.PodNames.CORE_SERVICES,
+            tags=[f"result:{'hit' if entry else 'miss'}"],
+            sample_rate=0.1,
+        )
+        return entry
+
+    def add(self, token: str, claims: dict, expires_at: Optional[int]) -> None:
+        if self.maxsize <= 0 or not isinstance(expires_at, (int, float)):
+            return
+        key = self._hash(token)
+        with self._lock:
+            self._entries[key] = (claims, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+verified_tokens = VerifiedTokenCache()
+
+
 class DevelopmentDecoder:
     """This should only be used in local testing environments as it does not do JWT signature verification"""
 
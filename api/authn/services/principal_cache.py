@@ -0,0 +1,280 @@
+"""
+A short-lived cache of the authenticated principal.
+
+Authenticating a request only needs a handful of facts about the user: whether they
+are active, their phone numbers (for the BlockList check) and their roles and
+capabilities (for flask-principal needs). Loading them from MySQL takes several round
+trips per request, so they are kept as an immutable Principal snapshot, first in a
+small per-process cache and then in Redis.
+
+Entries are invalidated when a User, MemberProfile or PractitionerProfile is flushed
+or committed, and when the authn user repositories write the user table with Core
+statements, which the ORM events don't see. Other processes may keep serving their
+local copy for up to PRINCIPAL_CACHE_LOCAL_TTL_SECONDS; changes to role definitions themselves are not
+tracked and age out of Redis after PRINCIPAL_CACHE_TTL_SECONDS.
+"""
+from __future__ import annotations
+
+import dataclasses
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from authn.models.user import User
+from caching.redis import RedisTTLCache
+from common import stats
+from models.profiles import MemberProfile, PractitionerProfile
+from storage.connection import db
+from utils.log import logger
+
+log = logger(__name__)
+
+METRIC_PREFIX = "api.authn.principal_cache"
+PRINCIPAL_CACHE_ENABLED = (
+    os.environ.get("PRINCIPAL_CACHE_ENABLED", "true").lower() == "true"
+)
+PRINCIPAL_CACHE_TTL_SECONDS = int(os.environ.get("PRINCIPAL_CACHE_TTL_SECONDS", 60))
+PRINCIPAL_CACHE_LOCAL_TTL_SECONDS = int(
+    os.environ.get("PRINCIPAL_CACHE_LOCAL_TTL_SECONDS", 5)
+)
+PRINCIPAL_CACHE_LOCAL_MAX_SIZE = 10_000
+
+_PENDING_INVALIDATIONS_KEY = "principal_cache_invalidations"
+
+
+@dataclasses.dataclass(frozen=True)
+class PrincipalCapability:
+    method: str
+    object_type: str
+
+
+@dataclasses.dataclass(frozen=True)
+class PrincipalRole:
+    name: str
+    capabilities: Tuple[PrincipalCapability, ...] = ()
+
+
+@dataclasses.dataclass(frozen=True)
+class Principal:
+    """
+    The parts of a user needed to authenticate and authorize a request.
+
+    Mirrors the User methods and attributes used during authentication, so it can be
+    used in place of a User by `authenticate` and the identity loader.
+    """
+
+    id: int
+    active: bool
+    phone_numbers: Tuple[str, ...] = ()
+    # Assigned roles followed by the roles of the user's profiles.
+    roles: Tuple[PrincipalRole, ...] = ()
+
+    def is_active(self) -> bool:
+        return self.active
+
+    def is_authenticated(self) -> bool:
+        return self.active and bool(self.id)
+
+    @classmethod
+    def from_user(cls, user: User) -> Principal:
+        phone_numbers = [user.sms_phone_number]
+        roles = list(user.roles)
+        if user.member_profile:
+            phone_numbers.append(user.member_profile.phone_number)
+            roles.append(user.member_profile.role)
+        if user.practitioner_profile:
+            roles.append(user.practitioner_profile.role)
+
+        return cls(
+            id=user.id,
+            active=bool(user.active),
+            phone_numbers=tuple(
+                "".join(filter(str.isdigit, number))
+                for number in phone_numbers
+                if number
+            ),
+            roles=tuple(
+                PrincipalRole(
+                    name=role.name,
+                    capabilities=tuple(
+                        PrincipalCapability(
+                            method=capability.method,
+                            object_type=capability.object_type,
+                        )
+                        for capability in role.capabilities
+                    ),
+                )
+                for role in roles
+                if role is not None
+            ),
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dataclasses.asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> Principal:
+        return cls(
+            id=data["id"],
+            active=data["active"],
+            phone_numbers=tuple(data["phone_numbers"]),
+            roles=tuple(
+                PrincipalRole(
+                    name=role["name"],
+                    capabilities=tuple(
+                        PrincipalCapability(**capability)
+                        for capability in role["capabilities"]
+                    ),
+                )
+                for role in data["roles"]
+            ),
+        )
+
+
+class PrincipalCache:
+    def __init__(
+        self,
+        ttl_in_seconds: int = PRINCIPAL_CACHE_TTL_SECONDS,
+        local_ttl_in_seconds: int = PRINCIPAL_CACHE_LOCAL_TTL_SECONDS,
+        local_max_size: int = PRINCIPAL_CACHE_LOCAL_MAX_SIZE,
+        redis_cache: Optional[RedisTTLCache] = None,
+    ) -> None:
+        self.local_ttl_in_seconds = local_ttl_in_seconds
+        self.local_max_size = local_max_size
+        self.redis_cache = redis_cache or RedisTTLCache(
+            namespace="authn_principal",
+            ttl_in_seconds=ttl_in_seconds,
+            pod_name=stats.PodNames.CORE_SERVICES,
+        )
+        self._local: Dict[int, Tuple[Principal, float]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int | str) -> Optional[Principal]:
+        """Get the principal for a user id, or None if there is no such user."""
+        try:
+            user_id = int(user_id)
+        except (TypeError, ValueError):
+            return None
+
+        principal = self._get_local(user_id)
+        if principal is not None:
+            self._increment_metric("source:local")
+            return principal
+
+        cached = self.redis_cache.get(user_id)
+        if cached is not None:
+            try:
+                principal = Principal.from_dict(cached)
+            except (KeyError, TypeError) as e:
+                log.warning("Invalid cached principal", user_id=user_id, error=str(e))
+            else:
+                self._increment_metric("source:redis")
+                self._set_local(principal)
+                return principal
+
+        user = db.session.query(User).filter(User.id == user_id).one_or_none()
+        self._increment_metric("source:db")
+        if user is None:
+            return None
+        principal = Principal.from_user(user)
+        self.redis_cache.add(user_id, principal.to_dict())
+        self._set_local(principal)
+        return principal
+
+    def invalidate(self, user_ids: Iterable[int]) -> None:
+        user_ids = [user_id for user_id in user_ids if user_id is not None]
+        if not user_ids:
+            return
+        with self._lock:
+            for user_id in user_ids:
+                self._local.pop(user_id, None)
+        self.redis_cache.delete(*user_ids)
+
+    def clear_local(self) -> None:
+        with self._lock:
+            self._local.clear()
+
+    def _get_local(self, user_id: int) -> Optional[Principal]:
+        entry = self._local.get(user_id)
+        if entry is None:
+            return None
+        principal, expires_at = entry
+        if expires_at <= time.monotonic():
+            with self._lock:
+                self._local.pop(user_id, None)
+            return None
+        return principal
+
+    def _set_local(self, principal: Principal) -> None:
+        if self.local_ttl_in_seconds <= 0:
+            return
+        with self._lock:
+            if len(self._local) >= self.local_max_size:
+                # Evict the oldest entry, dicts keep insertion order.
+                self._local.pop(next(iter(self._local)))
+            self._local[principal.id] = (
+                principal,
+                time.monotonic() + self.local_ttl_in_seconds,
+            )
+
+    @staticmethod
+    def _increment_metric(tag: str) -> None:
+        stats.increment(
+            metric_name=f"{METRIC_PREFIX}.get",
+            pod_name=stats.PodNames.CORE_SERVICES,
+            tags=[tag],
+            sample_rate=0.1,
+        )
+
+
+principal_cache = PrincipalCache()
+
+
+def _affected_user_ids(session: Session) -> Set[int]:
+    user_ids = set()
+    for instance in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(instance, User):
+            user_ids.add(instance.id)
+        elif isinstance(instance, (MemberProfile, PractitionerProfile)):
+            user_ids.add(instance.user_id)
+    return user_ids
+
+
+def invalidate_on_write(session: Session, user_ids: Iterable[int]) -> None:
+    """
+    Invalidates users written outside of the unit of work, like the Core updates of the
+    authn repositories, right away and again when the session commits.
+    """
+    user_ids = {user_id for user_id in user_ids if user_id is not None}
+    if not user_ids:
+        return
+    session.info.setdefault(_PENDING_INVALIDATIONS_KEY, set()).update(user_ids)
+    principal_cache.invalidate(user_ids)
+
+
+@event.listens_for(Session, "before_flush")
+def collect_principal_invalidations(session, flush_context, instances):  # type: ignore[no-untyped-def] # Function is missing a type annotation
+    user_ids = _affected_user_ids(session)
+    if user_ids:
+        session.info.setdefault(_PENDING_INVALIDATIONS_KEY, set()).update(user_ids)
+
+
+@event.listens_for(Session, "after_flush")
+def invalidate_flushed_principals(session, flush_context):  # type: ignore[no-untyped-def] # Function is missing a type annotation
+    # Invalidate right away so this process sees its own writes, and again on commit
+    # in case another process cached the old values in between.
+    principal_cache.invalidate(session.info.get(_PENDING_INVALIDATIONS_KEY, ()))
+
+
+@event.listens_for(Session, "after_commit")
+def invalidate_principals(session):  # type: ignore[no-untyped-def] # Function is missing a type annotation
+    principal_cache.invalidate(session.info.pop(_PENDING_INVALIDATIONS_KEY, ()))
+
+
+@event.listens_for(Session, "after_rollback")
+def discard_principal_invalidations(session):  # type: ignore[no-untyped-def] # Function is missing a type annotation
+    session.info.pop(_PENDING_INVALIDATIONS_KEY, None)
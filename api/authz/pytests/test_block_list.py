@@ -1,17 +1,40 @@
+from unittest import mock
+
 import pytest
 from redis.exceptions import ConnectionError, TimeoutError
 
+from authz.services import block_list
 from authz.services.block_list import BlockList, BlockListDenied
 
 
+@pytest.fixture(autouse=True)
+def reset_block_list():
+    block_list.reset()
+    yield
+    block_list.reset()
+
+
+@pytest.fixture
+def blocked(mock_redis):
+    """Serve the given values as the blocked list from the mocked redis."""
+
+    def set_blocked(*values, version="1"):
+        mock_redis.get.return_value = version
+        mock_redis.scard.return_value = len(values)
+        mock_redis.smembers.return_value = set(values)
+
+    set_blocked()
+    return set_blocked
+
+
 class TestBlockList:
     @staticmethod
-    def test_validate_access(mock_redis, mock_user_service):
+    def test_validate_access(mock_redis, mock_user_service, blocked):
         # Given
         user_id = 123
         attribute = "credit_card"
         check_values = "zyx123"
-        mock_redis.sismember.return_value = 1
+        blocked("zyx123")
 
         # When/Then
         with pytest.raises(BlockListDenied):
@@ -30,7 +53,7 @@ class TestBlockList:
         user_id = 123
         attribute = "credit_card"
         check_values = "zyx123"
-        mock_redis.sismember.side_effect = TimeoutError("Timeout")
+        mock_redis.get.side_effect = TimeoutError("Timeout")
 
         # When
         BlockList().validate_access(
@@ -43,7 +66,7 @@ class TestBlockList:
         user_id = 123
         attribute = "credit_card"
         check_values = "zyx123"
-        mock_redis.sismember.side_effect = ConnectionError(
+        mock_redis.get.side_effect = ConnectionError(
             "Error 111 connecting to redis:6379. Connection refused."
         )
 
@@ -58,7 +81,7 @@ class TestBlockList:
         user_id = 123
         attribute = "credit_card"
         check_values = "zyx123"
-        mock_redis.sismember.side_effect = ConnectionRefusedError(
+        mock_redis.get.side_effect = ConnectionRefusedError(
             "[Errno 111] Connection refused"
         )
 
@@ -73,7 +96,7 @@ class TestBlockList:
         user_id = 123
         attribute = "credit_card"
         check_values = "zyx123"
-        mock_redis.sismember.side_effect = Exception("dummy exception")
+        mock_redis.get.side_effect = Exception("dummy exception")
 
         # When
         with pytest.raises(Exception, match="dummy exception"):
@@ -87,7 +110,7 @@ class TestBlockList:
         user_id = 123
         attribute = "credit_card"
         check_values = "zyx123"
-        mock_redis.sismember.side_effect = Exception("dummy exception")
+        mock_redis.get.side_effect = Exception("dummy exception")
 
         # When
         BlockList(skip_if_unavailable=True).validate_access(
@@ -95,12 +118,12 @@ class TestBlockList:
         )
 
     @staticmethod
-    def test_validate_access_multiple_values(mock_redis, mock_user_service):
+    def test_validate_access_multiple_values(mock_redis, mock_user_service, blocked):
         # Given
         user_id = 123
         attribute = "phone_number"
         check_values = ["zyx123", "abcd1234"]
-        mock_redis.sismember.return_value = 1
+        blocked("abcd1234")
 
         # When/Then
         with pytest.raises(BlockListDenied):
@@ -155,3 +178,91 @@ class TestBlockList:
             f"user_blocked_attributes.{attribute}",
             value,
         )
+
+    @staticmethod
+    def test_validate_access_allowed_from_snapshot(
+        mock_redis, mock_user_service, blocked
+    ):
+        # Given
+        blocked("zyx123")
+        BlockList().validate_access(
+            user_id=123, attribute="phone_number", check_values="abcd1234"
+        )
+        mock_redis.reset_mock()
+
+        # When
+        BlockList().validate_access(
+            user_id=123, attribute="phone_number", check_values=["abcd1234", "1234"]
+        )
+
+        # Then no redis calls are made within the version check interval
+        assert mock_redis.method_calls == []
+        mock_user_service.update_user.assert_not_called()
+
+    @staticmethod
+    def test_validate_access_reloads_on_new_version(
+        mock_redis, mock_user_service, blocked
+    ):
+        # Given
+        BlockList().validate_access(
+            user_id=123, attribute="phone_number", check_values="abcd1234"
+        )
+        blocked("abcd1234", version="2")
+
+        # When/Then
+        with mock.patch.object(block_list, "BLOCK_LIST_VERSION_CHECK_SECONDS", 0):
+            with pytest.raises(BlockListDenied):
+                BlockList().validate_access(
+                    user_id=123, attribute="phone_number", check_values="abcd1234"
+                )
+
+    @staticmethod
+    def test_validate_access_published_change_invalidates_snapshot(
+        mock_redis, mock_user_service, blocked
+    ):
+        # Given
+        BlockList().validate_access(
+            user_id=123, attribute="phone_number", check_values="abcd1234"
+        )
+        blocked("abcd1234", version="2")
+
+        # When another process publishes a change
+        block_list._on_block_list_changed({"data": "phone_number"})
+
+        # Then
+        with pytest.raises(BlockListDenied):
+            BlockList().validate_access(
+                user_id=123, attribute="phone_number", check_values="abcd1234"
+            )
+
+    @staticmethod
+    def test_validate_access_large_list_uses_single_call(
+        mock_redis, mock_user_service, blocked
+    ):
+        # Given
+        mock_redis.get.return_value = "1"
+        mock_redis.scard.return_value = block_list.BLOCK_LIST_SNAPSHOT_MAX_SIZE + 1
+        mock_redis.smismember.return_value = [0, 1]
+
+        # When/Then
+        with pytest.raises(BlockListDenied):
+            BlockList().validate_access(
+                user_id=123, attribute="phone_number", check_values=["zyx123", "abcd"]
+            )
+        mock_redis.smismember.assert_called_once_with(
+            "user_blocked_attributes.phone_number", ["zyx123", "abcd"]
+        )
+        mock_redis.smembers.assert_not_called()
+
+    @staticmethod
+    def test_block_attribute_publishes_change(mock_redis):
+        # When
+        BlockList().block_attribute(attribute="phone_number", value="foo")
+
+        # Then
+        mock_redis.incr.assert_called_once_with(
+            "user_blocked_attributes.phone_number.version"
+        )
+        mock_redis.publish.assert_called_once_with(
+            block_list.BLOCK_LIST_CHANNEL, "phone_number"
+        )
@@ -1,6 +1,10 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
+import dataclasses
+import os
+import threading
+import time
+from typing import TYPE_CHECKING, Dict, FrozenSet, List, Optional
 
 from redis.exceptions import ConnectionError, TimeoutError
 
@@ -16,12 +20,106 @@ if TYPE_CHECKING:
 log = logger(__name__)
 
 USER_BLOCKED_ATTRIBUTES_KEY = "user_blocked_attributes"
+BLOCK_LIST_CHANNEL = f"{USER_BLOCKED_ATTRIBUTES_KEY}.changed"
+# How long a snapshot is trusted before its version key is checked again. Changes
+# made through BlockList are also published, so processes subscribed to
+# BLOCK_LIST_CHANNEL pick them up right away.
+BLOCK_LIST_VERSION_CHECK_SECONDS = float(
+    os.environ.get("BLOCK_LIST_VERSION_CHECK_SECONDS", 5)
+)
+# Attributes with more blocked values than this are not held in memory, and are
+# checked against redis with a single SMISMEMBER instead.
+BLOCK_LIST_SNAPSHOT_MAX_SIZE = int(
+    os.environ.get("BLOCK_LIST_SNAPSHOT_MAX_SIZE", 50_000)
+)
+_SUBSCRIBE_RETRY_SECONDS = 60
 
 BlockableAttributes = frozenset(["phone_number", "credit_card"])
 
 
+@dataclasses.dataclass(frozen=True)
+class _Snapshot:
+    """The blocked values of one attribute as of a given version of the list."""
+
+    version: Optional[str]
+    # None when the list is too large to be held in memory.
+    values: Optional[FrozenSet[str]]
+    checked_at: float
+
+
+# Shared by every BlockList in the process.
+_snapshots: Dict[str, _Snapshot] = {}
+_redis_clients: Dict[float, Redis] = {}
+_subscription_lock = threading.Lock()
+_subscribed_pid: Optional[int] = None
+_subscribe_attempted_at: float = float("-inf")
+
+
+def reset() -> None:
+    """Drop the shared snapshots and redis clients, ie. between tests."""
+    global _subscribed_pid, _subscribe_attempted_at
+    _snapshots.clear()
+    _redis_clients.clear()
+    _subscribed_pid = None
+    _subscribe_attempted_at = float("-inf")
+
+
+def _shared_redis_client(timeout: float) -> Redis:
+    client = _redis_clients.get(timeout)
+    if client is None:
+        client = _redis_clients.setdefault(
+            timeout, redis_client(decode_responses=True, socket_timeout=timeout)
+        )
+    return client
+
+
+def _on_block_list_changed(message: dict) -> None:
+    _snapshots.pop(message["data"], None)
+
+
+def _subscribe(client: Redis) -> None:
+    """Listen for block list changes in a background thread, once per process."""
+    global _subscribed_pid, _subscribe_attempted_at
+    pid = os.getpid()
+    if _subscribed_pid == pid:
+        return
+    now = time.monotonic()
+    if now - _subscribe_attempted_at < _SUBSCRIBE_RETRY_SECONDS:
+        return
+    if not _subscription_lock.acquire(blocking=False):
+        return
+    try:
+        _subscribe_attempted_at = now
+        pubsub = client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(**{BLOCK_LIST_CHANNEL: _on_block_list_changed})
+        pubsub.run_in_thread(
+            sleep_time=1, daemon=True, exception_handler=_on_subscription_error
+        )
+        _subscribed_pid = pid
+    except Exception as e:
+        # Snapshots still refresh from the version key, just not as quickly.
+        log.warning("BlockList unable to subscribe to changes", exception=e)
+    finally:
+        _subscription_lock.release()
+
+
+def _on_subscription_error(exception, pubsub, worker_thread):  # type: ignore[no-untyped-def] # Function is missing a type annotation
+    global _subscribed_pid
+    log.warning("BlockList subscription failed", exception=exception)
+    worker_thread.stop()
+    pubsub.close()
+    _subscribed_pid = None
+
+
 class BlockList:
-    """Manage a set of attributes for users that will prevent them from accessing their account"""
+    """
+    Manage a set of attributes for users that will prevent them from accessing their account
+
+    Access checks run against an in-process snapshot of each attribute's blocked
+    values, so the common case makes no redis calls. A snapshot is reloaded when its
+    version key changes, checked at most every BLOCK_LIST_VERSION_CHECK_SECONDS, or
+    as soon as a change is published on BLOCK_LIST_CHANNEL.
+    """
 
     _skip_if_unavailable: bool
     redis: Redis
@@ -31,10 +129,7 @@ class BlockList:
         if skip_if_unavailable is True then the check will be the best effort attempt
         """
         self._skip_if_unavailable = skip_if_unavailable
-        self.redis = redis_client(
-            decode_responses=True,
-            socket_timeout=timeout,
-        )
+        self.redis = _shared_redis_client(timeout)
 
     def validate_access(  # type: ignore[no-untyped-def] # Function is missing a return type annotation
         self,
@@ -48,10 +143,7 @@ class BlockList:
         self._validate_attribute(attribute)
 
         try:
-            if any(
-                self.redis.sismember(self._key(attribute), value)
-                for value in check_values
-            ):
+            if self._blocked_values(attribute, check_values):
                 log.info(
                     f"Preventing access for user in blocked attributes list: user_id={user_id}"
                 )
@@ -119,11 +211,13 @@ class BlockList:
         """Add another item to the block list for a given user attribute"""
         self._validate_attribute(attribute)
         self.redis.sadd(self._key(attribute), value)
+        self._publish_change(attribute)
 
     def unblock_attribute(self, attribute: BlockableAttributes, value: str):  # type: ignore[valid-type,no-untyped-def] # Variable "authz.services.block_list.BlockableAttributes" is not valid as a type #type: ignore[no-untyped-def] # Function is missing a return type annotation
         """Remove an item from the block list for a given user attribute"""
         self._validate_attribute(attribute)
         self.redis.srem(self._key(attribute), value)
+        self._publish_change(attribute)
 
     def get_block_list(self, attribute: BlockableAttributes):  # type: ignore[valid-type,no-untyped-def] # Variable "authz.services.block_list.BlockableAttributes" is not valid as a type #type: ignore[no-untyped-def] # Function is missing a return type annotation
         """View all of the blocked values for a given user attribute"""
@@ -133,6 +227,57 @@ class BlockList:
     def _key(self, attribute: str) -> str:
         return f"{USER_BLOCKED_ATTRIBUTES_KEY}.{attribute}"
 
+    def _version_key(self, attribute: str) -> str:
+        return f"{self._key(attribute)}.version"
+
+    def _blocked_values(self, attribute: str, check_values: List[str]) -> List[str]:
+        snapshot = self._snapshot(attribute)
+        if snapshot.values is not None:
+            return [value for value in check_values if value in snapshot.values]
+
+        if not check_values:
+            return []
+        is_member = self.redis.smismember(self._key(attribute), check_values)
+        return [value for value, member in zip(check_values, is_member) if member]
+
+    def _snapshot(self, attribute: str) -> _Snapshot:
+        _subscribe(self.redis)
+        now = time.monotonic()
+        snapshot = _snapshots.get(attribute)
+        if (
+            snapshot is not None
+            and now - snapshot.checked_at < BLOCK_LIST_VERSION_CHECK_SECONDS
+        ):
+            return snapshot
+
+        version = self.redis.get(self._version_key(attribute))
+        if snapshot is not None and snapshot.version == version:
+            snapshot = dataclasses.replace(snapshot, checked_at=now)
+        else:
+            snapshot = self._load_snapshot(attribute, version, now)
+        _snapshots[attribute] = snapshot
+        return snapshot
+
+    def _load_snapshot(
+        self, attribute: str, version: Optional[str], now: float
+    ) -> _Snapshot:
+        key = self._key(attribute)
+        values = None
+        size = self.redis.scard(key)
+        if size <= BLOCK_LIST_SNAPSHOT_MAX_SIZE:
+            values = frozenset(self.redis.smembers(key))
+        stats.increment(
+            "mono.block_list.snapshot_load",
+            pod_name=stats.PodNames.CORE_SERVICES,
+            tags=[f"attribute:{attribute}", f"in_memory:{values is not None}"],
+        )
+        return _Snapshot(version=version, values=values, checked_at=now)
+
+    def _publish_change(self, attribute: str) -> None:
+        self.redis.incr(self._version_key(attribute))
+        self.redis.publish(BLOCK_LIST_CHANNEL, attribute)
+        _snapshots.pop(attribute, None)
+
     def _disable_user(self, user_id: int) -> None:
         user_service = user.UserService()
         user_service.update_user(user_id=user_id, is_active=False)
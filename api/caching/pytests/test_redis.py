@@ -74,3 +74,16 @@ def test_ttl_cache_get_suppresses_exceptions(
         result = fake_ttl_cache.get("key")
 
     assert result is None
+
+
+def test_ttl_cache_delete_namespaces_keys(mock_redis_client, fake_ttl_cache):
+    fake_ttl_cache.delete("key", "other_key")
+
+    mock_redis_client.delete.assert_called_with("namespace:key", "namespace:other_key")
+
+
+def test_ttl_cache_delete_suppresses_exceptions(mock_redis_client, fake_ttl_cache):
+    mock_redis_client.delete.side_effect = redis.RedisError()
+
+    with does_not_raise():
+        fake_ttl_cache.delete("key")
@@ -95,6 +95,20 @@ class RedisTTLCache:
             log.error("Error retrieving value from redis", exception=e, key=key)
             self._increment_metric("get.error", tags=["error_type:other"])
 
+    @span
+    def delete(self, *keys: K) -> None:
+        if not keys:
+            return
+        try:
+            self._increment_metric("delete", sample_rate=_DEFAULT_REDUCED_SAMPLE_RATE)
+            self.get_client().delete(*(self._get_namespaced_key(key) for key in keys))
+        except redis.RedisError as e:
+            log.error("Error deleting value from redis", exception=e, keys=keys)
+            self._increment_metric("delete.error", tags=["error_type:redis"])
+        except Exception as e:
+            log.error("Error deleting value from redis", exception=e, keys=keys)
+            self._increment_metric("delete.error", tags=["error_type:other"])
+
     def _get_namespaced_key(self, key: K):  # type: ignore[no-untyped-def] # Function is missing a return type annotation
         return f"{self._namespace}:{key}"
 
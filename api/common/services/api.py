@@ -21,6 +21,11 @@ from sqlalchemy.orm.exc import NoResultFound
 
 from authn.models.user import User
 from authn.services.integrations.idp.token_validator import TokenValidator
+from authn.services.principal_cache import (
+    PRINCIPAL_CACHE_ENABLED,
+    Principal,
+    principal_cache,
+)
 from authz.services.block_list import BlockList, BlockListDenied
 from common import stats
 from common.services import ratelimiting
@@ -95,7 +100,7 @@ def is_path_allowed_view_as(path: str) -> bool:
 # ---- Auth wrapper for AuthenticatedResource -----
 
 
-def _get_user_from_token():  # type: ignore[no-untyped-def] # Function is missing a return type annotation
+def _get_user_from_token(*, loader: Callable[[int], User] = None):  # type: ignore[no-untyped-def,assignment] # Function is missing a return type annotation #type: ignore[assignment] # Incompatible default for argument "loader" (default has type "None", argument has type "Callable[[int], User]")
     bearer_header = request.headers.get("Authorization")
     if not bearer_header:
         return
@@ -103,6 +108,8 @@ def _get_user_from_token():  # type: ignore[no-untyped-def] # Function is missin
     try:
         token_dict = validator.decode_token(bearer_header)
         user_id = token_dict["user_id"]
+        if loader:  # type: ignore[truthy-function] # Function "loader" could always be true in boolean context
+            return loader(user_id)
         return db.session.query(User).filter(User.id == user_id).one()
     except Exception:
         return
@@ -115,8 +122,6 @@ def _get_user(*, loader: Callable[[int], User] = None):  # type: ignore[no-untyp
 
     if user_id:
         try:
-            if loader:  # type: ignore[truthy-function] # Function "loader" could always be true in boolean context
-                return loader(user_id)  # type: ignore[arg-type] # Argument 1 has incompatible type "str"; expected "int"
             if view_as:
                 view_as_log = f"_get_user view as query: user_id {user_id} view_as {view_as} on {request.path}"
                 if request.method == "GET" and is_path_allowed_view_as(request.path):
@@ -124,6 +129,8 @@ def _get_user(*, loader: Callable[[int], User] = None):  # type: ignore[no-untyp
                     user_id = int(view_as)
                 else:
                     log.warning(f"Rejected, {view_as_log}")
+            if loader:  # type: ignore[truthy-function] # Function "loader" could always be true in boolean context
+                return loader(user_id)  # type: ignore[arg-type] # Argument 1 has incompatible type "str"; expected "int"
             return db.session.query(User).filter(User.id == user_id).one()
         except NoResultFound:
             log.debug("No user for ID: %s", user_id)
@@ -141,6 +148,9 @@ _REDIS_CLIENT_TIME_OUT = 2.0
 
 def _get_phone_numbers(user):  # type: ignore[no-untyped-def] # Function is missing a type annotation
     """Return the users phone numbers from both the User or Member Profile"""
+    if isinstance(user, Principal):
+        return list(user.phone_numbers)
+
     numbers = [user.sms_phone_number]
 
     if user.member_profile:
@@ -152,25 +162,29 @@ def _get_phone_numbers(user):  # type: ignore[no-untyped-def] # Function is miss
 def authenticate(func):  # type: ignore[no-untyped-def] # Function is missing a type annotation
     @wraps(func)
     def wrapper(*args, **kwargs):  # type: ignore[no-untyped-def] # Function is missing a type annotation
+        auth_start = time.monotonic()
         user_id = str(request.headers.get(_USER_ID_HEADER))
         user = None
-        if (
-            hasattr(func, "__self__")
-            and hasattr(func.__self__, "user")
-            and func.__self__.user
-        ):
-            if str(func.__self__.user.id) == user_id:
-                user = func.__self__.user or _get_user_from_token()
+        # only reuse a user the resource already loaded, reading `user` would load one
+        stored_user = getattr(getattr(func, "__self__", None), "_user", None)
+        if stored_user:
+            if str(stored_user.id) == user_id:
+                user = stored_user
             else:
                 log.error(
-                    f"[authenticate] mismatched user id, request_user_id {user_id}, stored {func.__self__.user.id}"
+                    f"[authenticate] mismatched user id, request_user_id {user_id}, stored {stored_user.id}"
                 )
 
         if user is None:
-            user = _get_user() or _get_user_from_token()
+            # Authenticate with a cached principal, resources load the full User
+            # lazily through HasUserResource.user only if they need it.
+            loader = principal_cache.get if PRINCIPAL_CACHE_ENABLED else None
+            user = _get_user(loader=loader) or _get_user_from_token(loader=loader)
             # further reduce the amount of queries and assign the user record here
-            if hasattr(func, "__self__") and issubclass(
-                type(func.__self__), HasUserResource
+            if (
+                isinstance(user, User)
+                and hasattr(func, "__self__")
+                and issubclass(type(func.__self__), HasUserResource)
             ):
                 func.__self__.set_user(user)
                 # temp metric logic to gauge how often it happens
@@ -208,6 +222,7 @@ def authenticate(func):  # type: ignore[no-untyped-def] # Function is missing a
                     current_app._get_current_object(),
                     identity=Identity(current_user_id),
                 )
+                _record_auth_duration(auth_start, user)
                 return func(*args, **kwargs)
 
             # The BlockList tracks phone_numbers, which tells us when a blocked phone number has been reused
@@ -236,6 +251,7 @@ def authenticate(func):  # type: ignore[no-untyped-def] # Function is missing a
             identity_changed.send(
                 current_app._get_current_object(), identity=Identity(current_user_id)
             )
+            _record_auth_duration(auth_start, user)
             return func(*args, **kwargs)
         else:
             log.debug("Bad or missing API KEY / JWT for auth.")
@@ -244,6 +260,15 @@ def authenticate(func):  # type: ignore[no-untyped-def] # Function is missing a
     return wrapper
 
 
+def _record_auth_duration(start: float, user: User | Principal) -> None:
+    stats.histogram(
+        metric_name="mono.api_auth.duration_ms",
+        pod_name=stats.PodNames.CORE_SERVICES,
+        metric_value=(time.monotonic() - start) * 1000,
+        tags=[f"principal_cache:{isinstance(user, Principal)}".lower()],
+    )
+
+
 # ---- Shared parts of Maven Base Views -----
 
 
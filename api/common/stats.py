@@ -12,10 +12,22 @@ def my function():
     ...business logic...
     stats.increment(...)
 ```
+
+Counters, gauges and histograms sent with a sample rate of 1 are aggregated in
+process per metric name and tags, and sent by a background thread every
+STATS_FLUSH_INTERVAL_SECONDS: one count per counter, the last value of a gauge and
+every value of a histogram. Set STATS_AGGREGATION_ENABLED=false to send each call
+right away.
 """
 
+import atexit
+import functools
+import logging
+import os
+import threading
+from collections import defaultdict
 from enum import Enum
-from typing import List
+from typing import Dict, List, Optional, Tuple
 
 from datadog import statsd
 
@@ -29,6 +41,13 @@ SYS_PREFIX = "mvn"
 ENG_POD_TAG = "eng_pod"
 ASSOCIATED_METRIC_TAG = "associated_metric_name"
 
+log = logging.getLogger(__name__)
+
+STATS_AGGREGATION_ENABLED = (
+    os.environ.get("STATS_AGGREGATION_ENABLED", "true").lower() == "true"
+)
+STATS_FLUSH_INTERVAL_SECONDS = float(os.environ.get("STATS_FLUSH_INTERVAL_SECONDS", 2))
+
 
 class PodNames(str, Enum):
     MPRACTICE_CORE = "mpractice_core"
@@ -62,7 +81,9 @@ def increment(  # type: ignore[no-untyped-def] # Function is missing a return ty
 ):
     metric_name = f"{SYS_PREFIX}.{metric_name}"
     tags = _add_default_tags(metric_name=metric_name, pod_name=pod_name, tags=tags)
-
+    if STATS_AGGREGATION_ENABLED and sample_rate == 1:
+        _aggregator.count(metric_name, metric_value, tags)
+        return
     statsd.increment(metric_name, metric_value, tags=tags, sample_rate=sample_rate)
 
 
@@ -76,6 +97,9 @@ def gauge(  # type: ignore[no-untyped-def] # Function is missing a return type a
 ):
     metric_name = f"{SYS_PREFIX}.{metric_name}"
     tags = _add_default_tags(metric_name=metric_name, pod_name=pod_name, tags=tags)
+    if STATS_AGGREGATION_ENABLED and sample_rate == 1:
+        _aggregator.gauge(metric_name, metric_value, tags)
+        return
     statsd.gauge(metric_name, metric_value, tags=tags, sample_rate=sample_rate)
 
 
@@ -89,6 +113,9 @@ def decrement(  # type: ignore[no-untyped-def] # Function is missing a return ty
 ):
     metric_name = f"{SYS_PREFIX}.{metric_name}"
     tags = _add_default_tags(metric_name=metric_name, pod_name=pod_name, tags=tags)
+    if STATS_AGGREGATION_ENABLED and sample_rate == 1:
+        _aggregator.count(metric_name, -metric_value, tags)
+        return
     statsd.decrement(metric_name, metric_value, tags=tags, sample_rate=sample_rate)
 
 
@@ -115,23 +142,14 @@ def histogram(  # type: ignore[no-untyped-def] # Function is missing a return ty
 ):
     metric_name = f"{SYS_PREFIX}.{metric_name}"
     tags = _add_default_tags(metric_name=metric_name, pod_name=pod_name, tags=tags)
+    if STATS_AGGREGATION_ENABLED and sample_rate == 1:
+        _aggregator.histogram(metric_name, metric_value, tags)
+        return
     statsd.histogram(metric_name, metric_value, tags=tags, sample_rate=sample_rate)
 
 
 def _add_default_tags(metric_name: str, pod_name: PodNames, tags: List[str] = None):  # type: ignore[no-untyped-def,assignment] # Function is missing a return type annotation #type: ignore[assignment] # Incompatible default for argument "tags" (default has type "None", argument has type "List[str]")
-    if pod_name not in {*PodNames}:
-        raise ValueError(
-            f"'{pod_name}' not found in PodNames Enum. Please pass in an enum member or matching member value (ex: PodNames.MY_POD or 'my_pod')"
-        )
-
-    tags = [] if tags is None else [*tags]
-
-    if metric_name:
-        metric_tag = f"{ASSOCIATED_METRIC_TAG}:{metric_name}"
-        tags.append(metric_tag)
-
-    pod_tag = f"{ENG_POD_TAG}:{pod_name}"
-    tags.append(pod_tag)
+    tags = [*_static_tags(metric_name, pod_name, tuple(tags or ()))]
 
     # add service_ns and team_ns tags as defaults if info exists
     service_ns, team_ns = get_owner_tags_from_span()
@@ -140,3 +158,122 @@ def _add_default_tags(metric_name: str, pod_name: PodNames, tags: List[str] = No
         tags.append(f"{TEAM_NS_TAG}:{team_ns}")
 
     return tags
+
+
+_POD_NAMES = {*PodNames}
+
+
+@functools.lru_cache(maxsize=4096)
+def _static_tags(
+    metric_name: str, pod_name: PodNames, tags: Tuple[str, ...]
+) -> Tuple[str, ...]:
+    # the tags that don't depend on the current span
+    if pod_name not in _POD_NAMES:
+        raise ValueError(
+            f"'{pod_name}' not found in PodNames Enum. Please pass in an enum member or matching member value (ex: PodNames.MY_POD or 'my_pod')"
+        )
+
+    if metric_name:
+        tags = (*tags, f"{ASSOCIATED_METRIC_TAG}:{metric_name}")
+
+    return (*tags, f"{ENG_POD_TAG}:{pod_name}")
+
+
+_MetricKey = Tuple[str, Tuple[str, ...]]
+
+
+class _Aggregator:
+    """
+    Combines the metrics sent between two flushes per metric name and tags, and
+    flushes them from a background thread.
+    """
+
+    def __init__(self, flush_interval: float = STATS_FLUSH_INTERVAL_SECONDS):
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._counts: Dict[_MetricKey, float] = defaultdict(float)
+        self._gauges: Dict[_MetricKey, float] = {}
+        self._histograms: Dict[_MetricKey, List[float]] = defaultdict(list)
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    def count(self, metric_name: str, value: float, tags: List[str]) -> None:
+        with self._lock:
+            self._counts[(metric_name, tuple(tags))] += value
+        self._ensure_started()
+
+    def gauge(self, metric_name: str, value: float, tags: List[str]) -> None:
+        with self._lock:
+            self._gauges[(metric_name, tuple(tags))] = value
+        self._ensure_started()
+
+    def histogram(self, metric_name: str, value: float, tags: List[str]) -> None:
+        with self._lock:
+            self._histograms[(metric_name, tuple(tags))].append(value)
+        self._ensure_started()
+
+    def flush(self) -> None:
+        with self._lock:
+            counts, self._counts = self._counts, defaultdict(float)
+            gauges, self._gauges = self._gauges, {}
+            histograms, self._histograms = self._histograms, defaultdict(list)
+        # the client is initialized with buffering disabled, sending each metric in a
+        # packet of its own; batch the flush into as few packets as fit
+        with statsd:
+            for (metric_name, tags), value in counts.items():
+                statsd.increment(metric_name, value, tags=[*tags])
+            for (metric_name, tags), value in gauges.items():
+                statsd.gauge(metric_name, value, tags=[*tags])
+            for (metric_name, tags), values in histograms.items():
+                for value in values:
+                    statsd.histogram(metric_name, value, tags=[*tags])
+
+    def _ensure_started(self) -> None:
+        # started on first use, so that processes only importing this module, and
+        # children forked before any metric was sent, don't run the thread
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(
+                target=self._run, name="stats-aggregator", daemon=True
+            )
+            self._thread.start()
+
+    def _run(self) -> None:
+        failure_logged = False
+        while not self._stopped.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception:
+                # a failed flush must not stop the next ones, and would likely fail
+                # again every interval, so it's logged once
+                if not failure_logged:
+                    log.exception("Failed to flush the aggregated metrics")
+                    failure_logged = True
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self.flush()
+
+
+_aggregator = _Aggregator()
+
+
+def flush() -> None:
+    """
+    Send the aggregated metrics now. Processes leaving with os._exit, e.g. RQ work
+    horses, skip the flush at exit and call this instead.
+    """
+    _aggregator.flush()
+
+
+def _reset_after_fork() -> None:
+    # the thread doesn't survive the fork, and the lock may have been held by it
+    global _aggregator
+    _aggregator = _Aggregator()
+
+
+atexit.register(lambda: _aggregator.stop())
+os.register_at_fork(after_in_child=_reset_after_fork)
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import contextlib
 import datetime
 import enum
 import glob
@@ -52,6 +53,7 @@ from app import create_app
 from eligibility.e9y import model as e9y_model
 from glidepath.pytests import helpers as glidepath_helpers
 from pytests.compat import *  # noqa: F403,F401
+from storage import query_budget as _query_budget
 from storage.connection import db as _db
 from storage.dev import reset_test_schemas, setup_test_dbs
 from tasks import queues
@@ -341,6 +343,39 @@ def session(db):  # type: ignore[no-untyped-def] # Function is missing a type an
     yield db.session
 
 
+@pytest.fixture(scope="function")
+def query_budget(session):  # type: ignore[no-untyped-def] # Function is missing a type annotation
+    """Assert how many queries a block of code may make.
+
+    Usage:
+        def test_list_things(client, query_budget):
+            with query_budget(max_queries=5, max_repeats=1) as stats:
+                client.get("/api/v1/things")
+            assert stats.row_count < 100
+
+    max_repeats bounds how many times a single statement (ignoring its parameters)
+    may run, which catches N+1 loops that a total count alone would let through.
+    """
+
+    @contextlib.contextmanager
+    def budget(max_queries: int | None = None, max_repeats: int | None = None):  # type: ignore[no-untyped-def] # Function is missing a return type annotation
+        test_name = (os.environ.get("PYTEST_CURRENT_TEST") or "").split(" ")[0]
+        with _query_budget.track(name=test_name, kind="test", report=False) as stats:
+            yield stats
+
+        if max_queries is not None:
+            assert (
+                stats.query_count <= max_queries
+            ), f"Query budget exceeded: {stats.query_count} queries, budget {max_queries}"
+        if max_repeats is not None:
+            repeated = stats.repeated_statements(threshold=max_repeats + 1)
+            assert not repeated, "Repeated queries exceeded budget:\n" + "\n".join(
+                f"[{r.count}x] {r.fingerprint}" for r in repeated
+            )
+
+    return budget
+
+
 @pytest.fixture(scope="function")
 def client(app):  # type: ignore[no-untyped-def] # Function is missing a type annotation
     """A test client for communicating with the local test application."""
@@ -701,8 +736,13 @@ class CellPhoneProvider(phone_number.Provider):
 
 @pytest.fixture()
 def mock_jwk_client():  # type: ignore[no-untyped-def] # Function is missing a return type annotation
+    from authn.services.integrations.idp.token_validator import JWKSKeyStore
+
+    # key stores are shared by the process, make sure they are built with the mock
+    JWKSKeyStore.clear()
     with mock.patch("jwt.PyJWKClient") as m:
         yield m
+    JWKSKeyStore.clear()
 
 
 @pytest.fixture()
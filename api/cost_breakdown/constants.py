@@ -15,6 +15,8 @@ PVERIFY_PROD_URL = "https://api.pverify.com/"
 PVERIFY_TEST_URL = "https://api.pverify.com/test/"
 PVERIFY_CLIENT_API_ID = os.environ.get("PVERIFY_CLIENT_API_ID")
 PVERIFY_CLIENT_API_SECRET = os.environ.get("PVERIFY_CLIENT_API_SECRET")
+# How long a successful pverify eligibility response is reused. 0 disables the cache.
+RTE_CACHE_TTL_SECONDS = int(os.environ.get("RTE_CACHE_TTL_SECONDS", 300))
 
 PVERIFY_RESPONSE_KEY_SUBSET = (
     "APIResponseCode",
@@ -0,0 +1,291 @@
+from __future__ import annotations
+
+import dataclasses
+import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import sqlalchemy
+
+from common import stats
+from common.global_procedures.procedure import ProcedureService
+from cost_breakdown.cost_breakdown_processor import (
+    METRIC_PREFIX,
+    CostBreakdownProcessor,
+)
+from cost_breakdown.models.cost_breakdown import (
+    CalcConfigAudit,
+    CostBreakdown,
+    HDHPAccumulationYTDInfo,
+    SystemUser,
+)
+from direct_payment.treatment_procedure.models.treatment_procedure import (
+    TreatmentProcedure,
+)
+from utils.log import logger
+from wallet.models.constants import CostSharingCategory
+from wallet.models.reimbursement import ReimbursementRequest
+from wallet.models.reimbursement_organization_settings import EmployerHealthPlan
+from wallet.models.reimbursement_wallet import MemberHealthPlan, ReimbursementWallet
+
+log = logger(__name__)
+
+BATCH_METRIC_PREFIX = f"{METRIC_PREFIX}.batch"
+
+_HealthPlanKey = Tuple[int, int, datetime.datetime]
+_SequentialRRKey = Tuple[int, bool, Optional[datetime.datetime]]
+_HDHPYTDSpendKey = Tuple[
+    int, int, datetime.datetime, int, bool, Optional[datetime.datetime]
+]
+
+
+@dataclasses.dataclass
+class CostBreakdownBatchResult:
+    treatment_procedure: TreatmentProcedure
+    cost_breakdown: Optional[CostBreakdown] = None
+    error: Optional[Exception] = None
+
+
+class CostBreakdownBatchProcessor(CostBreakdownProcessor):
+    """
+    Calculates cost breakdowns for many treatment procedures at once.
+
+    Data that cannot change while a batch runs (health plans, cost sharing categories,
+    alegeus ytd spend and the sequential reimbursement request history) is loaded once per
+    wallet/member and shared across every procedure of the batch. The non-alegeus hdhp ytd spend
+    is cached per wallet and cutoff date until a cost breakdown of that wallet is persisted, since
+    cost breakdowns persisted earlier in the batch must be picked up by the procedures that
+    follow them.
+
+    Procedures are processed in the order given, so results match calling
+    get_cost_breakdown_for_treatment_procedure for each procedure in turn.
+    """
+
+    def __init__(
+        self,
+        session: sqlalchemy.orm.Session = None,  # type: ignore[assignment] # Incompatible default for argument "session" (default has type "None", argument has type "Session")
+        procedure_service_client: ProcedureService = None,  # type: ignore[assignment] # Incompatible default for argument "procedure_service_client" (default has type "None", argument has type "ProcedureService")
+        system_user: SystemUser = None,  # type: ignore[assignment] # Incompatible default for argument "system_user" (default has type "None", argument has type "SystemUser")
+    ):
+        super().__init__(
+            session=session,
+            procedure_service_client=procedure_service_client,
+            system_user=system_user,
+        )
+        self.system_user = system_user
+        self._member_health_plans: Dict[_HealthPlanKey, Optional[MemberHealthPlan]] = {}
+        self._employer_health_plans: Dict[
+            _HealthPlanKey, Optional[EmployerHealthPlan]
+        ] = {}
+        self._cost_sharing_categories: Dict[str, CostSharingCategory] = {}
+        self._alegeus_ytd_spend: Dict[int, int] = {}
+        self._sequential_reimbursement_requests: Dict[
+            _SequentialRRKey, List[Tuple[ReimbursementRequest, CostBreakdown]]
+        ] = {}
+        # the ytd spend and the sequential ids it audits
+        self._hdhp_ytd_spend: Dict[
+            _HDHPYTDSpendKey, Tuple[HDHPAccumulationYTDInfo, List[int], List[int]]
+        ] = {}
+
+    def get_cost_breakdowns_for_treatment_procedures(
+        self,
+        wallets_and_procedures: Iterable[
+            Tuple[ReimbursementWallet, TreatmentProcedure]
+        ],
+        wallet_balance: Optional[int] = None,
+        store_to_db: bool = True,
+    ) -> List[CostBreakdownBatchResult]:
+        """
+        wallets_and_procedures: (wallet, treatment procedure) pairs, in the order they should be calculated.
+        wallet_balance: optional wallet balance override in cents, applied to every procedure.
+        store_to_db: persist each cost breakdown before calculating the next one, so later procedures
+        see the earlier ones as sequential payments.
+
+        A failing procedure does not stop the batch; its error is returned on its result. Each procedure
+        runs in a savepoint, so a failure only rolls back its own changes.
+        """
+        results = []
+        for wallet, treatment_procedure in wallets_and_procedures:
+            # Each procedure gets its own audit, exactly like a fresh processor would.
+            self.calc_config = CalcConfigAudit(system_user=self.system_user)  # type: ignore[arg-type]
+            try:
+                with self.session.begin_nested():
+                    cost_breakdown = self.get_cost_breakdown_for_treatment_procedure(
+                        wallet=wallet,
+                        treatment_procedure=treatment_procedure,
+                        wallet_balance=wallet_balance,
+                        store_to_db=store_to_db,
+                    )
+                if store_to_db:
+                    # committed before the next procedure, like a fresh processor would
+                    self.session.commit()
+                    self._clear_hdhp_ytd_spend(wallet.id)
+                results.append(
+                    CostBreakdownBatchResult(
+                        treatment_procedure=treatment_procedure,
+                        cost_breakdown=cost_breakdown,
+                    )
+                )
+            except Exception as e:
+                # only the procedure's savepoint was rolled back
+                self._clear_hdhp_ytd_spend(wallet.id)
+                log.error(
+                    "Batch cost breakdown failed for treatment procedure",
+                    treatment_procedure_id=treatment_procedure.id,
+                    reimbursement_wallet_id=str(wallet.id),
+                    error=str(e),
+                )
+                results.append(
+                    CostBreakdownBatchResult(
+                        treatment_procedure=treatment_procedure, error=e
+                    )
+                )
+
+        stats.increment(
+            metric_name=f"{BATCH_METRIC_PREFIX}.procedures",
+            pod_name=stats.PodNames.PAYMENTS_PLATFORM,
+            metric_value=len(results),
+        )
+        return results
+
+    def _store_cost_breakdown_to_db(
+        self, cost_breakdown: CostBreakdown, wallet: ReimbursementWallet
+    ) -> None:
+        # flushed into the procedure's savepoint, committing here would release it
+        # and leave the batch nothing to roll back to
+        try:
+            self.session.add(cost_breakdown)
+            self.session.flush()
+        except Exception as e:
+            log.error(
+                "Could not persist cost breakdown into database",
+                wallet_id=wallet.id,
+                error=e,
+            )
+            stats.increment(
+                metric_name=f"{METRIC_PREFIX}",
+                pod_name=stats.PodNames.PAYMENTS_PLATFORM,
+                tags=["success:false", "reason:db_failure"],
+            )
+            raise e
+
+    def _get_member_health_plan(  # type: ignore[no-untyped-def]
+        self, member_id: int, wallet_id: int, effective_date: datetime.datetime
+    ):
+        key = (member_id, wallet_id, effective_date)
+        if key not in self._member_health_plans:
+            self._member_health_plans[key] = super()._get_member_health_plan(
+                member_id=member_id, wallet_id=wallet_id, effective_date=effective_date
+            )
+        return self._member_health_plans[key]
+
+    def _get_employer_health_plan(
+        self, member_id: int, wallet_id: int, effective_date: datetime.datetime
+    ) -> Optional[EmployerHealthPlan]:
+        key = (member_id, wallet_id, effective_date)
+        if key not in self._employer_health_plans:
+            self._employer_health_plans[key] = super()._get_employer_health_plan(
+                member_id=member_id, wallet_id=wallet_id, effective_date=effective_date
+            )
+        return self._employer_health_plans[key]
+
+    def get_treatment_cost_sharing_category(  # type: ignore[no-untyped-def] # Function is missing a type annotation for one or more arguments
+        self,
+        global_procedure_id,
+    ) -> CostSharingCategory:
+        if global_procedure_id not in self._cost_sharing_categories:
+            self._cost_sharing_categories[
+                global_procedure_id
+            ] = super().get_treatment_cost_sharing_category(global_procedure_id)
+        return self._cost_sharing_categories[global_procedure_id]
+
+    def get_hdhp_alegeus_sequential_ytd_spend(
+        self, member_health_plan: MemberHealthPlan
+    ) -> int:
+        if member_health_plan.id not in self._alegeus_ytd_spend:
+            self._alegeus_ytd_spend[
+                member_health_plan.id
+            ] = super().get_hdhp_alegeus_sequential_ytd_spend(member_health_plan)
+        return self._alegeus_ytd_spend[member_health_plan.id]
+
+    def get_hdhp_non_alegeus_sequential_ytd_spend(
+        self,
+        member_id: int,
+        reimbursement_wallet_id: int,
+        before_this_date: datetime.datetime,
+        member_health_plan: MemberHealthPlan,
+        should_include_pending: Optional[bool] = False,
+        family_effective_date: Optional[datetime.datetime] = None,
+    ) -> HDHPAccumulationYTDInfo:
+        if self.extra_applied_amount:
+            # admin recalculations override sequential procedures, don't share them
+            return super().get_hdhp_non_alegeus_sequential_ytd_spend(
+                member_id=member_id,
+                reimbursement_wallet_id=reimbursement_wallet_id,
+                before_this_date=before_this_date,
+                member_health_plan=member_health_plan,
+                should_include_pending=should_include_pending,
+                family_effective_date=family_effective_date,
+            )
+        key = (
+            member_id,
+            reimbursement_wallet_id,
+            before_this_date,
+            member_health_plan.id,
+            bool(should_include_pending),
+            family_effective_date,
+        )
+        if key not in self._hdhp_ytd_spend:
+            ytd_spend = super().get_hdhp_non_alegeus_sequential_ytd_spend(
+                member_id=member_id,
+                reimbursement_wallet_id=reimbursement_wallet_id,
+                before_this_date=before_this_date,
+                member_health_plan=member_health_plan,
+                should_include_pending=should_include_pending,
+                family_effective_date=family_effective_date,
+            )
+            self._hdhp_ytd_spend[key] = (
+                ytd_spend,
+                self.calc_config.sequential_cost_breakdown_ids,
+                self.calc_config.sequential_procedure_ids,
+            )
+        (
+            ytd_spend,
+            self.calc_config.sequential_cost_breakdown_ids,
+            self.calc_config.sequential_procedure_ids,
+        ) = self._hdhp_ytd_spend[key]
+        return ytd_spend
+
+    def _clear_hdhp_ytd_spend(self, reimbursement_wallet_id: int) -> None:
+        for key in [k for k in self._hdhp_ytd_spend if k[1] == reimbursement_wallet_id]:
+            del self._hdhp_ytd_spend[key]
+
+    def _get_all_sequential_reimbursement_request_data(
+        self,
+        member_health_plan: MemberHealthPlan,
+        before_this_date: datetime.datetime,
+        should_include_pending: Optional[bool] = False,
+        family_effective_date: Optional[datetime.datetime] = None,
+    ) -> List[Tuple[ReimbursementRequest, CostBreakdown]]:
+        # Reimbursement request cost breakdowns are never created by a treatment procedure batch,
+        # so the history is loaded once with the latest possible cutoff and filtered per procedure.
+        key = (
+            member_health_plan.id,
+            bool(should_include_pending),
+            family_effective_date,
+        )
+        if key not in self._sequential_reimbursement_requests:
+            self._sequential_reimbursement_requests[
+                key
+            ] = super()._get_all_sequential_reimbursement_request_data(
+                member_health_plan=member_health_plan,
+                before_this_date=datetime.datetime.max,
+                should_include_pending=should_include_pending,
+                family_effective_date=family_effective_date,
+            )
+        return [
+            (reimbursement_request, cost_breakdown)
+            for reimbursement_request, cost_breakdown in self._sequential_reimbursement_requests[
+                key
+            ]
+            if cost_breakdown.created_at < before_this_date
+        ]
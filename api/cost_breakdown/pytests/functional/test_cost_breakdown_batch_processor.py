@@ -0,0 +1,256 @@
+import datetime
+import time
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+from cost_breakdown.cost_breakdown_batch_processor import CostBreakdownBatchProcessor
+from cost_breakdown.cost_breakdown_processor import CostBreakdownProcessor
+from cost_breakdown.models.cost_breakdown import (
+    CalcConfigAudit,
+    CostBreakdown,
+    HDHPAccumulationYTDInfo,
+)
+from direct_payment.treatment_procedure.pytests.factories import (
+    TreatmentProcedureFactory,
+)
+from utils.log import logger
+from wallet.models.constants import CostSharingCategory
+
+log = logger(__name__)
+
+COMPARED_FIELDS = (
+    "total_member_responsibility",
+    "total_employer_responsibility",
+    "beginning_wallet_balance",
+    "ending_wallet_balance",
+    "deductible",
+    "coinsurance",
+    "copay",
+    "overage_amount",
+    "cost_breakdown_type",
+)
+
+
+@pytest.fixture(scope="function")
+def clinic_day_procedures(wallet, treatment_procedure):
+    # A synthetic clinic day: the same member returning for several procedures.
+    wallet.reimbursement_organization_settings.deductible_accumulation_enabled = False
+    wallet.reimbursement_organization_settings.first_dollar_coverage = True
+    return [treatment_procedure] + [
+        TreatmentProcedureFactory.create(
+            member_id=treatment_procedure.member_id,
+            reimbursement_wallet_id=wallet.id,
+            reimbursement_request_category=treatment_procedure.reimbursement_request_category,
+            global_procedure_id=treatment_procedure.global_procedure_id,
+            cost=10_000 * (i + 1),
+            start_date=treatment_procedure.start_date,
+            end_date=treatment_procedure.end_date,
+        )
+        for i in range(9)
+    ]
+
+
+def test_batch_matches_per_procedure_results(wallet, clinic_day_procedures):
+    with patch(
+        "cost_breakdown.cost_breakdown_processor.CostBreakdownProcessor.get_treatment_cost_sharing_category",
+        return_value=CostSharingCategory.GENERIC_PRESCRIPTIONS,
+    ), patch(
+        "cost_breakdown.cost_breakdown_processor.CostBreakdownProcessor._get_member_health_plan",
+        return_value=None,
+    ):
+        expected = [
+            CostBreakdownProcessor().get_cost_breakdown_for_treatment_procedure(
+                wallet=wallet,
+                treatment_procedure=procedure,
+                wallet_balance=50_000,
+                store_to_db=False,
+            )
+            for procedure in clinic_day_procedures
+        ]
+        results = (
+            CostBreakdownBatchProcessor().get_cost_breakdowns_for_treatment_procedures(
+                wallets_and_procedures=[
+                    (wallet, procedure) for procedure in clinic_day_procedures
+                ],
+                wallet_balance=50_000,
+                store_to_db=False,
+            )
+        )
+
+    assert [r.treatment_procedure for r in results] == clinic_day_procedures
+    assert all(r.error is None for r in results)
+    for expected_cost_breakdown, result in zip(expected, results):
+        for field in COMPARED_FIELDS:
+            assert getattr(result.cost_breakdown, field) == getattr(
+                expected_cost_breakdown, field
+            )
+
+
+def test_batch_loads_shared_data_once(wallet, clinic_day_procedures):
+    with patch(
+        "cost_breakdown.cost_breakdown_processor.CostBreakdownProcessor.get_treatment_cost_sharing_category",
+        return_value=CostSharingCategory.GENERIC_PRESCRIPTIONS,
+    ) as get_category, patch(
+        "cost_breakdown.cost_breakdown_processor.CostBreakdownProcessor._get_member_health_plan",
+        return_value=None,
+    ) as get_member_health_plan:
+        CostBreakdownBatchProcessor().get_cost_breakdowns_for_treatment_procedures(
+            wallets_and_procedures=[
+                (wallet, procedure) for procedure in clinic_day_procedures
+            ],
+            wallet_balance=50_000,
+            store_to_db=False,
+        )
+
+    assert get_category.call_count == 1
+    # the tier check and the data service share a single lookup for the whole batch
+    assert get_member_health_plan.call_count == 1
+
+
+def test_batch_error_does_not_stop_batch(wallet, clinic_day_procedures):
+    clinic_day_procedures[0].start_date = None
+    with patch(
+        "cost_breakdown.cost_breakdown_processor.CostBreakdownProcessor.get_treatment_cost_sharing_category",
+        return_value=CostSharingCategory.GENERIC_PRESCRIPTIONS,
+    ), patch(
+        "cost_breakdown.cost_breakdown_processor.CostBreakdownProcessor._get_member_health_plan",
+        return_value=None,
+    ):
+        results = (
+            CostBreakdownBatchProcessor().get_cost_breakdowns_for_treatment_procedures(
+                wallets_and_procedures=[
+                    (wallet, procedure) for procedure in clinic_day_procedures
+                ],
+                wallet_balance=50_000,
+                store_to_db=False,
+            )
+        )
+
+    assert results[0].error is not None
+    assert all(r.cost_breakdown is not None for r in results[1:])
+
+
+def test_batch_error_rolls_back_only_its_procedure(wallet, clinic_day_procedures):
+    procedures = clinic_day_procedures[:3]
+    store = CostBreakdownBatchProcessor._store_cost_breakdown_to_db
+
+    def store_then_fail(self, cost_breakdown, wallet):
+        store(self, cost_breakdown, wallet)
+        if cost_breakdown.treatment_procedure_uuid == procedures[1].uuid:
+            raise Exception("deadlock")
+
+    with patch(
+        "cost_breakdown.cost_breakdown_processor.CostBreakdownProcessor.get_treatment_cost_sharing_category",
+        return_value=CostSharingCategory.GENERIC_PRESCRIPTIONS,
+    ), patch(
+        "cost_breakdown.cost_breakdown_processor.CostBreakdownProcessor._get_member_health_plan",
+        return_value=None,
+    ), patch.object(
+        CostBreakdownBatchProcessor,
+        "_store_cost_breakdown_to_db",
+        autospec=True,
+        side_effect=store_then_fail,
+    ):
+        results = (
+            CostBreakdownBatchProcessor().get_cost_breakdowns_for_treatment_procedures(
+                wallets_and_procedures=[
+                    (wallet, procedure) for procedure in procedures
+                ],
+                wallet_balance=50_000,
+                store_to_db=True,
+            )
+        )
+
+    assert [r.error is not None for r in results] == [False, True, False]
+    stored = CostBreakdown.query.filter(
+        CostBreakdown.treatment_procedure_uuid.in_([p.uuid for p in procedures])
+    ).all()
+    # the fixtures and the other procedures' cost breakdowns survive the failure
+    assert {c.treatment_procedure_uuid for c in stored} == {
+        procedures[0].uuid,
+        procedures[2].uuid,
+    }
+
+
+def test_hdhp_non_alegeus_ytd_spend_is_cached_per_wallet():
+    processor = CostBreakdownBatchProcessor()
+    processor.calc_config = CalcConfigAudit()
+    ytd_spend = HDHPAccumulationYTDInfo(
+        sequential_member_responsibilities=100, sequential_family_responsibilities=200
+    )
+    kwargs = dict(
+        member_id=1,
+        reimbursement_wallet_id=2,
+        before_this_date=datetime.datetime(2024, 1, 1),
+        member_health_plan=SimpleNamespace(id=3),
+        should_include_pending=True,
+    )
+
+    def get_ytd_spend(self, **kwargs):
+        self.calc_config.sequential_procedure_ids = [4]
+        return ytd_spend
+
+    with patch(
+        "cost_breakdown.cost_breakdown_processor.CostBreakdownProcessor.get_hdhp_non_alegeus_sequential_ytd_spend",
+        autospec=True,
+        side_effect=get_ytd_spend,
+    ) as get_hdhp_ytd_spend:
+        assert (
+            processor.get_hdhp_non_alegeus_sequential_ytd_spend(**kwargs) is ytd_spend
+        )
+        # the next procedure gets a fresh audit, the cached ids are replayed into it
+        processor.calc_config = CalcConfigAudit()
+        assert (
+            processor.get_hdhp_non_alegeus_sequential_ytd_spend(**kwargs) is ytd_spend
+        )
+        assert processor.calc_config.sequential_procedure_ids == [4]
+        assert get_hdhp_ytd_spend.call_count == 1
+
+        # a persisted cost breakdown of the wallet changes its sequential payments
+        processor._clear_hdhp_ytd_spend(2)
+        processor.get_hdhp_non_alegeus_sequential_ytd_spend(**kwargs)
+        assert get_hdhp_ytd_spend.call_count == 2
+
+
+def test_benchmark_clinic_day(wallet, clinic_day_procedures, query_budget):
+    with patch(
+        "cost_breakdown.cost_breakdown_processor.CostBreakdownProcessor.get_treatment_cost_sharing_category",
+        return_value=CostSharingCategory.GENERIC_PRESCRIPTIONS,
+    ), patch(
+        "cost_breakdown.cost_breakdown_processor.CostBreakdownProcessor._get_member_health_plan",
+        return_value=None,
+    ):
+        start = time.perf_counter()
+        with query_budget() as per_procedure_queries:
+            for procedure in clinic_day_procedures:
+                CostBreakdownProcessor().get_cost_breakdown_for_treatment_procedure(
+                    wallet=wallet,
+                    treatment_procedure=procedure,
+                    wallet_balance=50_000,
+                    store_to_db=False,
+                )
+        per_procedure_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        with query_budget() as batch_queries:
+            results = CostBreakdownBatchProcessor().get_cost_breakdowns_for_treatment_procedures(
+                wallets_and_procedures=[
+                    (wallet, procedure) for procedure in clinic_day_procedures
+                ],
+                wallet_balance=50_000,
+                store_to_db=False,
+            )
+        batch_seconds = time.perf_counter() - start
+
+    log.info(
+        "Cost breakdown clinic day benchmark",
+        procedures=len(clinic_day_procedures),
+        per_procedure_seconds=per_procedure_seconds,
+        batch_seconds=batch_seconds,
+        per_procedure_queries=per_procedure_queries.query_count,
+        batch_queries=batch_queries.query_count,
+    )
+    assert all(r.cost_breakdown is not None for r in results)
+    assert batch_queries.query_count < per_procedure_queries.query_count
@@ -0,0 +1,118 @@
+import threading
+import time
+from datetime import date
+from unittest import mock
+
+import pytest
+
+from cost_breakdown.models.rte import RTETransaction
+from cost_breakdown.rte.rte_cache import RTECache
+from wallet.models.constants import CostSharingCategory
+
+
+@pytest.fixture(scope="function")
+def ttl_cache():
+    store = {}
+    cache = mock.MagicMock()
+    cache.get.side_effect = store.get
+    cache.add.side_effect = store.__setitem__
+    return cache
+
+
+@pytest.fixture(scope="function")
+def rte_cache(ttl_cache):
+    return RTECache(ttl_in_seconds=300, cache=ttl_cache)
+
+
+@pytest.fixture(scope="function")
+def rte_transaction():
+    return RTETransaction(
+        id=1,
+        member_health_plan_id=2,
+        response_code=200,
+        request={"payerCode": "00001"},
+        response={"individual_oop": 150_000},
+        plan_active_status=True,
+        trigger_source="treatment procedure id: 3",
+    )
+
+
+def test_cache_key():
+    assert (
+        RTECache.cache_key(
+            member_health_plan_id=2,
+            cost_sharing_category=CostSharingCategory.CONSULTATION,
+            service_start_date=date(2024, 1, 1),
+            is_second_tier=False,
+        )
+        == "2:CONSULTATION:2024-01-01:tier1"
+    )
+
+
+def test_get_or_fetch_miss_then_hit(rte_cache, rte_transaction):
+    fetch = mock.MagicMock(return_value=rte_transaction)
+
+    first = rte_cache.get_or_fetch("key", fetch)
+    second = rte_cache.get_or_fetch("key", fetch)
+
+    assert first is rte_transaction
+    assert fetch.call_count == 1
+    assert second.id == rte_transaction.id
+    assert second.response == rte_transaction.response
+
+
+def test_get_or_fetch_errors_are_not_cached(rte_cache, rte_transaction):
+    fetch = mock.MagicMock(side_effect=[Exception("pverify down"), rte_transaction])
+
+    with pytest.raises(Exception):
+        rte_cache.get_or_fetch("key", fetch)
+    assert rte_cache.get_or_fetch("key", fetch) is rte_transaction
+    assert fetch.call_count == 2
+
+
+def test_get_or_fetch_disabled(ttl_cache, rte_transaction):
+    rte_cache = RTECache(ttl_in_seconds=0, cache=ttl_cache)
+    fetch = mock.MagicMock(return_value=rte_transaction)
+
+    rte_cache.get_or_fetch("key", fetch)
+    rte_cache.get_or_fetch("key", fetch)
+
+    assert fetch.call_count == 2
+    ttl_cache.get.assert_not_called()
+
+
+def test_get_or_fetch_coalesces_concurrent_requests(rte_cache, rte_transaction):
+    started, release = threading.Event(), threading.Event()
+
+    def slow_fetch():
+        started.set()
+        release.wait(timeout=5)
+        return rte_transaction
+
+    fetch = mock.MagicMock(side_effect=slow_fetch)
+    results = []
+    leader = threading.Thread(
+        target=lambda: results.append(rte_cache.get_or_fetch("key", fetch))
+    )
+    leader.start()
+    started.wait(timeout=5)
+    # the follower misses redis, since the leader has not finished yet
+    follower_missed = threading.Event()
+
+    def follower_get(key):
+        follower_missed.set()
+        return None
+
+    follower = threading.Thread(
+        target=lambda: results.append(rte_cache.get_or_fetch("key", fetch))
+    )
+    with mock.patch.object(rte_cache.cache, "get", side_effect=follower_get):
+        follower.start()
+        follower_missed.wait(timeout=5)
+        time.sleep(0.1)
+        release.set()
+        leader.join(timeout=5)
+        follower.join(timeout=5)
+
+    assert fetch.call_count == 1
+    assert [r.id for r in results] == [rte_transaction.id, rte_transaction.id]
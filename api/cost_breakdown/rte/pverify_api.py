@@ -38,6 +38,7 @@ from cost_breakdown.errors import (
     PverifyProcessFailedError,
 )
 from cost_breakdown.models.rte import EligibilityInfo, RTETransaction
+from cost_breakdown.rte.rte_cache import RTECache
 from payer_accumulator.models.payer_list import Payer
 from storage.connection import db
 from utils.log import logger
@@ -69,7 +70,7 @@ class PverifyAPI(AccessTokenMixin, BaseHttpClient):
     This class is responsible for calling the Pverify API.
     """
 
-    def __init__(self) -> None:
+    def __init__(self, rte_cache: Optional[RTECache] = None) -> None:
         super().__init__(
             base_url=PVERIFY_URL,
             service_name="pVerify",
@@ -78,6 +79,7 @@ class PverifyAPI(AccessTokenMixin, BaseHttpClient):
             metric_prefix=METRIC_PREFIX,
             metric_pod_name=stats.PodNames.PAYMENTS_PLATFORM,
         )
+        self.rte_cache = rte_cache or RTECache()
 
     def _create_access_token(self) -> tuple[str | None, int | None]:
         """
@@ -167,12 +169,43 @@ class PverifyAPI(AccessTokenMixin, BaseHttpClient):
     ) -> RTETransaction:
         """
         Send EligibilitySummary post request to Pverify to get member real time medical plan eligibility information.
+        Successful responses are cached for the same plan, cost sharing category, service date and tier.
         """
         # These values should be passed from treatment procedure/reimbursement request
         # default to past logic, sending today's date if they're null
         if service_start_date is None:
             service_start_date = date.today()
 
+        return self.rte_cache.get_or_fetch(
+            key=RTECache.cache_key(
+                member_health_plan_id=plan.id,
+                cost_sharing_category=cost_sharing_category,
+                service_start_date=service_start_date,
+                is_second_tier=is_second_tier,
+            ),
+            fetch=lambda: self._fetch_real_time_eligibility_data(
+                plan=plan,
+                cost_sharing_category=cost_sharing_category,
+                service_start_date=service_start_date,  # type: ignore[arg-type] # Argument "service_start_date" has incompatible type "Optional[date]"; expected "date"
+                member_first_name=member_first_name,
+                member_last_name=member_last_name,
+                is_second_tier=is_second_tier,
+                treatment_procedure_id=treatment_procedure_id,
+                reimbursement_request_id=reimbursement_request_id,
+            ),
+        )
+
+    def _fetch_real_time_eligibility_data(
+        self,
+        plan: MemberHealthPlan,
+        cost_sharing_category: CostSharingCategory,
+        service_start_date: date,
+        member_first_name: Optional[str] = None,
+        member_last_name: Optional[str] = None,
+        is_second_tier: bool = False,
+        treatment_procedure_id: Optional[int] = None,
+        reimbursement_request_id: Optional[int] = None,
+    ) -> RTETransaction:
         body = self._get_eligibility_summary_request_body(
             plan=plan,
             cost_sharing_category=cost_sharing_category,
@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+import threading
+import time
+from datetime import date
+from typing import Callable, Dict, Optional
+
+from caching.redis import RedisTTLCache
+from common import stats
+from cost_breakdown.constants import RTE_CACHE_TTL_SECONDS
+from cost_breakdown.models.rte import RTETransaction
+from utils.log import logger
+from wallet.models.constants import CostSharingCategory
+
+log = logger(__name__)
+
+METRIC_PREFIX = "api.cost_breakdown.rte.rte_cache"
+RTE_CACHE_NAMESPACE = "rte_transaction"
+# How long a request waits on an identical in-flight pverify call before calling pverify itself.
+COALESCE_WAIT_SECONDS = 35
+
+
+class _InFlightRequest:
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Optional[dict] = None
+        self.error: Optional[Exception] = None
+
+
+class RTECache:
+    """
+    Caches successful pverify eligibility responses per member health plan, cost sharing category,
+    service date and tier.
+
+    A hit returns the RTETransaction persisted by the original call, so cost breakdowns calculated
+    from a hit reference the same rte transaction id. Identical requests that arrive while a pverify
+    call is already in flight in this process wait for that call instead of issuing their own.
+    """
+
+    _in_flight: Dict[str, _InFlightRequest] = {}
+    _in_flight_lock = threading.Lock()
+
+    def __init__(
+        self,
+        ttl_in_seconds: int = RTE_CACHE_TTL_SECONDS,
+        cache: Optional[RedisTTLCache] = None,
+    ) -> None:
+        self.ttl_in_seconds = ttl_in_seconds
+        self.cache = cache or RedisTTLCache(
+            namespace=RTE_CACHE_NAMESPACE,
+            ttl_in_seconds=max(ttl_in_seconds, 1),
+            pod_name=stats.PodNames.PAYMENTS_PLATFORM,
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_in_seconds > 0
+
+    @staticmethod
+    def cache_key(
+        member_health_plan_id: int,
+        cost_sharing_category: CostSharingCategory,
+        service_start_date: date,
+        is_second_tier: bool,
+    ) -> str:
+        category = (
+            cost_sharing_category.value
+            if isinstance(cost_sharing_category, CostSharingCategory)
+            else cost_sharing_category
+        )
+        tier = "tier2" if is_second_tier else "tier1"
+        return f"{member_health_plan_id}:{category}:{service_start_date.isoformat()}:{tier}"
+
+    def get_or_fetch(
+        self, key: str, fetch: Callable[[], RTETransaction]
+    ) -> RTETransaction:
+        """
+        Return the cached rte transaction for key, or call fetch once for all concurrent callers.
+        Only successful transactions are cached; errors raised by fetch propagate to every waiting caller.
+        """
+        if not self.enabled:
+            return fetch()
+
+        cached = self.cache.get(key)
+        if cached is not None:
+            self._record_hit(cached, source="redis")
+            return self._to_transaction(cached)
+
+        with self._in_flight_lock:
+            in_flight = self._in_flight.get(key)
+            is_leader = in_flight is None
+            if is_leader:
+                in_flight = _InFlightRequest()
+                self._in_flight[key] = in_flight
+
+        if not is_leader:
+            if in_flight.done.wait(timeout=COALESCE_WAIT_SECONDS):  # type: ignore[union-attr] # Item "None" of "Optional[_InFlightRequest]" has no attribute "done"
+                if in_flight.error is not None:  # type: ignore[union-attr] # Item "None" of "Optional[_InFlightRequest]" has no attribute "error"
+                    raise in_flight.error  # type: ignore[union-attr] # Item "None" of "Optional[_InFlightRequest]" has no attribute "error"
+                self._record_hit(in_flight.result, source="coalesced")  # type: ignore[union-attr,arg-type] # Item "None" of "Optional[_InFlightRequest]" has no attribute "result"
+                return self._to_transaction(in_flight.result)  # type: ignore[union-attr,arg-type] # Item "None" of "Optional[_InFlightRequest]" has no attribute "result"
+            log.warning("Timed out waiting on in-flight pverify request", key=key)
+            return fetch()
+
+        try:
+            self._increment_metric("miss")
+            started = time.monotonic()
+            rte_transaction = fetch()
+            cached = self._from_transaction(
+                rte_transaction, latency_ms=int((time.monotonic() - started) * 1000)
+            )
+            self.cache.add(key, cached)
+            in_flight.result = cached  # type: ignore[union-attr] # Item "None" of "Optional[_InFlightRequest]" has no attribute "result"
+            return rte_transaction
+        except Exception as e:
+            in_flight.error = e  # type: ignore[union-attr] # Item "None" of "Optional[_InFlightRequest]" has no attribute "error"
+            raise
+        finally:
+            in_flight.done.set()  # type: ignore[union-attr] # Item "None" of "Optional[_InFlightRequest]" has no attribute "done"
+            with self._in_flight_lock:
+                self._in_flight.pop(key, None)
+
+    def _record_hit(self, cached: dict, source: str) -> None:
+        self._increment_metric("hit", tags=[f"source:{source}"])
+        stats.histogram(
+            metric_name=f"{METRIC_PREFIX}.latency_saved_ms",
+            pod_name=stats.PodNames.PAYMENTS_PLATFORM,
+            metric_value=cached.get("latency_ms", 0),
+            tags=[f"source:{source}"],
+        )
+
+    def _increment_metric(self, metric_suffix: str, tags: list = None) -> None:  # type: ignore[assignment] # Incompatible default for argument "tags" (default has type "None", argument has type "List[Any]")
+        stats.increment(
+            metric_name=f"{METRIC_PREFIX}.{metric_suffix}",
+            pod_name=stats.PodNames.PAYMENTS_PLATFORM,
+            tags=tags,
+        )
+
+    @staticmethod
+    def _from_transaction(rte_transaction: RTETransaction, latency_ms: int) -> dict:
+        return {
+            "id": rte_transaction.id,
+            "member_health_plan_id": rte_transaction.member_health_plan_id,
+            "response_code": rte_transaction.response_code,
+            "request": rte_transaction.request,
+            "response": rte_transaction.response,
+            "plan_active_status": rte_transaction.plan_active_status,
+            "trigger_source": rte_transaction.trigger_source,
+            "latency_ms": latency_ms,
+        }
+
+    @staticmethod
+    def _to_transaction(cached: dict) -> RTETransaction:
+        # A transient copy of the persisted row: it is never added to the session, so hits do not write.
+        return RTETransaction(
+            id=cached["id"],
+            member_health_plan_id=cached["member_health_plan_id"],
+            response_code=cached["response_code"],
+            request=cached["request"],
+            response=cached["response"],
+            plan_active_status=cached["plan_active_status"],
+            trigger_source=cached["trigger_source"],
+        )
@@ -1,25 +1,133 @@
+"""
+Precomputed practitioner search documents, stored in practitioner_data.
+
+Profile, vertical, specialty, need and language changes are tracked by ORM
+listeners: the practitioners whose documents went stale are added to a Redis set
+after commit, and refresh_stale_practitioners_data rebuilds only those documents,
+in batches. Changes to shared rows (needs, verticals, specialties, languages)
+request a full rebuild, which update_practitioners_data streams over the
+practitioners in id order and fans out to parallel jobs of bounded size.
+"""
+
 from __future__ import annotations
 
+import dataclasses
 import datetime
+import itertools
 import json
-
-from sqlalchemy.orm import joinedload, subqueryload
-
-from appointments.models.needs_and_categories import Need
+import os
+from typing import Dict, FrozenSet, Iterator, List, Optional, Set, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, joinedload, subqueryload
+
+from appointments.models.needs_and_categories import (
+    Need,
+    NeedCategory,
+    NeedRestrictedVertical,
+    NeedVertical,
+)
 from appointments.schemas.provider import make_dynamic_subtext
 from appointments.utils.provider import get_provider_country_flag
 from authn.models.user import User
-from models.profiles import PractitionerData, PractitionerProfile
+from common import stats
+from models.profiles import Language, PractitionerData, PractitionerProfile
+from models.verticals_and_specialties import Specialty, Vertical
 from storage.connection import db
 from tasks.queues import job
+from utils.cache import redis_client
 from utils.log import logger
+from utils.query import has_changes
 
 log = logger(__name__)
 
+STALE_PRACTITIONERS_KEY = "global_search:stale_practitioners"
+# member of the stale set asking for a full rebuild
+FULL_REBUILD = "all"
+REFRESH_BATCH_SIZE = int(os.environ.get("PRACTITIONER_DATA_REFRESH_BATCH_SIZE", 200))
+# practitioners rebuilt by each job of a full rebuild
+FULL_REBUILD_CHUNK_SIZE = int(
+    os.environ.get("PRACTITIONER_DATA_FULL_REBUILD_CHUNK_SIZE", 1000)
+)
+PRACTITIONERS_DATA_REFRESHED = "api.global_search.provider_data.refreshed"
+STALE_PRACTITIONERS_ERRORS = "api.global_search.provider_data.stale_errors"
+
+_PENDING_STALE_PRACTITIONERS_KEY = "stale_practitioner_ids"
+# rows embedded in the documents of many practitioners
+_SHARED_MODELS = (
+    Need,
+    NeedCategory,
+    NeedRestrictedVertical,
+    NeedVertical,
+    Vertical,
+    Specialty,
+    Language,
+)
+# the user columns embedded in a practitioner's document
+_USER_DOCUMENT_ATTRIBUTES = ("image_id", "email")
+
+
+@job("priority", team_ns="ai_platform")
+def update_practitioners_data(  # type: ignore[no-untyped-def] # Function is missing a type annotation
+    batch_size=50, chunk_size=FULL_REBUILD_CHUNK_SIZE, parallel=True
+):
+    """
+    Rebuilds the documents of all practitioners. The practitioner ids are read
+    chunk_size at a time and each chunk is rebuilt by its own job, so no worker
+    holds more than a chunk of profiles.
+    """
+    log.info("Start rebuilding all practitioner search documents")
+    num_chunks = 0
+    for user_ids in _stream_practitioner_ids(chunk_size):
+        num_chunks += 1
+        if parallel:
+            update_practitioners_data_chunk.delay(
+                user_ids, batch_size=batch_size, team_ns="ai_platform"
+            )
+        else:
+            update_practitioners_data_chunk(user_ids, batch_size=batch_size)
+    log.info("Scheduled practitioner search documents rebuild", chunks=num_chunks)
+
+
+@job("priority", team_ns="ai_platform")
+def update_practitioners_data_chunk(user_ids, batch_size=50):  # type: ignore[no-untyped-def] # Function is missing a type annotation
+    needs = load_need_documents()
+    for offset in range(0, len(user_ids), batch_size):
+        refresh_practitioners_data(user_ids[offset : offset + batch_size], needs)
+    _increment_refreshed(len(user_ids), mode="full")
+
 
 @job("priority", team_ns="ai_platform")
-def update_practitioners_data(batch_size=50):  # type: ignore[no-untyped-def] # Function is missing a type annotation
-    log.info("Start reading profiles and needs data")
+def refresh_stale_practitioners_data(batch_size=REFRESH_BATCH_SIZE):  # type: ignore[no-untyped-def] # Function is missing a type annotation
+    """Rebuilds the documents of the practitioners changed since the last run."""
+    redis = redis_client(decode_responses=True)
+    if redis.srem(STALE_PRACTITIONERS_KEY, FULL_REBUILD):
+        update_practitioners_data.delay(team_ns="ai_platform", job_timeout=45 * 60)
+
+    needs: Optional[List[NeedDocument]] = None
+    num_refreshed = 0
+    while True:
+        members = redis.spop(STALE_PRACTITIONERS_KEY, batch_size)
+        if not members:
+            break
+        user_ids = sorted(int(m) for m in members if m != FULL_REBUILD)
+        if not user_ids:
+            continue
+        if needs is None:
+            needs = load_need_documents()
+        # ids popped by a failing run are picked up by the next full rebuild
+        num_refreshed += refresh_practitioners_data(user_ids, needs)
+    if num_refreshed:
+        log.info("Refreshed stale practitioner search documents", count=num_refreshed)
+        _increment_refreshed(num_refreshed, mode="incremental")
+
+
+def refresh_practitioners_data(user_ids: List[int], needs: List[NeedDocument]) -> int:
+    """
+    Rebuilds and commits the documents of the given practitioners, loading them
+    in bulk. Ids without a practitioner profile are skipped. Returns the number
+    of documents written.
+    """
     profiles = (
         db.session.query(PractitionerProfile)
         .options(
@@ -27,13 +135,143 @@ def update_practitioners_data(batch_size=50):  # type: ignore[no-untyped-def] #
             subqueryload(PractitionerProfile.specialties),
             subqueryload(PractitionerProfile.languages),
         )
+        .filter(PractitionerProfile.user_id.in_(user_ids))
         .all()
     )
-    practitioner_data_list = db.session.query(PractitionerData).all()
+    if not profiles:
+        return 0
     practitioner_data_dict = {
         practitioner_data.user_id: practitioner_data
-        for practitioner_data in practitioner_data_list
+        for practitioner_data in db.session.query(PractitionerData).filter(
+            PractitionerData.user_id.in_(user_ids)
+        )
+    }
+    practitioner_users_dict = {
+        user.id: user
+        for user in db.session.query(User)
+        .options(joinedload(User.image))
+        .filter(User.id.in_(user_ids))
     }
+
+    processed_data_list = []
+    for profile in profiles:
+        practitioner_user = practitioner_users_dict[profile.user_id]
+        practitioner_user.practitioner_profile = profile
+        practitioner_data = practitioner_data_dict.get(profile.user_id)
+        if practitioner_data is None:
+            practitioner_data = PractitionerData(
+                user_id=profile.user_id,
+                created_at=datetime.datetime.now(datetime.timezone.utc),
+            )
+            db.session.add(practitioner_data)
+        _populate_practitioner_data(
+            practitioner_data, profile, practitioner_user, needs
+        )
+        processed_data_list.append(practitioner_data)
+
+    db.session.commit()
+    # expunge to avoid OOM
+    for p_data in processed_data_list:
+        db.session.expunge(p_data)
+    log.info(f"Committing {len(processed_data_list)} records")
+    return len(processed_data_list)
+
+
+def _populate_practitioner_data(  # type: ignore[no-untyped-def] # Function is missing a type annotation
+    practitioner_data, profile, practitioner_user, needs
+) -> None:
+    now = datetime.datetime.now(datetime.timezone.utc)
+    practitioner_data.practitioner_profile_json = json.dumps(
+        construct_profile_json(profile, practitioner_user)
+    )
+    practitioner_data.practitioner_profile_modified_at = now
+    practitioner_data.next_availability = profile.next_availability
+    practitioner_data.vertical_json = json.dumps(
+        [construct_vertical_json(vertical) for vertical in profile.verticals]
+    )
+    practitioner_data.vertical_modified_at = now
+    practitioner_data.specialty_json = json.dumps(
+        [construct_specialty_json(specialty) for specialty in profile.specialties]
+    )
+    practitioner_data.specialty_modified_at = now
+    practitioner_data.need_json = json.dumps(construct_needs_json(profile, needs))
+    practitioner_data.need_modified_at = now
+
+
+def _stream_practitioner_ids(chunk_size: int) -> Iterator[List[int]]:
+    last_user_id = 0
+    while True:
+        user_ids = [
+            user_id
+            for (user_id,) in db.session.query(PractitionerProfile.user_id)
+            .filter(PractitionerProfile.user_id > last_user_id)
+            .order_by(PractitionerProfile.user_id)
+            .limit(chunk_size)
+        ]
+        if not user_ids:
+            return
+        yield user_ids
+        last_user_id = user_ids[-1]
+
+
+def _increment_refreshed(count: int, mode: str) -> None:
+    stats.increment(
+        metric_name=PRACTITIONERS_DATA_REFRESHED,
+        pod_name=stats.PodNames.CARE_DISCOVERY,
+        metric_value=count,
+        tags=[f"mode:{mode}"],
+    )
+
+
+@dataclasses.dataclass(frozen=True)
+class NeedDocument:
+    """
+    The parts of a need its matching and json use, read once per rebuild
+    instead of once per practitioner.
+    """
+
+    need_json: dict
+    categories: Tuple[Tuple[int, dict], ...]
+    vertical_ids: FrozenSet[int]
+    specialty_ids: FrozenSet[int]
+    restricted_specialty_ids: FrozenSet[int]
+
+    @classmethod
+    def from_need(cls, need: Need) -> NeedDocument:
+        return cls(
+            need_json=construct_single_need_json(need),
+            categories=tuple(
+                (need_category.id, construct_need_category_json(need_category))
+                for need_category in need.categories
+            ),
+            vertical_ids=frozenset(vertical.id for vertical in need.verticals),
+            specialty_ids=frozenset(specialty.id for specialty in need.specialties),
+            restricted_specialty_ids=frozenset(
+                nrv.specialty_id for nrv in need.restricted_verticals
+            ),
+        )
+
+    def matches(
+        self,
+        vertical_ids: Set[int] | FrozenSet[int],
+        specialty_ids: Set[int] | FrozenSet[int],
+    ) -> bool:
+        # Vertical match: at least one
+        if not self.vertical_ids & vertical_ids:
+            return False
+        # If the need has specialties, run the matching: at least one
+        if self.specialty_ids and not self.specialty_ids & specialty_ids:
+            return False
+        # If the need has NeedRestrictedVerticals, run the speciality matching: at least one
+        if (
+            self.restricted_specialty_ids
+            and not self.restricted_specialty_ids & specialty_ids
+        ):
+            return False
+        return True
+
+
+def load_need_documents() -> List[NeedDocument]:
     needs = (
         db.session.query(Need)
         .options(
@@ -44,99 +282,57 @@ def update_practitioners_data(batch_size=50):  # type: ignore[no-untyped-def] #
         )
         .all()
     )
-    practitioner_users = (
-        db.session.query(User)
-        .options(
-            joinedload(User.image),
+    log.info(f"Processing {len(needs)} needs.")
+    return [NeedDocument.from_need(need) for need in needs]
+
+
+@event.listens_for(Session, "after_flush")
+def collect_stale_practitioners(session, flush_context):  # type: ignore[no-untyped-def] # Function is missing a type annotation
+    stale: Set[str] = set()
+    for instance in itertools.chain(session.new, session.deleted):
+        if isinstance(instance, PractitionerProfile):
+            stale.add(str(instance.user_id))
+        elif isinstance(instance, (Need, NeedRestrictedVertical, NeedVertical)):
+            stale.add(FULL_REBUILD)
+    for instance in session.dirty:
+        if isinstance(instance, PractitionerProfile):
+            # includes verticals, specialties, languages and next_availability
+            if session.is_modified(instance, include_collections=True):
+                stale.add(str(instance.user_id))
+        elif isinstance(instance, User):
+            if has_changes(instance, _USER_DOCUMENT_ATTRIBUTES):
+                # ids of members are skipped by the refresh
+                stale.add(str(instance.id))
+        elif isinstance(instance, Need):
+            if session.is_modified(instance, include_collections=True):
+                stale.add(FULL_REBUILD)
+        elif isinstance(instance, _SHARED_MODELS):
+            # the practitioners collections change with every practitioner
+            if session.is_modified(instance, include_collections=False):
+                stale.add(FULL_REBUILD)
+    if stale:
+        session.info.setdefault(_PENDING_STALE_PRACTITIONERS_KEY, set()).update(stale)
+
+
+@event.listens_for(Session, "after_commit")
+def mark_stale_practitioners(session):  # type: ignore[no-untyped-def] # Function is missing a type annotation
+    stale = session.info.pop(_PENDING_STALE_PRACTITIONERS_KEY, None)
+    if not stale:
+        return
+    try:
+        redis_client().sadd(STALE_PRACTITIONERS_KEY, *stale)
+    except Exception as e:
+        # the nightly full rebuild catches up
+        log.warning("Failed to mark stale practitioner search documents", error=str(e))
+        stats.increment(
+            metric_name=STALE_PRACTITIONERS_ERRORS,
+            pod_name=stats.PodNames.CARE_DISCOVERY,
         )
-        .join(PractitionerProfile)
-        .all()
-    )
-    practitioner_users_dict = {user.id: user for user in practitioner_users}
-    log.info(
-        f"Processing {len(profiles)} practitioner profiles and {len(needs)} needs."
-    )
 
-    # Populate profiles/verticals/specialties/needs
-    idx = 0
-    processed_data_list = []
-    for profile in profiles:
-        idx += 1
-        practitioner_user = practitioner_users_dict[profile.user_id]
-        practitioner_user.practitioner_profile = profile
-        # Update practitioner_data if we have the profile
-        if profile.user_id in practitioner_data_dict:
-            practitioner_data = practitioner_data_dict[profile.user_id]
-            practitioner_data.practitioner_profile_json = json.dumps(
-                construct_profile_json(profile, practitioner_user)
-            )
-            practitioner_data.practitioner_profile_modified_at = datetime.datetime.now(
-                datetime.timezone.utc
-            )
-            practitioner_data.next_availability = profile.next_availability
-            practitioner_data.vertical_json = json.dumps(
-                [construct_vertical_json(vertical) for vertical in profile.verticals]
-            )
-            practitioner_data.vertical_modified_at = datetime.datetime.now(
-                datetime.timezone.utc
-            )
-            practitioner_data.specialty_json = json.dumps(
-                [
-                    construct_specialty_json(specialty)
-                    for specialty in profile.specialties
-                ]
-            )
-            practitioner_data.specialty_modified_at = datetime.datetime.now(
-                datetime.timezone.utc
-            )
-            practitioner_data.need_json = json.dumps(
-                construct_needs_json(profile, needs)
-            )
-            practitioner_data.need_modified_at = datetime.datetime.now(
-                datetime.timezone.utc
-            )
-            processed_data_list.append(practitioner_data)
-        # Add practitioner_data if we don't have
-        else:
-            new_practitioner_data = PractitionerData(
-                user_id=profile.user_id,
-                created_at=datetime.datetime.now(datetime.timezone.utc),
-                practitioner_profile_json=json.dumps(
-                    construct_profile_json(profile, practitioner_user)
-                ),
-                practitioner_profile_modified_at=datetime.datetime.now(
-                    datetime.timezone.utc
-                ),
-                next_availability=profile.next_availability,
-                vertical_json=json.dumps(
-                    [
-                        construct_vertical_json(vertical)
-                        for vertical in profile.verticals
-                    ]
-                ),
-                vertical_modified_at=datetime.datetime.now(datetime.timezone.utc),
-                specialty_json=json.dumps(
-                    [
-                        construct_specialty_json(specialty)
-                        for specialty in profile.specialties
-                    ]
-                ),
-                specialty_modified_at=datetime.datetime.now(datetime.timezone.utc),
-                need_json=json.dumps(construct_needs_json(profile, needs)),
-                need_modified_at=datetime.datetime.now(datetime.timezone.utc),
-            )
-            db.session.add(new_practitioner_data)
-            processed_data_list.append(new_practitioner_data)
 
-        # batch commit and expunge to avoid OOM
-        if idx % batch_size == 0:
-            db.session.commit()
-            for p_data in processed_data_list:
-                db.session.expunge(p_data)
-            processed_data_list = []
-            log.info(f"Committing {idx} records")
-
-    db.session.commit()
+@event.listens_for(Session, "after_rollback")
+def discard_stale_practitioners(session):  # type: ignore[no-untyped-def] # Function is missing a type annotation
+    session.info.pop(_PENDING_STALE_PRACTITIONERS_KEY, None)
 
 
 def construct_profile_json(profile_obj, user_obj) -> dict:  # type: ignore
@@ -268,26 +464,28 @@ def construct_need_category_json(need_category_obj) -> dict:  # type: ignore
 
 
 def construct_needs_json(practitioner_profile, needs) -> dict:  # type: ignore
+    """Takes Need models or the NeedDocuments of load_need_documents."""
+    vertical_ids = {vertical.id for vertical in practitioner_profile.verticals}
+    specialty_ids = {specialty.id for specialty in practitioner_profile.specialties}
     matched_needs = []
-    need_categories_dict = {}
+    need_categories_dict: Dict[int, dict] = {}
 
     for need in needs:
-        if not match_practitioner_and_need(practitioner_profile, need):
+        if not isinstance(need, NeedDocument):
+            need = NeedDocument.from_need(need)
+        if not need.matches(vertical_ids, specialty_ids):
             continue
 
         # Add the need to the matched needs list
-        matched_needs.append(construct_single_need_json(need))
+        matched_needs.append(need.need_json)
 
         # Add associated need categories and de-dup
-        for need_category in need.categories:
-            need_categories_dict.setdefault(need_category.id, need_category)
+        for need_category_id, need_category_json in need.categories:
+            need_categories_dict.setdefault(need_category_id, need_category_json)
 
     return {
         "needs": matched_needs,
-        "need_categories": [
-            construct_need_category_json(need_category)
-            for need_category in need_categories_dict.values()
-        ],
+        "need_categories": list(need_categories_dict.values()),
     }
 
 
@@ -295,30 +493,7 @@ def match_practitioner_and_need(practitioner_profile, need) -> bool:  # type: ig
     """
     Returns: True if the practitioner meets the requirements of the need. False otherwise.
     """
-    # Vertical match: at least one
-    need_vertical_ids = {vertical.id for vertical in need.verticals}
-    practitioner_vertical_ids = {
-        vertical.id for vertical in practitioner_profile.verticals
-    }
-    vertical_intersection = need_vertical_ids & practitioner_vertical_ids
-    if not vertical_intersection:
-        return False
-
-    practitioner_specialty_ids = {
-        specialty.id for specialty in practitioner_profile.specialties
-    }
-    # If the need has specialties, run the matching: at least one
-    if need.specialties:
-        need_specialty_ids = {specialty.id for specialty in need.specialties}
-        specialty_intersection = need_specialty_ids & practitioner_specialty_ids
-        if not specialty_intersection:
-            return False
-
-    # If the need has NeedRestrictedVerticals, run the speciality matching: at least one
-    if need.restricted_verticals:
-        nrv_specialty_ids = {nrv.specialty_id for nrv in need.restricted_verticals}
-        nrv_specialty_intersection = nrv_specialty_ids & practitioner_specialty_ids
-        if not nrv_specialty_intersection:
-            return False
-
-    return True
+    return NeedDocument.from_need(need).matches(
+        {vertical.id for vertical in practitioner_profile.verticals},
+        {specialty.id for specialty in practitioner_profile.specialties},
+    )
@@ -0,0 +1,132 @@
+import datetime
+import json
+from types import SimpleNamespace
+from unittest import mock
+
+import pytest
+
+from global_search import provider_data
+from global_search.provider_data import (
+    FULL_REBUILD,
+    NeedDocument,
+    construct_needs_json,
+    refresh_practitioners_data,
+)
+from models.profiles import PractitionerData, PractitionerProfile
+
+
+def _need(id, vertical_ids, specialty_ids=(), restricted_specialty_ids=()):
+    return SimpleNamespace(
+        id=id,
+        name=f"need {id}",
+        description=None,
+        display_order=id,
+        promote_messaging=False,
+        hide_from_multitrack=False,
+        slug=f"need-{id}",
+        searchable_localized_data=None,
+        categories=[],
+        verticals=[SimpleNamespace(id=i) for i in vertical_ids],
+        specialties=[SimpleNamespace(id=i) for i in specialty_ids],
+        restricted_verticals=[
+            SimpleNamespace(specialty_id=i) for i in restricted_specialty_ids
+        ],
+    )
+
+
+def test_construct_needs_json():
+    profile = SimpleNamespace(
+        verticals=[SimpleNamespace(id=1)], specialties=[SimpleNamespace(id=10)]
+    )
+    needs = [
+        _need(1, vertical_ids=[1]),
+        _need(2, vertical_ids=[2]),
+        _need(3, vertical_ids=[1], specialty_ids=[11]),
+        _need(4, vertical_ids=[1], restricted_specialty_ids=[10]),
+    ]
+
+    needs_json = construct_needs_json(profile, needs)
+
+    assert [need["id"] for need in needs_json["needs"]] == [1, 4]
+    # documents match the same way as the models
+    assert (
+        construct_needs_json(profile, [NeedDocument.from_need(need) for need in needs])
+        == needs_json
+    )
+
+
+@pytest.fixture
+def practitioners(factories):
+    return factories.PractitionerUserFactory.create_batch(size=3)
+
+
+def test_refresh_practitioners_data(practitioners):
+    stale, up_to_date, _ = practitioners
+
+    assert refresh_practitioners_data([stale.id, 0], needs=[]) == 1
+
+    practitioner_data = PractitionerData.query.get(stale.id)
+    assert json.loads(practitioner_data.practitioner_profile_json)["user_id"] == (
+        stale.id
+    )
+    assert PractitionerData.query.get(up_to_date.id) is None
+
+
+def test_update_practitioners_data_streams_chunks(practitioners):
+    with mock.patch.object(
+        provider_data,
+        "refresh_practitioners_data",
+        wraps=provider_data.refresh_practitioners_data,
+    ) as refresh:
+        provider_data.update_practitioners_data(
+            batch_size=1, chunk_size=2, parallel=False
+        )
+
+    assert refresh.call_count == PractitionerProfile.query.count()
+    assert PractitionerData.query.filter(
+        PractitionerData.user_id.in_([p.id for p in practitioners])
+    ).count() == len(practitioners)
+
+
+def test_flush_collects_stale_practitioners(practitioners, session):
+    practitioner = practitioners[0]
+    session.info.pop(provider_data._PENDING_STALE_PRACTITIONERS_KEY, None)
+
+    practitioner.practitioner_profile.next_availability = datetime.datetime.utcnow()
+    session.flush()
+    assert session.info[provider_data._PENDING_STALE_PRACTITIONERS_KEY] == {
+        str(practitioner.id)
+    }
+
+    practitioner.practitioner_profile.verticals[0].description = "updated"
+    session.flush()
+    assert FULL_REBUILD in session.info[provider_data._PENDING_STALE_PRACTITIONERS_KEY]
+
+    provider_data.discard_stale_practitioners(session)
+    assert provider_data._PENDING_STALE_PRACTITIONERS_KEY not in session.info
+
+    practitioner.email = "updated@example.com"
+    session.flush()
+    assert session.info[provider_data._PENDING_STALE_PRACTITIONERS_KEY] == {
+        str(practitioner.id)
+    }
+
+
+def test_refresh_stale_practitioners_data():
+    redis = mock.MagicMock()
+    redis.srem.return_value = 1
+    redis.spop.side_effect = [["2", "1", FULL_REBUILD], []]
+
+    with mock.patch.object(
+        provider_data, "redis_client", return_value=redis
+    ), mock.patch.object(
+        provider_data, "load_need_documents", return_value=[]
+    ), mock.patch.object(
+        provider_data, "refresh_practitioners_data", return_value=2
+    ) as refresh, mock.patch.object(
+        provider_data.update_practitioners_data, "delay"
+    ) as full_rebuild:
+        provider_data.refresh_stale_practitioners_data(batch_size=10)
+
+    full_rebuild.assert_called_once()
+    refresh.assert_called_once_with([1, 2], [])
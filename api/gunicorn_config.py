@@ -1,6 +1,8 @@
 from __future__ import annotations
 
 import ctypes
+import gc
+import os
 import socket
 import struct
 import sys
@@ -14,11 +16,17 @@ from gunicorn.workers import gthread
 from common import stats
 from utils import log
 
+# Request threads hand their log records to a writer thread, see utils.log
+os.environ.setdefault("LOG_ASYNC_WRITER", "true")
 log.configure()
 
 # https://github.com/benoitc/gunicorn/blob/master/examples/example_config.py
-# disable to avoid the global referencing issue across process boundaries
-# preload_app = True
+# With GUNICORN_PRELOAD_APP the master imports the app once and workers share its
+# memory copy-on-write. Resources holding sockets or threads are rebuilt in post_fork.
+preload_app = os.environ.get("GUNICORN_PRELOAD_APP", "false").lower() == "true"
+if preload_app:
+    # gRPC is imported by the master, let its core survive the fork
+    os.environ.setdefault("GRPC_ENABLE_FORK_SUPPORT", "true")
 bind = "0.0.0.0:5000"
 # tune this later if needed
 # backlog = 2048
@@ -46,6 +54,13 @@ def on_starting(server):  # type: ignore[no-untyped-def] # Function is missing a
 
 
 def when_ready(server):  # type: ignore[no-untyped-def] # Function is missing a type annotation
+    if preload_app:
+        # Move everything allocated while loading the app to the permanent
+        # generation, so the workers' garbage collections don't touch (and copy)
+        # the pages it lives on.
+        gc.collect()
+        gc.freeze()
+        server.log.info(f"[gunicorn] froze {gc.get_freeze_count()} preloaded objects")
     server.log.debug(
         "[gunicorn] server is almost ready, starting backlog monitor daemon..."
     )
@@ -60,6 +75,16 @@ def on_exit(server):  # type: ignore[no-untyped-def] # Function is missing a typ
 
 
 def pre_fork(server, worker):  # type: ignore[no-untyped-def] # Function is missing a type annotation
+    worker.busy = Value(ctypes.c_uint, 0)
+    worker.log.debug("[gunicorn] worker pre_fork event")
+    if preload_app:
+        # Close any DB connection the master opened while loading the app, so no
+        # socket is shared with the workers.
+        from utils.service_hooks import dispose_db_engines
+
+        dispose_db_engines(server.app.wsgi())
+        return
+
     # add sleep logic to smooth out the resource contentions
     if server.live_worker_count.value >= server.num_workers:
         server.live_worker_count.value -= server.num_workers
@@ -72,15 +97,16 @@ def pre_fork(server, worker):  # type: ignore[no-untyped-def] # Function is miss
         )
         time.sleep(max_sleep_time)
 
-    worker.busy = Value(ctypes.c_uint, 0)
-    worker.log.debug("[gunicorn] worker pre_fork event")
-
 
 def post_fork(server, worker):  # type: ignore[no-untyped-def] # Function is missing a type annotation
     # Ensure that each worker process has its own SDK state
     from maven import feature_flags
 
     feature_flags.initialize()
+    if preload_app:
+        from utils.service_hooks import reinitialize_after_fork
+
+        reinitialize_after_fork(server.app.wsgi())
 
 
 def pre_request(worker: gthread.ThreadWorker, req: message.Request) -> None:
@@ -0,0 +1,47 @@
+import time
+from datetime import date, datetime, timedelta
+
+from health.data_models.member_risk_flag import MemberRiskFlag
+from health.models.health_profile import HealthProfile
+from health.pytests.risk_test_utils import RiskTestUtils
+from health.tasks.member_risk_flag_update import (
+    IncrementalMemberRiskFlagUpdateTask,
+    NewMemberRiskFlagUpdateTask,
+)
+from models.tracks.member_track import MemberTrack
+from models.tracks.track import TrackName
+from pytests.factories import DefaultUserFactory, MemberTrackFactory
+
+
+def test_incremental_run_overhead(session, risk_flags):
+    """A run after a handful of profile edits should only recompute those members."""
+    birthday = date(date.today().year - 30, date.today().month, 1) - timedelta(days=180)
+    users = []
+    for _ in range(50):
+        user = DefaultUserFactory.create()
+        MemberTrackFactory.create(user=user, name=TrackName.PREGNANCY)
+        user.health_profile.json["birthday"] = birthday.isoformat()
+        users.append(user)
+    session.commit()
+
+    long_ago = datetime.utcnow() - timedelta(days=2)
+    for model in (HealthProfile, MemberTrack, MemberRiskFlag):
+        session.query(model).update(
+            {model.modified_at: long_ago}, synchronize_session=False
+        )
+    session.commit()
+    RiskTestUtils.set_age(session, users[0], 41)
+
+    start = time.perf_counter()
+    full = NewMemberRiskFlagUpdateTask()
+    full.run()
+    full_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    incremental = IncrementalMemberRiskFlagUpdateTask()
+    incremental.run_incremental(since=long_ago + timedelta(days=1))
+    incremental_seconds = time.perf_counter() - start
+
+    assert full.num_users_processed == len(users)
+    assert incremental.num_users_processed == 1
+    assert incremental_seconds < full_seconds
@@ -0,0 +1,154 @@
+from datetime import date, datetime, timedelta
+from unittest import mock
+
+from dateutil.relativedelta import relativedelta
+
+from authn.models.user import User
+from health.data_models.member_risk_flag import MemberRiskFlag
+from health.models.health_profile import HealthProfile
+from health.models.risk_enums import RiskFlagName, RiskInputKey
+from health.pytests.risk_test_data import *  # type: ignore # noqa
+from health.pytests.risk_test_utils import RiskTestUtils
+from health.services.member_risk_calc_service import (
+    MemberRiskCalcService,
+    MemberRiskChanges,
+)
+from health.services.member_risk_service import MemberRiskService
+from health.tasks.member_risk_flag_update import IncrementalMemberRiskFlagUpdateTask
+from models.tracks.member_track import MemberTrack
+from models.tracks.track import TrackName
+from pytests.factories import DefaultUserFactory, MemberTrackFactory
+
+
+def _set_birthday(session, user: User, birthday: date) -> None:
+    health_profile: HealthProfile = user.health_profile
+    health_profile.json["birthday"] = birthday.isoformat()
+    session.add(health_profile)
+    session.commit()
+
+
+def _age_without_birthday_soon(age: int) -> date:
+    # Half a year away from a birthday, so only the profile edit counts as a change
+    today = date.today()
+    return date(today.year - age, today.month, 1) - timedelta(days=180)
+
+
+def _backdate_changes(session) -> datetime:
+    long_ago = datetime.utcnow() - timedelta(days=2)
+    for model in (HealthProfile, MemberTrack, MemberRiskFlag):
+        session.query(model).update(
+            {model.modified_at: long_ago}, synchronize_session=False
+        )
+    session.commit()
+    return long_ago + timedelta(days=1)
+
+
+def _pregnancy_user(session) -> User:
+    user = DefaultUserFactory.create()
+    MemberTrackFactory.create(user=user, name=TrackName.PREGNANCY)
+    _set_birthday(session, user, _age_without_birthday_soon(36))
+    # Profile edits set risks right away, leave them for the task to find
+    RiskTestUtils.delete_member_risks(session, user)
+    return user
+
+
+class TestIncrementalMemberRiskFlagUpdateTask:
+    def test_only_changed_users_are_updated(self, session, risk_flags):
+        changed = _pregnancy_user(session)
+        unchanged = _pregnancy_user(session)
+        since = _backdate_changes(session)
+
+        _set_birthday(session, changed, _age_without_birthday_soon(37))
+        RiskTestUtils.delete_member_risks(session, changed)
+        task = IncrementalMemberRiskFlagUpdateTask()
+        task.run_incremental(since=since)
+
+        assert task.num_users_processed == 1
+        assert RiskTestUtils.has_risk(changed, RiskFlagName.ADVANCED_MATERNAL_AGE_35)
+        assert not RiskTestUtils.has_risk(
+            unchanged, RiskFlagName.ADVANCED_MATERNAL_AGE_35
+        )
+
+    def test_birthday_reruns_age_calculators(self, session, risk_flags):
+        user = _pregnancy_user(session)
+        today = date.today()
+        _set_birthday(session, user, today - relativedelta(years=35))
+        RiskTestUtils.delete_member_risks(session, user)
+        since = _backdate_changes(session)
+
+        task = IncrementalMemberRiskFlagUpdateTask()
+        task.run_incremental(since=since)
+
+        assert task.num_users_processed == 1
+        assert RiskTestUtils.has_risk(user, RiskFlagName.ADVANCED_MATERNAL_AGE_35)
+
+    def test_time_based_risks_are_updated(self, session, fertility_user, risk_flags):
+        RiskTestUtils.add_member_risk(
+            fertility_user, "months trying to conceive", 5, 45
+        )
+        since = _backdate_changes(session)
+
+        IncrementalMemberRiskFlagUpdateTask().run_incremental(since=since)
+
+        actual = RiskTestUtils.get_active_risk(
+            fertility_user, "months trying to conceive"
+        )
+        assert actual.value == 6
+
+    def test_no_watermark_runs_for_all_users(
+        self, session, risk_flags, mock_redis_client
+    ):
+        user = _pregnancy_user(session)
+        _backdate_changes(session)
+
+        task = IncrementalMemberRiskFlagUpdateTask()
+        task.run_incremental()
+
+        assert task.changes_by_user is None
+        assert RiskTestUtils.has_risk(user, RiskFlagName.ADVANCED_MATERNAL_AGE_35)
+        mock_redis_client.set.assert_called_once_with(
+            "member_risk_flag_update:watermark:0:1", mock.ANY, ex=mock.ANY
+        )
+
+    def test_shards_split_users(self, session, risk_flags):
+        users = [_pregnancy_user(session) for _ in range(2)]
+
+        for user in users:
+            task = IncrementalMemberRiskFlagUpdateTask(shard=user.id % 2, num_shards=2)
+            task.run_incremental(since=datetime.utcnow() - timedelta(days=1))
+
+            assert task.changes_by_user is not None
+            assert set(task.changes_by_user) & {u.id for u in users} == {user.id}
+
+
+class TestRunForChanges:
+    def _calculators_run(self, user: User, changes: MemberRiskChanges):
+        calc_service = MemberRiskCalcService(
+            MemberRiskService(user, commit=False), [TrackName.PREGNANCY]
+        )
+        with mock.patch.object(calc_service, "_run_calc") as run_calc:
+            calc_service.run_for_changes(changes)
+        return {call.args[0].risk_name() for call in run_calc.call_args_list}
+
+    def test_runs_calculators_using_changed_inputs(self, default_user, risk_flags):
+        ran = self._calculators_run(
+            default_user, MemberRiskChanges(input_keys={RiskInputKey.AGE})
+        )
+
+        assert RiskFlagName.ADVANCED_MATERNAL_AGE_35 in ran
+        assert RiskFlagName.ADVANCED_MATERNAL_AGE_40 in ran
+        assert RiskFlagName.BMI_OBESITY not in ran
+
+    def test_runs_composite_calculators_using_changed_risks(
+        self, default_user, risk_flags
+    ):
+        ran = self._calculators_run(
+            default_user,
+            MemberRiskChanges(risk_names={RiskFlagName.HIGH_BLOOD_PRESSURE.value}),
+        )
+
+        assert RiskFlagName.ADVANCED_MATERNAL_AGE_35 not in ran
+        assert RiskFlagName.GESTATIONAL_DIABETES_AT_RISK in ran
+
+    def test_runs_nothing_without_changes(self, default_user, risk_flags):
+        assert self._calculators_run(default_user, MemberRiskChanges()) == set()
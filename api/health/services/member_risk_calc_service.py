@@ -52,6 +52,17 @@ class RunCalculatorsResult:
     error_count: int = 0
 
 
+# What changed for a member since the risk calculators last ran for them
+@dataclass
+class MemberRiskChanges:
+    input_keys: Set[RiskInputKey] = field(default_factory=set)
+    # Names of member risks that were set or ended
+    risk_names: Set[str] = field(default_factory=set)
+    # e.g. a track change, or no record of what changed
+    run_all: bool = False
+    run_time_based: bool = False
+
+
 # Runs RiskCalculators and updates MemberRiskFlags accordingly (sets or clears member risks)
 class MemberRiskCalcService:
     @staticmethod
@@ -104,6 +115,33 @@ class MemberRiskCalcService:
                 self._run_calc(calc, inputs, result)
         return result
 
+    # Run only the Calculators affected by changes made since a previous run
+    def run_for_changes(self, changes: MemberRiskChanges) -> RunCalculatorsResult:
+        if changes.run_all:
+            return self.run_all()
+        result = RunCalculatorsResult()
+        inputs = RiskInputRepository(
+            self.member_risk_service, {}, self.health_profile, self.active_track_names
+        )
+        relevant = {
+            calc.risk_name()
+            for calc in self.get_relevant_calculators(changes.input_keys)
+        }
+        for calc in self.all_calculators():
+            if isinstance(calc, TimeBasedRiskCalculator):
+                should_run = changes.run_time_based
+            else:
+                # Composite Risks also run when a Risk they depend on changed,
+                # whether before this run or earlier in it
+                should_run = calc.risk_name() in relevant or self.should_run(
+                    calc, {}, None, result
+                )
+                if isinstance(calc, CompositeRiskCalculator):
+                    should_run = should_run or calc.uses_risks(changes.risk_names)
+            if should_run:
+                self._run_calc(calc, inputs, result)
+        return result
+
     # Run All Calculators
     def run_all(self) -> RunCalculatorsResult:
         result = RunCalculatorsResult()
@@ -1,16 +1,29 @@
+import multiprocessing
+import os
 import traceback
 from collections import defaultdict
 from collections.abc import Iterator
-from datetime import datetime, timedelta
-from typing import Dict, Iterable, List, Optional
+from concurrent import futures
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
 
 import ddtrace
+import redis
 from maven import feature_flags
-from sqlalchemy.orm import joinedload
+from sqlalchemy import Column, case, func, or_
+from sqlalchemy.orm import Query, joinedload
 
+from caching.redis import get_redis_client
 from health.data_models.member_risk_flag import MemberRiskFlag
+from health.data_models.risk_flag import RiskFlag
 from health.models.health_profile import HealthProfile
-from health.services.member_risk_calc_service import MemberRiskCalcService
+from health.models.risk_enums import RiskInputKey
+from health.risk_calculators.risk_calculator import TimeBasedRiskCalculator
+from health.services.member_risk_calc_service import (
+    MemberRiskCalcService,
+    MemberRiskChanges,
+    RunCalculatorsResult,
+)
 from health.services.member_risk_service import MemberRiskService
 from health.services.risk_service import RiskService
 from models.tracks.member_track import MemberTrack
@@ -20,6 +33,13 @@ from utils.log import logger
 
 log = logger(__name__)
 
+INCREMENTAL_NUM_SHARDS = int(os.environ.get("MEMBER_RISK_FLAG_UPDATE_NUM_SHARDS", 4))
+# Shards that have not completed a run within this window fall back to a full run
+INCREMENTAL_MAX_LOOKBACK = timedelta(
+    days=int(os.environ.get("MEMBER_RISK_FLAG_UPDATE_MAX_LOOKBACK_DAYS", 7))
+)
+MODIFIED_REASON = "MemberRiskFlagUpdateTask"
+
 split_cron_in_half_enabled = feature_flags.bool_variation(
     "split-nightly-risk-calculation-cron-into-half",
     default=False,
@@ -124,7 +144,7 @@ class MemberRiskFlagUpdateTask:
         member_risk_service = MemberRiskService(
             user_id,
             health_profile=health_profile,
-            modified_reason="MemberRiskFlagUpdateTask",
+            modified_reason=MODIFIED_REASON,
             risk_service=self.risk_service,  # so that Risk Flag Lookup by name gets cached
             confirm_existing_risks=False,  # don't want existing risks to be modified reach run
             commit=False,
@@ -215,6 +235,7 @@ class NewMemberRiskFlagUpdateTask:
         self.num_ended_by_risk_name: Dict[str, int] = {}
         self.num_updated_by_risk_name: Dict[str, int] = {}
         self.error_count: int = 0
+        self.aborted: bool = False
 
     def _get_user_ids(self, is_even: Optional[bool] = None) -> Iterator[int]:
         total_count = 0
@@ -231,6 +252,7 @@ class NewMemberRiskFlagUpdateTask:
 
             if is_even is not None:
                 query = query.filter(MemberTrack.user_id % 2 == (0 if is_even else 1))
+            query = self._filter_shard(query, MemberTrack.user_id)
 
             results = (
                 query.order_by(MemberTrack.user_id)
@@ -277,13 +299,16 @@ class NewMemberRiskFlagUpdateTask:
                 self._run_for_user_batch(batch, batch_num, is_even)
                 if self.error_count > 5000:
                     message = f"MemberRiskFlagUpdateTask - Aborted Due to Error Count, is_even {is_even}"
+                    self.aborted = True
                     break
                 run_time = datetime.utcnow() - start
                 if run_time > self.max_runtime:
                     message = f"MemberRiskFlagUpdateTask - Aborted, Exceeded max runtime, is_even {is_even}"
+                    self.aborted = True
                     break
         except Exception as e:
             message = f"MemberRiskFlagUpdateTask - Aborted Due to Exception, is_even {is_even}"
+            self.aborted = True
             raise e
         finally:
             self._log_stats(message)
@@ -390,7 +415,7 @@ class NewMemberRiskFlagUpdateTask:
         member_risk_service = MemberRiskService(
             user_id,
             health_profile=health_profile,
-            modified_reason="MemberRiskFlagUpdateTask",
+            modified_reason=MODIFIED_REASON,
             risk_service=self.risk_service,  # so that Risk Flag Lookup by name gets cached
             confirm_existing_risks=False,  # don't want existing risks to be modified reach run
             commit=False,
@@ -398,7 +423,7 @@ class NewMemberRiskFlagUpdateTask:
         member_risk_service._set_active_risk_cache(active_risks)
 
         calc_service = MemberRiskCalcService(member_risk_service, active_tracks)
-        result = calc_service.run_all()
+        result = self._run_calculators(user_id, calc_service)
 
         for name in result.risks_added:
             self.num_created_by_risk_name[name] = (
@@ -416,6 +441,14 @@ class NewMemberRiskFlagUpdateTask:
             self.num_users_updated += 1
         self.error_count += result.error_count
 
+    def _run_calculators(
+        self, user_id: int, calc_service: MemberRiskCalcService
+    ) -> RunCalculatorsResult:
+        return calc_service.run_all()
+
+    def _filter_shard(self, query: Query, user_id_column: Column) -> Query:
+        return query
+
     def _get_health_profiles(self, user_ids: List[int]) -> Dict[int, HealthProfile]:
         try:
             health_profiles: List[HealthProfile] = (
@@ -485,6 +518,237 @@ class NewMemberRiskFlagUpdateTask:
         )
 
 
+# Runs only the RiskCalculators affected by changes since the shard's previous run:
+#   - HealthProfile edits re-run every input-based calculator
+#   - Birthdays re-run the age based calculators
+#   - Risks set or ended outside of this task re-run the composite calculators using them
+#   - Track changes re-run all calculators
+#   - Members with an active time-based risk get their value updated
+# A shard without a recent watermark (first run, missed runs, new shard count)
+# falls back to a full run. Profiles edited outside of the ORM, or with a birthday
+# the database can't read, are only caught by the periodic full run.
+class IncrementalMemberRiskFlagUpdateTask(NewMemberRiskFlagUpdateTask):
+    def __init__(self, shard: int = 0, num_shards: int = 1) -> None:
+        super().__init__()
+        self.shard = shard
+        self.num_shards = num_shards
+        # None = full run
+        self.changes_by_user: Optional[Dict[int, MemberRiskChanges]] = None
+
+    @property
+    def watermark_key(self) -> str:
+        return f"member_risk_flag_update:watermark:{self.shard}:{self.num_shards}"
+
+    def run_incremental(self, since: Optional[datetime] = None) -> None:
+        until = datetime.utcnow()
+        if since is None:
+            since = self._get_watermark()
+
+        if since is None or until - since > INCREMENTAL_MAX_LOOKBACK:
+            log.info(
+                "MemberRiskFlagUpdateTask - No recent watermark, running for all users",
+                shard=self.shard,
+                num_shards=self.num_shards,
+            )
+            self.changes_by_user = None
+            self.run()
+        else:
+            self.changes_by_user = self._get_changes(since, until)
+            log.info(
+                "MemberRiskFlagUpdateTask - Running for changed users",
+                shard=self.shard,
+                num_shards=self.num_shards,
+                since=since.isoformat(),
+                num_users=len(self.changes_by_user),
+            )
+            # run() falls back to all users when given no user ids
+            if self.changes_by_user:
+                self.run(user_ids=sorted(self.changes_by_user))
+
+        if not self.aborted:
+            self._set_watermark(until)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "num_users_processed": self.num_users_processed,
+            "num_users_updated": self.num_users_updated,
+            "risks_created": self.num_created_by_risk_name,
+            "risks_ended": self.num_ended_by_risk_name,
+            "risks_updated": self.num_updated_by_risk_name,
+            "error_count": self.error_count,
+        }
+
+    def _run_calculators(
+        self, user_id: int, calc_service: MemberRiskCalcService
+    ) -> RunCalculatorsResult:
+        if self.changes_by_user is None:
+            return calc_service.run_all()
+        # Match the full run, which only covers members with an active track
+        if not calc_service.active_track_names:
+            return RunCalculatorsResult()
+        return calc_service.run_for_changes(
+            self.changes_by_user.get(user_id, MemberRiskChanges(run_all=True))
+        )
+
+    def _filter_shard(self, query: Query, user_id_column: Column) -> Query:
+        if self.num_shards <= 1:
+            return query
+        return query.filter(user_id_column % self.num_shards == self.shard)
+
+    def _get_changes(
+        self, since: datetime, until: datetime
+    ) -> Dict[int, MemberRiskChanges]:
+        changes: Dict[int, MemberRiskChanges] = defaultdict(MemberRiskChanges)
+
+        # The modified columns aren't tracked, so re-run every input-based calculator
+        for (user_id,) in self._filter_shard(
+            db.session.query(HealthProfile.user_id).filter(
+                HealthProfile.modified_at >= since
+            ),
+            HealthProfile.user_id,
+        ):
+            changes[user_id].input_keys.update(RiskInputKey)
+
+        for user_id in self._get_users_with_birthday(since.date(), until.date()):
+            changes[user_id].input_keys.add(RiskInputKey.AGE)
+
+        # Risks set by this task already re-ran their dependent calculators
+        for user_id, risk_name in self._filter_shard(
+            db.session.query(MemberRiskFlag.user_id, RiskFlag.name)
+            .join(RiskFlag, MemberRiskFlag.risk_flag_id == RiskFlag.id)
+            .filter(
+                MemberRiskFlag.modified_at >= since,
+                or_(
+                    MemberRiskFlag.modified_reason.is_(None),
+                    MemberRiskFlag.modified_reason != MODIFIED_REASON,
+                ),
+            ),
+            MemberRiskFlag.user_id,
+        ):
+            changes[user_id].risk_names.add(risk_name)
+
+        for (user_id,) in self._filter_shard(
+            db.session.query(MemberTrack.user_id)
+            .filter(MemberTrack.modified_at >= since)
+            .distinct(),
+            MemberTrack.user_id,
+        ):
+            changes[user_id].run_all = True
+
+        time_based_risk_names = [
+            calc.risk_name().value
+            for calc in MemberRiskCalcService.all_calculators()
+            if isinstance(calc, TimeBasedRiskCalculator)
+        ]
+        for (user_id,) in self._filter_shard(
+            db.session.query(MemberRiskFlag.user_id)
+            .join(RiskFlag, MemberRiskFlag.risk_flag_id == RiskFlag.id)
+            .filter(
+                MemberRiskFlag.end.is_(None),
+                RiskFlag.name.in_(time_based_risk_names),
+            ),
+            MemberRiskFlag.user_id,
+        ):
+            changes[user_id].run_time_based = True
+
+        return dict(changes)
+
+    def _get_users_with_birthday(self, start: date, end: date) -> List[int]:
+        days = {
+            (start + timedelta(days=offset)).strftime("%m-%d")
+            for offset in range((end - start).days + 1)
+        }
+        # A Feb 29 birthday is celebrated on Feb 28 or Mar 1 in other years
+        if days & {"02-28", "03-01"}:
+            days.add("02-29")
+
+        # Age is read from the "birthday" in the profile json, stored as an ISO date
+        birthday = case(
+            [
+                (
+                    func.json_valid(HealthProfile.json) == 1,
+                    func.json_unquote(
+                        func.json_extract(HealthProfile.json, "$.birthday")
+                    ),
+                )
+            ],
+            else_=None,
+        )
+        return [
+            user_id
+            for (user_id,) in self._filter_shard(
+                db.session.query(HealthProfile.user_id).filter(
+                    func.substr(birthday, 6, 5).in_(days)
+                ),
+                HealthProfile.user_id,
+            )
+        ]
+
+    def _get_watermark(self) -> Optional[datetime]:
+        try:
+            value = get_redis_client().get(self.watermark_key)
+        except redis.RedisError as e:
+            log.warning("Failed to read member risk flag watermark", error=str(e))
+            return None
+        if not value:
+            return None
+        try:
+            return datetime.fromisoformat(
+                value.decode() if isinstance(value, bytes) else value
+            )
+        except (TypeError, ValueError):
+            return None
+
+    def _set_watermark(self, until: datetime) -> None:
+        try:
+            get_redis_client().set(
+                self.watermark_key, until.isoformat(), ex=INCREMENTAL_MAX_LOOKBACK
+            )
+        except redis.RedisError as e:
+            log.error("Failed to store member risk flag watermark", error=str(e))
+
+
+def _run_incremental_shard(shard: int, num_shards: int) -> Dict[str, Any]:
+    # Runs in a worker process, which needs its own app and database connections
+    from app import create_app
+
+    with create_app(task_instance=True).app_context():
+        task = IncrementalMemberRiskFlagUpdateTask(shard=shard, num_shards=num_shards)
+        task.run_incremental()
+        return task.summary()
+
+
+def run_incremental_shards(
+    num_shards: int = INCREMENTAL_NUM_SHARDS, max_workers: Optional[int] = None
+) -> None:
+    log.info("MemberRiskFlagUpdateTask - Starting shards", num_shards=num_shards)
+    # Spawned rather than forked so workers don't share the parent's connections
+    with futures.ProcessPoolExecutor(
+        max_workers=max_workers or num_shards,
+        mp_context=multiprocessing.get_context("spawn"),
+    ) as executor:
+        shard_futures = {
+            executor.submit(_run_incremental_shard, shard, num_shards): shard
+            for shard in range(num_shards)
+        }
+        for future in futures.as_completed(shard_futures):
+            shard = shard_futures[future]
+            try:
+                log.info(
+                    "MemberRiskFlagUpdateTask - Shard completed",
+                    shard=shard,
+                    num_shards=num_shards,
+                    context=future.result(),
+                )
+            except Exception as e:
+                log.error(
+                    "MemberRiskFlagUpdateTask - Shard failed",
+                    shard=shard,
+                    num_shards=num_shards,
+                    error=str(e),
+                )
+
+
 @ddtrace.tracer.wrap()
 @job("priority")
 def update_member_risk_flags_even() -> None:
@@ -506,3 +770,13 @@ def update_member_risk_flags_odd() -> None:
 def update_member_risk_flags() -> None:
     if not split_cron_in_half_enabled:
         MemberRiskFlagUpdateTask().run()
+
+
+@ddtrace.tracer.wrap()
+@job("priority")
+def update_member_risk_flags_incremental() -> None:
+    if feature_flags.bool_variation(
+        "enable-incremental-member-risk-flag-update",
+        default=False,
+    ):
+        run_incremental_shards()
@@ -627,7 +627,7 @@ def test_remove_value_from_cache(library_contentful_client, mock_get_locale):
         f"article:{locale}:{slug}" for locale in ["fr", "es", "fr-CA"]
     ]
     library_contentful_client.return_value.get_entry_by_id.return_value.slug = slug
-    localized_article_service.redis_client.keys.return_value = localized_cache_keys
+    localized_article_service.redis_client.smembers.return_value = localized_cache_keys
 
     localized_article_service.remove_value_from_cache(entry_id)
     library_contentful_client.assert_called_once_with(preview=True, user_facing=False)
@@ -637,11 +637,13 @@ def test_remove_value_from_cache(library_contentful_client, mock_get_locale):
     localized_article_service.redis_client.delete.assert_called_once_with(
         f"article:{slug}"
     )
-    localized_article_service.redis_client.keys.assert_called_once_with(
-        f"article:*:{slug}"
+    localized_article_service.redis_client.smembers.assert_called_once_with(
+        f"cache_tag:article_localized:{slug}"
     )
+    localized_article_service.redis_client.keys.assert_not_called()
     localized_article_service.redis_client.pipeline.return_value.delete.assert_has_calls(
         [call(cache_key) for cache_key in localized_cache_keys]
+        + [call(f"cache_tag:article_localized:{slug}")]
     )
     localized_article_service.redis_client.pipeline.return_value.execute.assert_called_once_with()
 
@@ -104,7 +104,7 @@ def test_remove_value_from_cache(library_contentful_client):
         f"article_title:{locale}:{slug}" for locale in ["fr", "es", "fr-CA"]
     ]
     library_contentful_client.return_value.get_entry_by_id.return_value.slug = slug
-    localized_article_title_service.redis_client.keys.return_value = (
+    localized_article_title_service.redis_client.smembers.return_value = (
         localized_cache_keys
     )
 
@@ -113,10 +113,12 @@ def test_remove_value_from_cache(library_contentful_client):
     library_contentful_client.return_value.get_entry_by_id.assert_called_once_with(
         entry_id
     )
-    localized_article_title_service.redis_client.keys.assert_called_once_with(
-        f"article_title:*:{slug}"
+    localized_article_title_service.redis_client.smembers.assert_called_once_with(
+        f"cache_tag:article_title:{slug}"
     )
+    localized_article_title_service.redis_client.keys.assert_not_called()
     localized_article_title_service.redis_client.pipeline.return_value.delete.assert_has_calls(
         [call(cache_key) for cache_key in localized_cache_keys]
+        + [call(f"cache_tag:article_title:{slug}")]
     )
     localized_article_title_service.redis_client.pipeline.return_value.execute.assert_called_once_with()
@@ -0,0 +1,159 @@
+from typing import Any, Dict, List
+from unittest import mock
+
+import pytest
+
+from learn.services import caching_service
+from learn.services.contentful_caching_service import (
+    REVALIDATE_LOCK_SECONDS,
+    REVALIDATE_WINDOW_SECONDS,
+    TTL,
+    ContentfulCachingService,
+)
+
+
+class ThingService(ContentfulCachingService[str]):
+    def _get_values_from_contentful(
+        self, identifier_values: List[str], **kwargs: Any
+    ) -> Dict[str, str]:
+        return self.contentful_client.get_things(identifier_values)
+
+    def _get_cache_key(self, identifier_value: str, **kwargs: Any) -> str:
+        return f"thing:{identifier_value}"
+
+    def _get_cache_tags(self, identifier_value: str, **kwargs: Any) -> List[str]:
+        return ["things"]
+
+    @staticmethod
+    def _serialize_value(value: str) -> str:
+        return value
+
+    @staticmethod
+    def _deserialize_value(value_str: str) -> str:
+        return value_str
+
+
+@pytest.fixture
+@mock.patch("learn.services.caching_service.redis_client")
+@mock.patch("learn.services.contentful.LibraryContentfulClient")
+def thing_service(_, __):
+    return ThingService(preview=False, user_facing=True)
+
+
+def test_redis_client_is_shared():
+    with mock.patch.object(caching_service, "_shared_client", None), mock.patch.object(
+        caching_service, "_create_redis_client"
+    ) as create_redis_client:
+        first = caching_service.redis_client()
+        second = caching_service.redis_client()
+
+    assert first is second
+    create_redis_client.assert_called_once_with()
+
+
+def test_saved_values_are_tagged(thing_service):
+    pipeline = thing_service.redis_client.pipeline.return_value
+
+    thing_service.try_to_save_values_in_cache({"a": "A"})
+
+    pipeline.set.assert_called_once_with("thing:a", "A", ex=TTL)
+    pipeline.sadd.assert_called_once_with("cache_tag:things", "thing:a")
+    pipeline.expire.assert_called_once_with("cache_tag:things", TTL)
+
+
+def test_remove_keys_from_cache_by_tag(thing_service):
+    thing_service.redis_client.smembers.return_value = ["thing:a", "thing:b"]
+    pipeline = thing_service.redis_client.pipeline.return_value
+
+    thing_service.remove_keys_from_cache_by_tag("things")
+
+    thing_service.redis_client.smembers.assert_called_once_with("cache_tag:things")
+    pipeline.delete.assert_has_calls(
+        [mock.call("thing:a"), mock.call("thing:b"), mock.call("cache_tag:things")]
+    )
+    thing_service.redis_client.keys.assert_not_called()
+
+
+def test_fresh_value_is_served_from_cache(thing_service):
+    thing_service.redis_client.pipeline.return_value.execute.return_value = [
+        "cached",
+        TTL * 1000,
+    ]
+
+    assert thing_service.get_value("a") == "cached"
+    thing_service.contentful_client.get_things.assert_not_called()
+    thing_service.redis_client.set.assert_not_called()
+
+
+def test_value_near_expiry_is_revalidated_by_one_reader(thing_service):
+    thing_service.redis_client.pipeline.return_value.execute.return_value = [
+        "cached",
+        (REVALIDATE_WINDOW_SECONDS - 1) * 1000,
+    ]
+    thing_service.redis_client.set.return_value = True
+    thing_service.contentful_client.get_things.return_value = {"a": "fresh"}
+
+    assert thing_service.get_value("a") == "fresh"
+    thing_service.redis_client.set.assert_called_once_with(
+        "revalidate:thing:a", "1", nx=True, ex=REVALIDATE_LOCK_SECONDS
+    )
+    thing_service.redis_client.pipeline.return_value.set.assert_called_once_with(
+        "thing:a", "fresh", ex=TTL
+    )
+
+
+def test_value_near_expiry_is_served_while_another_reader_revalidates(thing_service):
+    thing_service.redis_client.pipeline.return_value.execute.return_value = [
+        "cached",
+        (REVALIDATE_WINDOW_SECONDS - 1) * 1000,
+    ]
+    thing_service.redis_client.set.return_value = None
+
+    assert thing_service.get_value("a") == "cached"
+    thing_service.contentful_client.get_things.assert_not_called()
+
+
+def test_stale_value_is_served_when_contentful_fails(thing_service):
+    thing_service.redis_client.pipeline.return_value.execute.return_value = [
+        "cached",
+        (REVALIDATE_WINDOW_SECONDS - 1) * 1000,
+    ]
+    thing_service.redis_client.set.return_value = True
+    thing_service.contentful_client.get_things.side_effect = Exception("😡")
+
+    assert thing_service.get_value("a") == "cached"
+
+
+@mock.patch("learn.services.contentful_caching_service.stats")
+def test_hit_rate_and_fetch_metrics(mock_stats, thing_service):
+    thing_service.redis_client.pipeline.return_value.execute.return_value = [
+        "cached",
+        None,
+        TTL * 1000,
+        -2,
+    ]
+    thing_service.contentful_client.get_things.return_value = {"b": "B"}
+
+    assert thing_service.get_values(["a", "b"]) == {"a": "cached", "b": "B"}
+
+    increments = {
+        (call.kwargs["metric_name"], tuple(call.kwargs["tags"])): call.kwargs[
+            "metric_value"
+        ]
+        for call in mock_stats.increment.call_args_list
+    }
+    assert increments == {
+        (
+            "learn.services.contentful_cache.get",
+            ("service:ThingService", "result:hit"),
+        ): 1,
+        (
+            "learn.services.contentful_cache.get",
+            ("service:ThingService", "result:miss"),
+        ): 1,
+        (
+            "learn.services.contentful_cache.contentful_fetch",
+            ("service:ThingService", "outcome:success"),
+        ): 1,
+    }
+    mock_stats.histogram.assert_called_once()
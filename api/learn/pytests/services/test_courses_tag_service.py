@@ -155,16 +155,18 @@ def test_courses_for_tag_limit(courses_tag_service):
 
 
 def test_clear_cache(courses_tag_service):
-    courses_tag_service.redis_client.keys.return_value = [
+    courses_tag_service.redis_client.smembers.return_value = {
         "courses:pregnancy",
         "courses:fertility",
-    ]
+    }
 
     courses_tag_service.clear_cache()
 
-    courses_tag_service.redis_client.keys.assert_called_with("courses:*")
+    courses_tag_service.redis_client.smembers.assert_called_with("cache_tag:courses")
+    courses_tag_service.redis_client.keys.assert_not_called()
     call1 = mock.call("courses:pregnancy")
     call2 = mock.call("courses:fertility")
+    call3 = mock.call("cache_tag:courses")
     courses_tag_service.redis_client.pipeline.return_value.delete.assert_has_calls(
-        [call1, call2]
+        [call1, call2, call3], any_order=True
     )
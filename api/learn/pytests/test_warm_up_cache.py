@@ -0,0 +1,51 @@
+import datetime
+from unittest import mock
+
+from learn.models.resource_interaction import ResourceInteraction, ResourceType
+from learn.tasks import warm_up_cache
+
+
+def _view(session, user, slug, days_ago=0):
+    session.add(
+        ResourceInteraction(
+            user_id=user.id,
+            resource_type=ResourceType.ARTICLE,
+            slug=slug,
+            resource_viewed_at=datetime.datetime.utcnow()
+            - datetime.timedelta(days=days_ago),
+        )
+    )
+
+
+def test_get_most_read_article_slugs(session, factories):
+    users = [factories.DefaultUserFactory.create() for _ in range(3)]
+    for user in users:
+        _view(session, user, "popular")
+    for user in users[:2]:
+        _view(session, user, "less-popular")
+    _view(session, users[0], "old-news", days_ago=30)
+    session.flush()
+
+    assert warm_up_cache.get_most_read_article_slugs(limit=5, lookback_days=7) == [
+        "popular",
+        "less-popular",
+    ]
+    assert warm_up_cache.get_most_read_article_slugs(limit=1, lookback_days=7) == [
+        "popular"
+    ]
+
+
+@mock.patch("learn.tasks.warm_up_cache.article_service.ArticleService")
+@mock.patch("learn.tasks.warm_up_cache.get_most_read_article_slugs")
+def test_warm_up_most_read_articles(get_slugs, article_service):
+    get_slugs.return_value = [f"article-{i}" for i in range(75)]
+
+    warm_up_cache.warm_up_most_read_articles(limit=75)
+
+    article_service.assert_called_once_with(user_facing=False)
+    article_service.return_value.get_values.assert_has_calls(
+        [
+            mock.call([f"article-{i}" for i in range(50)]),
+            mock.call([f"article-{i}" for i in range(50, 75)]),
+        ]
+    )
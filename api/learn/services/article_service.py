@@ -60,6 +60,17 @@ class ArticleService(
         else:
             return f"article:{article_slug}"
 
+    def _get_cache_tags(self, identifier_value: str, **kwargs: Any) -> List[str]:
+        if kwargs.get("locale", None):
+            return []
+        elif self.request_locale and self.request_locale != DEFAULT_CONTENTFUL_LOCALE:
+            return [self._get_localized_articles_tag(identifier_value)]
+        return []
+
+    @staticmethod
+    def _get_localized_articles_tag(article_slug: str) -> str:
+        return f"article_localized:{article_slug}"
+
     @staticmethod
     def _serialize_value(value: Dict[str, Any]) -> str:
         return json.dumps(value)
@@ -99,7 +110,7 @@ class ArticleService(
         self.remove_localized_articles_from_cache(entry.slug)
 
     def remove_localized_articles_from_cache(self, slug: str) -> None:
-        self.remove_keys_from_cache_by_pattern(f"article:*:{slug}")
+        self.remove_keys_from_cache_by_tag(self._get_localized_articles_tag(slug))
 
     def entry_to_article_dict(self, entry: contentful.Entry) -> Dict[str, Any]:
         if entry.content_type.id == ContentfulContentType.ARTICLE_GLOBAL:
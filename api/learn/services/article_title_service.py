@@ -45,8 +45,11 @@ class LocalizedArticleTitleService(
     def _get_cache_key(self, identifier_value: str, **kwargs: Any) -> str:
         return f"{self.__CACHE_KEY_PREFIX}:{self.request_locale}:{identifier_value}"
 
-    def _get_cache_key_pattern(self, identifier_value: str) -> str:
-        return f"{self.__CACHE_KEY_PREFIX}:*:{identifier_value}"
+    def _get_cache_tags(self, identifier_value: str, **kwargs: Any) -> List[str]:
+        return [self._get_cache_tag(identifier_value)]
+
+    def _get_cache_tag(self, identifier_value: str) -> str:
+        return f"{self.__CACHE_KEY_PREFIX}:{identifier_value}"
 
     @staticmethod
     def _serialize_value(value: str) -> str:
@@ -69,4 +72,4 @@ class LocalizedArticleTitleService(
     def remove_value_from_cache(self, entry_id: str) -> None:
         contentful_client = LibraryContentfulClient(preview=True, user_facing=False)
         entry = contentful_client.get_entry_by_id(entry_id)
-        self.remove_keys_from_cache_by_pattern(self._get_cache_key_pattern(entry.slug))
+        self.remove_keys_from_cache_by_tag(self._get_cache_tag(entry.slug))
@@ -1,4 +1,6 @@
 import os
+import threading
+from typing import Optional
 
 import redis
 
@@ -14,7 +16,25 @@ MEMORY_STORE_LEARN_CMS_SERVER_CA_PATH = (
 )
 
 
+_shared_client: Optional[redis.Redis] = None
+_shared_client_lock = threading.Lock()
+
+
 def redis_client() -> redis.Redis:
+    """Get the Learn CMS redis client shared by every caching service in the process.
+
+    redis-py clients are thread safe and their connection pool resets itself after a
+    fork, so one client (and one pool of SSL connections) serves the whole process.
+    """
+    global _shared_client
+    if _shared_client is None:
+        with _shared_client_lock:
+            if _shared_client is None:
+                _shared_client = _create_redis_client()
+    return _shared_client
+
+
+def _create_redis_client() -> redis.Redis:
     log.debug("Initializing learn redis client")  # type: ignore[attr-defined] # Module has no attribute "debug"
     return redis.Redis(  # type: ignore[call-overload] # No overload variant of "Redis" matches argument types "Optional[str]", "int", "Optional[str]", "str", "int", "bool", "bool"
         host=MEMORYSTORE_LEARN_CMS_HOST,
@@ -1,8 +1,15 @@
 # a bit more opinionated version of CachingService - use as desired. works well for simple caching and invalidating
 # for a single Contentful entry. could maybe be made more generic if needed in the future.
+#
+# entries can be tagged (see `_get_cache_tags`) so that related keys, e.g. every localized copy of an article, can
+# be invalidated together from the Contentful webhook without scanning the keyspace. entries close to expiring are
+# revalidated by a single reader while everyone else keeps getting the cached value (stale-while-revalidate).
+import os
+import time
 from abc import ABC, abstractmethod
-from typing import Any, Dict, Generic, List, Optional, TypeVar
+from typing import Any, Dict, Generic, List, Optional, Tuple, TypeVar
 
+from common import stats
 from learn.services import caching_service, contentful
 from utils import log
 
@@ -11,6 +18,13 @@ T = TypeVar("T")
 log = log.logger(__name__)
 
 TTL = 182 * 24 * 60 * 60
+# Cached entries with less than this many seconds to live are refreshed from Contentful by the first reader to see
+# them, while other readers keep getting the cached value.
+REVALIDATE_WINDOW_SECONDS = int(
+    os.environ.get("LEARN_CACHE_REVALIDATE_WINDOW_SECONDS", 7 * 24 * 60 * 60)
+)
+REVALIDATE_LOCK_SECONDS = 60
+METRIC_PREFIX = "learn.services.contentful_cache"
 
 
 class ContentfulCachingService(caching_service.CachingService, Generic[T], ABC):
@@ -33,8 +47,26 @@ class ContentfulCachingService(caching_service.CachingService, Generic[T], ABC):
         # you can NOT query with a separate locale for each slug within the same call to `get_values`. you need to make
         # one call per locale
         values = {}
+        stale_values: Dict[str, T] = {}
         if not self.preview:
-            values = self._get_values_from_cache(identifier_values, **kwargs)
+            values, ttls = self._get_values_and_ttls_from_cache(
+                identifier_values, **kwargs
+            )
+            stale_values = self._claim_values_to_revalidate(values, ttls, **kwargs)
+            self._increment_metric(
+                "get", metric_value=len(values) - len(stale_values), result="hit"
+            )
+            self._increment_metric(
+                "get", metric_value=len(stale_values), result="stale"
+            )
+            self._increment_metric(
+                "get", metric_value=len(identifier_values) - len(values), result="miss"
+            )
+            values = {
+                identifier_value: value
+                for identifier_value, value in values.items()
+                if identifier_value not in stale_values
+            }
         missing_identifier_values = [
             identifier_value
             for identifier_value in identifier_values
@@ -42,10 +74,10 @@ class ContentfulCachingService(caching_service.CachingService, Generic[T], ABC):
         ]
         if missing_identifier_values:
             try:
-                values_from_contentful = self._get_values_from_contentful(
+                values_from_contentful = self._fetch_values_from_contentful(
                     missing_identifier_values, **kwargs
                 )
-                values = {**values, **values_from_contentful}
+                values = {**stale_values, **values, **values_from_contentful}
 
                 missing_identifier_values = [
                     identifier_value
@@ -67,13 +99,40 @@ class ContentfulCachingService(caching_service.CachingService, Generic[T], ABC):
                     missing_identifier_values=missing_identifier_values,
                     class_name=self.__class__.__name__,
                 )
+                # Contentful is unavailable, keep serving what we have.
+                values = {**stale_values, **values}
 
         return values
 
+    def _fetch_values_from_contentful(  # type: ignore[no-untyped-def] # Function is missing a type annotation for one or more arguments
+        self, identifier_values: List[str], **kwargs
+    ) -> Dict[str, T]:
+        start = time.perf_counter()
+        outcome = "error"
+        try:
+            values = self._get_values_from_contentful(identifier_values, **kwargs)
+            outcome = "success"
+            return values
+        finally:
+            self._increment_metric(
+                "contentful_fetch", metric_value=len(identifier_values), outcome=outcome
+            )
+            stats.histogram(
+                metric_name=f"{METRIC_PREFIX}.contentful_fetch.duration_ms",
+                pod_name=stats.PodNames.COCOPOD,
+                metric_value=(time.perf_counter() - start) * 1000,
+                tags=[f"service:{self.__class__.__name__}", f"outcome:{outcome}"],
+            )
+
     def save_value_in_cache(self, identifier_value: str, value: T, **kwargs):  # type: ignore[no-untyped-def] # Function is missing a return type annotation #type: ignore[no-untyped-def] # Function is missing a type annotation for one or more arguments
         if self.redis_client:
             key = self._get_cache_key(identifier_value, **kwargs)
             self.redis_client.set(key, self._serialize_value(value), ex=TTL)
+            tags = self._get_cache_tags(identifier_value, **kwargs)
+            if tags:
+                pipeline = self.redis_client.pipeline()
+                self._tag_key(pipeline, key, tags)
+                pipeline.execute()
         else:
             raise RuntimeError(
                 "Unable to save value in cache. Redis client has not been initialized."
@@ -87,14 +146,25 @@ class ContentfulCachingService(caching_service.CachingService, Generic[T], ABC):
         entry = contentful_client.get_entry_by_id(entry_id)
         self.redis_client.delete(self._get_cache_key(entry.slug))  # type: ignore[union-attr] # Item "None" of "Optional[Any]" has no attribute "delete"
 
+    def remove_keys_from_cache_by_tag(self, tag: str) -> None:
+        """Remove every cached entry saved with the given tag."""
+        if self.redis_client:
+            tag_key = self._get_tag_key(tag)
+            keys = self.redis_client.smembers(tag_key)
+            pipeline = self.redis_client.pipeline()
+            for key in keys:
+                pipeline.delete(key)
+            pipeline.delete(tag_key)
+            pipeline.execute()
+            self._increment_metric("invalidate", metric_value=len(keys))
+
     def remove_keys_from_cache_by_pattern(self, key_pattern: str) -> None:
+        # Walks the keyspace, prefer tagging entries and `remove_keys_from_cache_by_tag`.
         if self.redis_client:
-            keys = self.redis_client.keys(key_pattern)
-            if keys:
-                pipeline = self.redis_client.pipeline()
-                for key in keys:
-                    pipeline.delete(key)
-                pipeline.execute()
+            pipeline = self.redis_client.pipeline()
+            for key in self.redis_client.scan_iter(match=key_pattern, count=1000):
+                pipeline.delete(key)
+            pipeline.execute()
 
     def try_to_save_values_in_cache(self, values_by_identifier: Dict[str, T], **kwargs):  # type: ignore[no-untyped-def] # Function is missing a return type annotation #type: ignore[no-untyped-def] # Function is missing a type annotation for one or more arguments
         if self.redis_client:
@@ -103,6 +173,9 @@ class ContentfulCachingService(caching_service.CachingService, Generic[T], ABC):
                 for identifier_value, value in values_by_identifier.items():
                     key = self._get_cache_key(identifier_value, **kwargs)
                     pipeline.set(key, self._serialize_value(value), ex=TTL)
+                    tags = self._get_cache_tags(identifier_value, **kwargs)
+                    if tags:
+                        self._tag_key(pipeline, key, tags)
                 pipeline.execute()
             except Exception as e:
                 log.exception(  # type: ignore[attr-defined] # Module has no attribute "exception"
@@ -115,13 +188,24 @@ class ContentfulCachingService(caching_service.CachingService, Generic[T], ABC):
     def _get_values_from_cache(  # type: ignore[no-untyped-def] # Function is missing a type annotation for one or more arguments
         self, identifier_values: List[str], **kwargs
     ) -> Dict[str, T]:
+        return self._get_values_and_ttls_from_cache(identifier_values, **kwargs)[0]
+
+    def _get_values_and_ttls_from_cache(  # type: ignore[no-untyped-def] # Function is missing a type annotation for one or more arguments
+        self, identifier_values: List[str], **kwargs
+    ) -> Tuple[Dict[str, T], Dict[str, int]]:
+        """Get the cached values and their remaining ttl in seconds."""
         result: Dict[str, T] = {}
+        ttls_by_identifier: Dict[str, int] = {}
         if self.redis_client:
             pipeline = self.redis_client.pipeline()
             for identifier_value in identifier_values:
                 pipeline.get(self._get_cache_key(identifier_value, **kwargs))
+            # Remaining ttls come after the values, so the values keep their indexes.
+            for identifier_value in identifier_values:
+                pipeline.pttl(self._get_cache_key(identifier_value, **kwargs))
             try:
                 value_strs = pipeline.execute()
+                ttls = value_strs[len(identifier_values) : 2 * len(identifier_values)]
 
                 for index, identifier_value in enumerate(identifier_values):
                     value_str = value_strs[index]
@@ -131,13 +215,75 @@ class ContentfulCachingService(caching_service.CachingService, Generic[T], ABC):
                         )
                         if value is not None:
                             result[identifier_value] = value
+                            if index < len(ttls) and isinstance(ttls[index], int):
+                                ttls_by_identifier[identifier_value] = (
+                                    ttls[index] // 1000
+                                )
             except Exception as e:
                 log.exception(  # type: ignore[attr-defined] # Module has no attribute "exception"
                     "Error fetching value from redis",
                     error=e,
                     class_name=self.__class__.__name__,
                 )
-        return result
+        return result, ttls_by_identifier
+
+    def _claim_values_to_revalidate(  # type: ignore[no-untyped-def] # Function is missing a type annotation for one or more arguments
+        self, values: Dict[str, T], ttls: Dict[str, int], **kwargs
+    ) -> Dict[str, T]:
+        """Pick the cached values this caller should refresh from Contentful.
+
+        A value is due once its ttl drops below REVALIDATE_WINDOW_SECONDS. Only the
+        caller that wins the per-key lock refreshes it, everyone else keeps using
+        the cached value until it is replaced.
+        """
+        due = [
+            identifier_value
+            for identifier_value in values
+            if 0 <= ttls.get(identifier_value, -1) < REVALIDATE_WINDOW_SECONDS
+        ]
+        claimed = {}
+        for identifier_value in due:
+            lock_key = f"revalidate:{self._get_cache_key(identifier_value, **kwargs)}"
+            try:
+                if self.redis_client.set(  # type: ignore[union-attr] # Item "None" of "Optional[Any]" has no attribute "set"
+                    lock_key, "1", nx=True, ex=REVALIDATE_LOCK_SECONDS
+                ):
+                    claimed[identifier_value] = values[identifier_value]
+            except Exception as e:
+                log.warn(  # type: ignore[attr-defined] # Module has no attribute "warn"
+                    "Error claiming cache entry to revalidate",
+                    error=e,
+                    key=lock_key,
+                    class_name=self.__class__.__name__,
+                )
+        return claimed
+
+    def _get_cache_tags(self, identifier_value: str, **kwargs: Any) -> List[str]:
+        """Tags to save the entry under, override to allow invalidating by tag."""
+        return []
+
+    @staticmethod
+    def _get_tag_key(tag: str) -> str:
+        return f"cache_tag:{tag}"
+
+    def _tag_key(self, pipeline: Any, key: str, tags: List[str]) -> None:
+        for tag in tags:
+            tag_key = self._get_tag_key(tag)
+            pipeline.sadd(tag_key, key)
+            pipeline.expire(tag_key, TTL)
+
+    def _increment_metric(
+        self, metric_suffix: str, metric_value: int = 1, **tags: str
+    ) -> None:
+        if metric_value <= 0:
+            return
+        stats.increment(
+            metric_name=f"{METRIC_PREFIX}.{metric_suffix}",
+            pod_name=stats.PodNames.COCOPOD,
+            metric_value=metric_value,
+            tags=[f"service:{self.__class__.__name__}"]
+            + [f"{key}:{value}" for key, value in tags.items()],
+        )
 
     @abstractmethod
     def _get_values_from_contentful(  # type: ignore[no-untyped-def] # Function is missing a type annotation for one or more arguments
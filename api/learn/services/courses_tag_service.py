@@ -9,6 +9,8 @@ logger = log.logger(__name__)
 
 
 class CoursesTagService(contentful_caching_service.ContentfulCachingService[List[str]]):
+    __CACHE_TAG = "courses"
+
     def __init__(self, preview: bool = False, user_facing: bool = True):
         super().__init__(preview=preview, user_facing=user_facing)
         self.course_service = course_service.CourseService(
@@ -51,6 +53,9 @@ class CoursesTagService(contentful_caching_service.ContentfulCachingService[List
         # Here the value is a tag
         return f"courses:{identifier_value}"
 
+    def _get_cache_tags(self, identifier_value: str, **kwargs: Any) -> List[str]:
+        return [self.__CACHE_TAG]
+
     @staticmethod
     def _serialize_value(value: List[str]) -> str:
         return json.dumps(value)
@@ -60,4 +65,4 @@ class CoursesTagService(contentful_caching_service.ContentfulCachingService[List
         return json.loads(value_str)
 
     def clear_cache(self) -> None:
-        self.remove_keys_from_cache_by_pattern("courses:*")
+        self.remove_keys_from_cache_by_tag(self.__CACHE_TAG)
@@ -0,0 +1,54 @@
+import datetime
+import os
+from typing import List
+
+from sqlalchemy import func
+
+from learn.models.resource_interaction import ResourceInteraction, ResourceType
+from learn.services import article_service
+from storage.connection import db
+from tasks.queues import job
+from utils.log import logger
+
+log = logger(__name__)
+
+WARM_UP_ARTICLE_LIMIT = int(os.environ.get("LEARN_CACHE_WARM_UP_ARTICLE_LIMIT", 200))
+WARM_UP_LOOKBACK_DAYS = 7
+BATCH_SIZE = 50
+
+
+def get_most_read_article_slugs(limit: int, lookback_days: int) -> List[str]:
+    since = datetime.datetime.utcnow() - datetime.timedelta(days=lookback_days)
+    rows = (
+        db.session.query(ResourceInteraction.slug)
+        .filter(
+            ResourceInteraction.resource_type == ResourceType.ARTICLE,
+            ResourceInteraction.resource_viewed_at >= since,
+        )
+        .group_by(ResourceInteraction.slug)
+        .order_by(func.count().desc())
+        .limit(limit)
+        .all()
+    )
+    return [slug for (slug,) in rows]
+
+
+@job(team_ns="content_and_community")
+def warm_up_most_read_articles(
+    limit: int = WARM_UP_ARTICLE_LIMIT, lookback_days: int = WARM_UP_LOOKBACK_DAYS
+) -> None:
+    """
+    Make sure the most read articles are cached before members ask for them.
+
+    Missing articles are fetched from Contentful and articles close to expiring are
+    refreshed, see ContentfulCachingService.get_values. Only the default locale is
+    warmed up, localized copies are cached on first read.
+    """
+    slugs = get_most_read_article_slugs(limit=limit, lookback_days=lookback_days)
+    log.info("Warming up the learn cache", article_count=len(slugs))
+
+    service = article_service.ArticleService(user_facing=False)
+    warmed = 0
+    for i in range(0, len(slugs), BATCH_SIZE):
+        warmed += len(service.get_values(slugs[i : i + BATCH_SIZE]))
+    log.info("Warmed up the learn cache", article_count=len(slugs), cached_count=warmed)
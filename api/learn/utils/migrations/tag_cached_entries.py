@@ -0,0 +1,63 @@
+"""
+tag_cached_entries.py
+
+adds entries cached before tag-based invalidation existed to their cache tags, so the Contentful webhook can
+invalidate them without scanning the keyspace
+
+Usage:
+    tag_cached_entries.py [--dry-run]
+"""
+import os
+
+os.environ["LOG_LEVEL"] = "DEBUG"
+os.environ["DEV_LOGGING"] = "1"
+
+from docopt import docopt
+
+from app import create_app
+from learn.services.caching_service import CachingService
+from learn.services.contentful_caching_service import TTL, ContentfulCachingService
+from utils.log import logger
+
+log = logger(__name__)
+
+# key pattern -> function from the key to its tag
+TAGS_BY_KEY_PATTERN = {
+    # field-level localized articles: article:{locale}:{slug}
+    "article:*:*": lambda key: f"article_localized:{key.split(':')[2]}",
+    # article titles: article_title:{locale}:{slug}
+    "article_title:*:*": lambda key: f"article_title:{key.split(':')[2]}",
+    # courses by tag: courses:{tag}
+    "courses:*": lambda key: "courses",
+}
+
+
+def tag_cached_entries(dry_run: bool) -> None:
+    learn_cache = CachingService()
+    if not learn_cache.redis_client:
+        log.error("Redis is not defined in this environment")
+        exit(1)
+
+    for key_pattern, get_tag in TAGS_BY_KEY_PATTERN.items():
+        pipeline = learn_cache.redis_client.pipeline()
+        tagged = 0
+        for key in learn_cache.redis_client.scan_iter(match=key_pattern, count=1000):
+            tag_key = ContentfulCachingService._get_tag_key(get_tag(key))
+            if dry_run:
+                log.debug(f"Would've added key [{key}] to [{tag_key}]")
+                continue
+            pipeline.sadd(tag_key, key)
+            pipeline.expire(tag_key, TTL)
+            tagged += 1
+            if tagged % 1000 == 0:
+                pipeline.execute()
+        if not dry_run:
+            pipeline.execute()
+        log.debug(f"Tagged {tagged} keys matching [{key_pattern}]")
+
+
+if __name__ == "__main__":
+    args = docopt(__doc__)
+    dry_run = args["--dry-run"]
+    with create_app().app_context():
+        tag_cached_entries(dry_run=dry_run)
@@ -3,7 +3,7 @@ from __future__ import annotations
 import enum
 from datetime import datetime
 from itertools import chain
-from typing import Any
+from typing import Any, Collection
 
 import ddtrace
 from sqlalchemy import (
@@ -16,6 +16,7 @@ from sqlalchemy import (
     String,
     Text,
     UniqueConstraint,
+    func,
 )
 from sqlalchemy.dialects.mysql import DOUBLE
 from sqlalchemy.ext.associationproxy import association_proxy
@@ -573,15 +574,32 @@ class Message(TimeLoggedModelBase):
         return cls.braze_campaign_id != None
 
     @classmethod
-    def last_ca_message_to_member(cls, user: User) -> Message | None:
+    def _ca_messages_query(cls):  # type: ignore[no-untyped-def] # Function is missing a return type annotation
+        # Messages from CA...
+        return (
+            cls.query.join(Message.user)
+            .join(User.practitioner_profile)
+            .join(PractitionerProfile.verticals)
+            .filter(is_cx_vertical_name(Vertical.name))
+        )
+
+    @classmethod
+    def _messages_to_ca_query(cls):  # type: ignore[no-untyped-def] # Function is missing a return type annotation
+        # Messages in a channel with CA participant.
         return (
-            cls.query.options(load_only("created_at"))
-            .join(Message.user)
+            cls.query.join(Channel)
+            .join(Channel.participants)
             .join(User.practitioner_profile)
             .join(PractitionerProfile.verticals)
+            .filter(is_cx_vertical_name(Vertical.name))
+        )
+
+    @classmethod
+    def last_ca_message_to_member(cls, user: User) -> Message | None:
+        return (
+            cls._ca_messages_query()
+            .options(load_only("created_at"))
             .filter(
-                # Message from CA...
-                is_cx_vertical_name(Vertical.name),
                 # ... in a channel with user participant.
                 cls.channel_id.in_(
                     db.session.query(Channel.id)
@@ -597,21 +615,50 @@ class Message(TimeLoggedModelBase):
     @classmethod
     def last_member_message_to_ca(cls, user: User) -> Message | None:
         return (
-            cls.query.options(load_only("created_at"))
-            .join(Channel)
-            .join(Channel.participants)
-            .join(User.practitioner_profile)
-            .join(PractitionerProfile.verticals)
+            cls._messages_to_ca_query()
+            .options(load_only("created_at"))
             .filter(
                 # Message from user...
-                cls.user == user,
-                # ... in a channel with CA participant.
-                is_cx_vertical_name(Vertical.name),
+                cls.user
+                == user,
             )
             .order_by(cls.created_at.desc())
             .first()
         )
 
+    @classmethod
+    def last_ca_message_to_members(
+        cls, user_ids: Collection[int]
+    ) -> dict[int, datetime]:
+        """The created_at of the last CA message to each member, see last_ca_message_to_member."""
+        if not user_ids:
+            return {}
+        rows = (
+            cls._ca_messages_query()
+            .join(ChannelUsers, ChannelUsers.channel_id == cls.channel_id)
+            .filter(ChannelUsers.user_id.in_(user_ids))
+            .with_entities(ChannelUsers.user_id, func.max(cls.created_at))
+            .group_by(ChannelUsers.user_id)
+            .all()
+        )
+        return dict(rows)
+
+    @classmethod
+    def last_member_messages_to_ca(
+        cls, user_ids: Collection[int]
+    ) -> dict[int, datetime]:
+        """The created_at of the last message from each member to a CA, see last_member_message_to_ca."""
+        if not user_ids:
+            return {}
+        rows = (
+            cls._messages_to_ca_query()
+            .filter(cls.user_id.in_(user_ids))
+            .with_entities(cls.user_id, func.max(cls.created_at))
+            .group_by(cls.user_id)
+            .all()
+        )
+        return dict(rows)
+
 
 class MessageUsers(TimeLoggedModelBase):
     """
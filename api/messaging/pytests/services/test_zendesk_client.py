@@ -22,6 +22,7 @@ from messaging.services.zendesk_client import (
     CustomSession,
     ZendeskAPIEmailAlreadyExistsException,
     ZendeskClient,
+    ZendeskRateLimitedException,
     exception_related_to_email_already_exists,
     get_updated_ticket_search_default_lookback_seconds,
     handle_zendesk_rate_limit,
@@ -1132,3 +1133,125 @@ class TestZendeskRateLimit:
             "Zendesk account rate limit is below the warning threshold!",
             warning_threshold=100,
         )
+
+
+def _json_response(body, status_code=200):
+    response = Mock()
+    response.status_code = status_code
+    response.ok = status_code < 400
+    response.headers = {}
+    response.json.return_value = body
+    return response
+
+
+@pytest.fixture()
+def zendesk_api_client():
+    class ZDTestableClient(ZendeskClient):
+        def __init__(self):
+            self.session = MagicMock()
+            self.api_url = "https://test.zendesk.com/api/v2"
+
+    return ZDTestableClient()
+
+
+class TestZendeskIncrementalExport:
+    def test_get_comment_events(self, zendesk_api_client):
+        zendesk_api_client.session.get.side_effect = [
+            _json_response(
+                {
+                    "ticket_events": [
+                        {
+                            "ticket_id": 1,
+                            "timestamp": 1700000010,
+                            "via": "Web form",
+                            "child_events": [
+                                {"event_type": "Change", "id": 10},
+                                {
+                                    "event_type": "Comment",
+                                    "id": 11,
+                                    "author_id": 5,
+                                    "body": "hello",
+                                    "public": True,
+                                },
+                            ],
+                        }
+                    ],
+                    "end_time": 1700000010,
+                    "end_of_stream": False,
+                }
+            ),
+            _json_response(
+                {
+                    "ticket_events": [
+                        {
+                            "ticket_id": 2,
+                            "timestamp": 1700000020,
+                            "child_events": [
+                                {
+                                    "event_type": "Comment",
+                                    "id": 21,
+                                    "author_id": 6,
+                                    "body": "internal",
+                                    "public": False,
+                                    "via": {"channel": "api"},
+                                }
+                            ],
+                        }
+                    ],
+                    "end_time": 1700000020,
+                    "end_of_stream": True,
+                }
+            ),
+        ]
+
+        export = zendesk_api_client.get_comment_events(start_time=1700000000)
+
+        assert [(c.ticket_id, c.comment_id) for c in export.comments] == [
+            (1, 11),
+            (2, 21),
+        ]
+        assert export.comments[0].via_channel == "web form"
+        assert export.comments[1].via_channel == "api"
+        assert not export.comments[1].public
+        assert (export.end_time, export.end_of_stream) == (1700000020, True)
+        # the second page resumes from the end of the first
+        assert zendesk_api_client.session.get.call_args_list[1][1]["params"] == {
+            "start_time": 1700000010,
+            "include": "comment_events",
+        }
+
+    def test_get_comment_events_stops_at_max_pages(self, zendesk_api_client):
+        zendesk_api_client.session.get.return_value = _json_response(
+            {"ticket_events": [], "end_time": 1700000010, "end_of_stream": False}
+        )
+
+        export = zendesk_api_client.get_comment_events(
+            start_time=1700000000, max_pages=2
+        )
+
+        assert zendesk_api_client.session.get.call_count == 2
+        assert not export.end_of_stream
+
+    @mock.patch("messaging.services.zendesk_client.handle_zendesk_rate_limit")
+    def test_get_comment_events_rate_limited(
+        self, mock_handle_rate_limit, zendesk_api_client
+    ):
+        zendesk_api_client.session.get.return_value = _json_response(
+            {}, status_code=429
+        )
+
+        with pytest.raises(ZendeskRateLimitedException):
+            zendesk_api_client.get_comment_events(start_time=1700000000)
+
+        assert mock_handle_rate_limit.call_count == 3
+
+    def test_show_many_tickets(self, zendesk_api_client):
+        zendesk_api_client.session.get.return_value = _json_response(
+            {"tickets": [{"id": 1}], "users": [{"id": 5, "email": "a@maven.com"}]}
+        )
+
+        tickets, users = zendesk_api_client.show_many_tickets(list(range(150)))
+
+        assert zendesk_api_client.session.get.call_count == 2
+        assert users == {5: {"id": 5, "email": "a@maven.com"}}
+        assert len(tickets) == 2
@@ -8,6 +8,7 @@ from marshmallow_v1 import fields
 from zenpy.lib.api_objects import Comment as ZDComment
 from zenpy.lib.api_objects import Ticket as ZDTicket
 
+from messaging.services.zendesk_client import ZendeskCommentEvent
 from views.schemas.common import MavenSchema
 
 
@@ -113,6 +114,34 @@ def ticket_to_zendesk_inbound_message_schema(
     )
 
 
+def comment_event_to_zendesk_inbound_message_schema(
+    ticket: dict,
+    comment: ZendeskCommentEvent,
+    users: dict[int, dict],
+) -> ZendeskInboundMessageSchema:
+    """
+    Creates a ZendeskInboundMessageSchema from an exported ticket and comment,
+    with the same mapping as ticket_to_zendesk_inbound_message_schema. `users`
+    must contain the ticket requester and the comment author by id.
+    """
+    if not ticket:
+        raise ValueError("ticket cannot be None")
+    if not comment:
+        raise ValueError("comment cannot be None")
+
+    requester = users[ticket["requester_id"]]
+    author = users[comment.author_id]  # type: ignore[index] # Invalid index type "Optional[int]"
+    return ZendeskInboundMessageSchema(
+        comment_id=comment.comment_id,
+        message_body=comment.body,
+        maven_user_email=requester["email"],
+        comment_author_email=author["email"],
+        zendesk_user_id=requester["id"],
+        tags=ticket.get("tags") or [],
+        source=ZendeskInboundMessageSource.TICKET,
+    )
+
+
 class ZendeskInboundMessageSource(str, enum.Enum):
     WEBHOOK = "webhook"
     TICKET = "ticket"
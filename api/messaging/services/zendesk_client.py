@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import contextlib
+import dataclasses
 import re
 import time
 from datetime import datetime, timedelta
@@ -63,11 +64,51 @@ DEFAULT_ZENDESK_RATE_LIMIT_WARNING_THRESHOLD: int = 100
 DEFAULT_ZENDESK_API_MAX_RETRY: int = 3
 DEFAULT_ZENDESK_PERCENTAGE_THRESHOLD: int = 10
 
+# The incremental exports only accept a start_time at least a minute in the past
+INCREMENTAL_EXPORT_MIN_AGE_SECONDS: int = 60
+# The incremental exports are limited to 10 requests a minute, this bounds how
+# many of them a single export call makes
+INCREMENTAL_EXPORT_MAX_PAGES: int = 5
+# The show_many endpoints accept at most 100 ids per request
+SHOW_MANY_LIMIT: int = 100
+
 # Ticket class reference
 # https://github.com/facetoe/zenpy/blob/78073ff8ebbd66c75c1ddfd73a94d498a06a8fdf/zenpy/lib/api_objects/__init__.py#L3979C9-L3980C21
 ZendeskTicketId = int
 
 
+@dataclasses.dataclass(frozen=True)
+class ZendeskCommentEvent:
+    """A comment side-loaded by the incremental ticket event export."""
+
+    ticket_id: ZendeskTicketId
+    comment_id: int
+    author_id: int | None
+    body: str
+    public: bool
+    via_channel: str | None
+    # epoch seconds
+    timestamp: int
+
+
+@dataclasses.dataclass(frozen=True)
+class ZendeskCommentExport:
+    comments: list[ZendeskCommentEvent]
+    # epoch seconds to resume the export from
+    end_time: int
+    # False when the export stopped at INCREMENTAL_EXPORT_MAX_PAGES
+    end_of_stream: bool
+
+
+def _via_channel(via: Any) -> str | None:
+    # the event export reports via either as an object or as its display name
+    if isinstance(via, dict):
+        return via.get("channel")
+    if isinstance(via, str):
+        return via.lower()
+    return None
+
+
 class IdentityType:
     EMAIL = "email"
     PHONE = "phone_number"
@@ -76,6 +117,17 @@ class IdentityType:
     TRACK = "track"
 
 
+def get_updated_ticket_search_runaway_guard_seconds() -> int:
+    """
+    Returns the furthest back in seconds that reconciliation will look for
+    updated tickets or comments.
+    """
+    return feature_flags.int_variation(
+        ZENDESK_V2_RECONCILIATION.UPDATED_TICKET_SEARCH_RUNAWAY_GUARD_SECONDS,
+        default=_UPDATED_TICKET_LOOKBACK_SECONDS_RUNAWAY_GUARD,
+    )
+
+
 def get_updated_ticket_search_default_lookback_seconds() -> int:
     """
     Returns the default lookback seconds for the updated ticket search.
@@ -92,10 +144,7 @@ def get_updated_ticket_search_default_lookback_seconds() -> int:
         ZENDESK_V2_RECONCILIATION.UPDATED_TICKET_SEARCH_LOOKBACK_SECONDS,
         default=_FALLBACK_UPDATED_TICKET_SEARCH_LOOKBACK_SECONDS,
     )
-    runaway_guard_sec = feature_flags.int_variation(
-        ZENDESK_V2_RECONCILIATION.UPDATED_TICKET_SEARCH_RUNAWAY_GUARD_SECONDS,
-        default=_UPDATED_TICKET_LOOKBACK_SECONDS_RUNAWAY_GUARD,
-    )
+    runaway_guard_sec = get_updated_ticket_search_runaway_guard_seconds()
     if lookback_sec > runaway_guard_sec:
         log.warning(
             "The lookback seconds for the updated ticket search is greater than the runaway guard seconds. The runaway guard value will be used.",
@@ -144,6 +193,10 @@ class ZendeskAPIEmailAlreadyExistsException(Exception):
     pass
 
 
+class ZendeskRateLimitedException(Exception):
+    pass
+
+
 def warn_on_zendesk_rate_limit(  # type: ignore[no-untyped-def] # Function is missing a type annotation
     response,
 ) -> None:
@@ -264,6 +317,10 @@ class ZendeskClient:
         custom_session = CustomSession()
         self.zenpy = Zenpy(**creds, session=custom_session)
         self.zenpy.disable_caching()
+        # Zenpy authorizes the session, it is used directly for the endpoints
+        # Zenpy does not expose the raw responses of (incremental exports)
+        self.session = custom_session
+        self.api_url = f"https://{creds['subdomain']}.zendesk.com/api/v2"
         self.failed_vendor_api_call_recorder = failed_vendor_api_call_recorder
 
     def _record_failed_call(self, user_id, called_by, api_name, payload):  # type: ignore[no-untyped-def] # Function is missing a type annotation
@@ -1461,6 +1518,135 @@ class ZendeskClient:
         )
         return None
 
+    def _get_json(
+        self,
+        api_name: str,
+        path: str,
+        params: dict[str, Any],
+        pod_name: PodNames = stats.PodNames.VIRTUAL_CARE,
+        max_retries: int = DEFAULT_ZENDESK_API_MAX_RETRY,
+    ) -> dict[str, Any]:
+        retries = 0
+        while retries < max_retries:
+            response = self.session.get(f"{self.api_url}/{path}", params=params)
+            if response.status_code == 429:
+                handle_zendesk_rate_limit(response)
+                stats.increment(
+                    metric_name=ZENDESK_API_ERROR_COUNT_METRICS,
+                    pod_name=pod_name,
+                    tags=[
+                        f"api_name:{api_name}",
+                        "exception_type:HTTPError",
+                        f"status_code:{response.status_code}",
+                    ],
+                )
+                retries += 1
+                continue
+            if not response.ok:
+                stats.increment(
+                    metric_name=ZENDESK_API_ERROR_COUNT_METRICS,
+                    pod_name=pod_name,
+                    tags=[
+                        f"api_name:{api_name}",
+                        "exception_type:HTTPError",
+                        f"status_code:{response.status_code}",
+                    ],
+                )
+                response.raise_for_status()
+            stats.increment(
+                metric_name=ZENDESK_API_SUCCESS_COUNT_METRICS,
+                pod_name=pod_name,
+                tags=[f"api_name:{api_name}"],
+            )
+            return response.json()
+
+        log.error("Exceeded max retries for Zendesk request", api_name=api_name)
+        raise ZendeskRateLimitedException(api_name)
+
+    def get_comment_events(
+        self,
+        start_time: int,
+        max_pages: int = INCREMENTAL_EXPORT_MAX_PAGES,
+    ) -> ZendeskCommentExport:
+        """
+        Returns the comments added to any ticket since start_time (epoch
+        seconds), using the incremental ticket event export with side-loaded
+        comment events. Resume the export from the returned end_time.
+
+        Zendesk may return the same event on both sides of a page boundary, so
+        the comments are not guaranteed to be unique.
+        https://developer.zendesk.com/api-reference/ticketing/ticket-management/incremental_exports/#incremental-ticket-event-export
+        """
+        latest_start_time = int(time.time()) - INCREMENTAL_EXPORT_MIN_AGE_SECONDS
+        end_time = min(start_time, latest_start_time)
+        end_of_stream = False
+        comments: list[ZendeskCommentEvent] = []
+
+        for _ in range(max_pages):
+            page = self._get_json(
+                api_name="incremental.ticket_events",
+                path="incremental/ticket_events.json",
+                params={"start_time": end_time, "include": "comment_events"},
+            )
+            for event in page.get("ticket_events", []):
+                for child_event in event.get("child_events") or []:
+                    if child_event.get("event_type") != "Comment":
+                        continue
+                    comments.append(
+                        ZendeskCommentEvent(
+                            ticket_id=event["ticket_id"],
+                            comment_id=child_event["id"],
+                            author_id=child_event.get("author_id"),
+                            body=child_event.get("body") or "",
+                            public=bool(child_event.get("public")),
+                            via_channel=_via_channel(
+                                child_event.get("via") or event.get("via")
+                            ),
+                            timestamp=event.get("timestamp") or end_time,
+                        )
+                    )
+            # an empty export returns no end_time, it is resumed from the same start
+            end_time = page.get("end_time") or end_time
+            end_of_stream = bool(page.get("end_of_stream", True))
+            if end_of_stream:
+                break
+
+        return ZendeskCommentExport(
+            comments=comments, end_time=end_time, end_of_stream=end_of_stream
+        )
+
+    def show_many_tickets(
+        self, ticket_ids: list[ZendeskTicketId]
+    ) -> tuple[list[dict[str, Any]], dict[int, dict[str, Any]]]:
+        """
+        Returns the tickets with the given ids and their side-loaded users
+        (requesters, assignees, collaborators) by id.
+        """
+        tickets: list[dict[str, Any]] = []
+        users: dict[int, dict[str, Any]] = {}
+        for offset in range(0, len(ticket_ids), SHOW_MANY_LIMIT):
+            ids = ticket_ids[offset : offset + SHOW_MANY_LIMIT]
+            page = self._get_json(
+                api_name="tickets.show_many",
+                path="tickets/show_many.json",
+                params={"ids": ",".join(str(i) for i in ids), "include": "users"},
+            )
+            tickets.extend(page.get("tickets", []))
+            users.update({user["id"]: user for user in page.get("users", [])})
+        return tickets, users
+
+    def show_many_users(self, user_ids: list[int]) -> dict[int, dict[str, Any]]:
+        users: dict[int, dict[str, Any]] = {}
+        for offset in range(0, len(user_ids), SHOW_MANY_LIMIT):
+            ids = user_ids[offset : offset + SHOW_MANY_LIMIT]
+            page = self._get_json(
+                api_name="users.show_many",
+                path="users/show_many.json",
+                params={"ids": ",".join(str(i) for i in ids)},
+            )
+            users.update({user["id"]: user for user in page.get("users", [])})
+        return users
+
     @contextlib.contextmanager
     def create_or_update_zd_user_lock(
         self,
@@ -3,7 +3,7 @@ from __future__ import annotations
 import datetime
 import enum
 import uuid
-from typing import TYPE_CHECKING, Any, List, MutableMapping, Optional, Union
+from typing import TYPE_CHECKING, Any, Collection, List, MutableMapping, Optional, Union
 
 import pycountry
 from dateutil.relativedelta import relativedelta
@@ -1095,6 +1095,23 @@ class Device(base.TimeLoggedModelBase):
             .all()
         )
 
+    @classmethod
+    def for_users(
+        cls, user_ids: Collection[int], application_names: Collection[str]
+    ) -> List[Device]:
+        """Active devices for many users at once, for any of the given applications."""
+        if not user_ids:
+            return []
+        return (
+            db.session.query(cls)
+            .filter(
+                Device.user_id.in_(user_ids),
+                Device.is_active == True,
+                Device.application_name.in_(application_names),
+            )
+            .all()
+        )
+
 
 class Certification(base.ModelBase):
     __tablename__ = "certification"
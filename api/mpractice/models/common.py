@@ -1,7 +1,10 @@
 from __future__ import annotations
 
+import base64
+import binascii
 import dataclasses
 import enum
+import json
 from datetime import datetime
 
 
@@ -26,3 +29,30 @@ class Pagination:
     limit: int
     offset: int
     total: int
+    next_cursor: str | None = None
+
+
+@dataclasses.dataclass(frozen=True)
+class AppointmentListCursor:
+    """
+    The position of the last appointment of a page in an appointment list ordered by
+    (scheduled_start, id). Clients get it as an opaque string.
+    """
+
+    scheduled_start: datetime
+    id: int
+
+    def encode(self) -> str:
+        payload = json.dumps([self.scheduled_start.isoformat(), self.id])
+        return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+
+    @classmethod
+    def decode(cls, cursor: str) -> AppointmentListCursor:
+        """raises ValueError if the cursor is not one returned by encode"""
+        try:
+            scheduled_start, id_ = json.loads(base64.urlsafe_b64decode(cursor))
+            return cls(
+                scheduled_start=datetime.fromisoformat(scheduled_start), id=int(id_)
+            )
+        except (binascii.Error, TypeError, ValueError) as e:
+            raise ValueError(f"Invalid appointment list cursor: {cursor}") from e
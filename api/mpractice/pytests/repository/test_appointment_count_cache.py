@@ -0,0 +1,36 @@
+import datetime
+import sys
+from unittest import mock
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+
+def test_app_registers_appointment_count_listeners(factories, session):
+    # Registered by create_app, this test imports neither the cache nor the
+    # repositories and resources using it
+    module = sys.modules["mpractice.repository.appointment_count_cache"]
+    assert event.contains(
+        Session, "before_flush", module.collect_appointment_count_invalidations
+    )
+    appointment = factories.AppointmentFactory.create()
+
+    with mock.patch.object(module.appointment_count_cache, "invalidate") as invalidate:
+        appointment.cancelled_at = datetime.datetime.utcnow()
+        session.flush()
+
+    invalidate.assert_called_with({appointment.product.user_id})
+
+
+def test_expired_appointment_invalidates_its_practitioner(factories, session):
+    module = sys.modules["mpractice.repository.appointment_count_cache"]
+    appointment = factories.AppointmentFactory.create()
+    practitioner_id = appointment.product.user_id
+    # as after a commit, the product id isn't loaded when the appointment is changed
+    session.expire(appointment)
+
+    with mock.patch.object(module.appointment_count_cache, "invalidate") as invalidate:
+        appointment.cancelled_at = datetime.datetime.utcnow()
+        session.flush()
+
+    invalidate.assert_called_with({practitioner_id})
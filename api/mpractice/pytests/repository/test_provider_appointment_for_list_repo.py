@@ -2,6 +2,7 @@ from __future__ import annotations
 
 from datetime import datetime
 from typing import List
+from unittest import mock
 
 import pytest
 from _pytest.fixtures import FixtureRequest
@@ -11,8 +12,13 @@ from appointments.models.appointment import Appointment
 from appointments.models.constants import APPOINTMENT_STATES
 from appointments.models.reschedule_history import RescheduleHistory
 from mpractice.models.appointment import ProviderAppointmentForList
-from mpractice.models.common import OrderDirection, ProviderAppointmentFilter
+from mpractice.models.common import (
+    AppointmentListCursor,
+    OrderDirection,
+    ProviderAppointmentFilter,
+)
 from mpractice.models.note import SessionMetaInfo
+from mpractice.repository.appointment_count_cache import appointment_count_cache
 from mpractice.repository.provider_appointment_for_list import (
     ProviderAppointmentForListRepository,
 )
@@ -353,6 +359,98 @@ class TestProviderAppointmentForListRepository:
                 expected_appts_for_list.append(request.getfixturevalue(appt))
             assert result == expected_appts_for_list
 
+    @pytest.mark.parametrize(
+        argnames="order_direction,expected_pages",
+        argvalues=[
+            (OrderDirection.ASC, [[100, 200], [300], []]),
+            (OrderDirection.DESC, [[300, 200], [100], []]),
+        ],
+        ids=["order_direction_asc", "order_direction_desc"],
+    )
+    def test_get_appointment_ids_with_cursor(
+        self,
+        db: SQLAlchemy,
+        provider_appointment_for_list_repo: ProviderAppointmentForListRepository,
+        appointment_100: Appointment,
+        appointment_200: Appointment,
+        appointment_300: Appointment,
+        order_direction: OrderDirection,
+        expected_pages: List[List[int]],
+    ):
+        appointments = {
+            a.id: a for a in [appointment_100, appointment_200, appointment_300]
+        }
+        pages = []
+        cursor = None
+        with enable_db_performance_warnings(database=db, failure_threshold=3):
+            for _ in expected_pages:
+                # offset is ignored once there is a cursor
+                appt_ids = provider_appointment_for_list_repo.get_appointment_ids(
+                    order_direction=order_direction,
+                    limit=2,
+                    offset=2 if cursor else 0,
+                    cursor=cursor,
+                )
+                pages.append(appt_ids)
+                if appt_ids:
+                    last = appointments[appt_ids[-1]]
+                    cursor = AppointmentListCursor(
+                        scheduled_start=last.scheduled_start, id=last.id
+                    )
+        assert pages == expected_pages
+
+    def test_get_appointment_ids_with_cursor_breaks_ties_by_id(
+        self,
+        session,
+        provider_appointment_for_list_repo: ProviderAppointmentForListRepository,
+        appointment_100: Appointment,
+        appointment_200: Appointment,
+    ):
+        appointment_200.scheduled_start = appointment_100.scheduled_start
+        session.flush()
+        cursor = AppointmentListCursor(
+            scheduled_start=appointment_100.scheduled_start, id=100
+        )
+
+        assert provider_appointment_for_list_repo.get_appointment_ids(
+            limit=5, cursor=cursor
+        ) == [200]
+
+    def test_get_total_appointment_count_is_cached(
+        self,
+        db: SQLAlchemy,
+        provider_appointment_for_list_repo: ProviderAppointmentForListRepository,
+        appointment_100: Appointment,
+    ):
+        filters = ProviderAppointmentFilter(
+            practitioner_id=appointment_100.product.user_id
+        )
+        with mock.patch.object(
+            appointment_count_cache, "get", return_value=None
+        ), mock.patch.object(appointment_count_cache, "set") as mock_set:
+            assert (
+                provider_appointment_for_list_repo.get_total_appointment_count(filters)
+                == 1
+            )
+        mock_set.assert_called_once_with(filters, 1)
+
+        with mock.patch.object(appointment_count_cache, "get", return_value=7):
+            assert (
+                provider_appointment_for_list_repo.get_total_appointment_count(filters)
+                == 7
+            )
+
+    def test_appointment_change_invalidates_total_appointment_count(
+        self,
+        session,
+        appointment_100: Appointment,
+    ):
+        with mock.patch.object(appointment_count_cache, "invalidate") as invalidate:
+            appointment_100.cancelled_at = datetime(2023, 1, 1)
+            session.flush()
+
+        invalidate.assert_called_with({appointment_100.product.user_id})
+
     def test_get_paginated_appointments_with_total_count(
         self,
         db: SQLAlchemy,
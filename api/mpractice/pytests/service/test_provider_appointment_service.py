@@ -18,7 +18,7 @@ from mpractice.models.appointment import (
     ProviderAppointmentForList,
     Vertical,
 )
-from mpractice.models.common import Pagination
+from mpractice.models.common import AppointmentListCursor, Pagination
 from mpractice.models.translated_appointment import (
     SessionMetaInfo,
     TranslatedMPracticeMember,
@@ -92,9 +92,44 @@ class TestProviderAppointmentService:
         )
         assert appts == [translated_provider_appointment_for_list]
         assert pagination == Pagination(
-            limit=1, offset=0, total=3, order_direction="asc"
+            limit=1,
+            offset=0,
+            total=3,
+            order_direction="asc",
+            next_cursor=AppointmentListCursor(
+                scheduled_start=base_appointment_for_list.scheduled_start,
+                id=base_appointment_for_list.id,
+            ).encode(),
         )
 
+    def test_get_provider_appointments_with_cursor(
+        self,
+        provider_appointment_service: ProviderAppointmentService,
+        mock_provider_appointment_for_list_repo: MagicMock,
+        base_appointment_for_list,
+    ):
+        mock_provider_appointment_for_list_repo.get_paginated_appointments_with_total_count.return_value = (
+            [base_appointment_for_list],
+            3,
+        )
+        mock_provider_appointment_for_list_repo.get_appointment_id_to_latest_post_session_note.return_value = (
+            {}
+        )
+        cursor = AppointmentListCursor(scheduled_start=datetime(2024, 1, 1), id=5)
+
+        (_, pagination) = provider_appointment_service.get_provider_appointments(
+            {"limit": 2, "cursor": cursor.encode()}
+        )
+
+        assert (
+            mock_provider_appointment_for_list_repo.get_paginated_appointments_with_total_count.call_args.kwargs[
+                "cursor"
+            ]
+            == cursor
+        )
+        # fewer appointments than the limit, this is the last page
+        assert pagination.next_cursor is None
+
     def test_get_provider_appointment_by_id_returns_empty_result(
         self,
         provider_appointment_service: ProviderAppointmentService,
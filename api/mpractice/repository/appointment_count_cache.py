@@ -0,0 +1,158 @@
+"""
+Totals of providers' appointment lists.
+
+Counting a provider's appointments joins appointment and product and scans every
+matching row, so the total of each filtered list is kept in a Redis hash per
+provider, keyed by a digest of the filters. The hash of a provider is deleted when
+one of their appointments is flushed or committed.
+"""
+from __future__ import annotations
+
+import dataclasses
+import hashlib
+import json
+import os
+from typing import Iterable, Optional, Set
+
+import redis
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+import caching.redis
+from appointments.models.appointment import Appointment
+from common import stats
+from models.products import Product
+from mpractice.models.common import ProviderAppointmentFilter
+from utils.log import logger
+
+log = logger(__name__)
+
+METRIC_PREFIX = "api.mpractice.repository.appointment_count_cache"
+APPOINTMENT_COUNT_CACHE_ENABLED = (
+    os.environ.get("APPOINTMENT_COUNT_CACHE_ENABLED", "true").lower() == "true"
+)
+APPOINTMENT_COUNT_CACHE_TTL_SECONDS = int(
+    os.environ.get("APPOINTMENT_COUNT_CACHE_TTL_SECONDS", 10 * 60)
+)
+
+_PENDING_INVALIDATIONS_KEY = "appointment_count_cache_invalidations"
+
+
+class ProviderAppointmentCountCache:
+    def __init__(
+        self,
+        ttl_in_seconds: int = APPOINTMENT_COUNT_CACHE_TTL_SECONDS,
+        client: Optional[redis.Redis] = None,
+    ) -> None:
+        self.ttl_in_seconds = ttl_in_seconds
+        self._client = client
+
+    def get_client(self) -> redis.Redis:
+        if self._client is None:
+            self._client = caching.redis.get_redis_client()
+        return self._client
+
+    @staticmethod
+    def _key(practitioner_id: int) -> str:
+        return f"mpractice_appointment_count:{practitioner_id}"
+
+    @staticmethod
+    def _field(filters: ProviderAppointmentFilter) -> str:
+        payload = json.dumps(dataclasses.asdict(filters), sort_keys=True, default=str)
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+    def get(self, filters: ProviderAppointmentFilter) -> Optional[int]:
+        if not (APPOINTMENT_COUNT_CACHE_ENABLED and filters.practitioner_id):
+            return None
+        try:
+            value = self.get_client().hget(
+                self._key(filters.practitioner_id), self._field(filters)
+            )
+        except redis.RedisError as e:
+            log.warning("Unable to read cached appointment count", error=str(e))
+            return None
+        if not isinstance(value, (bytes, str)):
+            self._increment_metric("miss")
+            return None
+        self._increment_metric("hit")
+        return int(value)
+
+    def set(self, filters: ProviderAppointmentFilter, count: int) -> None:
+        if not (APPOINTMENT_COUNT_CACHE_ENABLED and filters.practitioner_id):
+            return
+        key = self._key(filters.practitioner_id)
+        try:
+            pipeline = self.get_client().pipeline(transaction=False)
+            pipeline.hset(key, self._field(filters), count)
+            pipeline.expire(key, self.ttl_in_seconds)
+            pipeline.execute()
+        except redis.RedisError as e:
+            log.warning("Unable to cache appointment count", error=str(e))
+
+    def invalidate(self, practitioner_ids: Iterable[int]) -> None:
+        keys = [self._key(p) for p in practitioner_ids if p is not None]
+        if not keys:
+            return
+        try:
+            self.get_client().delete(*keys)
+        except redis.RedisError as e:
+            log.error("Unable to invalidate cached appointment counts", error=str(e))
+            self._increment_metric("invalidate.error")
+
+    @staticmethod
+    def _increment_metric(suffix: str) -> None:
+        stats.increment(
+            metric_name=f"{METRIC_PREFIX}.{suffix}",
+            pod_name=stats.PodNames.MPRACTICE_CORE,
+        )
+
+
+appointment_count_cache = ProviderAppointmentCountCache()
+
+
+def _affected_practitioner_ids(session: Session) -> Set[int]:
+    product_ids = set()
+    with session.no_autoflush:
+        for instance in (*session.new, *session.dirty, *session.deleted):
+            if isinstance(instance, Appointment):
+                # the product before and after the change
+                history = inspect(instance).attrs.product_id.history.sum()
+                if history:
+                    product_ids.update(history)
+                else:
+                    # not loaded, e.g. expired by a commit and then changed without a
+                    # read, so it is loaded now
+                    product_ids.add(instance.product_id)
+        product_ids.discard(None)
+        if not product_ids:
+            return set()
+        rows = session.query(Product.user_id).filter(Product.id.in_(product_ids))
+        return {user_id for (user_id,) in rows}
+
+
+@event.listens_for(Session, "before_flush")
+def collect_appointment_count_invalidations(session, flush_context, instances):  # type: ignore[no-untyped-def] # Function is missing a type annotation
+    if not APPOINTMENT_COUNT_CACHE_ENABLED:
+        return
+    practitioner_ids = _affected_practitioner_ids(session)
+    if practitioner_ids:
+        session.info.setdefault(_PENDING_INVALIDATIONS_KEY, set()).update(
+            practitioner_ids
+        )
+
+
+@event.listens_for(Session, "after_flush")
+def invalidate_flushed_appointment_counts(session, flush_context):  # type: ignore[no-untyped-def] # Function is missing a type annotation
+    # Invalidate right away so this process sees its own writes, and again on commit
+    # in case another process cached the old totals in between.
+    appointment_count_cache.invalidate(session.info.get(_PENDING_INVALIDATIONS_KEY, ()))
+
+
+@event.listens_for(Session, "after_commit")
+def invalidate_appointment_counts(session):  # type: ignore[no-untyped-def] # Function is missing a type annotation
+    appointment_count_cache.invalidate(session.info.pop(_PENDING_INVALIDATIONS_KEY, ()))
+
+
+@event.listens_for(Session, "after_rollback")
+def discard_appointment_count_invalidations(session):  # type: ignore[no-untyped-def] # Function is missing a type annotation
+    session.info.pop(_PENDING_INVALIDATIONS_KEY, None)
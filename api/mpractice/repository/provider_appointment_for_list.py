@@ -13,8 +13,13 @@ from appointments.utils import query_utils
 from models.products import Product
 from mpractice.error import MissingQueryError, QueryNotFoundError
 from mpractice.models.appointment import ProviderAppointmentForList
-from mpractice.models.common import OrderDirection, ProviderAppointmentFilter
+from mpractice.models.common import (
+    AppointmentListCursor,
+    OrderDirection,
+    ProviderAppointmentFilter,
+)
 from mpractice.models.note import SessionMetaInfo
+from mpractice.repository.appointment_count_cache import appointment_count_cache
 from storage.repository.base import BaseRepository
 
 __all__ = ("ProviderAppointmentForListRepository",)
@@ -48,10 +53,97 @@ class ProviderAppointmentForListRepository(BaseRepository[ProviderAppointmentFor
         order_direction: OrderDirection | None = None,
         limit: int | None = None,
         offset: int | None = None,
+        cursor: AppointmentListCursor | None = None,
     ) -> Tuple[List[int], int]:
         """
         Get a list of appointment IDs to be loaded and total appointment count for pagination
         """
+        appt_ids = self.get_appointment_ids(
+            filters, order_direction, limit, offset, cursor
+        )
+        return appt_ids, self.get_total_appointment_count(filters)
+
+    def get_total_appointment_count(
+        self, filters: ProviderAppointmentFilter | None = None
+    ) -> int:
+        """
+        Totals of a provider's appointment lists are cached until one of their
+        appointments changes, see appointment_count_cache.
+        """
+        filters = filters or ProviderAppointmentFilter()
+        total_appt_count = appointment_count_cache.get(filters)
+        if total_appt_count is not None:
+            return total_appt_count
+
+        appts = self.appointment_table()
+        joined, where = self._appointment_list_from_and_where(filters)
+        count_query = sqlalchemy.select(
+            columns=(sqlalchemy.func.count(appts.c.id),),
+            from_obj=joined,
+            whereclause=sqlalchemy.and_(*where),
+        )
+        total_appt_count = self.session.execute(count_query).scalar()
+        appointment_count_cache.set(filters, total_appt_count)
+        return total_appt_count
+
+    def get_appointment_ids(
+        self,
+        filters: ProviderAppointmentFilter | None = None,
+        order_direction: OrderDirection | None = None,
+        limit: int | None = None,
+        offset: int | None = None,
+        cursor: AppointmentListCursor | None = None,
+    ) -> List[int]:
+        """
+        Get a page of appointment IDs ordered by (scheduled_start, id). With a cursor,
+        the page starts after the cursor's appointment and offset is ignored, so that
+        every page costs the same as the first one.
+        """
+        appts = self.appointment_table()
+        joined, where = self._appointment_list_from_and_where(filters)
+
+        descending = order_direction == OrderDirection.DESC
+        if descending:
+            order_by = (appts.c.scheduled_start.desc(), appts.c.id.desc())
+        else:
+            order_by = (appts.c.scheduled_start.asc(), appts.c.id.asc())
+
+        if cursor:
+            if descending:
+                after_cursor = sqlalchemy.or_(
+                    appts.c.scheduled_start < cursor.scheduled_start,
+                    sqlalchemy.and_(
+                        appts.c.scheduled_start == cursor.scheduled_start,
+                        appts.c.id < cursor.id,
+                    ),
+                )
+            else:
+                after_cursor = sqlalchemy.or_(
+                    appts.c.scheduled_start > cursor.scheduled_start,
+                    sqlalchemy.and_(
+                        appts.c.scheduled_start == cursor.scheduled_start,
+                        appts.c.id > cursor.id,
+                    ),
+                )
+            where = [*where, after_cursor]
+            offset = 0
+
+        limit = limit if limit else 5
+        offset = offset if offset else 0
+        ids_query = sqlalchemy.select(
+            columns=(appts.c.id,),
+            from_obj=joined,
+            whereclause=sqlalchemy.and_(*where),
+            order_by=order_by,
+            limit=limit,
+            offset=offset,
+        )
+        rows = self.session.execute(ids_query).fetchall()
+        return [row.id for row in rows]
+
+    def _appointment_list_from_and_where(
+        self, filters: ProviderAppointmentFilter | None
+    ) -> Tuple[sqlalchemy.sql.FromClause, List[sqlalchemy.sql.ColumnElement]]:
         appts = self.appointment_table()
         products = self.product_table()
         schedules = self.schedule_table()
@@ -84,33 +176,7 @@ class ProviderAppointmentForListRepository(BaseRepository[ProviderAppointmentFor
             if filters.exclude_statuses and len(filters.exclude_statuses) > 0:
                 if APPOINTMENT_STATES.cancelled in filters.exclude_statuses:
                     where.append(appts.c.cancelled_at.is_(None))
-
-        if not order_direction or order_direction == OrderDirection.ASC:
-            order_by = appts.c.scheduled_start.asc()
-        else:
-            order_by = appts.c.scheduled_start.desc()
-
-        # If SELECT count becomes a performance bottleneck, consider alternatives to get an estimated count
-        count_query = sqlalchemy.select(
-            columns=(sqlalchemy.func.count(appts.c.id),),
-            from_obj=joined,
-            whereclause=sqlalchemy.and_(*where),
-        )
-        total_appt_count = self.session.execute(count_query).scalar()
-
-        limit = limit if limit else 5
-        offset = offset if offset else 0
-        ids_query = sqlalchemy.select(
-            columns=(appts.c.id,),
-            from_obj=joined,
-            whereclause=sqlalchemy.and_(*where),
-            order_by=order_by,
-            limit=limit,
-            offset=offset,
-        )
-        rows = self.session.execute(ids_query).fetchall()
-        appt_ids = [row.id for row in rows]
-        return appt_ids, total_appt_count
+        return joined, where
 
     def get_appointments_by_ids(
         self, appointment_ids: List[int], order_direction: OrderDirection | None = None
@@ -245,7 +311,8 @@ class ProviderAppointmentForListRepository(BaseRepository[ProviderAppointmentFor
             ) as appt_fees
             ON loaded_appts.id = appt_fees.appointment_id
 
-            ORDER BY loaded_appts.scheduled_start {order_direction_string}
+            ORDER BY loaded_appts.scheduled_start {order_direction_string},
+                loaded_appts.id {order_direction_string}
         """
 
         result = self.session.execute(
@@ -259,12 +326,13 @@ class ProviderAppointmentForListRepository(BaseRepository[ProviderAppointmentFor
         order_direction: OrderDirection | None = None,
         limit: int | None = None,
         offset: int | None = None,
+        cursor: AppointmentListCursor | None = None,
     ) -> Tuple[List[ProviderAppointmentForList], int]:
         (
             appointment_ids,
             total_count,
         ) = self.get_appointment_ids_and_total_appointment_count(
-            filters, order_direction, limit, offset
+            filters, order_direction, limit, offset, cursor
         )
         appointments = self.get_appointments_by_ids(appointment_ids, order_direction)
         return appointments, total_count
@@ -1,7 +1,8 @@
 from __future__ import annotations
 
-from marshmallow import fields, validates_schema
+from marshmallow import ValidationError, fields, validates, validates_schema
 
+from mpractice.models.common import AppointmentListCursor
 from mpractice.schema.note import (
     ProviderAddendaAndQuestionnaireSchemaV3,
     StructuredInternalNoteSchemaV3,
@@ -23,6 +24,7 @@ from views.schemas.common_v3 import (
     CSVStringField,
     PaginableArgsSchemaV3,
     PaginableOutputSchemaV3,
+    PaginationInfoSchemaV3,
 )
 
 
@@ -190,9 +192,22 @@ class GetProviderAppointmentsRequestSchemaV3(PaginableArgsSchemaV3):
     member_id = fields.Integer(required=False)
     schedule_event_ids = CSVIntegerField(required=False)
     exclude_statuses = CSVStringField(required=False)
+    cursor = fields.String(required=False)
+
+    @validates("cursor")
+    def validate_cursor(self, value: str) -> None:
+        try:
+            AppointmentListCursor.decode(value)
+        except ValueError as e:
+            raise ValidationError(str(e))
+
+
+class ProviderAppointmentsPaginationSchemaV3(PaginationInfoSchemaV3):
+    next_cursor = fields.String(required=False, allow_none=True)
 
 
 class GetProviderAppointmentsResponseSchemaV3(PaginableOutputSchemaV3):
+    pagination = fields.Nested(ProviderAppointmentsPaginationSchemaV3)
     data = fields.Nested(ProviderAppointmentForListSchemaV3, many=True, required=True)  # type: ignore[assignment] # Incompatible types in assignment (expression has type "Nested", base class "PaginableOutputSchemaV3" defined the type as "Raw")
 
 
@@ -20,6 +20,7 @@ from mpractice.models.appointment import (
     Vertical,
 )
 from mpractice.models.common import (
+    AppointmentListCursor,
     OrderDirection,
     Pagination,
     ProviderAppointmentFilter,
@@ -385,6 +386,9 @@ class ProviderAppointmentService:
         )
         limit = args.get("limit") if args.get("limit") else 5
         offset = args.get("offset") if args.get("offset") else 0
+        cursor = (
+            AppointmentListCursor.decode(args["cursor"]) if args.get("cursor") else None
+        )
 
         filters = ProviderAppointmentFilter(
             practitioner_id=args.get("practitioner_id"),
@@ -402,6 +406,7 @@ class ProviderAppointmentService:
             order_direction=OrderDirection(order_direction),
             limit=limit,
             offset=offset,
+            cursor=cursor,
         )
 
         appt_ids = [appt.id for appt in appts]
@@ -419,6 +424,13 @@ class ProviderAppointmentService:
             limit=limit,  # type: ignore[arg-type] # Argument "limit" to "Pagination" has incompatible type "Union[int, Any, None]"; expected "int"
             offset=offset,  # type: ignore[arg-type] # Argument "offset" to "Pagination" has incompatible type "Union[int, Any, None]"; expected "int"
             total=total_count,
+            next_cursor=(
+                AppointmentListCursor(
+                    scheduled_start=appts[-1].scheduled_start, id=appts[-1].id
+                ).encode()
+                if len(appts) == limit
+                else None
+            ),
         )
         return translated_appts, pagination
 
@@ -0,0 +1,164 @@
+from unittest import mock
+
+import pytest
+
+from models.profiles import Device
+from notification.services.notification_dispatch import NotificationDispatcher
+
+
+def create_device(session, user, device_id, application_name):
+    device = Device(user=user, device_id=device_id, application_name=application_name)
+    session.add(device)
+    session.flush()
+    return device
+
+
+@pytest.fixture
+def redis_cli():
+    claimed = set()
+    client = mock.MagicMock()
+
+    def pipeline(transaction=True):
+        commands = []
+        pipe = mock.MagicMock()
+        pipe.set.side_effect = lambda key, *args, **kwargs: commands.append(key)
+
+        def execute():
+            results = [True if key not in claimed else None for key in commands]
+            claimed.update(commands)
+            return results
+
+        pipe.execute.side_effect = execute
+        return pipe
+
+    client.pipeline.side_effect = pipeline
+    return client
+
+
+@pytest.fixture
+def mock_apns():
+    with mock.patch(
+        "notification.services.notification_dispatch.apns_send_bulk_message"
+    ) as apns:
+        apns.return_value = mock.Mock(
+            errors=[], failed={}, **{"needs_retry.return_value": False}
+        )
+        yield apns
+
+
+def test_push_batches_same_payload_into_one_send(
+    session, factories, redis_cli, mock_apns
+):
+    users = [factories.DefaultUserFactory.create() for _ in range(3)]
+    for i, user in enumerate(users):
+        create_device(
+            session, user=user, device_id=f"device-{i}", application_name="member"
+        )
+
+    dispatcher = NotificationDispatcher(kind="test", redis_cli=redis_cli)
+    for user in users:
+        dispatcher.add_push(user_id=user.id, alert="hello", sound="default")
+    dispatcher.flush()
+
+    mock_apns.assert_called_once_with(
+        ["device-0", "device-1", "device-2"],
+        "hello",
+        application_name="member",
+        sound="default",
+    )
+
+
+def test_push_prefers_practitioner_devices(session, factories, redis_cli, mock_apns):
+    user = factories.DefaultUserFactory.create()
+    create_device(
+        session, user=user, device_id="forum-device", application_name="forum"
+    )
+    create_device(
+        session,
+        user=user,
+        device_id="practitioner-device",
+        application_name="practitioner",
+    )
+
+    dispatcher = NotificationDispatcher(kind="test", redis_cli=redis_cli)
+    dispatcher.add_push(user_id=user.id, alert="hello")
+    dispatcher.flush()
+
+    mock_apns.assert_called_once_with(
+        ["practitioner-device"], "hello", application_name="practitioner"
+    )
+
+
+def test_push_dedupes_per_user_and_window(session, factories, redis_cli, mock_apns):
+    user = factories.DefaultUserFactory.create()
+    create_device(session, user=user, device_id="device", application_name="member")
+
+    dispatcher = NotificationDispatcher(kind="test", redis_cli=redis_cli)
+    dispatcher.add_push(user_id=user.id, alert="hello", message_id="1")
+    dispatcher.add_push(user_id=user.id, alert="hello again", message_id="1")
+    dispatcher.flush()
+    dispatcher.add_push(
+        user_id=user.id, alert="hello in the same window", message_id="1"
+    )
+    dispatcher.flush()
+
+    mock_apns.assert_called_once_with(["device"], "hello", application_name="member")
+
+
+def test_push_dedupes_per_message(session, factories, redis_cli, mock_apns):
+    user = factories.DefaultUserFactory.create()
+    create_device(session, user=user, device_id="device", application_name="member")
+
+    dispatcher = NotificationDispatcher(kind="test", redis_cli=redis_cli)
+    dispatcher.add_push(user_id=user.id, alert="hello", message_id="1")
+    dispatcher.add_push(user_id=user.id, alert="hello", message_id="2")
+    dispatcher.flush()
+
+    assert mock_apns.call_count == 2
+
+
+def test_push_counts_delivered_from_send_result(
+    session, factories, redis_cli, mock_apns
+):
+    users = [factories.DefaultUserFactory.create() for _ in range(2)]
+    for i, user in enumerate(users):
+        create_device(
+            session, user=user, device_id=f"device-{i}", application_name="member"
+        )
+    mock_apns.return_value.failed = {"device-1": (8, "Invalid token")}
+
+    dispatcher = NotificationDispatcher(kind="test", redis_cli=redis_cli)
+    for user in users:
+        dispatcher.add_push(user_id=user.id, alert="hello")
+    with mock.patch.object(dispatcher, "_increment_metric") as increment_metric:
+        dispatcher.flush()
+        # apns_send_bulk_message returns None when the send failed
+        mock_apns.return_value = None
+        dispatcher.add_push(user_id=users[0].id, alert="hello again")
+        dispatcher.flush()
+
+    assert increment_metric.call_args_list == [
+        mock.call("error", tags=["channel:push"]),
+        mock.call("delivered", value=1, tags=["channel:push"]),
+        mock.call("error", tags=["channel:push"]),
+    ]
+
+
+def test_push_without_devices_is_skipped(factories, redis_cli, mock_apns):
+    user = factories.DefaultUserFactory.create()
+
+    dispatcher = NotificationDispatcher(kind="test", redis_cli=redis_cli)
+    dispatcher.add_push(user_id=user.id, alert="hello")
+    dispatcher.flush()
+
+    mock_apns.assert_not_called()
+
+
+def test_sms_dispatch(redis_cli):
+    with mock.patch("notification.services.notification_dispatch.send_sms") as send_sms:
+        dispatcher = NotificationDispatcher(kind="test", redis_cli=redis_cli)
+        dispatcher.add_sms(user_id=1, phone_number="+12125551515", message="hi")
+        dispatcher.add_sms(user_id=1, phone_number="+12125551515", message="hi")
+        dispatcher.flush()
+
+    send_sms.assert_called_once()
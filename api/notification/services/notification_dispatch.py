@@ -0,0 +1,331 @@
+from __future__ import annotations
+
+import dataclasses
+import hashlib
+import json
+import time
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import redis
+
+from common import stats
+from models.profiles import Device
+from utils.apns import apns_send_bulk_message
+from utils.cache import redis_client
+from utils.log import logger
+from utils.sms import send_sms
+
+log = logger(__name__)
+
+METRIC_PREFIX = "api.notification.dispatch"
+DEDUPE_KEY_PREFIX = "notification_dispatch"
+DEFAULT_BATCH_SIZE = 100
+DEFAULT_DEDUPE_WINDOW_SECONDS = 60
+
+# Same preference order as forum notifications: practitioner app, then member app, then forum app.
+FORUM_APPLICATION_PRIORITY = ("practitioner", "member", "forum")
+
+
+@dataclasses.dataclass
+class PushNotification:
+    user_id: int
+    alert: str
+    # One of the apns certificate names, or None to pick by FORUM_APPLICATION_PRIORITY.
+    application_name: Optional[str] = None
+    sound: Optional[str] = None
+    extra: Optional[Dict[str, Any]] = None
+    # Identifies the message within its kind for dedupe, defaults to a digest of the payload.
+    message_id: Optional[str] = None
+    enqueued_at: float = dataclasses.field(default_factory=time.monotonic)
+
+    def __post_init__(self) -> None:
+        if self.message_id is None:
+            self.message_id = _digest(
+                self.alert, self.sound, json.dumps(self.extra, sort_keys=True)
+            )
+
+
+@dataclasses.dataclass
+class SMSNotification:
+    user_id: int
+    phone_number: str
+    message: str
+    notification_type: Optional[str] = None
+    message_id: Optional[str] = None
+    enqueued_at: float = dataclasses.field(default_factory=time.monotonic)
+
+    def __post_init__(self) -> None:
+        if self.message_id is None:
+            self.message_id = _digest(self.message)
+
+
+def _digest(*parts: Optional[str]) -> str:
+    return hashlib.sha1("\x1f".join(part or "" for part in parts).encode()).hexdigest()[
+        :16
+    ]
+
+
+class NotificationDispatcher:
+    """
+    Collects push and SMS notifications for many users and delivers them in batches.
+
+    Devices for every queued user are resolved with a single query per batch, and users
+    receiving the same push payload share one APNs message. A user only receives a
+    given message of a kind once per dedupe window, across all workers.
+
+    Usage:
+        dispatcher = NotificationDispatcher(kind="forum_reply")
+        for user in followers:
+            dispatcher.add_push(user_id=user.id, alert="There is a new reply!")
+        dispatcher.flush()
+    """
+
+    def __init__(
+        self,
+        kind: str,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        dedupe_window_seconds: int = DEFAULT_DEDUPE_WINDOW_SECONDS,
+        redis_cli: Optional[redis.Redis] = None,
+        pod_name: stats.PodNames = stats.PodNames.VIRTUAL_CARE,
+    ) -> None:
+        self.kind = kind
+        self.batch_size = batch_size
+        self.dedupe_window_seconds = dedupe_window_seconds
+        self.pod_name = pod_name
+        self._redis = redis_cli
+        self._push_queue: List[PushNotification] = []
+        self._sms_queue: List[SMSNotification] = []
+
+    @property
+    def redis(self) -> redis.Redis:
+        if self._redis is None:
+            self._redis = redis_client()
+        return self._redis
+
+    def add_push(
+        self,
+        user_id: int,
+        alert: str,
+        application_name: Optional[str] = None,
+        sound: Optional[str] = None,
+        extra: Optional[Dict[str, Any]] = None,
+        message_id: Optional[str] = None,
+    ) -> None:
+        self._push_queue.append(
+            PushNotification(
+                user_id=user_id,
+                alert=alert,
+                application_name=application_name,
+                sound=sound,
+                extra=extra,
+                message_id=message_id,
+            )
+        )
+        if len(self._push_queue) >= self.batch_size:
+            self._flush_push()
+
+    def add_sms(
+        self,
+        user_id: int,
+        phone_number: str,
+        message: str,
+        notification_type: Optional[str] = None,
+        message_id: Optional[str] = None,
+    ) -> None:
+        self._sms_queue.append(
+            SMSNotification(
+                user_id=user_id,
+                phone_number=phone_number,
+                message=message,
+                notification_type=notification_type,
+                message_id=message_id,
+            )
+        )
+        if len(self._sms_queue) >= self.batch_size:
+            self._flush_sms()
+
+    def flush(self) -> None:
+        self._flush_push()
+        self._flush_sms()
+
+    def _flush_push(self) -> None:
+        batch, self._push_queue = self._dedupe(self._push_queue, channel="push"), []
+        if not batch:
+            return
+
+        devices_by_user = self._devices_by_user(batch)
+
+        # Group recipients by payload, so each distinct payload is one APNs send.
+        payloads: Dict[Tuple, List[Tuple[PushNotification, List[str]]]] = defaultdict(
+            list
+        )
+        for notification in batch:
+            application_name, device_ids = self._select_devices(
+                devices_by_user.get(notification.user_id, {}),
+                notification.application_name,
+            )
+            if not device_ids:
+                self._increment_metric("skipped", tags=["reason:no_devices"])
+                continue
+            payload_key = (
+                application_name,
+                notification.alert,
+                notification.sound,
+                json.dumps(notification.extra, sort_keys=True),
+            )
+            payloads[payload_key].append((notification, device_ids))
+
+        for payload_key, recipients in payloads.items():
+            application_name, alert, sound, _ = payload_key
+            kwargs: Dict[str, Any] = {}
+            if sound:
+                kwargs["sound"] = sound
+            if recipients[0][0].extra:
+                kwargs["extra"] = recipients[0][0].extra
+            all_device_ids = [
+                device_id for _, device_ids in recipients for device_id in device_ids
+            ]
+            result = apns_send_bulk_message(
+                all_device_ids,
+                alert,
+                application_name=application_name,
+                **kwargs,
+            )
+            undelivered = self._undelivered_device_ids(result, all_device_ids)
+            delivered = []
+            for notification, device_ids in recipients:
+                # Delivered when the APNs accepted at least one of the user's devices.
+                if undelivered.issuperset(device_ids):
+                    self._increment_metric("error", tags=["channel:push"])
+                else:
+                    delivered.append(notification)
+            self._record_delivery(delivered, channel="push")
+
+    def _flush_sms(self) -> None:
+        batch, self._sms_queue = self._dedupe(self._sms_queue, channel="sms"), []
+        for notification in batch:
+            try:
+                result = send_sms(
+                    message=notification.message,
+                    to_phone_number=notification.phone_number,
+                    user_id=notification.user_id,
+                    notification_type=notification.notification_type,
+                    pod=self.pod_name,
+                )
+            except Exception as e:
+                log.error(
+                    "Failed to dispatch sms notification",
+                    user_id=notification.user_id,
+                    kind=self.kind,
+                    error=str(e),
+                )
+                self._increment_metric("error", tags=["channel:sms"])
+                continue
+            if result.is_ok:
+                self._record_delivery([notification], channel="sms")
+
+    @staticmethod
+    def _undelivered_device_ids(result: Any, device_ids: List[str]) -> Set[str]:
+        """
+        The device ids an apns_send_bulk_message result didn't reach. The send logs
+        and returns None on errors, and the APNs stops a batch at its first failed token.
+        """
+        if result is None or result.errors:
+            return set(device_ids)
+        undelivered = set(result.failed)
+        if result.needs_retry():
+            retry = result.retry()
+            if retry is not None:
+                undelivered.update(retry.tokens)
+        return undelivered
+
+    def _dedupe(self, notifications: Iterable, channel: str) -> List:
+        """Drop messages users already received for this kind in the current window."""
+        unique: Dict[Tuple[int, str], Any] = {}
+        for notification in notifications:
+            unique.setdefault(
+                (notification.user_id, notification.message_id), notification
+            )
+        if not unique or self.dedupe_window_seconds <= 0:
+            return list(unique.values())
+
+        pipeline = self.redis.pipeline(transaction=False)
+        for user_id, message_id in unique:
+            pipeline.set(
+                f"{DEDUPE_KEY_PREFIX}:{self.kind}:{channel}:{message_id}:{user_id}",
+                1,
+                nx=True,
+                ex=self.dedupe_window_seconds,
+            )
+        try:
+            claimed = pipeline.execute()
+        except redis.RedisError as e:
+            # Deliver rather than silently drop when dedupe state is unavailable.
+            log.warning("Notification dedupe unavailable", kind=self.kind, error=str(e))
+            return list(unique.values())
+
+        deduped = []
+        for notification, was_set in zip(unique.values(), claimed):
+            # SET NX returns None when the key already exists.
+            if not was_set:
+                self._increment_metric("skipped", tags=["reason:duplicate"])
+                continue
+            deduped.append(notification)
+        return deduped
+
+    @staticmethod
+    def _devices_by_user(
+        batch: List[PushNotification],
+    ) -> Dict[int, Dict[str, List[str]]]:
+        application_names = {
+            n.application_name for n in batch if n.application_name
+        } | set(FORUM_APPLICATION_PRIORITY)
+        devices_by_user: Dict[int, Dict[str, List[str]]] = defaultdict(
+            lambda: defaultdict(list)
+        )
+        for device in Device.for_users(
+            user_ids={n.user_id for n in batch},
+            application_names=application_names,
+        ):
+            devices_by_user[device.user_id][device.application_name].append(
+                device.device_id
+            )
+        return devices_by_user
+
+    @staticmethod
+    def _select_devices(
+        devices_by_application: Dict[str, List[str]],
+        application_name: Optional[str],
+    ) -> Tuple[Optional[str], List[str]]:
+        if application_name:
+            return application_name, devices_by_application.get(application_name, [])
+        for name in FORUM_APPLICATION_PRIORITY:
+            if devices_by_application.get(name):
+                return name, devices_by_application[name]
+        return None, []
+
+    def _record_delivery(self, notifications: List, channel: str) -> None:
+        if not notifications:
+            return
+        now = time.monotonic()
+        self._increment_metric(
+            "delivered", value=len(notifications), tags=[f"channel:{channel}"]
+        )
+        for notification in notifications:
+            stats.histogram(
+                metric_name=f"{METRIC_PREFIX}.delivery_latency_ms",
+                pod_name=self.pod_name,
+                metric_value=(now - notification.enqueued_at) * 1000,
+                tags=[f"kind:{self.kind}", f"channel:{channel}"],
+            )
+
+    def _increment_metric(
+        self, metric_suffix: str, value: int = 1, tags: Optional[List[str]] = None
+    ) -> None:
+        stats.increment(
+            metric_name=f"{METRIC_PREFIX}.{metric_suffix}",
+            pod_name=self.pod_name,
+            metric_value=value,
+            tags=[f"kind:{self.kind}", *(tags or [])],
+        )
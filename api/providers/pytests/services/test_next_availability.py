@@ -0,0 +1,171 @@
+import datetime
+from unittest import mock
+
+import pytest
+
+from models.products import Product
+from providers.service import next_availability
+from providers.service.next_availability import NextAvailabilityService
+
+
+@pytest.fixture
+def redis():
+    redis = mock.MagicMock()
+    with mock.patch.object(next_availability, "redis_client", return_value=redis):
+        yield redis
+
+
+@pytest.fixture
+def practitioner(factories):
+    factories.VerticalFactory.create(
+        products=[{"minutes": 30, "price": 60}, {"minutes": 60, "price": 120}]
+    )
+    return factories.PractitionerUserFactory.create()
+
+
+def test_refresh_by_product_length(factories, practitioner, redis):
+    now = datetime.datetime.utcnow().replace(microsecond=0)
+    # only long enough for the 30m product
+    thirty_m_start = now + datetime.timedelta(minutes=30)
+    factories.ScheduleEventFactory.create(
+        schedule=practitioner.schedule,
+        starts_at=thirty_m_start,
+        ends_at=now + datetime.timedelta(hours=1),
+    )
+    sixty_m_start = now + datetime.timedelta(hours=2)
+    factories.ScheduleEventFactory.create(
+        schedule=practitioner.schedule,
+        starts_at=sixty_m_start,
+        ends_at=now + datetime.timedelta(hours=3),
+    )
+    redis.smembers.return_value = set()
+
+    next_availabilities = NextAvailabilityService().refresh([practitioner.id], now=now)
+
+    assert next_availabilities == {
+        practitioner.id: {30: thirty_m_start, 60: sixty_m_start}
+    }
+    assert practitioner.practitioner_profile.next_availability == thirty_m_start
+    pipeline = redis.pipeline.return_value
+    pipeline.zadd.assert_any_call(
+        f"{next_availability.NEXT_AVAILABILITY_KEY_PREFIX}:60",
+        {str(practitioner.id): next_availability.timestamp_score(sixty_m_start)},
+    )
+    pipeline.execute.assert_called_once()
+
+
+def test_refresh_without_availability(practitioner, redis):
+    redis.smembers.return_value = {"30", "60", "90"}
+
+    NextAvailabilityService().refresh([practitioner.id])
+
+    assert practitioner.practitioner_profile.next_availability is None
+    # removed from the lengths it is no longer available for
+    assert redis.pipeline.return_value.zrem.call_count == 3
+
+
+def test_refresh_invalidates_posts_of_changed_practitioners(practitioner, redis):
+    practitioner.practitioner_profile.next_availability = datetime.datetime.utcnow()
+    redis.smembers.return_value = set()
+
+    with mock.patch.object(
+        next_availability, "invalidate_posts_cache_for_user"
+    ) as invalidate:
+        NextAvailabilityService().refresh([practitioner.id])
+        NextAvailabilityService().refresh([practitioner.id])
+
+    # only the first refresh changed it
+    invalidate.delay.assert_called_once_with(
+        practitioner.id, service_ns="community_forum", team_ns=mock.ANY
+    )
+
+
+def test_refresh_stale_resolves_schedules_and_products(practitioner, redis):
+    product = Product.query.filter(Product.user_id == practitioner.id).first()
+    redis.spop.side_effect = [
+        [f"schedule:{practitioner.schedule.id}", f"product:{product.id}"],
+        [],
+    ]
+    service = NextAvailabilityService()
+
+    with mock.patch.object(service, "refresh", return_value={}) as refresh:
+        service.refresh_stale()
+
+    refresh.assert_called_once_with([practitioner.id])
+
+
+def test_available_within(redis):
+    pipeline = redis.pipeline.return_value
+    pipeline.execute.return_value = [True, [b"1", b"2"]]
+    assert NextAvailabilityService().available_within(4, 30) == {1, 2}
+
+    pipeline.execute.side_effect = Exception("down")
+    assert NextAvailabilityService().available_within(4, 30) is None
+
+
+def test_available_within_unpopulated_length(redis):
+    pipeline = redis.pipeline.return_value
+    # a missing key reads as empty, the marker tells it apart from no availability
+    pipeline.execute.return_value = [False, []]
+    assert NextAvailabilityService().available_within(4, 30) is None
+
+    pipeline.execute.return_value = [True, []]
+    assert NextAvailabilityService().available_within(4, 30) == set()
+
+
+def test_backfill_marks_lengths_populated(practitioner, redis):
+    service = NextAvailabilityService()
+
+    with mock.patch.object(
+        service, "_refresh", return_value=({practitioner.id: {}}, True)
+    ) as refresh:
+        assert service.backfill() == 1
+
+    refresh.assert_called_once_with([practitioner.id])
+    key, *lengths = redis.sadd.call_args.args
+    assert key == next_availability.POPULATED_LENGTHS_KEY
+    assert sorted(lengths) == [30, 60]
+
+
+def test_backfill_failed_store_keeps_lengths_unpopulated(practitioner, redis):
+    service = NextAvailabilityService()
+
+    with mock.patch.object(
+        service, "_refresh", return_value=({practitioner.id: {}}, False)
+    ):
+        service.backfill()
+
+    redis.sadd.assert_not_called()
+
+
+def test_flush_collects_stale_schedules(factories, practitioner, session):
+    session.info.pop(next_availability._PENDING_STALE_KEY, None)
+
+    factories.ScheduleEventFactory.create(
+        schedule=practitioner.schedule,
+        starts_at=datetime.datetime.utcnow(),
+        ends_at=datetime.datetime.utcnow() + datetime.timedelta(hours=1),
+    )
+    session.flush()
+
+    assert f"schedule:{practitioner.schedule.id}" in (
+        session.info[next_availability._PENDING_STALE_KEY]
+    )
+
+
+@pytest.mark.parametrize("newly_stale", [True, False])
+def test_commit_schedules_a_refresh(session, newly_stale):
+    session.info[next_availability._PENDING_STALE_KEY] = {"practitioner:1"}
+
+    with mock.patch.object(
+        next_availability.next_availability_service,
+        "mark_stale",
+        return_value=newly_stale,
+    ) as mark_stale, mock.patch.object(
+        next_availability.refresh_next_availability, "delay"
+    ) as delay:
+        next_availability.schedule_next_availability_refresh(session)
+
+    mark_stale.assert_called_once_with({"practitioner:1"})
+    assert delay.called is newly_stale
+    assert next_availability._PENDING_STALE_KEY not in session.info
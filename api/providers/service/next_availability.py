@@ -0,0 +1,416 @@
+"""
+Precomputed next availability of practitioners.
+
+Schedule event, appointment, product and booking buffer changes are collected by
+ORM listeners and, after commit, the affected schedules, products and
+practitioners are added to a Redis set and a refresh_next_availability job is
+enqueued. The job recomputes the next availability of the affected practitioners
+for each of their product lengths in bulk, stores the one of their shortest
+product in PractitionerProfile.next_availability, which search filters and sorts
+on, and every length in a Redis sorted set per length, so "available within N
+hours" for a product length is a range query instead of an availability
+calculation.
+
+The sorted set of a length is only read once backfill_next_availability has
+refreshed every practitioner and marked the length populated. Until then, and for
+lengths first sold after the last backfill, searches fall back to the
+next_availability column.
+"""
+
+from __future__ import annotations
+
+import datetime
+import itertools
+import os
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, selectinload
+
+from appointments.models.appointment import Appointment
+from appointments.models.schedule import Schedule
+from appointments.models.schedule_event import ScheduleEvent
+from appointments.utils.booking import (
+    AvailabilityCalculator,
+    AvailabilityTools,
+    MassAvailabilityCalculator,
+)
+from authn.models.user import User
+from common import stats
+from models.products import Product
+from models.profiles import PractitionerProfile
+from storage.connection import db
+from tasks.forum import invalidate_posts_cache_for_user
+from tasks.queues import job
+from utils.cache import redis_client, timestamp_score
+from utils.log import logger
+from utils.query import has_changes
+from utils.service_owner_mapper import service_ns_team_mapper
+
+log = logger(__name__)
+
+NEXT_AVAILABILITY_ENABLED = (
+    os.environ.get("NEXT_AVAILABILITY_PRECOMPUTE_ENABLED", "true").lower() == "true"
+)
+STALE_KEY = "next_availability:stale"
+LENGTHS_KEY = "next_availability:lengths"
+POPULATED_LENGTHS_KEY = "next_availability:populated_lengths"
+NEXT_AVAILABILITY_KEY_PREFIX = "next_availability:minutes"
+REFRESH_BATCH_SIZE = int(os.environ.get("NEXT_AVAILABILITY_REFRESH_BATCH_SIZE", 100))
+SEARCH_WINDOW_DAYS = 365
+NEXT_AVAILABILITY_REFRESHED = "api.providers.service.next_availability.refreshed"
+NEXT_AVAILABILITY_ERRORS = "api.providers.service.next_availability.errors"
+
+_PENDING_STALE_KEY = "stale_next_availability"
+_APPOINTMENT_AVAILABILITY_ATTRIBUTES = (
+    "scheduled_start",
+    "scheduled_end",
+    "cancelled_at",
+    "product_id",
+)
+
+
+def _next_availability_key(minutes: int) -> str:
+    return f"{NEXT_AVAILABILITY_KEY_PREFIX}:{minutes}"
+
+
+class NextAvailabilityService:
+    def __init__(self, batch_size: int = REFRESH_BATCH_SIZE) -> None:
+        self.batch_size = batch_size
+
+    def mark_stale(self, members: Iterable[str]) -> bool:
+        """
+        Adds "practitioner:<user id>", "schedule:<id>" or "product:<id>" members to
+        the stale set. Returns True when any of them wasn't pending already.
+        """
+        members = list(members)
+        if not members:
+            return False
+        return bool(redis_client().sadd(STALE_KEY, *members))
+
+    def refresh_stale(self) -> int:
+        """Recomputes the practitioners marked stale, batch by batch."""
+        redis = redis_client(decode_responses=True)
+        num_refreshed = 0
+        while True:
+            members = redis.spop(STALE_KEY, self.batch_size)
+            if not members:
+                return num_refreshed
+            practitioner_ids = self._resolve_practitioner_ids(members)
+            if practitioner_ids:
+                num_refreshed += len(self.refresh(sorted(practitioner_ids)))
+
+    def refresh(
+        self, practitioner_ids: List[int], now: Optional[datetime.datetime] = None
+    ) -> Dict[int, Dict[int, Optional[datetime.datetime]]]:
+        """
+        Recomputes and commits the next availability of the given practitioners.
+        Returns it by practitioner id and product length.
+        """
+        next_availabilities, _ = self._refresh(practitioner_ids, now)
+        return next_availabilities
+
+    def backfill(self) -> int:
+        """
+        Recomputes every practitioner with an active product, batch by batch, then
+        marks the product lengths populated so available_within reads them.
+        """
+        lengths = {
+            minutes
+            for (minutes,) in db.session.query(Product.minutes)
+            .filter(Product.is_active.is_(True), Product.minutes.isnot(None))
+            .distinct()
+        }
+        practitioner_ids = [
+            user_id
+            for (user_id,) in db.session.query(Product.user_id)
+            .filter(Product.is_active.is_(True))
+            .distinct()
+            .order_by(Product.user_id)
+        ]
+        num_refreshed = 0
+        all_stored = True
+        for start in range(0, len(practitioner_ids), self.batch_size):
+            next_availabilities, stored = self._refresh(
+                practitioner_ids[start : start + self.batch_size]
+            )
+            num_refreshed += len(next_availabilities)
+            all_stored = all_stored and stored
+        if not all_stored:
+            # a length missing practitioners would hide them from search
+            log.error("Not marking next availability lengths populated")
+        elif lengths:
+            redis_client().sadd(POPULATED_LENGTHS_KEY, *lengths)
+        return num_refreshed
+
+    def _refresh(
+        self, practitioner_ids: List[int], now: Optional[datetime.datetime] = None
+    ) -> Tuple[Dict[int, Dict[int, Optional[datetime.datetime]]], bool]:
+        now = now or datetime.datetime.utcnow()
+        profiles = (
+            db.session.query(PractitionerProfile)
+            .options(selectinload(PractitionerProfile.user).selectinload(User.products))
+            .filter(PractitionerProfile.user_id.in_(practitioner_ids))
+            .all()
+        )
+        next_availabilities = self.compute(profiles, now)
+        changed_ids = []
+        for profile in profiles:
+            by_length = next_availabilities.get(profile.user_id)
+            if by_length is None:
+                # no products, like update_practitioner_profile_next_availability
+                continue
+            next_availability = by_length[min(by_length)]
+            if profile.next_availability != next_availability:
+                changed_ids.append(profile.user_id)
+            profile.next_availability = next_availability
+        db.session.commit()
+        for user_id in changed_ids:
+            # the cached forum posts show their author's next availability
+            invalidate_posts_cache_for_user.delay(
+                user_id,
+                service_ns="community_forum",
+                team_ns=service_ns_team_mapper.get("community_forum"),
+            )
+        stored = self._store(next_availabilities, [p.user_id for p in profiles])
+        stats.increment(
+            metric_name=NEXT_AVAILABILITY_REFRESHED,
+            pod_name=stats.PodNames.CARE_DISCOVERY,
+            metric_value=len(profiles),
+        )
+        return next_availabilities, stored
+
+    def compute(
+        self, profiles: List[PractitionerProfile], now: datetime.datetime
+    ) -> Dict[int, Dict[int, Optional[datetime.datetime]]]:
+        """
+        The next availability of each practitioner for each of their active product
+        lengths, reading the schedules and appointments of all of them at once.
+        """
+        if not profiles:
+            return {}
+        end = now + datetime.timedelta(days=SEARCH_WINDOW_DAYS)
+        (
+            all_existing_availabilities,
+            all_existing_appointments,
+            _,
+            all_credits,
+        ) = MassAvailabilityCalculator().get_common_availability_fields(
+            practitioner_profiles=profiles, start_time=now, end_time=end
+        )
+
+        next_availabilities: Dict[int, Dict[int, Optional[datetime.datetime]]] = {}
+        for profile in profiles:
+            products_by_length: Dict[int, Product] = {}
+            for product in profile.user.products:
+                if product.is_active and product.minutes is not None:
+                    products_by_length.setdefault(product.minutes, product)
+            if not products_by_length:
+                continue
+            availability = all_existing_availabilities.get(profile.user_id) or []
+            existing_appointments = all_existing_appointments.get(profile.user_id) or []
+            start = AvailabilityTools.pad_and_round_availability_start_time(
+                now, profile.booking_buffer, profile.rounding_minutes
+            )
+            by_length: Dict[int, Optional[datetime.datetime]] = {}
+            for minutes, product in products_by_length.items():
+                potential_appointments = []
+                if profile.active and availability:
+                    calculator = AvailabilityCalculator(
+                        profile, product, load_practitioner_user_entity=False
+                    )
+                    potential_appointments = calculator.calculate_availability(
+                        start,
+                        end,
+                        availability,
+                        existing_appointments,
+                        all_credits,
+                        member_has_had_ca_intro_appt=False,
+                        limit=1,
+                    )
+                by_length[minutes] = (
+                    potential_appointments[0].scheduled_start
+                    if potential_appointments
+                    else None
+                )
+            next_availabilities[profile.user_id] = by_length
+        return next_availabilities
+
+    def available_within(
+        self,
+        hours: int,
+        product_minutes: int,
+        now: Optional[datetime.datetime] = None,
+    ) -> Optional[Set[int]]:
+        """
+        The practitioners with availability for the product length in the next
+        hours, None when it can't be read or the length isn't populated yet.
+        """
+        now = now or datetime.datetime.utcnow()
+        until = now + datetime.timedelta(hours=hours)
+        try:
+            pipeline = redis_client().pipeline(transaction=False)
+            pipeline.sismember(POPULATED_LENGTHS_KEY, product_minutes)
+            pipeline.zrangebyscore(
+                _next_availability_key(product_minutes),
+                timestamp_score(now),
+                timestamp_score(until),
+            )
+            populated, members = pipeline.execute()
+        except Exception as e:
+            log.warning("Failed to read next availability by length", error=str(e))
+            _increment_errors("read")
+            return None
+        if not populated:
+            return None
+        return {int(member) for member in members}
+
+    def _store(
+        self,
+        next_availabilities: Dict[int, Dict[int, Optional[datetime.datetime]]],
+        practitioner_ids: List[int],
+    ) -> bool:
+        try:
+            redis = redis_client(decode_responses=True)
+            lengths = {
+                int(minutes) for minutes in redis.smembers(LENGTHS_KEY) or ()
+            } | {
+                minutes
+                for by_length in next_availabilities.values()
+                for minutes in by_length
+            }
+            pipeline = redis.pipeline(transaction=False)
+            for minutes in lengths:
+                key = _next_availability_key(minutes)
+                for practitioner_id in practitioner_ids:
+                    next_availability = next_availabilities.get(
+                        practitioner_id, {}
+                    ).get(minutes)
+                    if next_availability is None:
+                        pipeline.zrem(key, practitioner_id)
+                    else:
+                        pipeline.zadd(
+                            key,
+                            {str(practitioner_id): timestamp_score(next_availability)},
+                        )
+            if lengths:
+                pipeline.sadd(LENGTHS_KEY, *lengths)
+            pipeline.execute()
+        except Exception as e:
+            log.error("Failed to store next availability by length", error=str(e))
+            _increment_errors("store")
+            return False
+        return True
+
+    @staticmethod
+    def _resolve_practitioner_ids(members: Iterable[str]) -> Set[int]:
+        ids: Dict[str, Set[int]] = {}
+        for member in members:
+            kind, _, id_ = member.partition(":")
+            ids.setdefault(kind, set()).add(int(id_))
+        practitioner_ids = ids.get("practitioner", set())
+        if ids.get("schedule"):
+            practitioner_ids |= {
+                user_id
+                for (user_id,) in db.session.query(Schedule.user_id).filter(
+                    Schedule.id.in_(ids["schedule"])
+                )
+            }
+        if ids.get("product"):
+            practitioner_ids |= {
+                user_id
+                for (user_id,) in db.session.query(Product.user_id).filter(
+                    Product.id.in_(ids["product"])
+                )
+            }
+        return practitioner_ids
+
+
+def _increment_errors(operation: str) -> None:
+    stats.increment(
+        metric_name=NEXT_AVAILABILITY_ERRORS,
+        pod_name=stats.PodNames.CARE_DISCOVERY,
+        tags=[f"operation:{operation}"],
+    )
+
+
+next_availability_service = NextAvailabilityService()
+
+
+@job("priority", team_ns="care_discovery")
+def refresh_next_availability() -> None:
+    num_refreshed = next_availability_service.refresh_stale()
+    log.info("Refreshed practitioners next availability", count=num_refreshed)
+
+
+@job(team_ns="care_discovery")
+def backfill_next_availability() -> None:
+    num_refreshed = next_availability_service.backfill()
+    log.info("Backfilled practitioners next availability", count=num_refreshed)
+
+
+@event.listens_for(Session, "after_flush")
+def collect_stale_next_availability(session, flush_context):  # type: ignore[no-untyped-def] # Function is missing a type annotation
+    if not NEXT_AVAILABILITY_ENABLED:
+        return
+    stale: Set[str] = set()
+    changed = itertools.chain(
+        session.new,
+        session.deleted,
+        (
+            instance
+            for instance in session.dirty
+            if session.is_modified(instance, include_collections=False)
+        ),
+    )
+    for instance in changed:
+        if isinstance(instance, ScheduleEvent):
+            # the schedule and appointment ids are resolved by the job
+            if instance.schedule_id is not None:
+                stale.add(f"schedule:{instance.schedule_id}")
+        elif isinstance(instance, Appointment):
+            if instance in session.new or instance in session.deleted:
+                stale.add(f"product:{instance.product_id}")
+            elif has_changes(instance, _APPOINTMENT_AVAILABILITY_ATTRIBUTES):
+                stale.add(f"product:{instance.product_id}")
+                # a rescheduled appointment frees the slot of its old product too
+                for product_id in inspect(instance).attrs.product_id.history.deleted:
+                    if product_id is not None:
+                        stale.add(f"product:{product_id}")
+        elif isinstance(instance, Product):
+            if instance.user_id is not None:
+                stale.add(f"practitioner:{instance.user_id}")
+        elif isinstance(instance, PractitionerProfile):
+            if instance in session.new or has_changes(
+                instance, ("booking_buffer", "active")
+            ):
+                stale.add(f"practitioner:{instance.user_id}")
+    if stale:
+        session.info.setdefault(_PENDING_STALE_KEY, set()).update(stale)
+
+
+def request_next_availability_refresh(members: Iterable[str]) -> None:
+    """
+    Marks members stale and enqueues a refresh. Writes the listeners don't see, like
+    Core deletes of schedule events, request it themselves.
+    """
+    try:
+        # a refresh is already queued for the members still pending
+        if next_availability_service.mark_stale(members):
+            refresh_next_availability.delay(team_ns="care_discovery")
+    except Exception as e:
+        # the expired next availability sweep catches up
+        log.warning("Failed to schedule next availability refresh", error=str(e))
+        _increment_errors("schedule")
+
+
+@event.listens_for(Session, "after_commit")
+def schedule_next_availability_refresh(session):  # type: ignore[no-untyped-def] # Function is missing a type annotation
+    stale = session.info.pop(_PENDING_STALE_KEY, None)
+    if stale:
+        request_next_availability_refresh(stale)
+
+
+@event.listens_for(Session, "after_rollback")
+def discard_stale_next_availability(session):  # type: ignore[no-untyped-def] # Function is missing a type annotation
+    session.info.pop(_PENDING_STALE_KEY, None)
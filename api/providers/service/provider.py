@@ -56,6 +56,7 @@ from providers.domain.model import Provider
 from providers.repository import provider as repository
 from providers.repository.v2.provider import ProviderRepositoryV2
 from providers.schemas.provider_languages import ProviderLanguagesServiceResponse
+from providers.service.next_availability import next_availability_service
 from utils.log import logger
 
 __all__ = ("ProviderService",)
@@ -826,15 +827,25 @@ class ProviderService:
 
         if available_in_next_hours not in (0, None):
             assert available_in_next_hours is not None  # mypy
-            available_until = datetime.datetime.utcnow() + datetime.timedelta(
-                hours=available_in_next_hours
-            )
-            users = users.filter(
-                and_(
-                    (Provider.next_availability >= datetime.datetime.utcnow()),
-                    (Provider.next_availability < available_until),
+            available_ids = None
+            if product_minutes not in (0, None):
+                assert product_minutes is not None  # mypy
+                # next_availability is the one of the shortest product
+                available_ids = next_availability_service.available_within(
+                    available_in_next_hours, product_minutes
+                )
+            if available_ids is not None:
+                users = users.filter(Provider.user_id.in_(available_ids))
+            else:
+                available_until = datetime.datetime.utcnow() + datetime.timedelta(
+                    hours=available_in_next_hours
+                )
+                users = users.filter(
+                    and_(
+                        (Provider.next_availability >= datetime.datetime.utcnow()),
+                        (Provider.next_availability < available_until),
+                    )
                 )
-            )
 
         # Check for an availability scope, with the default being 0 meaning no limit
         if availability_scope_in_days and availability_scope_in_days > 0:
@@ -1,6 +1,8 @@
 import pytest
+from flask import g
 from werkzeug.exceptions import Unauthorized
 
+from authn.services.principal_cache import Principal
 from common.services.api import authenticate
 
 
@@ -53,3 +55,18 @@ class TestCommonAPI:
             # When/Then
             with pytest.raises(Unauthorized):
                 authenticate(lambda x: x)("not success")
+
+    @staticmethod
+    def test_authenticate_uses_principal(app, default_user):
+        # Given
+        headers = {"X-Maven-User-ID": default_user.id}
+        with app.test_request_context("/test", headers=headers):
+            app.preprocess_request()
+
+            # When
+            authentication = authenticate(lambda x: x)("success")
+
+            # Then
+            assert authentication == "success"
+            assert isinstance(g.current_user, Principal)
+            assert g.current_user.id == default_user.id
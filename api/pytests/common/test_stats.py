@@ -0,0 +1,155 @@
+import threading
+from unittest import mock
+
+import pytest
+
+from common import stats
+
+
+@pytest.fixture
+def aggregator():
+    aggregator = stats._Aggregator(flush_interval=3600)
+    with mock.patch.object(stats, "_aggregator", aggregator), mock.patch.object(
+        aggregator, "_ensure_started"
+    ):
+        yield aggregator
+
+
+@pytest.fixture
+def statsd():
+    with mock.patch.object(stats, "statsd") as statsd:
+        yield statsd
+
+
+def _tags(*tags, metric_name):
+    return [
+        *tags,
+        f"associated_metric_name:mvn.{metric_name}",
+        "eng_pod:core_services",
+    ]
+
+
+def test_counters_are_aggregated(aggregator, statsd):
+    for _ in range(3):
+        stats.increment("foo.count", pod_name=stats.PodNames.CORE_SERVICES)
+    stats.increment(
+        "foo.count", pod_name=stats.PodNames.CORE_SERVICES, tags=["result:hit"]
+    )
+    stats.decrement(
+        "foo.count", pod_name=stats.PodNames.CORE_SERVICES, tags=["result:hit"]
+    )
+    statsd.increment.assert_not_called()
+
+    stats.flush()
+
+    assert statsd.increment.call_args_list == [
+        mock.call("mvn.foo.count", 3, tags=_tags(metric_name="foo.count")),
+        mock.call(
+            "mvn.foo.count", 0, tags=_tags("result:hit", metric_name="foo.count")
+        ),
+    ]
+
+
+def test_gauges_and_histograms_are_aggregated(aggregator, statsd):
+    for value in (1, 2):
+        stats.gauge(
+            "foo.size", pod_name=stats.PodNames.CORE_SERVICES, metric_value=value
+        )
+        stats.histogram(
+            "foo.latency", pod_name=stats.PodNames.CORE_SERVICES, metric_value=value
+        )
+
+    stats.flush()
+
+    statsd.gauge.assert_called_once_with(
+        "mvn.foo.size", 2, tags=_tags(metric_name="foo.size")
+    )
+    assert statsd.histogram.call_args_list == [
+        mock.call("mvn.foo.latency", value, tags=_tags(metric_name="foo.latency"))
+        for value in (1, 2)
+    ]
+
+
+def test_sampled_metrics_are_sent_right_away(aggregator, statsd):
+    stats.increment("foo.count", pod_name=stats.PodNames.CORE_SERVICES, sample_rate=0.1)
+
+    statsd.increment.assert_called_once_with(
+        "mvn.foo.count", 1, tags=_tags(metric_name="foo.count"), sample_rate=0.1
+    )
+    assert aggregator._counts == {}
+
+
+def test_aggregation_disabled(aggregator, statsd):
+    with mock.patch.object(stats, "STATS_AGGREGATION_ENABLED", False):
+        stats.histogram(
+            "foo.latency", pod_name=stats.PodNames.CORE_SERVICES, metric_value=5
+        )
+
+    statsd.histogram.assert_called_once_with(
+        "mvn.foo.latency", 5, tags=_tags(metric_name="foo.latency"), sample_rate=1
+    )
+
+
+def test_default_tags_include_span_owner():
+    with mock.patch.object(
+        stats, "get_owner_tags_from_span", return_value=("appointments", "care")
+    ):
+        tags = stats._add_default_tags(
+            metric_name="mvn.foo", pod_name=stats.PodNames.CORE_SERVICES, tags=["a:b"]
+        )
+
+    assert tags == [
+        "a:b",
+        "associated_metric_name:mvn.foo",
+        "eng_pod:core_services",
+        "service_ns:appointments",
+        "team_ns:care",
+    ]
+
+
+def test_default_tags_reject_unknown_pod():
+    with pytest.raises(ValueError):
+        stats._add_default_tags(metric_name="mvn.foo", pod_name="unknown")
+
+
+def test_aggregator_flushes_in_background(statsd):
+    aggregator = stats._Aggregator(flush_interval=0.01)
+    flushed = threading.Event()
+    statsd.increment.side_effect = lambda *args, **kwargs: flushed.set()
+
+    aggregator.count("mvn.foo.count", 1, ["eng_pod:core_services"])
+
+    assert flushed.wait(timeout=5)
+    aggregator.stop()
+    statsd.increment.assert_called_once_with(
+        "mvn.foo.count", 1, tags=["eng_pod:core_services"]
+    )
+
+
+def test_flush_is_batched(aggregator, statsd):
+    stats.increment("foo.count", pod_name=stats.PodNames.CORE_SERVICES)
+    stats.gauge("foo.gauge", pod_name=stats.PodNames.CORE_SERVICES, metric_value=1)
+
+    stats.flush()
+
+    statsd.__enter__.assert_called_once()
+    statsd.__exit__.assert_called_once()
+
+
+def test_failed_flushes_are_logged_once(statsd):
+    aggregator = stats._Aggregator(flush_interval=3600)
+    statsd.increment.side_effect = Exception("boom")
+    waits = []
+
+    def wait(timeout):
+        waits.append(timeout)
+        aggregator.count("mvn.foo.count", 1, ["eng_pod:core_services"])
+        return len(waits) > 2
+
+    with mock.patch.object(aggregator, "_ensure_started"), mock.patch.object(
+        aggregator._stopped, "wait", side_effect=wait
+    ), mock.patch.object(stats, "log") as log:
+        aggregator._run()
+
+    assert statsd.increment.call_count == 2
+    log.exception.assert_called_once()
@@ -0,0 +1,154 @@
+import dataclasses
+import time
+from unittest import mock
+
+import pytest
+
+from views import dashboard_metadata, dashboard_sections
+
+
+def _fail():
+    raise ValueError("boom")
+
+
+def _slow():
+    time.sleep(0.5)
+    return "late"
+
+
+@pytest.mark.parametrize("parallel", [False, True])
+def test_section_loader_returns_results(parallel, app_context):
+    loader = dashboard_sections.SectionLoader(parallel=parallel)
+    loader.submit("answer", lambda: 42, fallback=None)
+
+    assert loader.result("answer") == 42
+
+
+@pytest.mark.parametrize("parallel", [False, True])
+def test_section_loader_falls_back_on_error(parallel, app_context):
+    loader = dashboard_sections.SectionLoader(parallel=parallel)
+    loader.submit("broken", _fail, fallback="fallback")
+
+    assert loader.result("broken") == "fallback"
+
+
+def test_section_loader_falls_back_on_timeout(app_context):
+    loader = dashboard_sections.SectionLoader(parallel=True)
+    loader.submit("slow", _slow, fallback="fallback", timeout_seconds=0.01)
+
+    with mock.patch("views.dashboard_sections.stats") as mock_stats:
+        assert loader.result("slow") == "fallback"
+
+    mock_stats.increment.assert_called_once_with(
+        metric_name="api.views.dashboard_metadata.section.timeout",
+        pod_name=mock.ANY,
+        tags=["section:slow"],
+    )
+
+
+def test_timed_section_records_duration():
+    with mock.patch("views.dashboard_sections.stats") as mock_stats:
+        with dashboard_sections.timed_section("program"):
+            pass
+
+    mock_stats.histogram.assert_called_once_with(
+        metric_name="api.views.dashboard_metadata.section.duration_ms",
+        pod_name=mock.ANY,
+        metric_value=mock.ANY,
+        tags=["section:program", "outcome:ok"],
+    )
+
+
+class TestSharedSectionCache:
+    @pytest.fixture
+    def redis_cache(self, mock_redis_ttl_cache):
+        mock_redis_ttl_cache.get_client.return_value.get.return_value = b"3"
+        return mock_redis_ttl_cache
+
+    @pytest.fixture
+    def cache(self, redis_cache):
+        return dashboard_sections.SharedSectionCache(
+            namespace="test", redis_cache=redis_cache
+        )
+
+    def test_miss_loads_and_stores_under_current_version(self, cache, redis_cache):
+        load = mock.Mock(return_value=["a"])
+
+        result = cache.get_or_load("key", load=load, dump=list, restore=list)
+
+        assert result == ["a"]
+        redis_cache.get.assert_called_once_with("3:key")
+        redis_cache.add.assert_called_once_with("3:key", ["a"])
+
+    def test_hit_skips_loading(self, cache, redis_cache):
+        redis_cache.get.return_value = ["cached"]
+        load = mock.Mock()
+
+        result = cache.get_or_load("key", load=load, dump=list, restore=tuple)
+
+        assert result == ("cached",)
+        load.assert_not_called()
+
+    def test_unserializable_value_is_still_returned(self, cache, redis_cache):
+        redis_cache.add.side_effect = TypeError("not serializable")
+
+        result = cache.get_or_load("key", load=lambda: "value", dump=str, restore=str)
+
+        assert result == "value"
+
+    def test_invalidate_bumps_version(self, cache, redis_cache):
+        cache.invalidate()
+
+        redis_cache.get_client.return_value.incr.assert_called_once_with("test:version")
+
+
+def test_resource_edit_invalidates_library_cache(session, factories):
+    resource = factories.ResourceFactory(phases=[("pregnancy", "week-5")])
+    session.flush()
+    session.info.pop(dashboard_sections._PENDING_INVALIDATION_KEY, None)
+
+    resource.title = "A new title"
+    session.flush()
+
+    with mock.patch.object(
+        dashboard_sections.library_cache, "invalidate"
+    ) as invalidate:
+        dashboard_sections.invalidate_library_cache(session)
+
+    invalidate.assert_called_once()
+
+
+@mock.patch("views.dashboard_metadata.locate_maven_library")
+def test_get_library_resources_uses_shared_cache(locate_library_mock, factories):
+    user = factories.EnterpriseUserFactory()
+    cached = dashboard_metadata.DashboardLibraryResource(
+        id=1, title="Cached", group="article", url="/resources/cached"
+    )
+
+    with mock.patch.object(
+        dashboard_sections.library_cache.redis_cache,
+        "get",
+        return_value=[dataclasses.asdict(cached)],
+    ):
+        result = dashboard_metadata.get_library_resources(
+            user, "pregnancy", "week-5", None
+        )
+
+    assert result.maven == [cached]
+    locate_library_mock.assert_not_called()
+
+
+def test_unrelated_edit_does_not_invalidate_library_cache(session, factories):
+    user = factories.DefaultUserFactory()
+    session.flush()
+    session.info.pop(dashboard_sections._PENDING_INVALIDATION_KEY, None)
+
+    user.first_name = "Renamed"
+    session.flush()
+
+    with mock.patch.object(
+        dashboard_sections.library_cache, "invalidate"
+    ) as invalidate:
+        dashboard_sections.invalidate_library_cache(session)
+
+    invalidate.assert_not_called()
@@ -4,7 +4,7 @@ from unittest.mock import patch
 from redis.exceptions import ConnectionError
 
 from models.enterprise import OrganizationType
-from utils.org_search_autocomplete import OrganizationSearchAutocomplete
+from utils.org_search_autocomplete import OrganizationSearchAutocomplete, local_index
 
 
 def test_no_input__name(api_helpers, client, default_user):
@@ -308,6 +308,8 @@ def test_redis_connection_error(api_helpers, client, default_user):
       - no errors
       - empty results list
     """
+    # A loaded index answers without Redis
+    local_index.clear()
     with patch("redis.Redis.execute_command") as mock_redis_execute:
         mock_redis_execute.side_effect = ConnectionError(
             "Error 111 connecting to redis:6379. Connection refused."
@@ -0,0 +1,113 @@
+import json
+from unittest import mock
+
+import pytest
+
+from utils import org_search_autocomplete
+from utils.org_search_autocomplete import (
+    OrganizationSearchAutocomplete,
+    OrgAutocompleteIndex,
+    normalize,
+)
+
+
+@pytest.fixture
+def index():
+    return OrgAutocompleteIndex(
+        [
+            (1, "Maven Clinic"),
+            (2, "Acme Corp"),
+            (3, "Acme Widgets"),
+            (4, "Société Générale"),
+            (5, "Amazon"),
+            (6, "The Acme Foundation"),
+        ],
+        version=1,
+    )
+
+
+@pytest.fixture(autouse=True)
+def clear_local_index():
+    org_search_autocomplete.local_index.clear()
+    yield
+    org_search_autocomplete.local_index.clear()
+
+
+def _names(results):
+    return [entry.name for entry in results]
+
+
+def test_normalize():
+    assert normalize("  Société_Générale, Inc. ") == "societe generale inc"
+
+
+def test_name_prefixes_rank_before_word_prefixes(index):
+    assert _names(index.search("acme")) == [
+        "Acme Corp",
+        "Acme Widgets",
+        "The Acme Foundation",
+    ]
+
+
+def test_matches_later_words(index):
+    assert _names(index.search("clin")) == ["Maven Clinic"]
+
+
+def test_ignores_accents_and_case(index):
+    assert _names(index.search("SOCIETE")) == ["Société Générale"]
+
+
+@pytest.mark.parametrize("query", ["amazn", "amazom", "mavne cl", "foundatoin"])
+def test_tolerates_typos(index, query):
+    assert len(index.search(query)) == 1
+
+
+def test_short_queries_only_match_prefixes(index):
+    assert index.search("az") == []
+
+
+def test_limit(index):
+    assert _names(index.search("acme", limit=1)) == ["Acme Corp"]
+
+
+def test_results_come_from_redis_snapshot():
+    snapshot = json.dumps({"version": 7, "orgs": [[1, "Maven Clinic"]]})
+    client = mock.MagicMock()
+    client.get.return_value = snapshot
+
+    with mock.patch.object(org_search_autocomplete, "_redis", return_value=client):
+        results = OrganizationSearchAutocomplete().get_autocomplete_results("mav")
+
+    assert results == [{"id": "1", "name": "Maven Clinic"}]
+    assert org_search_autocomplete.local_index.index.version == 7
+
+
+def test_warm_index_does_not_call_redis(index):
+    org_search_autocomplete.local_index.set(index)
+
+    with mock.patch.object(org_search_autocomplete, "_redis") as redis_mock:
+        results = OrganizationSearchAutocomplete().get_autocomplete_results("amazon")
+
+    assert results == [{"id": "5", "name": "Amazon"}]
+    redis_mock.assert_not_called()
+
+
+def test_stale_index_refreshes_in_background(index):
+    org_search_autocomplete.local_index.set(index)
+    org_search_autocomplete.local_index.checked_at = 0
+
+    with mock.patch.object(
+        org_search_autocomplete.local_index, "refresh_in_background"
+    ) as refresh:
+        results = OrganizationSearchAutocomplete().get_autocomplete_results("amazon")
+
+    assert results == [{"id": "5", "name": "Amazon"}]
+    refresh.assert_called_once()
+
+
+def test_older_index_is_not_swapped_in(index):
+    org_search_autocomplete.local_index.set(index)
+
+    org_search_autocomplete.local_index.set(OrgAutocompleteIndex([], version=0))
+
+    assert org_search_autocomplete.local_index.index is index
@@ -0,0 +1,101 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+import pytest
+
+from braze import client
+from utils import braze
+from utils.braze_sync import BrazeBulkSync
+
+# Simulated round trip to Braze for a /users/track request
+STUB_LATENCY_SECONDS = 0.05
+
+
+class _BrazeStubHandler(BaseHTTPRequestHandler):
+    def do_POST(self):  # noqa: N802
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        time.sleep(STUB_LATENCY_SECONDS)
+        server = self.server
+        with server.lock:
+            server.num_requests += 1
+            server.num_attributes += len(body.get("attributes", []))
+            rate_limited = server.num_rate_limited > 0
+            if rate_limited:
+                server.num_rate_limited -= 1
+
+        self.send_response(429 if rate_limited else 201)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("X-RateLimit-Reset", str(time.time() + 0.1))
+        self.end_headers()
+        self.wfile.write(json.dumps({"message": "success"}).encode("utf-8"))
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def braze_stub():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _BrazeStubHandler)
+    server.lock = threading.Lock()
+    server.num_requests = 0
+    server.num_attributes = 0
+    server.num_rate_limited = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    with mock.patch(
+        "braze.client.constants.USER_TRACK_ENDPOINT",
+        f"http://127.0.0.1:{server.server_port}/users/track",
+    ), mock.patch(
+        "braze.client.braze_client.feature_flags.bool_variation", return_value=True
+    ):
+        yield server
+    server.shutdown()
+
+
+@pytest.fixture
+def snapshot_redis():
+    values = {}
+
+    redis_client = mock.MagicMock()
+    redis_client.mget.side_effect = lambda keys: [values.get(key) for key in keys]
+    redis_client.pipeline.return_value.set.side_effect = (
+        lambda key, value, ex=None: values.__setitem__(key, value.encode("utf-8"))
+    )
+    with mock.patch("utils.braze_sync.get_redis_client", return_value=redis_client):
+        yield values
+
+
+def test_bulk_sync_throughput(factories, braze_stub, snapshot_redis):
+    users = [factories.DefaultUserFactory.create() for _ in range(300)]
+    user_ids = [user.id for user in users]
+    braze_client = client.BrazeClient(api_key="test")
+
+    # Attributes built with per-user queries and sent one request at a time
+    start = time.perf_counter()
+    braze_client.track_users(
+        user_attributes=[braze.build_user_attrs(user) for user in users]
+    )
+    sequential_seconds = time.perf_counter() - start
+    sequential_requests = braze_stub.num_requests
+
+    braze_stub.num_requests = 0
+    braze_stub.num_rate_limited = 1
+    start = time.perf_counter()
+    first = BrazeBulkSync(braze_client=braze_client).sync_user_ids(user_ids)
+    bulk_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    second = BrazeBulkSync(braze_client=braze_client).sync_user_ids(user_ids)
+    unchanged_seconds = time.perf_counter() - start
+
+    assert first.num_sent == len(users)
+    assert braze_stub.num_attributes >= 2 * len(users)
+    # One request per TRACK_USER_ENDPOINT_LIMIT users, plus the rate limited retry
+    assert braze_stub.num_requests == sequential_requests + 1
+    assert second.num_unchanged == len(users)
+    assert second.num_batches == 0
+    assert bulk_seconds < sequential_seconds
+    assert unchanged_seconds < bulk_seconds
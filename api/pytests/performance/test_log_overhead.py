@@ -0,0 +1,126 @@
+import dataclasses
+import datetime
+import logging
+import logging.handlers
+import os
+import queue
+import time
+
+import pytest
+import structlog
+
+from utils import log as log_utils
+from utils.log import logger
+
+log = logger(__name__)
+
+NUM_REQUESTS = 200
+APPOINTMENTS_PER_PRACTITIONER = 40
+NUM_PRACTITIONERS = 20
+
+
+@dataclasses.dataclass
+class ExistingAppointment:
+    id: int
+    scheduled_start: datetime.datetime
+    scheduled_end: datetime.datetime
+    practitioner_id: int
+
+
+def _existing_appointments():
+    start = datetime.datetime(2024, 1, 1)
+    return {
+        practitioner_id: [
+            ExistingAppointment(
+                id=practitioner_id * 1000 + i,
+                scheduled_start=start + datetime.timedelta(hours=i),
+                scheduled_end=start + datetime.timedelta(hours=i, minutes=30),
+                practitioner_id=practitioner_id,
+            )
+            for i in range(APPOINTMENTS_PER_PRACTITIONER)
+        ]
+        for practitioner_id in range(NUM_PRACTITIONERS)
+    }
+
+
+def _request(bound_logger, existing_appointments):
+    # the records of a mass availability request
+    bound_logger.info("Request started", path="/api/v1/products/availability")
+    bound_logger.info(
+        "MassAvailabilityCalculator get_mass_availability",
+        practitioner_ids=list(existing_appointments),
+        existing_appointments=existing_appointments,
+    )
+    bound_logger.info("Request finished", status=200)
+
+
+def _stream_handler(stream, shared, renderer):
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(
+        structlog.stdlib.ProcessorFormatter(
+            processor=renderer, foreign_pre_chain=shared
+        )
+    )
+    return handler
+
+
+def _seconds_per_request(bound_logger, existing_appointments):
+    start = time.perf_counter()
+    for _ in range(NUM_REQUESTS):
+        _request(bound_logger, existing_appointments)
+    return (time.perf_counter() - start) / NUM_REQUESTS
+
+
+@pytest.fixture
+def stream():
+    with open(os.devnull, "w") as devnull:
+        yield devnull
+
+
+def test_log_overhead_per_request(stream):
+    existing_appointments = _existing_appointments()
+    shared, structured, renderer = log_utils._get_processors(json=True)
+
+    # Rendered and written by the request thread, without truncation
+    sync_logger = logging.Logger("benchmark.sync", level=logging.INFO)
+    sync_logger.addHandler(_stream_handler(stream, shared, renderer))
+    sync_seconds = _seconds_per_request(
+        structlog.wrap_logger(
+            sync_logger,
+            processors=[
+                *shared,
+                *(p for p in structured if p is not log_utils.truncate_fields),
+            ],
+            wrapper_class=structlog.stdlib.BoundLogger,
+        ),
+        existing_appointments,
+    )
+
+    # Truncated by the request thread, rendered and written by the writer thread
+    async_logger = logging.Logger("benchmark.async", level=logging.INFO)
+    handler = log_utils.NonBlockingQueueHandler(queue.Queue())
+    async_logger.addHandler(handler)
+    listener = logging.handlers.QueueListener(
+        handler.queue, _stream_handler(stream, shared, renderer)
+    )
+    listener.start()
+    async_seconds = _seconds_per_request(
+        structlog.wrap_logger(
+            async_logger,
+            processors=[log_utils.sample_events, *shared, *structured],
+            wrapper_class=structlog.stdlib.BoundLogger,
+        ),
+        existing_appointments,
+    )
+    start = time.perf_counter()
+    listener.stop()
+    drain_seconds = time.perf_counter() - start
+
+    log.info(
+        "Log overhead benchmark",
+        num_requests=NUM_REQUESTS,
+        sync_ms_per_request=round(sync_seconds * 1000, 3),
+        async_ms_per_request=round(async_seconds * 1000, 3),
+        async_drain_seconds=round(drain_seconds, 3),
+    )
+    assert async_seconds < sync_seconds
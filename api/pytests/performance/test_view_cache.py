@@ -0,0 +1,85 @@
+import json
+import time
+
+import pytest
+
+from utils import cache
+from utils.log import logger
+
+log = logger(__name__)
+
+NUM_URIS = 2_000
+POSTS_PER_RESPONSE = 10
+
+
+class BenchmarkViewCache(cache.ViewCache):
+    id_namespace = "benchmark_view_cache"
+
+
+def _response(page):
+    return {
+        "data": [
+            {"id": page * POSTS_PER_RESPONSE + i, "body": "Lorem ipsum dolor " * 40}
+            for i in range(POSTS_PER_RESPONSE)
+        ],
+        "pagination": {"offset": page * POSTS_PER_RESPONSE},
+    }
+
+
+def _memory_usage(redis, pattern):
+    return sum(redis.memory_usage(key) or 0 for key in redis.scan_iter(match=pattern))
+
+
+@pytest.fixture
+def redis():
+    client = cache.redis_client()
+    yield client
+    for pattern in ("benchmark_view_cache*", "/benchmark/*"):
+        keys = list(client.scan_iter(match=pattern))
+        if keys:
+            client.delete(*keys)
+
+
+def test_view_cache_memory_and_invalidate_all_latency(redis):
+    uris = [f"/benchmark/posts{page:05d}" for page in range(NUM_URIS)]
+
+    # The layout before generations: raw JSON under the URI, a set of all URIs
+    # and a set of URIs per object id, neither of which expire.
+    all_uris_key = "benchmark_view_cache_BenchmarkViewCache_all_uris"
+    pipeline = redis.pipeline(transaction=False)
+    for page, uri in enumerate(uris):
+        res = _response(page)
+        for post in res["data"]:
+            pipeline.sadd(f"benchmark_view_cache_view_cache_{post['id']}", uri)
+        pipeline.setex(uri, cache.ViewCache.ttl, json.dumps(res))
+        pipeline.sadd(all_uris_key, uri)
+    pipeline.execute()
+    legacy_memory = _memory_usage(redis, "/benchmark/*") + _memory_usage(
+        redis, "benchmark_view_cache_*"
+    )
+
+    start = time.perf_counter()
+    keys = list(redis.smembers(all_uris_key))
+    redis.delete(*keys)
+    redis.delete(all_uris_key)
+    legacy_seconds = time.perf_counter() - start
+
+    for page, uri in enumerate(uris):
+        BenchmarkViewCache(uri=uri).set(_response(page))
+    memory = _memory_usage(redis, "benchmark_view_cache:*")
+
+    start = time.perf_counter()
+    invalidated = BenchmarkViewCache().invalidate_all()
+    seconds = time.perf_counter() - start
+
+    log.info(
+        "ViewCache benchmark",
+        num_uris=NUM_URIS,
+        legacy_memory_bytes=legacy_memory,
+        memory_bytes=memory,
+        legacy_invalidate_all_seconds=round(legacy_seconds, 4),
+        invalidate_all_seconds=round(seconds, 4),
+    )
+    assert invalidated == NUM_URIS
+    assert memory < legacy_memory
+    assert seconds < legacy_seconds
@@ -0,0 +1,194 @@
+import time
+from unittest import mock
+
+import pytest
+import redis
+import requests
+
+from braze import client
+from direct_payment.clinic.pytests.factories import FertilityClinicUserProfileFactory
+from utils import braze
+from utils.braze_sync import (
+    AttributeSnapshots,
+    BrazeBulkSync,
+    RateLimiter,
+    attributes_digest,
+)
+
+
+class FakeRedis:
+    def __init__(self):
+        self.values = {}
+
+    def mget(self, keys):
+        return [self.values.get(key) for key in keys]
+
+    def pipeline(self, transaction=True):
+        return self
+
+    def set(self, key, value, ex=None):
+        self.values[key] = value.encode("utf-8")
+
+    def execute(self):
+        pass
+
+
+@pytest.fixture
+def fake_redis():
+    fake = FakeRedis()
+    with mock.patch("utils.braze_sync.get_redis_client", return_value=fake):
+        yield fake
+
+
+def _response(status_code=201, headers=None):
+    response = requests.Response()
+    response.status_code = status_code
+    response.headers.update(headers or {})
+    return response
+
+
+@pytest.fixture
+def braze_client():
+    braze_client = mock.create_autospec(client.BrazeClient, instance=True)
+    braze_client.track_users.return_value = _response()
+    return braze_client
+
+
+def test_preloaded_attributes_match_per_user_attributes(factories):
+    appointment = factories.AppointmentFactory.create(is_enterprise_factory=True)
+    user = appointment.member_schedule.user
+
+    preload = braze.load_braze_user_preloads([user.id])[user.id]
+
+    assert preload.appointments == (appointment,)
+    assert (
+        braze.build_user_attrs(user, preload=preload).attributes
+        == braze.build_user_attrs(user).attributes
+    )
+
+
+def test_attributes_digest_ignores_key_order():
+    first = client.BrazeUserAttributes(external_id="a", attributes={"x": 1, "y": 2})
+    second = client.BrazeUserAttributes(external_id="a", attributes={"y": 2, "x": 1})
+    changed = client.BrazeUserAttributes(external_id="a", attributes={"x": 1, "y": 3})
+
+    assert attributes_digest(first) == attributes_digest(second)
+    assert attributes_digest(first) != attributes_digest(changed)
+
+
+def test_sync_skips_unchanged_users(factories, fake_redis, braze_client):
+    users = [factories.DefaultUserFactory.create() for _ in range(3)]
+    sync = BrazeBulkSync(braze_client=braze_client, batch_size=2)
+
+    first = sync.sync_users(users)
+    second = sync.sync_users(users)
+
+    assert (first.num_sent, first.num_batches) == (3, 2)
+    assert (second.num_unchanged, second.num_sent, second.num_batches) == (3, 0, 0)
+    assert braze_client.track_users.call_count == 2
+
+
+def test_sync_force_sends_unchanged_users(factories, fake_redis, braze_client):
+    users = [factories.DefaultUserFactory.create()]
+    BrazeBulkSync(braze_client=braze_client).sync_users(users)
+
+    result = BrazeBulkSync(braze_client=braze_client, force=True).sync_users(users)
+
+    assert result.num_sent == 1
+    assert braze_client.track_users.call_count == 2
+
+
+def test_sync_failed_batch_is_sent_again(factories, fake_redis, braze_client):
+    users = [factories.DefaultUserFactory.create()]
+    braze_client.track_users.return_value = _response(status_code=400)
+    sync = BrazeBulkSync(braze_client=braze_client)
+
+    failed = sync.sync_users(users)
+    braze_client.track_users.return_value = _response()
+    retried = sync.sync_users(users)
+
+    assert failed.num_failed == 1
+    assert retried.num_sent == 1
+
+
+def test_sync_retries_rate_limited_batch(factories, fake_redis, braze_client):
+    users = [factories.DefaultUserFactory.create()]
+    braze_client.track_users.side_effect = [
+        _response(status_code=429, headers={"X-RateLimit-Reset": str(time.time() + 5)}),
+        _response(),
+    ]
+
+    with mock.patch("utils.braze_sync.time.sleep") as mock_sleep:
+        result = BrazeBulkSync(braze_client=braze_client).sync_users(users)
+
+    assert result.num_sent == 1
+    mock_sleep.assert_called_once()
+
+
+def test_sync_skips_fertility_clinic_users(factories, fake_redis, braze_client):
+    user = factories.DefaultUserFactory.create()
+    FertilityClinicUserProfileFactory.create(user_id=user.id)
+
+    result = BrazeBulkSync(braze_client=braze_client).sync_users([user])
+
+    assert result.num_sent == 0
+    braze_client.track_users.assert_not_called()
+
+
+def test_sync_skips_users_without_attributes(factories, fake_redis, braze_client):
+    user = factories.DefaultUserFactory.create()
+
+    with mock.patch(
+        "utils.braze_sync.build_user_attrs",
+        return_value=client.BrazeUserAttributes(
+            external_id=user.esp_id, attributes={"first_name": None}
+        ),
+    ):
+        result = BrazeBulkSync(braze_client=braze_client).sync_users([user])
+
+    assert (result.num_sent, result.num_failed) == (0, 0)
+    braze_client.track_users.assert_not_called()
+
+
+def test_bulk_track_users_syncs_users(factories):
+    users = [factories.DefaultUserFactory.create()]
+
+    with mock.patch("utils.braze_sync.BrazeBulkSync") as bulk_sync:
+        braze.bulk_track_users(users)
+
+    bulk_sync.return_value.sync_users.assert_called_once_with(users)
+
+
+def test_rate_limiter_backs_off_until_reset():
+    limiter = RateLimiter(reserve=5)
+    reset = time.time() + 30
+
+    limiter.update(
+        _response(
+            headers={"X-RateLimit-Remaining": "3", "X-RateLimit-Reset": str(reset)}
+        )
+    )
+
+    with mock.patch("utils.braze_sync.time.sleep") as mock_sleep:
+        limiter.wait()
+    assert mock_sleep.call_args[0][0] == pytest.approx(30, abs=1)
+
+
+def test_rate_limiter_ignores_healthy_window():
+    limiter = RateLimiter(reserve=5)
+
+    limiter.update(_response(headers={"X-RateLimit-Remaining": "500"}))
+
+    with mock.patch("utils.braze_sync.time.sleep") as mock_sleep:
+        limiter.wait()
+    mock_sleep.assert_not_called()
+
+
+def test_snapshots_survive_redis_errors():
+    with mock.patch(
+        "utils.braze_sync.get_redis_client", side_effect=redis.ConnectionError()
+    ):
+        snapshots = AttributeSnapshots()
+        snapshots.set_many({"a": "digest"})
+
+        assert snapshots.get_many(["a"]) == [None]
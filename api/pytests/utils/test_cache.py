@@ -20,6 +20,57 @@ def view_cache():
         cache.redis.delete(*keys)
 
 
+def _cache_uris(uris, ids_by_uri=None):
+    for uri in uris:
+        ids = (ids_by_uri or {}).get(uri, [1])
+        MySuperViewCache(uri=uri).set([{"id": id} for id in ids])
+
+
+class TestViewCache:
+    @staticmethod
+    def test_get_set(view_cache):
+        # Given
+        res = {"data": [{"id": 1, "body": "x" * 1000}], "pagination": {}}
+        # When
+        view_cache.set(res)
+        # Then
+        assert view_cache.get() == res
+        # the response is stored compressed
+        assert len(view_cache.redis.get(view_cache.key)) < 1000
+
+    @staticmethod
+    def test_indexes_expire_with_entries(view_cache):
+        # When
+        view_cache.set({"id": 1})
+        # Then
+        assert 0 < view_cache.redis.ttl(view_cache._id_key(1)) <= view_cache.ttl
+        assert 0 < view_cache.redis.ttl(view_cache._uris_key()) <= view_cache.ttl
+
+    @staticmethod
+    def test_invalidate_ids(view_cache):
+        # Given
+        _cache_uris(["/a", "/b", "/c"], {"/a": [1], "/b": [1, 2], "/c": [3]})
+        # When
+        invalidated = view_cache.invalidate_ids([1])
+        # Then
+        assert sorted(invalidated) == ["/a", "/b"]
+        assert MySuperViewCache(uri="/a").get() is None
+        assert MySuperViewCache(uri="/c").get() is not None
+        assert view_cache.all_uris() == {b"/c"}
+
+    @staticmethod
+    def test_invalidate_path_prefix(view_cache):
+        # Given
+        _cache_uris(["/api/v1/posts", "/api/v1/posts123", "/api/v1/postsabc", "/x"])
+        view_cache.batch_size = 2
+        # When
+        view_cache.invalidate_path_prefix("/api/v1/posts")
+        # Then
+        assert view_cache.all_uris() == {b"/x"}
+        assert MySuperViewCache(uri="/api/v1/posts123").get() is None
+        assert MySuperViewCache(uri="/x").get() is not None
+
+
 class TestInvalidateAll:
     @staticmethod
     def test_no_op(view_cache):
@@ -27,33 +78,30 @@ class TestInvalidateAll:
         invalidated = view_cache.invalidate_all()
         # Then
         assert invalidated == 0
+        assert view_cache.last_invalidated_all is not None
 
     @staticmethod
-    def test_atomic(view_cache, faker):
+    def test_invalidate_all(view_cache, faker):
         # Given
         uris = [faker.swift11() for _ in range(16)]
-        objects = [faker.bs()]
-        for uri in uris:
-            view_cache.redis.sadd(uri, *objects)
-        view_cache.redis.sadd(view_cache.all_uris_key, *uris)
+        _cache_uris(uris)
         # When
         invalidated = view_cache.invalidate_all()
         # Then
         assert invalidated == len(uris)
+        assert all(MySuperViewCache(uri=uri).get() is None for uri in uris)
+        assert view_cache.all_uris() == set()
+        assert view_cache.invalidate_ids([1]) == []
 
     @staticmethod
-    def test_batched(view_cache, faker):
+    def test_cache_is_usable_after_invalidate_all(view_cache):
         # Given
-        uris = [faker.swift11() for _ in range(16)]
-        objects = [faker.bs()]
-        for uri in uris:
-            view_cache.redis.sadd(uri, *objects)
-        view_cache.redis.sadd(view_cache.all_uris_key, *uris)
-        view_cache.BATCH_SIZE = 10
+        view_cache.set({"id": 1})
+        view_cache.invalidate_all()
         # When
-        invalidated = view_cache.invalidate_all()
+        view_cache.set({"id": 2})
         # Then
-        assert invalidated == len(uris)
+        assert MySuperViewCache(uri=view_cache.uri).get() == {"id": 2}
 
 
 class TestResilientRedis:
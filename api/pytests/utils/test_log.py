@@ -0,0 +1,169 @@
+import json
+import logging
+import queue
+from unittest import mock
+
+import pytest
+import structlog
+
+from utils import log
+
+
+@pytest.fixture
+def sample_rates():
+    yield log.set_sample_rates
+    log.set_sample_rates({})
+
+
+@pytest.fixture
+def event_counts():
+    counts = log._EventCounts(flush_interval=3600)
+    with mock.patch.object(log, "_event_counts", counts):
+        yield counts._counts
+
+
+def test_parse_sample_rates():
+    assert log.parse_sample_rates(" tasks.queues=0.1,appointments = 2,, bad") == {
+        "tasks.queues": 0.1,
+        "appointments": 1.0,
+    }
+
+
+def test_sample_rate_of_closest_ancestor(sample_rates):
+    sample_rates({"appointments": 0.5, "appointments.utils.booking": 0.1})
+
+    assert log._sample_rate("appointments.utils.booking") == 0.1
+    assert log._sample_rate("appointments.utils.booking.inner") == 0.1
+    assert log._sample_rate("appointments.resources") == 0.5
+    assert log._sample_rate("tasks.queues") == 1.0
+
+
+def test_sample_events(sample_rates, event_counts):
+    sample_rates({"tasks.queues": 0.1})
+    logger = logging.getLogger("tasks.queues")
+
+    with mock.patch.object(log.random, "random", return_value=0.5):
+        with pytest.raises(structlog.DropEvent):
+            log.sample_events(logger, "info", {"event": "dropped"})
+        assert log.sample_events(logger, "error", {"event": "kept"}) == {
+            "event": "kept"
+        }
+    with mock.patch.object(log.random, "random", return_value=0.05):
+        assert log.sample_events(logger, "info", {"event": "kept"}) == {
+            "event": "kept",
+            "sample_rate": 0.1,
+        }
+
+    assert event_counts == {(log.DROPPED_EVENTS_METRIC, "tasks.queues", "sampled"): 1}
+
+
+class LargeObject:
+    def __repr__(self):
+        return "x" * (log.LOG_MAX_FIELD_LENGTH + 10)
+
+
+def test_truncate_fields(event_counts):
+    event_dict = {
+        "event": "MassAvailabilityCalculator get_mass_availability",
+        "practitioner_ids": [1, 2],
+        "existing_appointments": {1: list(range(log.LOG_MAX_FIELD_ITEMS + 3))},
+        "appointment": LargeObject(),
+        "exception": "Traceback" * log.LOG_MAX_FIELD_LENGTH,
+    }
+
+    result = log.truncate_fields(logging.getLogger("booking"), "info", event_dict)
+
+    assert result["practitioner_ids"] == [1, 2]
+    assert result["existing_appointments"][1] == [
+        *range(log.LOG_MAX_FIELD_ITEMS),
+        "... 3 more items",
+    ]
+    assert result["appointment"] == f"{'x' * log.LOG_MAX_FIELD_LENGTH}... 10 more chars"
+    assert result["exception"] == "Traceback" * log.LOG_MAX_FIELD_LENGTH
+    assert event_counts == {(log.TRUNCATED_EVENTS_METRIC, "booking", "truncated"): 1}
+
+
+def test_truncate_fields_renders_objects():
+    result = log.truncate_fields(None, "info", {"ids": {3}, "level": log.LogLevel.INFO})
+
+    assert result == {"ids": [3], "level": "<LogLevel.INFO: 1>"}
+
+
+def test_event_counts_flush():
+    counts = log._EventCounts()
+    counts.increment(log.DROPPED_EVENTS_METRIC, "tasks.queues", "queue_full")
+    counts.increment(log.DROPPED_EVENTS_METRIC, "tasks.queues", "queue_full")
+
+    with mock.patch.object(log.stats, "increment") as increment:
+        counts.flush()
+
+    increment.assert_called_once_with(
+        metric_name=log.DROPPED_EVENTS_METRIC,
+        pod_name=log.stats.PodNames.CORE_SERVICES,
+        metric_value=2,
+        tags=["logger:tasks.queues", "reason:queue_full"],
+    )
+
+
+def test_queue_handler_drops_records_when_full(event_counts):
+    handler = log.NonBlockingQueueHandler(queue.Queue(maxsize=1))
+
+    handler.handle(logging.makeLogRecord({"name": "a", "msg": "hi %s", "args": (1,)}))
+    handler.handle(logging.makeLogRecord({"name": "a", "msg": "dropped"}))
+
+    record = handler.queue.get_nowait()
+    assert (record.msg, record.args) == ("hi 1", None)
+    assert event_counts == {(log.DROPPED_EVENTS_METRIC, "a", "queue_full"): 1}
+
+
+def test_queue_handler_runs_foreign_pre_chain_on_caller():
+    handler = log.NonBlockingQueueHandler(
+        queue.Queue(),
+        foreign_pre_chain=[
+            structlog.contextvars.merge_contextvars,
+            structlog.stdlib.add_log_level,
+            structlog.stdlib.add_logger_name,
+        ],
+    )
+    formatter = structlog.stdlib.ProcessorFormatter(
+        processor=structlog.processors.JSONRenderer()
+    )
+
+    with structlog.contextvars.bound_contextvars(request_id="abc"):
+        handler.handle(
+            logging.makeLogRecord(
+                {
+                    "name": "rq.worker",
+                    "levelname": "WARNING",
+                    "levelno": logging.WARNING,
+                    "msg": "hi %s",
+                    "args": (1,),
+                }
+            )
+        )
+
+    # the writer renders it without the caller's context
+    record = handler.queue.get_nowait()
+    assert json.loads(formatter.format(record)) == {
+        "event": "hi 1",
+        "request_id": "abc",
+        "level": "warning",
+        "logger": "rq.worker",
+    }
+
+
+def test_log_writer_writes_on_background_thread():
+    root = logging.Logger("root")
+    stream_handler = mock.Mock(spec=logging.Handler, level=logging.NOTSET)
+    root.addHandler(stream_handler)
+
+    log._start_log_writer(root)
+    try:
+        (handler,) = root.handlers
+        assert isinstance(handler, log.NonBlockingQueueHandler)
+        root.warning("written later")
+    finally:
+        log.stop_log_writer()
+
+    (record,) = [c.args[0] for c in stream_handler.handle.call_args_list]
+    assert record.msg == "written later"
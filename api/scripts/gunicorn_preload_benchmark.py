@@ -0,0 +1,126 @@
+"""
+Compare the startup time and memory of a pod's gunicorn with and without
+GUNICORN_PRELOAD_APP.
+
+Starts gunicorn with gunicorn_config.py the way the Dockerfile does, waits until every
+worker has logged its post_worker_init event and then sums the memory of the master
+and its workers from /proc/<pid>/smaps_rollup (Linux only):
+
+    python scripts/gunicorn_preload_benchmark.py --workers 8 --runs 3
+
+PSS splits pages shared copy-on-write between the processes sharing them, so its
+total is what the pod is charged for; USS is the memory private to each process.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from typing import Dict, List
+
+WORKER_READY_LINE = "[gunicorn] worker post_init event"
+
+
+def _memory_kb(pid: int) -> Dict[str, int]:
+    memory = {"pss": 0, "uss": 0}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            name, _, value = line.partition(":")
+            if name == "Pss":
+                memory["pss"] += int(value.split()[0])
+            elif name in ("Private_Clean", "Private_Dirty"):
+                memory["uss"] += int(value.split()[0])
+    return memory
+
+
+def _children(pid: int) -> List[int]:
+    with open(f"/proc/{pid}/task/{pid}/children") as f:
+        return [int(child) for child in f.read().split()]
+
+
+def run_once(
+    preload: bool, workers: int, port: int, health_path: str, timeout: float
+) -> Dict[str, float]:
+    env = {
+        **os.environ,
+        "GUNICORN_PRELOAD_APP": str(preload).lower(),
+        "GUNICORN_CMD_ARGS": f"--workers {workers} --bind 127.0.0.1:{port}",
+    }
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [
+            "gunicorn",
+            "-c",
+            "gunicorn_config.py",
+            "--logger-class",
+            "gunicorn_logging.GunicornLogger",
+            "application:wsgi",
+        ],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    ready = threading.Event()
+    num_ready = 0
+
+    def read_log() -> None:
+        nonlocal num_ready
+        for line in process.stderr:  # type: ignore[union-attr] # Item "None" of "Optional[IO[str]]" has no attribute "__iter__"
+            if WORKER_READY_LINE in line:
+                num_ready += 1
+                if num_ready == workers:
+                    ready.set()
+
+    threading.Thread(target=read_log, daemon=True).start()
+    try:
+        if not ready.wait(timeout):
+            raise RuntimeError(f"only {num_ready} of {workers} workers started")
+        startup_seconds = time.perf_counter() - start
+        # Serve a few requests so the workers touch their memory as they would in
+        # production.
+        for _ in range(workers * 10):
+            urllib.request.urlopen(f"http://127.0.0.1:{port}{health_path}").read()
+
+        pids = [process.pid, *_children(process.pid)]
+        memory = [_memory_kb(pid) for pid in pids]
+        return {
+            "startup_seconds": startup_seconds,
+            "pss_mb": sum(m["pss"] for m in memory) / 1024,
+            "uss_mb": sum(m["uss"] for m in memory) / 1024,
+        }
+    finally:
+        process.terminate()
+        process.wait(timeout=60)
+
+
+def main() -> None:
+    if not sys.platform.startswith("linux"):
+        sys.exit("smaps_rollup is only available on Linux")
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--port", type=int, default=5055)
+    parser.add_argument("--health-path", default="/livez")
+    parser.add_argument("--timeout", type=float, default=600)
+    args = parser.parse_args()
+
+    print(f"{'mode':<10} {'startup s':>10} {'PSS MB':>10} {'USS MB':>10}")
+    for preload in (False, True):
+        results = [
+            run_once(preload, args.workers, args.port, args.health_path, args.timeout)
+            for _ in range(args.runs)
+        ]
+        print(
+            f"{'preload' if preload else 'default':<10}"
+            f" {statistics.median(r['startup_seconds'] for r in results):>10.1f}"
+            f" {statistics.median(r['pss_mb'] for r in results):>10.0f}"
+            f" {statistics.median(r['uss_mb'] for r in results):>10.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
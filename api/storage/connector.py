@@ -12,6 +12,7 @@ from sqlalchemy import engine, orm, pool
 from sqlalchemy.orm import scoped_session, sessionmaker
 from werkzeug.local import LocalStack, release_local
 
+from storage import read_routing
 from utils.log import logger
 
 log = logger(__name__)
@@ -47,7 +48,13 @@ class RoutingSession(SignallingSession):
         if self.db.is_from_app_replica:
             # TODO: move this up after being stable
             return self.db.get_engine(bind=APP_REPLICA_BIND_KEY)
-        return super().get_bind(mapper, clause)
+        bind = super().get_bind(mapper, clause)
+        # Only the default database has an app replica, other binds (e.g. audit) stay put.
+        if bind is self.bind and read_routing.should_route_to_replica(
+            self, clause, self.db.app_replica_lag_monitor
+        ):
+            return self.db.get_engine(bind=APP_REPLICA_BIND_KEY)
+        return bind
 
     def using_bind(self, name: str) -> RoutingSession:
         """Manually route the session to a specific database.
@@ -74,6 +81,9 @@ class RoutingSQLAlchemy(SQLAlchemy):
         super().__init__()
         # Override db.Table to use the default bind key
         self.Table = _wrap_make_table(self.Table)  # type: ignore[has-type] # Cannot determine type of "Table"
+        self.app_replica_lag_monitor = read_routing.ReplicaLagMonitor(
+            db=self, bind_key=APP_REPLICA_BIND_KEY
+        )
 
     @property
     def s_app_replica(self) -> scoped_session:
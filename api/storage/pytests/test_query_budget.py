@@ -0,0 +1,114 @@
+from unittest import mock
+
+import pytest
+
+from authn.models.user import User
+from common.stats import PodNames
+from storage import query_budget
+
+
+def test_fingerprint_ignores_parameters():
+    assert query_budget.fingerprint(
+        "SELECT user.id FROM user\n  WHERE user.id = 5 AND user.email = 'a@b.com'"
+    ) == query_budget.fingerprint(
+        "SELECT user.id FROM user WHERE user.id = %s AND user.email = %s"
+    )
+
+
+def test_fingerprint_collapses_in_lists():
+    assert query_budget.fingerprint(
+        "SELECT * FROM user WHERE user.id IN (%s, %s, %s)"
+    ) == query_budget.fingerprint("SELECT * FROM user WHERE user.id IN (%s)")
+
+
+def test_fingerprint_distinguishes_statements():
+    assert query_budget.fingerprint(
+        "SELECT * FROM user WHERE id = %s"
+    ) != query_budget.fingerprint("SELECT * FROM device WHERE id = %s")
+
+
+def test_track_counts_queries_and_rows(session, factories):
+    users = [factories.DefaultUserFactory.create() for _ in range(3)]
+    session.flush()
+
+    with query_budget.track(name="test", kind="test", report=False) as stats:
+        session.query(User).filter(User.id.in_([u.id for u in users])).all()
+
+    assert stats.query_count == 1
+    assert stats.row_count == 3
+    assert stats.db_time_ms > 0
+
+
+def test_track_ignores_queries_outside_scope(session):
+    with query_budget.track(name="test", kind="test", report=False) as stats:
+        session.execute("SELECT 1")
+    session.execute("SELECT 1")
+
+    assert stats.query_count == 1
+
+
+def test_track_counts_failed_queries(session):
+    with query_budget.track(name="test", kind="test", report=False) as stats:
+        with pytest.raises(Exception):
+            session.execute("SELECT * FROM query_budget_missing_table")
+        session.execute("SELECT 1")
+
+    assert stats.query_count == 2
+    assert stats.row_count == 1
+    assert stats.db_time_ms > 0
+
+
+def test_repeated_statements_report_call_site(session, factories):
+    users = [
+        factories.DefaultUserFactory.create()
+        for _ in range(query_budget.N_PLUS_ONE_THRESHOLD)
+    ]
+    session.flush()
+
+    with query_budget.track(name="test", kind="test", report=False) as stats:
+        for user in users:
+            session.query(User).filter(User.id == user.id).one()
+
+    [repeated] = stats.repeated_statements()
+    assert repeated.count == query_budget.N_PLUS_ONE_THRESHOLD
+    assert "test_query_budget.py" in repeated.call_site
+
+
+def test_report_exports_metrics():
+    stats = query_budget.QueryStats(name="things", kind="endpoint")
+    for _ in range(query_budget.N_PLUS_ONE_THRESHOLD):
+        stats.record("SELECT * FROM user WHERE id = %s", rows=1, elapsed_ms=2)
+
+    with mock.patch("storage.query_budget.stats") as mock_stats:
+        stats.report()
+
+    histograms = {
+        call.kwargs["metric_name"]: call.kwargs["metric_value"]
+        for call in mock_stats.histogram.call_args_list
+    }
+    assert histograms == {
+        "api.storage.query_budget.queries": query_budget.N_PLUS_ONE_THRESHOLD,
+        "api.storage.query_budget.rows": query_budget.N_PLUS_ONE_THRESHOLD,
+        "api.storage.query_budget.db_time_ms": 2 * query_budget.N_PLUS_ONE_THRESHOLD,
+    }
+    mock_stats.increment.assert_called_once_with(
+        metric_name="api.storage.query_budget.n_plus_one",
+        pod_name=PodNames.CORE_SERVICES,
+        tags=["endpoint:things"],
+    )
+
+
+def test_query_budget_fixture(session, query_budget):
+    with query_budget(max_queries=2) as stats:
+        session.execute("SELECT 1")
+    assert stats.query_count == 1
+
+    with pytest.raises(AssertionError, match="Query budget exceeded"):
+        with query_budget(max_queries=1):
+            session.execute("SELECT 1")
+            session.execute("SELECT 2")
+
+    with pytest.raises(AssertionError, match="Repeated queries"):
+        with query_budget(max_repeats=1):
+            session.execute("SELECT 1")
+            session.execute("SELECT 1")
@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+from unittest import mock
+
+import flask
+import pytest
+import sqlalchemy as sa
+
+from storage import connector, read_routing
+
+
+@pytest.fixture
+def request_context():
+    app = flask.Flask(__name__)
+    app.add_url_rule("/api/v1/things", endpoint="things", methods=["GET", "POST"])
+    with app.test_request_context("/api/v1/things", method="GET"):
+        yield
+
+
+@pytest.fixture
+def session():
+    return mock.MagicMock(_flushing=False)
+
+
+@pytest.fixture
+def healthy_monitor():
+    monitor = mock.MagicMock()
+    monitor.is_healthy.return_value = True
+    return monitor
+
+
+@pytest.fixture
+def select_clause():
+    return sa.select([sa.literal_column("1")])
+
+
+def enable():
+    with mock.patch(
+        "storage.read_routing.feature_flags.bool_variation", return_value=True
+    ):
+        read_routing.enable_for_request()
+
+
+def test_not_enabled_without_flag(request_context, session, healthy_monitor):
+    with mock.patch(
+        "storage.read_routing.feature_flags.bool_variation", return_value=False
+    ):
+        read_routing.enable_for_request()
+
+    assert not read_routing.should_route_to_replica(
+        session, sa.select([sa.literal_column("1")]), healthy_monitor
+    )
+
+
+def test_reads_go_to_replica(request_context, session, healthy_monitor, select_clause):
+    enable()
+
+    assert read_routing.should_route_to_replica(session, select_clause, healthy_monitor)
+
+
+def test_write_pins_request_to_primary(
+    request_context, session, healthy_monitor, select_clause
+):
+    enable()
+    update = sa.table("thing", sa.column("id")).update().values(id=1)
+
+    assert not read_routing.should_route_to_replica(session, update, healthy_monitor)
+    assert not read_routing.should_route_to_replica(
+        session, select_clause, healthy_monitor
+    )
+
+
+def test_flush_pins_request_to_primary(
+    request_context, session, healthy_monitor, select_clause
+):
+    enable()
+    session._flushing = True
+
+    assert not read_routing.should_route_to_replica(session, None, healthy_monitor)
+    session._flushing = False
+    assert not read_routing.should_route_to_replica(
+        session, select_clause, healthy_monitor
+    )
+
+
+def test_raw_sql_goes_to_primary(request_context, session, healthy_monitor):
+    enable()
+
+    assert not read_routing.should_route_to_replica(
+        session, sa.text("select 1"), healthy_monitor
+    )
+
+
+def test_locking_reads_go_to_primary(
+    request_context, session, healthy_monitor, select_clause
+):
+    enable()
+
+    assert not read_routing.is_read(session, None)
+    assert not read_routing.should_route_to_replica(
+        session, select_clause.with_for_update(), healthy_monitor
+    )
+    assert not read_routing.should_route_to_replica(
+        session, select_clause, healthy_monitor
+    )
+
+
+def test_other_binds_are_not_rerouted(request_context, healthy_monitor, select_clause):
+    enable()
+    default_engine, audit_engine = mock.MagicMock(), mock.MagicMock()
+    routing_session = connector.RoutingSession.__new__(connector.RoutingSession)
+    routing_session._name = None
+    routing_session._flushing = False
+    routing_session.bind = default_engine
+    routing_session.db = mock.MagicMock(
+        is_from_olap_replica=False,
+        is_from_app_replica=False,
+        app_replica_lag_monitor=healthy_monitor,
+    )
+
+    with mock.patch.object(
+        connector.SignallingSession, "get_bind", return_value=audit_engine
+    ):
+        assert routing_session.get_bind(clause=select_clause) is audit_engine
+    with mock.patch.object(
+        connector.SignallingSession, "get_bind", return_value=default_engine
+    ):
+        assert routing_session.get_bind(clause=select_clause) is (
+            routing_session.db.get_engine.return_value
+        )
+    routing_session.db.get_engine.assert_called_once_with(
+        bind=connector.APP_REPLICA_BIND_KEY
+    )
+
+
+def test_lagging_replica_falls_back_to_primary(request_context, session, select_clause):
+    enable()
+    monitor = mock.MagicMock()
+    monitor.is_healthy.return_value = False
+
+    assert not read_routing.should_route_to_replica(session, select_clause, monitor)
+
+
+class TestReplicaLagMonitor:
+    def test_lag_under_threshold_is_healthy(self):
+        monitor = read_routing.ReplicaLagMonitor(
+            db=mock.MagicMock(), bind_key="app_replica", threshold_seconds=2
+        )
+        with mock.patch.object(monitor, "_measure_lag", return_value=1.0):
+            assert monitor.is_healthy()
+
+    def test_unknown_lag_is_unhealthy(self):
+        monitor = read_routing.ReplicaLagMonitor(
+            db=mock.MagicMock(), bind_key="app_replica", threshold_seconds=2
+        )
+        with mock.patch.object(monitor, "_measure_lag", return_value=None):
+            assert not monitor.is_healthy()
+
+    def test_missing_replication_privilege_is_unknown_lag(self):
+        db = mock.MagicMock()
+        connection = db.get_engine.return_value.connect.return_value.__enter__
+        connection.return_value.execute.side_effect = sa.exc.OperationalError(
+            "SHOW SLAVE STATUS",
+            {},
+            Exception(
+                read_routing.ER_SPECIFIC_ACCESS_DENIED_ERROR,
+                "Access denied; you need (at least one of) the SUPER, REPLICATION "
+                "CLIENT privilege(s) for this operation",
+            ),
+        )
+        monitor = read_routing.ReplicaLagMonitor(
+            db=db, bind_key="app_replica", threshold_seconds=2
+        )
+
+        with mock.patch("storage.read_routing.stats") as mock_stats:
+            assert monitor.lag_seconds() is None
+        assert not monitor.is_healthy()
+
+        mock_stats.increment.assert_called_once_with(
+            metric_name="api.storage.read_routing.replica_lag_unknown",
+            pod_name=mock.ANY,
+            tags=["bind_key:app_replica", "reason:access_denied"],
+        )
+
+    def test_lag_is_measured_once_per_interval(self):
+        monitor = read_routing.ReplicaLagMonitor(
+            db=mock.MagicMock(),
+            bind_key="app_replica",
+            threshold_seconds=2,
+            check_interval_seconds=60,
+        )
+        with mock.patch.object(
+            monitor, "_measure_lag", return_value=3.0
+        ) as measure_lag:
+            assert not monitor.is_healthy()
+            assert not monitor.is_healthy()
+
+        measure_lag.assert_called_once()
@@ -0,0 +1,213 @@
+"""
+Per-request and per-job query instrumentation.
+
+Every statement executed while a scope is being tracked is counted against it, along
+with the rows it returned or affected and the time spent in the database. Statements
+are fingerprinted (literals and IN-lists collapsed) so that the same statement issued
+over and over in a loop, the classic N+1 pattern, is reported with the call site that
+issued it.
+
+Scopes are opened for every Flask request (tagged by endpoint) and every RQ job (tagged
+by task name), and reported to Datadog when they finish. Tests can use the same
+machinery to assert a query budget, see the `query_budget` pytest fixture.
+
+Usage:
+    with query_budget.track("my_report", kind="script") as stats:
+        build_report()
+    log.info("report queries", queries=stats.query_count)
+"""
+from __future__ import annotations
+
+import dataclasses
+import os
+import re
+import threading
+import time
+import traceback
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.engine.interfaces import ExecutionContext
+
+from common import stats
+from utils.log import logger
+
+log = logger(__name__)
+
+METRIC_PREFIX = "api.storage.query_budget"
+QUERY_BUDGET_ENABLED = os.environ.get("QUERY_BUDGET_ENABLED", "true").lower() == "true"
+# A statement repeated this many times within one scope is reported as an N+1.
+N_PLUS_ONE_THRESHOLD = int(os.environ.get("QUERY_BUDGET_N_PLUS_ONE_THRESHOLD", 10))
+CALL_SITE_DEPTH = 3
+
+# Set on the execution context, so a statement that fails leaves nothing behind.
+_START_TIME_ATTR = "_query_budget_start_time"
+_local = threading.local()
+
+_WHITESPACE = re.compile(r"\s+")
+_IN_LIST = re.compile(r"\bIN\s*\((?:[^()]|\([^()]*\))*\)", re.IGNORECASE)
+_STRING_LITERAL = re.compile(r"'(?:[^'\\]|\\.)*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDERS = re.compile(r"%\(\w+\)s|%s|\?")
+
+
+def fingerprint(statement: str) -> str:
+    """Normalize a statement so that executions differing only in parameters match."""
+    normalized = _WHITESPACE.sub(" ", statement).strip()
+    normalized = _IN_LIST.sub("IN (...)", normalized)
+    normalized = _STRING_LITERAL.sub("?", normalized)
+    normalized = _NUMBER_LITERAL.sub("?", normalized)
+    return _PLACEHOLDERS.sub("?", normalized)
+
+
+@dataclasses.dataclass
+class RepeatedStatement:
+    fingerprint: str
+    count: int
+    call_site: Optional[str]
+
+
+@dataclasses.dataclass
+class QueryStats:
+    name: str
+    kind: str
+    query_count: int = 0
+    row_count: int = 0
+    db_time_ms: float = 0
+    fingerprints: Counter = dataclasses.field(default_factory=Counter)
+    call_sites: Dict[str, str] = dataclasses.field(default_factory=dict)
+
+    def record(self, statement: str, rows: int, elapsed_ms: float) -> None:
+        self.query_count += 1
+        self.row_count += max(rows, 0)
+        self.db_time_ms += elapsed_ms
+
+        key = fingerprint(statement)
+        self.fingerprints[key] += 1
+        # Only walk the stack once a statement starts repeating; by then the caller is
+        # almost certainly the loop issuing it.
+        if (
+            self.fingerprints[key] == N_PLUS_ONE_THRESHOLD
+            and key not in self.call_sites
+        ):
+            self.call_sites[key] = _call_site()
+
+    def repeated_statements(
+        self, threshold: int = N_PLUS_ONE_THRESHOLD
+    ) -> List[RepeatedStatement]:
+        return [
+            RepeatedStatement(
+                fingerprint=key, count=count, call_site=self.call_sites.get(key)
+            )
+            for key, count in self.fingerprints.most_common()
+            if count >= threshold
+        ]
+
+    def report(self, pod_name: stats.PodNames = stats.PodNames.CORE_SERVICES) -> None:
+        tags = [f"{self.kind}:{self.name}"]
+        for metric_suffix, value in (
+            ("queries", self.query_count),
+            ("rows", self.row_count),
+            ("db_time_ms", self.db_time_ms),
+        ):
+            stats.histogram(
+                metric_name=f"{METRIC_PREFIX}.{metric_suffix}",
+                pod_name=pod_name,
+                metric_value=value,
+                tags=tags,
+            )
+
+        for repeated in self.repeated_statements():
+            stats.increment(
+                metric_name=f"{METRIC_PREFIX}.n_plus_one",
+                pod_name=pod_name,
+                tags=tags,
+            )
+            log.warning(
+                "Repeated query detected",
+                scope_kind=self.kind,
+                scope_name=self.name,
+                count=repeated.count,
+                statement=repeated.fingerprint,
+                call_site=repeated.call_site,
+            )
+
+
+def _active_scopes() -> List[QueryStats]:
+    scopes = getattr(_local, "scopes", None)
+    if scopes is None:
+        scopes = _local.scopes = []
+    return scopes
+
+
+def start(name: str, kind: str) -> QueryStats:
+    """Start counting queries issued by the current thread against a new scope."""
+    query_stats = QueryStats(name=name, kind=kind)
+    _active_scopes().append(query_stats)
+    return query_stats
+
+
+def stop(query_stats: QueryStats, report: bool = True) -> QueryStats:
+    """Stop counting queries against a scope and optionally export its metrics."""
+    scopes = _active_scopes()
+    if query_stats in scopes:
+        scopes.remove(query_stats)
+    if report and QUERY_BUDGET_ENABLED:
+        try:
+            query_stats.report()
+        except Exception as e:
+            log.warning("Failed to report query budget", error=str(e))
+    return query_stats
+
+
+@contextmanager
+def track(name: str, kind: str, report: bool = True) -> Iterator[QueryStats]:
+    query_stats = start(name=name, kind=kind)
+    try:
+        yield query_stats
+    finally:
+        stop(query_stats, report=report)
+
+
+def _call_site() -> str:
+    frames = [
+        frame
+        for frame in traceback.extract_stack()
+        if "site-packages" not in frame.filename and frame.filename != __file__
+    ]
+    return " <- ".join(
+        f"{frame.filename}:{frame.lineno} in {frame.name}"
+        for frame in reversed(frames[-CALL_SITE_DEPTH:])
+    )
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):  # type: ignore[no-untyped-def] # Function is missing a type annotation
+    if context is not None and getattr(_local, "scopes", None):
+        setattr(context, _START_TIME_ATTR, time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):  # type: ignore[no-untyped-def] # Function is missing a type annotation
+    _record(context, statement, rows=cursor.rowcount)
+
+
+@event.listens_for(Engine, "handle_error")
+def handle_error(exception_context):  # type: ignore[no-untyped-def] # Function is missing a type annotation
+    # failed statements still spent time in the database
+    _record(exception_context.execution_context, exception_context.statement, rows=0)
+
+
+def _record(
+    context: Optional[ExecutionContext], statement: Optional[str], rows: int
+) -> None:
+    start_time = getattr(context, _START_TIME_ATTR, None)
+    if start_time is None or statement is None:
+        return
+    delattr(context, _START_TIME_ATTR)
+    elapsed_ms = (time.perf_counter() - start_time) * 1000
+    for query_stats in getattr(_local, "scopes", None) or ():
+        query_stats.record(statement, rows=rows, elapsed_ms=elapsed_ms)
@@ -0,0 +1,203 @@
+"""
+Automatic routing of read-only request queries to the app replica.
+
+When enabled for a request, every SELECT issued by the request's session against
+the default database goes to the app replica, unless:
+    * the request already wrote (the session is pinned to the primary for the rest
+      of the request, so the request reads its own writes), or
+    * it locks the rows it reads (SELECT ... FOR UPDATE), or
+    * the app replica lags behind the primary by more than the configured threshold,
+      or the lag can't be measured.
+
+Routing is only turned on for GET requests whose endpoint is enabled by the
+AUTO_REPLICA_ROUTING_FLAG feature flag, so it can be rolled out one endpoint at a time.
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from typing import TYPE_CHECKING, Optional
+
+import flask
+from maven import feature_flags
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.sql.expression import TextClause, UpdateBase
+
+from common import stats
+from utils.log import logger
+
+if TYPE_CHECKING:
+    from storage.connector import RoutingSQLAlchemy
+
+log = logger(__name__)
+
+AUTO_REPLICA_ROUTING_FLAG = "release-auto-replica-read-routing"
+METRIC_PREFIX = "api.storage.read_routing"
+REPLICA_LAG_THRESHOLD_SECONDS = float(
+    os.environ.get("REPLICA_LAG_THRESHOLD_SECONDS", 2)
+)
+REPLICA_LAG_CHECK_INTERVAL_SECONDS = float(
+    os.environ.get("REPLICA_LAG_CHECK_INTERVAL_SECONDS", 5)
+)
+
+# MySQL error raised by SHOW SLAVE STATUS without the REPLICATION CLIENT privilege
+ER_SPECIFIC_ACCESS_DENIED_ERROR = 1227
+
+_AUTO_ROUTING_ATTR = "auto_replica_routing"
+_PINNED_ATTR = "replica_pinned_to_primary"
+
+
+class ReplicaLagMonitor:
+    """Tracks replication lag of a replica, measuring it at most once per check interval per process."""
+
+    def __init__(
+        self,
+        db: RoutingSQLAlchemy,
+        bind_key: str,
+        threshold_seconds: float = REPLICA_LAG_THRESHOLD_SECONDS,
+        check_interval_seconds: float = REPLICA_LAG_CHECK_INTERVAL_SECONDS,
+    ):
+        self.db = db
+        self.bind_key = bind_key
+        self.threshold_seconds = threshold_seconds
+        self.check_interval_seconds = check_interval_seconds
+        self._lag_seconds: Optional[float] = None
+        self._checked_at: float = 0
+        self._lock = threading.Lock()
+
+    def is_healthy(self) -> bool:
+        lag = self.lag_seconds()
+        return lag is not None and lag <= self.threshold_seconds
+
+    def lag_seconds(self) -> Optional[float]:
+        now = time.monotonic()
+        if now - self._checked_at >= self.check_interval_seconds:
+            # Only one thread measures; the others keep using the last value.
+            if self._lock.acquire(blocking=False):
+                try:
+                    self._lag_seconds = self._measure_lag()
+                    self._checked_at = time.monotonic()
+                finally:
+                    self._lock.release()
+        return self._lag_seconds
+
+    def _measure_lag(self) -> Optional[float]:
+        try:
+            with self.db.get_engine(bind=self.bind_key).connect() as conn:
+                status = conn.execute("SHOW SLAVE STATUS").first()
+        except Exception as e:
+            if (
+                isinstance(e, OperationalError)
+                and _mysql_error_code(e) == ER_SPECIFIC_ACCESS_DENIED_ERROR
+            ):
+                # Without the REPLICATION CLIENT privilege the lag is unknown, which
+                # keeps reads on the primary rather than assuming the replica is current.
+                log.error(
+                    "Missing privilege to measure replica lag",
+                    bind_key=self.bind_key,
+                    error=str(e),
+                )
+                reason = "access_denied"
+            else:
+                log.warning(
+                    "Unable to measure replica lag",
+                    bind_key=self.bind_key,
+                    error=str(e),
+                )
+                reason = "error"
+            stats.increment(
+                metric_name=f"{METRIC_PREFIX}.replica_lag_unknown",
+                pod_name=stats.PodNames.CORE_SERVICES,
+                tags=[f"bind_key:{self.bind_key}", f"reason:{reason}"],
+            )
+            return None
+
+        lag = (
+            status["Seconds_Behind_Master"]
+            if status is not None and "Seconds_Behind_Master" in status.keys()
+            else None
+        )
+        if lag is None:
+            # Replication is stopped or the replica is not reporting; treat it as unusable.
+            return None
+        stats.gauge(
+            metric_name=f"{METRIC_PREFIX}.replica_lag_seconds",
+            pod_name=stats.PodNames.CORE_SERVICES,
+            metric_value=lag,
+            tags=[f"bind_key:{self.bind_key}"],
+        )
+        return float(lag)
+
+
+def _mysql_error_code(error: OperationalError) -> Optional[int]:
+    args = getattr(error.orig, "args", None)
+    return args[0] if args and isinstance(args[0], int) else None
+
+
+def enable_for_request() -> None:
+    """Turn on automatic replica routing for the current request if it is eligible."""
+    request = flask.request
+    if request.method != "GET" or request.url_rule is None:
+        return
+    endpoint = request.url_rule.endpoint
+    context = feature_flags.Context.builder("auto_replica_read_routing")
+    context.set("endpoint", endpoint)
+    if feature_flags.bool_variation(
+        AUTO_REPLICA_ROUTING_FLAG, context=context.build(), default=False
+    ):
+        setattr(flask.g, _AUTO_ROUTING_ATTR, True)
+
+
+def is_enabled_for_request() -> bool:
+    return flask.has_app_context() and flask.g.get(_AUTO_ROUTING_ATTR, False)
+
+
+def pin_to_primary() -> None:
+    """Route all remaining queries of the current request to the primary."""
+    if flask.has_app_context() and flask.g.get(_AUTO_ROUTING_ATTR, False):
+        setattr(flask.g, _PINNED_ATTR, True)
+
+
+def is_read(session, clause) -> bool:  # type: ignore[no-untyped-def] # Function is missing a type annotation
+    """Whether a statement is safe to send to a replica."""
+    # Without a statement the caller wants a connection, which it may write with.
+    if clause is None or session._flushing:
+        return False
+    # Locking reads must see, and lock, the rows on the primary.
+    if getattr(clause, "_for_update_arg", None) is not None:
+        return False
+    # Raw SQL may write; only route statements we can tell are reads.
+    if isinstance(clause, (UpdateBase, TextClause)):
+        return False
+    return True
+
+
+def should_route_to_replica(session, clause, lag_monitor: ReplicaLagMonitor) -> bool:  # type: ignore[no-untyped-def] # Function is missing a type annotation
+    if not is_enabled_for_request():
+        return False
+    if not is_read(session, clause):
+        pin_to_primary()
+        return False
+
+    if flask.g.get(_PINNED_ATTR, False):
+        reason = "pinned"
+    elif not lag_monitor.is_healthy():
+        reason = "replica_lag"
+    else:
+        _record_route(target="replica", reason="auto")
+        return True
+    _record_route(target="primary", reason=reason)
+    return False
+
+
+def _record_route(target: str, reason: str) -> None:
+    endpoint = None
+    if flask.has_request_context() and flask.request.url_rule:
+        endpoint = flask.request.url_rule.endpoint
+    stats.increment(
+        metric_name=f"{METRIC_PREFIX}.query",
+        pod_name=stats.PodNames.CORE_SERVICES,
+        tags=[f"target:{target}", f"reason:{reason}", f"endpoint:{endpoint}"],
+        sample_rate=0.1,
+    )
@@ -19,6 +19,7 @@ from models.forum import Post
 from models.images import Image  # noqa: F401
 from models.profiles import Device, MemberProfile
 from models.referrals import ReferralCodeUse  # noqa: F401
+from notification.services.notification_dispatch import NotificationDispatcher
 from storage.connection import db
 from tasks.queues import job, retryable_job
 from utils import braze_events
@@ -52,27 +53,26 @@ def notify_about_new_post(post_id):  # type: ignore[no-untyped-def] # Function i
 
 def _notify_followers(post):  # type: ignore[no-untyped-def] # Function is missing a type annotation
     log.debug("Notifying followers for %s", post)
+    dispatcher = NotificationDispatcher(
+        kind=f"forum_follower_reply:{post.parent.id}",
+        pod_name=stats.PodNames.COCOPOD,
+    )
     for bookmarker in post.bookmarks:
-        application_name, device_ids = _devices_for_forum_user(bookmarker)
-
-        if device_ids:
-            try:
-                apns_send_bulk_message(
-                    device_ids,
-                    "There is a new reply to a post you follow!",
-                    sound="default",
-                    extra={"link": forum_deeplink(post.parent.id)},
-                    application_name=application_name,
-                )
-                log.debug("All set - sent notification!")
-            except Exception as e:
-                log.warning(
-                    "Problem sending notification via APNS to %s. Error: %s",
-                    device_ids,
-                    e,
-                )
-        else:
-            log.debug("No devices to notify for %s following: %s", bookmarker, post)
+        dispatcher.add_push(
+            user_id=bookmarker.id,
+            alert="There is a new reply to a post you follow!",
+            sound="default",
+            extra={"link": forum_deeplink(post.parent.id)},
+            message_id=str(post.id),
+        )
+    try:
+        dispatcher.flush()
+    except Exception as e:
+        log.warning(
+            "Problem sending follower notifications via APNS for %s. Error: %s",
+            post,
+            e,
+        )
     log.debug("Notified all followers for %s", post)
 
 
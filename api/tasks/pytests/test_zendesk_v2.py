@@ -18,6 +18,8 @@ from messaging.schemas.zendesk import (
 )
 from messaging.services.zendesk_client import (
     _FALLBACK_UPDATED_TICKET_SEARCH_LOOKBACK_SECONDS,
+    ZendeskCommentEvent,
+    ZendeskCommentExport,
 )
 from models.verticals_and_specialties import CX_VERTICAL_NAME
 from tasks.zendesk_v2 import (
@@ -31,6 +33,8 @@ from tasks.zendesk_v2 import (
     get_corresponding_channel_from_tags,
     get_member,
     get_message_this_in_reply_to,
+    get_processed_zendesk_comment_ids,
+    get_reconciliation_cursor,
     is_wallet_response,
     process_credits_after_message_receive,
     process_inbound_member_message,
@@ -38,10 +42,12 @@ from tasks.zendesk_v2 import (
     process_updated_zendesk_ticket_id,
     process_zendesk_comment,
     process_zendesk_inbound_message_worker,
+    process_zendesk_ticket_inbound_messages,
     process_zendesk_webhook,
     public_comments_for_ticket,
     public_comments_for_ticket_id,
     reconcile_zendesk_messages,
+    reconcile_zendesk_messages_incremental,
     record_successful_processing_of_inbound_zendesk_message,
     recover_zendesk_user_id,
     route_and_handle_inbound_message,
@@ -53,7 +59,7 @@ from tasks.zendesk_v2 import (
     ticket_with_id,
     zendesk_comment_processing_job_lock,
 )
-from utils.flag_groups import CARE_DELIVERY_RELEASE
+from utils.flag_groups import CARE_DELIVERY_RELEASE, ZENDESK_V2_RECONCILIATION_RELEASE
 
 
 class ZDTestMessageSchema(ZendeskInboundMessageSchema):
@@ -1668,3 +1674,187 @@ def test_recover_zendesk_user_id_sets_zendesk_user_id(
 
     # no change to the member
     assert member.zendesk_user_id == 456
+
+
+def _comment_event(comment_id, ticket_id=1, public=True, via_channel="web"):
+    return ZendeskCommentEvent(
+        ticket_id=ticket_id,
+        comment_id=comment_id,
+        author_id=20,
+        body=f"comment {comment_id}",
+        public=public,
+        via_channel=via_channel,
+        timestamp=1700000000,
+    )
+
+
+def _exported_ticket(ticket_id, tags=("cx_messaging",), status="open"):
+    return {
+        "id": ticket_id,
+        "requester_id": 10,
+        "tags": list(tags),
+        "status": status,
+        "via": {"channel": "web"},
+    }
+
+
+@pytest.fixture
+def incremental_reconciliation(ff_test_data):
+    for flag in (
+        CARE_DELIVERY_RELEASE.ENABLE_ZENDESK_V2_RECONCILIATION_JOB,
+        CARE_DELIVERY_RELEASE.ENABLE_ZENDESK_V2_RECONCILIATION_OF_TICKET,
+        CARE_DELIVERY_RELEASE.ENABLE_ZENDESK_V2_RECONCILIATION_OF_COMMENT,
+        ZENDESK_V2_RECONCILIATION_RELEASE.INCREMENTAL_EXPORT,
+    ):
+        ff_test_data.update(ff_test_data.flag(flag).variation_for_all(True))
+
+    with mock.patch("tasks.zendesk_v2.zenpy_client") as mock_zenpy_client, mock.patch(
+        "tasks.zendesk_v2.redis_client"
+    ) as mock_redis_client, mock.patch(
+        "tasks.zendesk_v2.process_zendesk_ticket_inbound_messages"
+    ) as mock_process_ticket:
+        mock_redis_client.return_value.get.return_value = None
+        mock_zenpy_client.show_many_tickets.return_value = (
+            [_exported_ticket(1), _exported_ticket(2)],
+            {
+                10: {"id": 10, "email": "member@maven.com"},
+                20: {"id": 20, "email": "ca@maven.com"},
+            },
+        )
+        mock_zenpy_client.show_many_users.return_value = {}
+        yield mock_zenpy_client, mock_redis_client.return_value, mock_process_ticket
+
+
+def test_reconcile_zendesk_messages_uses_incremental_export(
+    incremental_reconciliation,
+):
+    mock_zenpy_client, _, _ = incremental_reconciliation
+    mock_zenpy_client.get_comment_events.return_value = ZendeskCommentExport(
+        comments=[], end_time=1700000000, end_of_stream=True
+    )
+
+    reconcile_zendesk_messages()
+
+    mock_zenpy_client.get_comment_events.assert_called_once()
+    mock_zenpy_client.find_updated_ticket_ids.assert_not_called()
+
+
+def test_reconcile_zendesk_messages_incremental(incremental_reconciliation, factories):
+    mock_zenpy_client, mock_redis, mock_process_ticket = incremental_reconciliation
+    factories.MessageFactory.create(zendesk_comment_id=101)
+    mock_zenpy_client.get_comment_events.return_value = ZendeskCommentExport(
+        comments=[
+            # already processed
+            _comment_event(101),
+            _comment_event(102),
+            # exported twice
+            _comment_event(102),
+            _comment_event(103, public=False),
+            _comment_event(104, via_channel="api"),
+            _comment_event(201, ticket_id=2),
+            _comment_event(202, ticket_id=2),
+        ],
+        end_time=1700000100,
+        end_of_stream=True,
+    )
+
+    reconcile_zendesk_messages_incremental()
+
+    mock_zenpy_client.show_many_tickets.assert_called_once_with([1, 2])
+    mock_zenpy_client.show_many_users.assert_not_called()
+    scheduled = [c.args[0] for c in mock_process_ticket.delay.call_args_list]
+    assert [[m.comment_id for m in messages] for messages in scheduled] == [
+        [102],
+        [201, 202],
+    ]
+    assert scheduled[0][0] == ZendeskInboundMessageSchema(
+        comment_id=102,
+        message_body="comment 102",
+        maven_user_email="member@maven.com",
+        comment_author_email="ca@maven.com",
+        zendesk_user_id=10,
+        tags=["cx_messaging"],
+        source=ZendeskInboundMessageSource.TICKET,
+    )
+    assert mock_redis.set.call_args[0][:2] == (
+        "zendesk_v2:reconciliation:ticket_events_cursor",
+        1700000100,
+    )
+
+
+def test_reconcile_zendesk_messages_incremental_skips_other_tickets(
+    incremental_reconciliation,
+):
+    mock_zenpy_client, _, mock_process_ticket = incremental_reconciliation
+    mock_zenpy_client.get_comment_events.return_value = ZendeskCommentExport(
+        comments=[_comment_event(101), _comment_event(201, ticket_id=2)],
+        end_time=1700000100,
+        end_of_stream=True,
+    )
+    mock_zenpy_client.show_many_tickets.return_value = (
+        [_exported_ticket(1, tags=()), _exported_ticket(2, status="closed")],
+        {},
+    )
+
+    reconcile_zendesk_messages_incremental()
+
+    mock_process_ticket.delay.assert_not_called()
+
+
+def test_reconcile_zendesk_messages_incremental_keeps_cursor_on_scheduling_error(
+    incremental_reconciliation,
+):
+    mock_zenpy_client, mock_redis, mock_process_ticket = incremental_reconciliation
+    mock_zenpy_client.get_comment_events.return_value = ZendeskCommentExport(
+        comments=[_comment_event(101), _comment_event(201, ticket_id=2)],
+        end_time=1700000100,
+        end_of_stream=True,
+    )
+    mock_process_ticket.delay.side_effect = Exception("ay yi yi")
+
+    reconcile_zendesk_messages_incremental()
+
+    # every ticket is still attempted
+    assert mock_process_ticket.delay.call_count == 2
+    mock_redis.set.assert_not_called()
+
+
+@mock.patch("tasks.zendesk_v2.redis_client")
+def test_get_reconciliation_cursor(mock_redis_client):
+    cursor = int(datetime.utcnow().timestamp()) - 60
+    mock_redis_client.return_value.get.return_value = str(cursor).encode()
+
+    assert get_reconciliation_cursor() == cursor
+
+
+@mock.patch("tasks.zendesk_v2.redis_client")
+def test_get_reconciliation_cursor_beyond_runaway_guard(mock_redis_client):
+    mock_redis_client.return_value.get.return_value = b"1000"
+
+    start_time = get_reconciliation_cursor()
+
+    expected = (
+        datetime.utcnow().timestamp() - _FALLBACK_UPDATED_TICKET_SEARCH_LOOKBACK_SECONDS
+    )
+    assert start_time == pytest.approx(expected, abs=5)
+
+
+def test_get_processed_zendesk_comment_ids(factories):
+    factories.MessageFactory.create(zendesk_comment_id=101)
+    factories.MessageFactory.create(zendesk_comment_id=102)
+
+    assert get_processed_zendesk_comment_ids([101, 103, 101]) == {101}
+    assert get_processed_zendesk_comment_ids([]) == set()
+
+
+@mock.patch("tasks.zendesk_v2.process_zendesk_inbound_message_worker")
+def test_process_zendesk_ticket_inbound_messages_attempts_every_comment(
+    mock_worker,
+):
+    messages = [ZDTestMessageSchema(comment_id=1), ZDTestMessageSchema(comment_id=2)]
+    mock_worker.side_effect = [LockTimeout("locked"), None]
+
+    with pytest.raises(Exception):
+        process_zendesk_ticket_inbound_messages(messages)
+
+    assert mock_worker.call_count == 2
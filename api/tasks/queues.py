@@ -17,6 +17,7 @@ from sqlalchemy import create_engine
 import configuration
 from app import create_app
 from common import stats
+from storage import query_budget
 from tasks.job_callbacks import (
     get_job_func_name,
     on_failure_callback_wrapper,
@@ -303,7 +304,7 @@ class MavenWorker(Worker):
                     # this metric is mostly to show the trend
                     # sampling to reduce costs
                     sample_rate=_DEFAULT_REDUCED_SAMPLE_RATE,
-                ):
+                ), query_budget.track(name=job_func_name, kind="task_name"):
                     return super().perform_job(_job, queue)
         except Exception as e:
             logger.error(  # type: ignore[attr-defined] # "Callable[[str, KwArg(Any)], Any]" has no attribute "error"
@@ -322,6 +323,8 @@ class MavenWorker(Worker):
             raise e
         finally:
             feature_flags.close()
+            # the work horse leaves with os._exit, skipping the flush at exit
+            stats.flush()
 
 
 def get_job_tracking_id(rq_job: Job):  # type: ignore[no-untyped-def] # Function is missing a return type annotation
@@ -695,6 +698,8 @@ _queues = {
     "default": get_queue(),
     "priority": get_queue("priority"),
     "high_mem": get_queue("high_mem"),
+    # long-running appointment reminder dispatcher, consumed by its own workers
+    "reminders": get_queue("reminders"),
     # this should be used for ad hoc jobs and not for routine or recurring work
     "ad_hoc": get_queue("ad_hoc"),
 }
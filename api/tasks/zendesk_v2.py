@@ -1,11 +1,13 @@
 from __future__ import annotations
 
+import collections
 import contextlib
 import dataclasses
 import enum
 import json
+import time
 from datetime import datetime, timedelta
-from typing import Generator
+from typing import Generator, Iterable
 
 import maven.feature_flags as feature_flags
 from redset.locks import LockTimeout
@@ -20,6 +22,7 @@ from messaging.schemas.zendesk import (
     ZendeskInboundMessageSchema,
     ZendeskInboundMessageSource,
     ZendeskWebhookSchema,
+    comment_event_to_zendesk_inbound_message_schema,
     ticket_to_zendesk_inbound_message_schema,
     webhook_to_zendesk_inbound_message_schema,
 )
@@ -30,8 +33,10 @@ from messaging.services.zendesk import (
     zenpy_client,
 )
 from messaging.services.zendesk_client import (
+    ZendeskCommentEvent,
     ZendeskTicketId,
     get_updated_ticket_search_default_lookback_seconds,
+    get_updated_ticket_search_runaway_guard_seconds,
 )
 from models.profiles import PractitionerProfile
 from storage.connection import db
@@ -48,7 +53,11 @@ from utils.constants import (
     ZENDESK_MESSAGE_PROCESSING_UNKNOWN_AUTHOR,
     ZENDESK_TICKET_PROCESSING_ERROR,
 )
-from utils.flag_groups import CARE_DELIVERY_RELEASE, ZENDESK_CONFIGURATION
+from utils.flag_groups import (
+    CARE_DELIVERY_RELEASE,
+    ZENDESK_CONFIGURATION,
+    ZENDESK_V2_RECONCILIATION_RELEASE,
+)
 from utils.log import LogLevel, generate_user_trace_log, logger
 from utils.mail import PRACTITIONER_SUPPORT_EMAIL, alert_admin
 from utils.service_owner_mapper import service_ns_team_mapper
@@ -72,6 +81,12 @@ EXCLUDE_TICKET_IDS_FROM_RECONCILIATION: list[ZendeskTicketId] = [
 # is equal to lookback window/reconciliation period
 ZENDESK_INBOUND_MESSAGE_RECONCILIATION_JOB_RETRY_LIMIT = 2
 
+# Epoch seconds the incremental reconciliation resumes the ticket event export from
+ZENDESK_RECONCILIATION_CURSOR_KEY = "zendesk_v2:reconciliation:ticket_events_cursor"
+ZENDESK_RECONCILIATION_CURSOR_TTL = timedelta(days=7)
+# The number of comment ids checked against the database per query
+PROCESSED_COMMENT_ID_QUERY_SIZE = 1000
+
 
 class ZendeskMessageType(str, enum.Enum):
     WALLET = "wallet"
@@ -639,15 +654,25 @@ def should_process_reconciliation_comment(
 
     # for all comments that fall within the processing window leaverage the
     # feature flag controls to determine if we should do this work.
+    return is_comment_reconciliation_enabled(
+        comment_id=comment.id,
+        ticket_id=parent_ticket.id,
+    )
+
+
+def is_comment_reconciliation_enabled(
+    comment_id: int,
+    ticket_id: ZendeskTicketId,
+) -> bool:
     return feature_flags.bool_variation(
         CARE_DELIVERY_RELEASE.ENABLE_ZENDESK_V2_RECONCILIATION_OF_COMMENT,
         context=(
             feature_flags.Context.builder(
-                f"reconciliation_exclude_comment_id_{comment.id}",
+                f"reconciliation_exclude_comment_id_{comment_id}",
             )
             .kind("reconciliation_exclusion")
-            .set("zendesk_ticket_id", parent_ticket.id)
-            .set("zendesk_comment_id", comment.id)
+            .set("zendesk_ticket_id", ticket_id)
+            .set("zendesk_comment_id", comment_id)
             .build()
         ),
         # default to excluding all comments to prevent any processing until the
@@ -684,6 +709,9 @@ def reconcile_zendesk_messages() -> None:
         log.info("feature flag has disabled zendesk v2 reconciliation job")
         return None  # job will not be retried
 
+    if should_use_incremental_reconciliation():
+        return reconcile_zendesk_messages_incremental()
+
     # without passing from/to we will get the default window
     updated_tickets = zenpy_client.find_updated_ticket_ids()
     log.info(
@@ -703,6 +731,231 @@ def reconcile_zendesk_messages() -> None:
             continue  # being explicit with our intent to continue processing
 
 
+def should_use_incremental_reconciliation() -> bool:
+    """
+    Returns True if reconciliation should resume the incremental ticket event
+    export instead of searching the lookback window for updated tickets.
+    """
+    return feature_flags.bool_variation(
+        ZENDESK_V2_RECONCILIATION_RELEASE.INCREMENTAL_EXPORT,
+        default=False,
+    )
+
+
+def get_reconciliation_cursor() -> int:
+    """
+    Returns the epoch seconds to resume the incremental reconciliation from.
+    Without a cursor, or with one older than the runaway guard, reconciliation
+    starts over from the default lookback window.
+    """
+    now = int(time.time())
+    try:
+        cursor = int(redis_client().get(ZENDESK_RECONCILIATION_CURSOR_KEY) or 0)
+    except Exception as e:
+        log.warning("Failed to read the Zendesk reconciliation cursor", exception=e)
+        cursor = 0
+
+    if cursor < now - get_updated_ticket_search_runaway_guard_seconds():
+        if cursor:
+            log.warning(
+                "Zendesk reconciliation cursor is beyond the runaway guard",
+                cursor=cursor,
+            )
+        return now - get_updated_ticket_search_default_lookback_seconds()
+    return cursor
+
+
+def save_reconciliation_cursor(cursor: int) -> None:
+    try:
+        redis_client().set(
+            ZENDESK_RECONCILIATION_CURSOR_KEY,
+            cursor,
+            ex=ZENDESK_RECONCILIATION_CURSOR_TTL,
+        )
+    except Exception as e:
+        log.warning("Failed to save the Zendesk reconciliation cursor", exception=e)
+
+
+def get_processed_zendesk_comment_ids(comment_ids: Iterable[int]) -> set[int]:
+    """
+    Returns the given Zendesk comment ids that are found in the database. The
+    bulk version of has_zendesk_comment_id_been_processed.
+    """
+    unique_comment_ids = sorted(set(comment_ids))
+    processed: set[int] = set()
+    for offset in range(0, len(unique_comment_ids), PROCESSED_COMMENT_ID_QUERY_SIZE):
+        chunk = unique_comment_ids[offset : offset + PROCESSED_COMMENT_ID_QUERY_SIZE]
+        rows = (
+            db.session.query(Message.zendesk_comment_id)
+            .filter(Message.zendesk_comment_id.in_(chunk))
+            .all()
+        )
+        processed.update(row.zendesk_comment_id for row in rows)
+    return processed
+
+
+def is_reconcilable_ticket(ticket: dict) -> bool:
+    """
+    Applies the filters of the updated ticket search (see
+    ZendeskClient._ticket_search_helper) to an exported ticket.
+    """
+    return (
+        "cx_messaging" in (ticket.get("tags") or [])
+        and ticket.get("status") != "closed"
+        and (ticket.get("via") or {}).get("channel") != "sunshine_conversations_api"
+    )
+
+
+def _unprocessed_comments_by_ticket(
+    comments: list[ZendeskCommentEvent],
+) -> dict[ZendeskTicketId, list[ZendeskCommentEvent]]:
+    candidates: dict[int, ZendeskCommentEvent] = {}
+    for comment in comments:
+        # the same event may be exported on both sides of a page boundary
+        if comment.comment_id in candidates:
+            continue
+        if not comment.public or comment.via_channel == "api":
+            continue
+        candidates[comment.comment_id] = comment
+
+    processed = get_processed_zendesk_comment_ids(candidates)
+    if processed:
+        stats.increment(
+            metric_name=ZENDESK_MESSAGE_PROCESSING,
+            pod_name=stats.PodNames.VIRTUAL_CARE,
+            metric_value=len(processed),
+            tags=["already_processed:True", "source:incremental_export"],
+        )
+
+    comments_by_ticket: dict[
+        ZendeskTicketId, list[ZendeskCommentEvent]
+    ] = collections.defaultdict(list)
+    for comment_id, comment in candidates.items():
+        if comment_id not in processed:
+            comments_by_ticket[comment.ticket_id].append(comment)
+    return comments_by_ticket
+
+
+def reconcile_zendesk_messages_incremental() -> None:
+    """
+    Reconciles the public comments added since the previous run. Comments are
+    read from the incremental ticket event export, resumed from a cursor
+    checkpointed in redis, instead of loading every recently updated ticket and
+    all of its comments. Comments that were already recorded are dropped with
+    one query per batch of ids, and each ticket with comments left is scheduled
+    as its own job so that independent tickets are processed concurrently.
+    """
+    start_time = get_reconciliation_cursor()
+    export = zenpy_client.get_comment_events(start_time=start_time)
+    comments_by_ticket = _unprocessed_comments_by_ticket(export.comments)
+
+    ticket_ids = [
+        ticket_id
+        for ticket_id in comments_by_ticket
+        if should_include_ticket_id_in_reconciliation(ticket_id)
+    ]
+    tickets, users = zenpy_client.show_many_tickets(ticket_ids)
+    tickets = [ticket for ticket in tickets if is_reconcilable_ticket(ticket)]
+    missing_author_ids = {
+        comment.author_id
+        for ticket in tickets
+        for comment in comments_by_ticket[ticket["id"]]
+        if comment.author_id and comment.author_id not in users
+    }
+    if missing_author_ids:
+        users.update(zenpy_client.show_many_users(sorted(missing_author_ids)))
+
+    log.info(
+        "Retrieved comments from the Zendesk ticket event export",
+        start_time=start_time,
+        end_time=export.end_time,
+        number_of_comments=len(export.comments),
+        number_of_tickets=len(tickets),
+    )
+
+    scheduling_failed = False
+    for ticket in tickets:
+        inbound_messages = []
+        for comment in comments_by_ticket[ticket["id"]]:
+            if not is_comment_reconciliation_enabled(
+                comment_id=comment.comment_id,
+                ticket_id=ticket["id"],
+            ):
+                signal_message_processing_skipped(
+                    reason="should_not_process_reconciliation_comment",
+                    source=ZendeskInboundMessageSource.TICKET,
+                )
+                continue
+            try:
+                inbound_messages.append(
+                    comment_event_to_zendesk_inbound_message_schema(
+                        ticket=ticket,
+                        comment=comment,
+                        users=users,
+                    )
+                )
+            except Exception as e:
+                signal_message_processing_error(
+                    reason="inbound_message_transform",
+                    source=ZendeskInboundMessageSource.TICKET,
+                )
+                log.exception(
+                    "Failed to create inbound message from exported Zendesk comment",
+                    comment_id=comment.comment_id,
+                    ticket_id=ticket["id"],
+                    exception=e,
+                )
+
+        if not inbound_messages:
+            continue
+        try:
+            process_zendesk_ticket_inbound_messages.delay(
+                inbound_messages, team_ns="virtual_care"
+            )
+        except Exception as e:
+            log.error(
+                "Failed to schedule exported Zendesk comments for reconciliation",
+                ticket_id=ticket["id"],
+                error=e,
+            )
+            signal_ticket_processing_error(reason="job_scheduling_error")
+            scheduling_failed = True
+
+    # keep the cursor where it is so the next run exports these comments again
+    if not scheduling_failed:
+        save_reconciliation_cursor(export.end_time)
+
+
+@retryable_job(
+    "default",
+    retry_limit=ZENDESK_INBOUND_MESSAGE_RECONCILIATION_JOB_RETRY_LIMIT,
+)
+def process_zendesk_ticket_inbound_messages(
+    inbound_messages: list[ZendeskInboundMessageSchema] | None = None,
+) -> None:
+    """
+    Processes the comments of a single ticket in the order they were created. A
+    failed comment does not stop the ones after it, the job is retried once all
+    were attempted and the comments processed by then are skipped.
+    """
+    failed = False
+    for inbound_message in inbound_messages or []:
+        try:
+            process_zendesk_inbound_message_worker(inbound_message)
+        except Exception as e:
+            log.exception(
+                "Failed to process Zendesk comment",
+                comment_id=inbound_message.comment_id,
+                exception=e,
+            )
+            signal_message_processing_error(
+                reason="unexpected_exception", source=ZendeskInboundMessageSource.TICKET
+            )
+            failed = True
+    if failed:
+        raise Exception("Failed to process Zendesk comments")  # job will be retried
+
+
 @job("default")
 def update_message_attrs(user_id):  # type: ignore[no-untyped-def] # Function is missing a type annotation
     user = get_user(user_id=user_id)
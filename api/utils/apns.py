@@ -54,6 +54,8 @@ def apns_send_message_object(message, application_name):  # type: ignore[no-unty
         srv = _get_apns_service_connection(application_name)
         return srv.send(message)
     except Exception as e:
+        # Drop the cached service so the next send reconnects.
+        _apns_services_created_at.pop(application_name, None)
         log.warning(
             "Problem sending notification via APNS for %s. Error: %s. Application_name: %s",
             message,
@@ -62,17 +64,37 @@ def apns_send_message_object(message, application_name):  # type: ignore[no-unty
         )
 
 
+# APNs services reused by every send of this worker process, keyed by application name.
+_apns_services = {}
+_apns_services_pid = None
+_apns_services_created_at = {}
+APNS_CONNECTION_MAX_AGE = datetime.timedelta(minutes=60)
+
+
 def _get_apns_service_connection(application_name):  # type: ignore[no-untyped-def] # Function is missing a type annotation
-    # Expunge connections older than an hour from the pool
-    delta = datetime.timedelta(minutes=60)
+    global _apns_services_pid
+
+    # Connections must not be shared across forked workers.
+    if _apns_services_pid != os.getpid():
+        _apns_services.clear()
+        _apns_services_created_at.clear()
+        _apns_services_pid = os.getpid()
+
+    now = datetime.datetime.utcnow()
+    created_at = _apns_services_created_at.get(application_name)
+    if created_at and now - created_at < APNS_CONNECTION_MAX_AGE:
+        return _apns_services[application_name]
 
     cert_file = CERTIFICATES.get(application_name)
     log.debug("send - cert_file: %s", cert_file)
 
-    session.outdate(delta)
+    # Expunge connections older than an hour from the pool
+    session.outdate(APNS_CONNECTION_MAX_AGE)
     con = session.get_connection("push_production", cert_file=cert_file)
 
-    return APNs(con)
+    _apns_services[application_name] = APNs(con)
+    _apns_services_created_at[application_name] = now
+    return _apns_services[application_name]
 
 
 def apns_fetch_inactive_ids(application_name):  # type: ignore[no-untyped-def] # Function is missing a type annotation
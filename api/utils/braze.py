@@ -316,9 +316,10 @@ def delete_practitioners(
 
 
 def bulk_track_users(users: list[User]) -> None:
-    braze_client = client.BrazeClient()
-    braze_user_attributes = [build_user_attrs(u) for u in users]
-    braze_client.track_users(user_attributes=braze_user_attributes)
+    from utils.braze_sync import BrazeBulkSync  # avoid circular import
+
+    # batched, rate limited and skipping users whose attributes Braze already has
+    BrazeBulkSync().sync_users(users)
 
 
 def braze_fertility_clinic_user_attributes(user: User) -> client.BrazeUserAttributes:
@@ -346,10 +347,64 @@ def braze_fertility_clinic_user_attributes(user: User) -> client.BrazeUserAttrib
     return client.BrazeUserAttributes(external_id=user.esp_id, attributes=attrs)
 
 
+@dataclass(frozen=True)
+class BrazeUserPreload:
+    """
+    The parts of a user's Braze attributes that would otherwise take a query per user,
+    loaded for many users at once by load_braze_user_preloads.
+    """
+
+    is_fertility_clinic_user: bool = False
+    # Ordered by scheduled_start
+    appointments: tuple[Appointment, ...] = ()
+    last_member_message_to_ca_at: datetime.datetime | None = None
+    last_ca_message_to_member_at: datetime.datetime | None = None
+
+
+def load_braze_user_preloads(user_ids: Collection[int]) -> dict[int, BrazeUserPreload]:
+    if not user_ids:
+        return {}
+
+    fertility_clinic_user_ids = {
+        row.user_id
+        for row in db.session.query(FertilityClinicUserProfile.user_id).filter(
+            FertilityClinicUserProfile.user_id.in_(user_ids)
+        )
+    }
+    appointments: dict[int, list[Appointment]] = {user_id: [] for user_id in user_ids}
+    for appointment, user_id in (
+        db.session.query(Appointment, Schedule.user_id)
+        .options(joinedload(Appointment.product).joinedload(Product.vertical))
+        .join(Schedule)
+        .filter(Schedule.user_id.in_(user_ids))
+        .order_by(Appointment.scheduled_start.asc())
+    ):
+        appointments[user_id].append(appointment)
+    last_member_messages_to_ca = Message.last_member_messages_to_ca(user_ids)
+    last_ca_messages_to_member = Message.last_ca_message_to_members(user_ids)
+
+    return {
+        user_id: BrazeUserPreload(
+            is_fertility_clinic_user=user_id in fertility_clinic_user_ids,
+            appointments=tuple(appointments[user_id]),
+            last_member_message_to_ca_at=last_member_messages_to_ca.get(user_id),
+            last_ca_message_to_member_at=last_ca_messages_to_member.get(user_id),
+        )
+        for user_id in user_ids
+    }
+
+
 def build_user_attrs(  # type: ignore[no-untyped-def] # Function is missing a type annotation for one or more arguments
-    user: User, email: Optional[str] = None, email_subscribe=None
+    user: User,
+    email: Optional[str] = None,
+    email_subscribe=None,
+    preload: BrazeUserPreload | None = None,
 ) -> client.BrazeUserAttributes:
-    if fertility_clinic_user(user.id):
+    if (
+        preload.is_fertility_clinic_user
+        if preload is not None
+        else fertility_clinic_user(user.id)
+    ):
         return braze_fertility_clinic_user_attributes(user)
 
     country_repo = CountryRepository()
@@ -396,8 +451,8 @@ def build_user_attrs(  # type: ignore[no-untyped-def] # Function is missing a ty
     _populate_last_track_attrs(user_attrs, user)  # only after tracks end
     _populate_last_org_attrs(user_attrs, user)  # only after tracks start
     _populate_bulk_messaging_attrs(user_attrs, user)  # after member profile is updated
-    _populate_appointment_attrs(user_attrs, user)
-    _populate_message_attrs(user_attrs, user)
+    _populate_appointment_attrs(user_attrs, user, preload)
+    _populate_message_attrs(user_attrs, user, preload)
 
     attrs = {
         k: user_attrs[k] if k in user_attrs else None for k in _BRAZE_USER_ATTR_FIELDS
@@ -711,16 +766,28 @@ def update_health_profile(user: User) -> None:
         braze_client.track_user(user_attributes=braze_user_attributes)
 
 
-def _populate_message_attrs(user_attrs: dict, user: User) -> None:
-    last_member_message_to_ca = Message.last_member_message_to_ca(user)
+def _populate_message_attrs(
+    user_attrs: dict, user: User, preload: BrazeUserPreload | None = None
+) -> None:
+    if preload is not None:
+        last_member_message_to_ca_at = preload.last_member_message_to_ca_at
+        last_ca_message_to_member_at = preload.last_ca_message_to_member_at
+    else:
+        last_member_message_to_ca = Message.last_member_message_to_ca(user)
+        last_member_message_to_ca_at = (
+            last_member_message_to_ca and last_member_message_to_ca.created_at
+        )
+        last_ca_message_to_member = Message.last_ca_message_to_member(user)
+        last_ca_message_to_member_at = (
+            last_ca_message_to_member and last_ca_message_to_member.created_at
+        )
+
     user_attrs[
         "member_last_messaged_with_CA_date"
-    ] = last_member_message_to_ca and format_dt(last_member_message_to_ca.created_at)
-    last_ca_message_to_member = Message.last_ca_message_to_member(user)
-
+    ] = last_member_message_to_ca_at and format_dt(last_member_message_to_ca_at)
     user_attrs[
         "CA_last_messaged_with_member_date"
-    ] = last_ca_message_to_member and format_dt(last_ca_message_to_member.created_at)
+    ] = last_ca_message_to_member_at and format_dt(last_ca_message_to_member_at)
 
 
 def update_message_attrs(user: User) -> None:
@@ -737,7 +804,9 @@ def update_message_attrs(user: User) -> None:
         braze_client.track_user(user_attributes=braze_user_attributes)
 
 
-def _populate_appointment_attrs(user_attrs: dict, user: User) -> None:
+def _populate_appointment_attrs(
+    user_attrs: dict, user: User, preload: BrazeUserPreload | None = None
+) -> None:
     ca_appointments_completed_count = 0
     non_ca_appointments_completed_count = 0
     most_recent_provider_appointment = None
@@ -747,14 +816,17 @@ def _populate_appointment_attrs(user_attrs: dict, user: User) -> None:
     intro_appointment_completed_at = None
 
     now = datetime.datetime.utcnow()
-    appointments = (
-        db.session.query(Appointment)
-        .options(joinedload(Appointment.product).joinedload(Product.vertical))
-        .join(Schedule)
-        .filter(Schedule.user_id == user.id)
-        .order_by(Appointment.scheduled_start.asc())
-        .all()
-    )
+    if preload is not None:
+        appointments = preload.appointments
+    else:
+        appointments = (
+            db.session.query(Appointment)
+            .options(joinedload(Appointment.product).joinedload(Product.vertical))
+            .join(Schedule)
+            .filter(Schedule.user_id == user.id)
+            .order_by(Appointment.scheduled_start.asc())
+            .all()
+        )
     for appt in appointments:
         is_completed = appt.is_completed()
         is_ca = is_cx_vertical_name(appt.product.vertical.name)
@@ -0,0 +1,315 @@
+"""
+Bulk sync of member attributes to Braze.
+
+Attributes are built for a chunk of users at a time, with the per-user queries of
+build_user_attrs (appointments, messages, fertility clinic profiles) replaced by one
+query per chunk. Each user's attributes are hashed and compared to the hash of the
+last attributes Braze accepted for them, so unchanged users are not sent again until
+their snapshot expires after BRAZE_SYNC_SNAPSHOT_TTL.
+
+Changed users are sent to /users/track in requests of TRACK_USER_ENDPOINT_LIMIT
+users, BRAZE_SYNC_MAX_WORKERS requests at a time. All workers share a rate limiter
+that backs off until the rate limit window resets when Braze answers with a 429 or
+reports that the window is almost used up.
+"""
+from __future__ import annotations
+
+import dataclasses
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent import futures
+from datetime import timedelta
+from typing import Iterable, Iterator, List, Optional, Sequence, TypeVar
+
+import redis
+import requests
+from sqlalchemy.orm import selectinload
+
+from authn.models.user import User
+from braze import client
+from braze.client import constants
+from caching.redis import get_redis_client
+from common import stats
+from utils.braze import build_user_attrs, load_braze_user_preloads
+from utils.log import logger
+
+log = logger(__name__)
+
+T = TypeVar("T")
+
+METRIC_PREFIX = "api.utils.braze_sync"
+BRAZE_SYNC_MAX_WORKERS = int(os.environ.get("BRAZE_SYNC_MAX_WORKERS", 4))
+# How many users are loaded from the database at once
+BRAZE_SYNC_CHUNK_SIZE = int(os.environ.get("BRAZE_SYNC_CHUNK_SIZE", 1_000))
+BRAZE_SYNC_SNAPSHOT_TTL = timedelta(days=7)
+BRAZE_SYNC_MAX_ATTEMPTS = 3
+# Back off once fewer requests than this are left in the rate limit window
+BRAZE_SYNC_RATE_LIMIT_RESERVE = 10
+# The longest we wait for a rate limit window to reset
+BRAZE_SYNC_MAX_BACKOFF_SECONDS = 60.0
+
+SNAPSHOT_KEY_PREFIX = "braze_sync:attributes"
+
+
+def chunked(items: Sequence[T], size: int) -> Iterator[Sequence[T]]:
+    for offset in range(0, len(items), size):
+        yield items[offset : offset + size]
+
+
+def attributes_digest(user_attributes: client.BrazeUserAttributes) -> str:
+    payload = json.dumps(user_attributes.as_dict(), sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+class AttributeSnapshots:
+    """Digests of the attributes Braze last accepted, by external id."""
+
+    def __init__(self, ttl: timedelta = BRAZE_SYNC_SNAPSHOT_TTL) -> None:
+        self.ttl = ttl
+
+    @staticmethod
+    def _key(external_id: str) -> str:
+        return f"{SNAPSHOT_KEY_PREFIX}:{external_id}"
+
+    def get_many(self, external_ids: Sequence[str]) -> List[Optional[str]]:
+        if not external_ids:
+            return []
+        try:
+            values = get_redis_client().mget([self._key(e) for e in external_ids])
+        except redis.RedisError as e:
+            log.warning("AttributeSnapshots: Unable to read snapshots", error=str(e))
+            return [None] * len(external_ids)
+        return [
+            value.decode("utf-8") if isinstance(value, bytes) else value
+            for value in values
+        ]
+
+    def set_many(self, digests: dict[str, str]) -> None:
+        if not digests:
+            return
+        try:
+            pipeline = get_redis_client().pipeline(transaction=False)
+            for external_id, digest in digests.items():
+                pipeline.set(self._key(external_id), digest, ex=self.ttl)
+            pipeline.execute()
+        except redis.RedisError as e:
+            log.warning("AttributeSnapshots: Unable to save snapshots", error=str(e))
+
+
+class RateLimiter:
+    """Pauses every worker until Braze's rate limit window resets."""
+
+    def __init__(
+        self,
+        reserve: int = BRAZE_SYNC_RATE_LIMIT_RESERVE,
+        max_backoff_seconds: float = BRAZE_SYNC_MAX_BACKOFF_SECONDS,
+    ) -> None:
+        self.reserve = reserve
+        self.max_backoff_seconds = max_backoff_seconds
+        self._resume_at = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        delay = self._resume_at - time.time()
+        if delay > 0:
+            time.sleep(delay)
+
+    def update(self, response: requests.Response) -> None:
+        remaining = response.headers.get("X-RateLimit-Remaining")
+        limited = response.status_code == 429
+        try:
+            limited = limited or (
+                remaining is not None and int(remaining) <= self.reserve
+            )
+        except ValueError:
+            pass
+        if not limited:
+            return
+
+        now = time.time()
+        try:
+            # Epoch seconds at which the window resets
+            resume_at = float(response.headers["X-RateLimit-Reset"])
+        except (KeyError, ValueError):
+            resume_at = now + 1
+        resume_at = min(resume_at, now + self.max_backoff_seconds)
+        if resume_at <= now:
+            return
+        with self._lock:
+            self._resume_at = max(self._resume_at, resume_at)
+        log.info(
+            "RateLimiter: Backing off Braze requests",
+            seconds=round(resume_at - now, 3),
+            remaining=remaining,
+        )
+
+
+@dataclasses.dataclass
+class BrazeSyncResult:
+    num_users: int = 0
+    num_unchanged: int = 0
+    num_sent: int = 0
+    num_failed: int = 0
+    num_batches: int = 0
+
+    def add(self, other: BrazeSyncResult) -> None:
+        for field in dataclasses.fields(self):
+            setattr(
+                self,
+                field.name,
+                getattr(self, field.name) + getattr(other, field.name),
+            )
+
+
+class BrazeBulkSync:
+    """
+    Usage:
+        result = BrazeBulkSync().sync_user_ids(user_ids)
+
+    Pass force=True to send every user, whether or not their attributes changed.
+    """
+
+    def __init__(
+        self,
+        braze_client: Optional[client.BrazeClient] = None,
+        max_workers: int = BRAZE_SYNC_MAX_WORKERS,
+        batch_size: int = constants.TRACK_USER_ENDPOINT_LIMIT,
+        force: bool = False,
+        snapshots: Optional[AttributeSnapshots] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+    ) -> None:
+        self.braze_client = braze_client or client.BrazeClient()
+        self.max_workers = max_workers
+        self.batch_size = min(batch_size, constants.TRACK_USER_ENDPOINT_LIMIT)
+        self.force = force
+        self.snapshots = snapshots or AttributeSnapshots()
+        self.rate_limiter = rate_limiter or RateLimiter()
+
+    def sync_user_ids(
+        self, user_ids: Iterable[int], chunk_size: int = BRAZE_SYNC_CHUNK_SIZE
+    ) -> BrazeSyncResult:
+        result = BrazeSyncResult()
+        start = time.perf_counter()
+        for chunk in chunked(sorted(set(user_ids)), chunk_size):
+            users = (
+                User.query.options(
+                    selectinload(User.active_tracks),
+                    selectinload(User.inactive_tracks),
+                    selectinload(User.install_attribution),
+                )
+                .filter(User.id.in_(chunk))
+                .all()
+            )
+            result.add(self.sync_users(users))
+
+        seconds = time.perf_counter() - start
+        log.info(
+            "BrazeBulkSync: Synced users",
+            seconds=round(seconds, 3),
+            **dataclasses.asdict(result),
+        )
+        if seconds and result.num_users:
+            stats.histogram(
+                metric_name=f"{METRIC_PREFIX}.users_per_second",
+                pod_name=stats.PodNames.ENROLLMENTS,
+                metric_value=result.num_users / seconds,
+            )
+        return result
+
+    def sync_users(self, users: Sequence[User]) -> BrazeSyncResult:
+        result = BrazeSyncResult(num_users=len(users))
+        changed = self._changed_attributes(self._build_attributes(users), result)
+
+        with futures.ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="braze-sync"
+        ) as executor:
+            for sent, failed in executor.map(
+                self._send, chunked(changed, self.batch_size)
+            ):
+                result.num_batches += 1
+                result.num_sent += sent
+                result.num_failed += failed
+
+        for outcome in ("unchanged", "sent", "failed"):
+            count = getattr(result, f"num_{outcome}")
+            if count:
+                stats.increment(
+                    metric_name=f"{METRIC_PREFIX}.users",
+                    pod_name=stats.PodNames.ENROLLMENTS,
+                    metric_value=count,
+                    tags=[f"outcome:{outcome}"],
+                )
+        return result
+
+    @staticmethod
+    def _build_attributes(users: Sequence[User]) -> List[client.BrazeUserAttributes]:
+        preloads = load_braze_user_preloads([user.id for user in users])
+        attributes = []
+        for user in users:
+            # Fertility clinic users live in their own Braze app, see track_user.
+            if preloads[user.id].is_fertility_clinic_user:
+                continue
+            try:
+                user_attributes = build_user_attrs(user, preload=preloads[user.id])
+            except Exception as e:
+                log.exception(
+                    "BrazeBulkSync: Unable to build attributes",
+                    user_id=user.id,
+                    error=str(e),
+                )
+                continue
+            # track_users leaves them out, and sends nothing for a batch of only them
+            if any(v is not None for v in user_attributes.attributes.values()):
+                attributes.append(user_attributes)
+        return attributes
+
+    def _changed_attributes(
+        self,
+        attributes: List[client.BrazeUserAttributes],
+        result: BrazeSyncResult,
+    ) -> List[tuple[client.BrazeUserAttributes, str]]:
+        digests = [attributes_digest(a) for a in attributes]
+        if self.force:
+            return list(zip(attributes, digests))
+
+        last_sent = self.snapshots.get_many([a.external_id for a in attributes])
+        changed = []
+        for user_attributes, digest, last_digest in zip(attributes, digests, last_sent):
+            if digest == last_digest:
+                result.num_unchanged += 1
+            else:
+                changed.append((user_attributes, digest))
+        return changed
+
+    def _send(
+        self, batch: Sequence[tuple[client.BrazeUserAttributes, str]]
+    ) -> tuple[int, int]:
+        """Send a batch, returns the number of users sent and failed."""
+        user_attributes = [attributes for attributes, _ in batch]
+        for attempt in range(1, BRAZE_SYNC_MAX_ATTEMPTS + 1):
+            self.rate_limiter.wait()
+            response = self.braze_client.track_users(user_attributes=user_attributes)
+            if response is None:
+                # Requests are disabled in this environment. It is also returned for
+                # users without attributes, which _build_attributes leaves out.
+                return 0, 0
+
+            self.rate_limiter.update(response)
+            if response.ok:
+                self.snapshots.set_many(
+                    {attributes.external_id: digest for attributes, digest in batch}
+                )
+                return len(batch), 0
+            if response.status_code != 429:
+                break
+            log.warning("BrazeBulkSync: Rate limited by Braze", attempt=attempt)
+
+        log.error(
+            "BrazeBulkSync: Failed to send batch",
+            status_code=response.status_code,
+            num_users=len(batch),
+        )
+        return 0, len(batch)
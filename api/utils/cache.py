@@ -1,7 +1,9 @@
 from __future__ import annotations
 
+import calendar
 import json
 import os
+import zlib
 from datetime import datetime, timezone
 from typing import Any, List
 from urllib import parse
@@ -28,6 +30,11 @@ DEFAULT_REDIS_CERT_FILE_PATH = os.environ.get(
 # ==================================================
 
 
+def timestamp_score(dt: datetime) -> float:
+    """The sorted set score of a naive UTC datetime: its unix timestamp."""
+    return float(calendar.timegm(dt.utctimetuple()))
+
+
 def redis_client(
     redis_host: str | None = None,
     redis_port: int | None = None,
@@ -198,6 +205,17 @@ class RedisLock(Lock):
 
 
 class ViewCache(object):
+    """
+    Caches API responses by URI and invalidates them by the ids of the objects
+    they contain, by URI prefix or all at once.
+
+    Every key is namespaced by a generation number, so invalidating everything
+    is a single INCR of the generation: entries of previous generations are no
+    longer read and expire with their TTL. The reverse indexes (the URIs cached
+    per object id, and all URIs of a generation) expire with the entries they
+    point to, and the responses are stored zlib compressed.
+    """
+
     ttl = 24 * 60 * 60
     id_attr = "id"
     id_namespace = None
@@ -212,9 +230,19 @@ class ViewCache(object):
             default_tags=["caller:view_cache"],
         )
 
-        self.all_uris_key = f"{self.id_namespace}_{self.__class__.__name__}_all_uris"
-
+        self.generation_key = f"{self.id_namespace}:view_cache:generation"
         self.invalidate_all_time_key = f"{self.id_namespace}:invalidate_all:time"
+        self._generation: int | None = None
+
+    @property
+    def generation(self) -> int:
+        """
+        Read once per instance, so a response is read and written in the same
+        generation.
+        """
+        if self._generation is None:
+            self._generation = int(self.redis.get(self.generation_key) or 0)
+        return self._generation
 
     @property
     def key(self):  # type: ignore[no-untyped-def] # Function is missing a return type annotation
@@ -222,7 +250,7 @@ class ViewCache(object):
         Required for cache R/W operations but optional for invalidation operations
         """
         assert self.uri, "Need a URI to get a key!"
-        return self.uri
+        return self._uri_key(self.uri)
 
     @trace_wrapper
     def get(self):  # type: ignore[no-untyped-def] # Function is missing a return type annotation
@@ -230,7 +258,7 @@ class ViewCache(object):
         res = self.redis.get(self.key)
 
         if res:
-            return json.loads(res.decode("utf8"))
+            return json.loads(zlib.decompress(res).decode("utf8"))
 
     @trace_wrapper
     def set(self, res):  # type: ignore[no-untyped-def] # Function is missing a type annotation
@@ -246,12 +274,20 @@ class ViewCache(object):
         else:
             ids_present = [res.get(self.id_attr)]
 
+        # the indexes are refreshed with every entry added to them, so they
+        # expire no later than the last of their entries
         for id in ids_present:
             pipeline.sadd(self._id_key(id), self.uri)
+            pipeline.expire(self._id_key(id), self.ttl)
 
         log.debug("Setting %s for main key: %s", self.key, self.ttl)
-        pipeline.setex(self.key, self.ttl, json.dumps(res))
-        pipeline.sadd(self.all_uris_key, self.key)
+        pipeline.setex(
+            self.key, self.ttl, zlib.compress(json.dumps(res).encode("utf8"))
+        )
+        # scored the same so that URIs are ordered lexicographically, which lets
+        # invalidate_path_prefix look them up by range
+        pipeline.zadd(self._uris_key(), {self.uri: 0})
+        pipeline.expire(self._uris_key(), self.ttl)
 
         ret = pipeline.execute()
         return ret
@@ -281,7 +317,8 @@ class ViewCache(object):
         if ids:
             pipeline.delete(*[self._id_key(id) for id in ids])
         if to_invalidate:
-            pipeline.delete(*[uri for uri in to_invalidate])
+            pipeline.delete(*[self._uri_key(uri) for uri in to_invalidate])
+            pipeline.zrem(self._uris_key(), *to_invalidate)
 
         res = pipeline.execute()
         log.debug("Delete results: %s", res)
@@ -289,50 +326,50 @@ class ViewCache(object):
 
     @trace_wrapper
     def invalidate_path_prefix(self, path):  # type: ignore[no-untyped-def] # Function is missing a type annotation
-        pattern = path + "*"
-        pipeline = self.redis.pipeline()
-
-        keys_to_delete = [
-            key for key in self.redis.scan_iter(match=pattern, count=self.batch_size)
-        ]
-        if keys_to_delete:
-            pipeline.delete(*keys_to_delete)
-            pipeline.srem(self.all_uris_key, *keys_to_delete)
+        # the byte 0xff sorts after any UTF-8 encoded character of a URI
+        prefix = b"[" + path.encode("utf8")
+        uris = self.redis.zrangebylex(self._uris_key(), prefix, prefix + b"\xff")
+        if not uris:
+            return []
 
+        pipeline = self.redis.pipeline()
+        for i in range(0, len(uris), self.batch_size):
+            batch = [uri.decode("utf8") for uri in uris[i : i + self.batch_size]]
+            pipeline.delete(*[self._uri_key(uri) for uri in batch])
+            pipeline.zrem(self._uris_key(), *batch)
         return pipeline.execute()
 
     @trace_wrapper
     def invalidate_all(self) -> int:
-        keys = [*self.all_uris()]
-        numkeys = len(keys)
-        # No-op, don't waste my time.
-        if numkeys == 0:
-            delete_count = 0
-        # If it's significantly higher than our batch size, batch it.
-        elif numkeys > (self.BATCH_SIZE + (self.BATCH_SIZE // 5)):
-            with self.redis.pipeline(transaction=False) as pipe:
-                for i in range(0, len(keys), self.BATCH_SIZE):
-                    batch = keys[i : i + self.BATCH_SIZE]
-                    pipe.delete(*batch)
-                out = pipe.execute()
-                delete_count = sum(out)
-        else:
-            # Otherwise, just do an atomic delete.
-            delete_count = self.redis.delete(*keys)
+        """
+        Moves the cache to a new generation and returns the number of URIs
+        cached in the previous one.
+        """
+        generation = self.redis.incr(self.generation_key)
+        if generation is None:
+            return 0
+        invalidated = self.redis.zcard(self._uris_key(generation - 1)) or 0
+        self._generation = generation
 
         self.redis.set(
             self.invalidate_all_time_key, datetime.now(timezone.utc).isoformat()
         )
-        return delete_count
-
-    BATCH_SIZE = int(os.environ.get("CACHE_CLEAR_BATCH_SIZE", 500_000))
+        return invalidated
 
     @trace_wrapper
     def all_uris(self):  # type: ignore[no-untyped-def] # Function is missing a return type annotation
-        return self.redis.smembers(self.all_uris_key)
+        return set(self.redis.zrange(self._uris_key(), 0, -1) or [])
+
+    def _uri_key(self, uri: str) -> str:
+        return f"{self.id_namespace}:view_cache:{self.generation}:{uri}"
+
+    def _uris_key(self, generation: int | None = None) -> str:
+        if generation is None:
+            generation = self.generation
+        return f"{self.id_namespace}:view_cache_uris:{generation}"
 
     def _id_key(self, id):  # type: ignore[no-untyped-def] # Function is missing a type annotation
-        return f"{self.id_namespace}_view_cache_{id}"
+        return f"{self.id_namespace}:view_cache_ids:{self.generation}:{id}"
 
     @property
     def last_invalidated_all(self) -> datetime:  # type: ignore[return] # Missing return statement
@@ -99,3 +99,4 @@ class CronJobName(Enum):
     FOLLOW_UP_WITH_USERS_WHO_MISSED_ZOOM_WEBINAR = 26
     FIND_STALE_REQUEST_AVAILABILITY_MESSAGES_JOB = 27
     MEMBER_RISK_FLAGS = 28
+    MEMBER_RISK_FLAGS_INCREMENTAL = 29
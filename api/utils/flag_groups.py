@@ -220,6 +220,12 @@ ZENDESK_V2_RECONCILIATION.UPDATED_TICKET_SEARCH_RUNAWAY_GUARD_SECONDS = (
     "updated-ticket-search-runaway-guard-seconds"
 )
 
+ZENDESK_V2_RECONCILIATION_RELEASE = FlagNameGroup(
+    group_type=AllowedFlagTypes.RELEASE,
+    namespace="zendesk-v2-reconciliation",
+)
+ZENDESK_V2_RECONCILIATION_RELEASE.INCREMENTAL_EXPORT = "incremental-export"
+
 ZENDESK_CLIENT_CONFIGURATION = FlagNameGroup(
     group_type=AllowedFlagTypes.CONFIGURE,
     namespace="zendesk-client",
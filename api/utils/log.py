@@ -1,10 +1,18 @@
 from __future__ import annotations
 
+import atexit
+import functools
 import logging
 import logging.config
+import logging.handlers
 import os
+import queue
+import random
+import threading
+import time
+from collections import Counter
 from enum import Enum
-from typing import Callable, List, Tuple
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Tuple
 
 import ddtrace
 import structlog
@@ -12,8 +20,27 @@ from maven.observability import logs
 from sqlalchemy import log as sqlalchemy_log
 
 import configuration
+from common import stats
 from utils import gcp
 
+# Records waiting for the writer thread, records logged while it is full are dropped
+LOG_QUEUE_SIZE = int(os.environ.get("LOG_QUEUE_SIZE", 10_000))
+# Comma separated logger=rate pairs, e.g. "appointments.utils.booking=0.1". A rate
+# applies to the info and debug records of the logger and of its children.
+LOG_SAMPLE_RATES = os.environ.get("LOG_SAMPLE_RATES", "")
+# Longer strings and reprs are cut, longer collections are cut to their first items
+LOG_MAX_FIELD_LENGTH = int(os.environ.get("LOG_MAX_FIELD_LENGTH", 4096))
+LOG_MAX_FIELD_ITEMS = int(os.environ.get("LOG_MAX_FIELD_ITEMS", 50))
+LOG_MAX_FIELD_DEPTH = 3
+# Event counts are buffered and sent to statsd at most once per interval
+LOG_COUNTS_FLUSH_INTERVAL_SECONDS = 10
+
+DROPPED_EVENTS_METRIC = "api.utils.log.dropped_events"
+TRUNCATED_EVENTS_METRIC = "api.utils.log.truncated_events"
+# Fields holding tracebacks are never truncated
+_UNTRUNCATED_FIELDS = frozenset(("exception", "stack"))
+_SAMPLED_METHODS = frozenset(("debug", "info"))
+
 
 class LogLevel(Enum):
     INFO = 1
@@ -26,6 +53,7 @@ def configure(  # type: ignore[no-untyped-def] # Function is missing a return ty
     project: str = None,  # type: ignore[assignment] # Incompatible default for argument "project" (default has type "None", argument has type "str")
     json: bool = None,  # type: ignore[assignment] # Incompatible default for argument "json" (default has type "None", argument has type "bool")
     level: str | int = None,  # type: ignore[assignment] # Incompatible default for argument "level" (default has type "None", argument has type "Union[str, int]")
+    async_writer: bool = None,  # type: ignore[assignment] # Incompatible default for argument "async_writer" (default has type "None", argument has type "bool")
     **context,
 ):
     """Set up structlog with formatting and context providers for your app."""
@@ -34,6 +62,10 @@ def configure(  # type: ignore[no-untyped-def] # Function is missing a return ty
         json = os.environ.get("DEV_LOGGING") not in ("1", "true", "True")
     if level is None:
         level = os.environ.get("LOG_LEVEL", "INFO")
+    if async_writer is None:
+        # render and write records on a background thread instead of the calling one
+        async_writer = os.environ.get("LOG_ASYNC_WRITER", "false").lower() == "true"
+    set_sample_rates(parse_sample_rates(LOG_SAMPLE_RATES))
     shared, structured, renderer = _get_processors(json)
     formatting = {
         "()": structlog.stdlib.ProcessorFormatter,
@@ -67,8 +99,11 @@ def configure(  # type: ignore[no-untyped-def] # Function is missing a return ty
             },
         }
     )
+    if async_writer:
+        _start_log_writer(logging.getLogger(), foreign_pre_chain=shared)
     structlog.configure(
-        processors=shared + structured,
+        # sampling comes first so dropped records cost as little as possible
+        processors=[sample_events, *shared, *structured],
         context_class=dict,
         logger_factory=structlog.stdlib.LoggerFactory(),
         wrapper_class=structlog.stdlib.BoundLogger,
@@ -99,7 +134,9 @@ def _get_processors(json: bool) -> Tuple[List, List, Callable]:
         structlog.processors.TimeStamper(fmt="iso"),
         add_correlation_ids,
     ]
-    structured = [structlog.stdlib.PositionalArgumentsFormatter()]
+    # truncate_fields runs in the calling thread, so the writer thread only renders
+    # plain values and never touches objects, e.g. models, the caller still uses
+    structured = [structlog.stdlib.PositionalArgumentsFormatter(), truncate_fields]
 
     if json:
         # `json=True` is sort of a proxy for whether we're in a context that will
@@ -135,6 +172,236 @@ def add_correlation_ids(logger, name: str, event_dict: dict) -> dict:  # type: i
     return event_dict
 
 
+def parse_sample_rates(value: str) -> Dict[str, float]:
+    """Parse "logger=rate,other.logger=rate" into a dict of rates by logger name."""
+    rates = {}
+    for pair in value.split(","):
+        name, _, rate = pair.partition("=")
+        if name.strip() and rate.strip():
+            rates[name.strip()] = min(max(float(rate), 0.0), 1.0)
+    return rates
+
+
+_sample_rates: Dict[str, float] = {}
+
+
+def set_sample_rates(rates: Mapping[str, float]) -> None:
+    global _sample_rates
+    _sample_rates = dict(rates)
+    _sample_rate.cache_clear()
+
+
+@functools.lru_cache(maxsize=1024)
+def _sample_rate(logger_name: str) -> float:
+    # the rate of the closest configured ancestor, like logging levels
+    name = logger_name
+    while name:
+        if name in _sample_rates:
+            return _sample_rates[name]
+        name = name.rpartition(".")[0]
+    return 1.0
+
+
+def sample_events(logger: Any, method_name: str, event_dict: dict) -> dict:
+    """Keep a configured fraction of the info and debug records of a logger."""
+    if method_name not in _SAMPLED_METHODS or not _sample_rates:
+        return event_dict
+    logger_name = getattr(logger, "name", "")
+    rate = _sample_rate(logger_name)
+    if rate >= 1.0:
+        return event_dict
+    if random.random() >= rate:
+        _event_counts.increment(DROPPED_EVENTS_METRIC, logger_name, "sampled")
+        raise structlog.DropEvent
+    event_dict["sample_rate"] = rate
+    return event_dict
+
+
+def _truncate(value: Any, depth: int, truncated: List[bool]) -> Any:
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    if isinstance(value, (dict, list, tuple, set, frozenset)) and (
+        depth < LOG_MAX_FIELD_DEPTH
+    ):
+        more = len(value) - LOG_MAX_FIELD_ITEMS
+        if more > 0:
+            truncated[0] = True
+        if isinstance(value, dict):
+            items = {
+                k: _truncate(v, depth + 1, truncated)
+                for k, v in list(value.items())[:LOG_MAX_FIELD_ITEMS]
+            }
+            if more > 0:
+                items["..."] = f"{more} more items"
+            return items
+        values = [
+            _truncate(v, depth + 1, truncated)
+            for v in list(value)[:LOG_MAX_FIELD_ITEMS]
+        ]
+        if more > 0:
+            values.append(f"... {more} more items")
+        return values
+    # anything else is rendered with its repr, as the JSON renderer would
+    text = value if isinstance(value, str) else repr(value)
+    if len(text) > LOG_MAX_FIELD_LENGTH:
+        truncated[0] = True
+        return f"{text[:LOG_MAX_FIELD_LENGTH]}... {len(text) - LOG_MAX_FIELD_LENGTH} more chars"
+    return text
+
+
+def truncate_fields(logger: Any, method_name: str, event_dict: dict) -> dict:
+    """
+    Cut long strings and collections down to LOG_MAX_FIELD_LENGTH characters and
+    LOG_MAX_FIELD_ITEMS items, and replace objects with their repr.
+    """
+    truncated = [False]
+    for key, value in event_dict.items():
+        if key not in _UNTRUNCATED_FIELDS:
+            event_dict[key] = _truncate(value, 0, truncated)
+    if truncated[0]:
+        _event_counts.increment(
+            TRUNCATED_EVENTS_METRIC, getattr(logger, "name", ""), "truncated"
+        )
+    return event_dict
+
+
+class _EventCounts:
+    """
+    Counts of dropped and truncated records, sent to statsd at most once per interval
+    instead of once per record.
+    """
+
+    def __init__(self, flush_interval: float = LOG_COUNTS_FLUSH_INTERVAL_SECONDS):
+        self.flush_interval = flush_interval
+        self._counts: Counter = Counter()
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+
+    def increment(self, metric_name: str, logger_name: str, reason: str) -> None:
+        with self._lock:
+            self._counts[(metric_name, logger_name, reason)] += 1
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            counts, self._counts = self._counts, Counter()
+            self._last_flush = time.monotonic()
+        for (metric_name, logger_name, reason), count in counts.items():
+            stats.increment(
+                metric_name=metric_name,
+                pod_name=stats.PodNames.CORE_SERVICES,
+                metric_value=count,
+                tags=[f"logger:{logger_name}", f"reason:{reason}"],
+            )
+
+
+_event_counts = _EventCounts()
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Hands records to the writer thread without rendering them, and drops them when
+    the queue is full rather than blocking the caller.
+    """
+
+    def __init__(
+        self, log_queue: queue.Queue, foreign_pre_chain: Sequence[Callable] = ()
+    ) -> None:
+        super().__init__(log_queue)
+        self.foreign_pre_chain = list(foreign_pre_chain)
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # structlog records carry their processed event dict as msg and only need
+        # rendering by the writer
+        if isinstance(record.msg, dict) and hasattr(record, "_logger"):
+            return record
+        if not self.foreign_pre_chain:
+            # merged with their args so no argument is read from another thread
+            record.msg = record.getMessage()
+            record.args = None
+            return record
+
+        # Run the pre-chain of the formatter here, so the context variables, trace
+        # ids and timestamp are the caller's, and hand the event dict to the writer
+        # as if it came from structlog.
+        method_name = record.levelname.lower()
+        event_dict: Dict[str, Any] = {"event": record.getMessage(), "_record": record}
+        if record.exc_info:
+            event_dict["exc_info"] = record.exc_info
+        if record.stack_info:
+            event_dict["stack_info"] = record.stack_info
+        for processor in self.foreign_pre_chain:
+            event_dict = processor(None, method_name, event_dict)
+        event_dict.pop("_record", None)
+        record.msg = event_dict
+        record.args = None
+        record.exc_info = None
+        record.exc_text = None
+        record.stack_info = None
+        # the attributes structlog.stdlib.ProcessorFormatter.wrap_for_formatter sets
+        setattr(record, "_logger", None)
+        setattr(record, "_name", method_name)
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            _event_counts.increment(DROPPED_EVENTS_METRIC, record.name, "queue_full")
+
+
+_log_writer: Optional[logging.handlers.QueueListener] = None
+
+
+def _start_log_writer(
+    root: logging.Logger, foreign_pre_chain: Sequence[Callable] = ()
+) -> None:
+    """Move the handlers of the root logger behind a queue and a writer thread."""
+    global _log_writer
+    stop_log_writer()
+    handlers = [h for h in root.handlers if not isinstance(h, NonBlockingQueueHandler)]
+    handler = NonBlockingQueueHandler(
+        queue.Queue(maxsize=LOG_QUEUE_SIZE), foreign_pre_chain=foreign_pre_chain
+    )
+    for h in handlers:
+        root.removeHandler(h)
+    root.addHandler(handler)
+    _log_writer = logging.handlers.QueueListener(
+        handler.queue, *handlers, respect_handler_level=True
+    )
+    _log_writer.start()
+
+
+def stop_log_writer() -> None:
+    """Write the queued records and stop the writer thread."""
+    global _log_writer
+    if _log_writer is not None:
+        _log_writer.stop()
+        _log_writer = None
+    _event_counts.flush()
+
+
+def _restart_log_writer_after_fork() -> None:
+    # Threads don't survive a fork and the queue's lock may have been held by the
+    # parent's writer, so the child starts over with an empty queue.
+    global _log_writer, _event_counts
+    _event_counts = _EventCounts()
+    if _log_writer is None:
+        return
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, NonBlockingQueueHandler):
+            handler.queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+            _log_writer = logging.handlers.QueueListener(
+                handler.queue, *_log_writer.handlers, respect_handler_level=True
+            )
+            _log_writer.start()
+
+
+atexit.register(stop_log_writer)
+os.register_at_fork(after_in_child=_restart_log_writer_after_fork)
+
+
 _ALTERNATES = (("severity", "level"), ("message", "event"))
 _DEFAULT_SEVERITY = "info"
 
@@ -1,55 +1,363 @@
+"""
+Autocomplete for organization names when users are onboarding.
+
+Every process keeps an OrgAutocompleteIndex in memory: sorted lists of normalized
+organization names, and of the names from the start of each later word, so a
+keystroke is answered with a couple of binary searches. Names that don't start with
+the query get a bounded typo-tolerant pass.
+
+The organizations are stored in Redis as a versioned snapshot. Processes check the
+version every ORG_AUTOCOMPLETE_REFRESH_SECONDS in a background thread and swap in a
+new index when it changed; requests never wait for a rebuild once the index is
+loaded. Editing an organization in admin rebuilds the snapshot right away, and the
+snapshot expires after ORG_AUTOCOMPLETE_SNAPSHOT_TTL_SECONDS so organizations
+activated or terminated on a schedule are picked up too.
+"""
+from __future__ import annotations
+
+import bisect
+import dataclasses
 import datetime
+import heapq
+import json
+import os
+import re
+import threading
+import time
+import unicodedata
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 
+import flask
+import redis
 from sqlalchemy import or_
 
+from common import stats
 from models.enterprise import Organization, OrganizationType
 from storage.connection import db
 from utils.cache import redis_client
+from utils.log import logger
+
+log = logger(__name__)
+
+METRIC_PREFIX = "api.utils.org_search_autocomplete"
+ORG_AUTOCOMPLETE_REFRESH_SECONDS = int(
+    os.environ.get("ORG_AUTOCOMPLETE_REFRESH_SECONDS", 30)
+)
+ORG_AUTOCOMPLETE_SNAPSHOT_TTL_SECONDS = int(
+    os.environ.get("ORG_AUTOCOMPLETE_SNAPSHOT_TTL_SECONDS", 3600)
+)
+# Queries shorter than this only match prefixes
+FUZZY_MIN_QUERY_LENGTH = 4
+REBUILD_LOCK_SECONDS = 60
+MAX_CACHED_QUERIES = 10_000
+
+_NON_ALPHANUMERIC = re.compile(r"[^a-z0-9]+")
+
+
+def normalize(name: str) -> str:
+    """Lowercase, strip accents and punctuation and collapse whitespace."""
+    name = unicodedata.normalize("NFKD", name)
+    name = "".join(c for c in name if not unicodedata.combining(c))
+    return _NON_ALPHANUMERIC.sub(" ", name.lower()).strip()
+
+
+def _next_row(
+    row: List[int], query: str, key_char: str, depth: int, max_distance: int
+) -> List[int]:
+    """
+    One step of the edit distance between `query` and a growing key prefix: row[j]
+    is the distance between query[:j] and the key prefix of length `depth`.
+
+    Only cells within `max_distance` of the diagonal can stay within `max_distance`,
+    the others are capped at max_distance + 1 without being computed.
+    """
+    too_far = max_distance + 1
+    next_row = [too_far] * len(row)
+    if depth <= max_distance:
+        next_row[0] = depth
+    for j in range(
+        max(1, depth - max_distance), min(len(query), depth + max_distance) + 1
+    ):
+        next_row[j] = min(
+            row[j] + 1,
+            next_row[j - 1] + 1,
+            row[j - 1] + (query[j - 1] != key_char),
+            too_far,
+        )
+    return next_row
+
+
+@dataclasses.dataclass(frozen=True)
+class OrgEntry:
+    id: int
+    name: str
+    normalized: str
+
+
+class OrgAutocompleteIndex:
+    """
+    An immutable, sorted prefix index over organization names.
+
+    Results are cached per query for the lifetime of the index, which is replaced
+    rather than updated when organizations change.
+    """
+
+    def __init__(self, orgs: Iterable[Tuple[int, str]], version: int = 0) -> None:
+        self.version = version
+        self.entries = sorted(
+            (
+                OrgEntry(id=org_id, name=name, normalized=normalize(name))
+                for org_id, name in orgs
+            ),
+            key=lambda entry: (entry.normalized, entry.id),
+        )
+        self._names = [entry.normalized for entry in self.entries]
+        words = sorted(
+            (entry.normalized[match.start() :], position)
+            for position, entry in enumerate(self.entries)
+            for match in re.finditer(r"(?<= )\S", entry.normalized)
+        )
+        self._words = [word for word, _ in words]
+        self._word_positions = [position for _, position in words]
+        # Members type the same prefixes, keystroke by keystroke
+        self._results: Dict[Tuple[str, int], List[OrgEntry]] = {}
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def search(self, query: str, limit: int = 10) -> List[OrgEntry]:
+        """
+        Organizations matching the query, best first: names starting with the query,
+        then names with a later word starting with it, then names within a typo or
+        two of it.
+        """
+        query = normalize(query)
+        if not query or limit <= 0:
+            return []
+        cached = self._results.get((query, limit))
+        if cached is not None:
+            return cached
+
+        # org position -> (tier, distance, normalized name)
+        ranks: Dict[int, Tuple[int, int, str]] = {}
+        for position in self._prefix_matches(self._names, None, query, limit):
+            ranks[position] = (0, 0, self._names[position])
+        for position in self._prefix_matches(
+            self._words, self._word_positions, query, limit
+        ):
+            ranks.setdefault(position, (1, 0, self._names[position]))
+
+        if len(ranks) < limit and len(query) >= FUZZY_MIN_QUERY_LENGTH:
+            max_distance = 1 if len(query) < 8 else 2
+            for position, distance in self._fuzzy_matches(query, max_distance):
+                rank = (2, distance, self._names[position])
+                if position not in ranks or rank < ranks[position]:
+                    ranks[position] = rank
+
+        best = heapq.nsmallest(limit, ranks, key=ranks.__getitem__)
+        results = [self.entries[position] for position in best]
+        if len(self._results) >= MAX_CACHED_QUERIES:
+            self._results.clear()
+        self._results[(query, limit)] = results
+        return results
+
+    @staticmethod
+    def _prefix_matches(
+        keys: List[str], positions: Optional[List[int]], prefix: str, limit: int
+    ) -> Iterator[int]:
+        found = 0
+        for i in range(bisect.bisect_left(keys, prefix), len(keys)):
+            if not keys[i].startswith(prefix) or found == limit:
+                return
+            found += 1
+            yield i if positions is None else positions[i]
+
+    @staticmethod
+    def _successor(prefix: str) -> str:
+        """The smallest string sorting after every string starting with `prefix`."""
+        return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+    def _fuzzy_matches(
+        self, query: str, max_distance: int
+    ) -> Iterator[Tuple[int, int]]:
+        for keys, positions in (
+            (self._names, None),
+            (self._words, self._word_positions),
+        ):
+            # Typos in the first letter are rare, and skipping them keeps this pass
+            # to a small slice of the index.
+            start = bisect.bisect_left(keys, query[0])
+            end = bisect.bisect_left(keys, self._successor(query[0]), start)
+            for i, distance in self._walk(keys, start, end, query, max_distance):
+                yield (i if positions is None else positions[i]), distance
+
+    @classmethod
+    def _walk(
+        cls, keys: List[str], start: int, end: int, query: str, max_distance: int
+    ) -> Iterator[Tuple[int, int]]:
+        """
+        Yield keys[start:end] whose prefix is within `max_distance` edits of `query`.
+
+        The sorted keys are walked like a trie: rows of the edit distance are kept
+        for the prefix shared with the previous key, and once a prefix is too far
+        from the query, every key starting with it is skipped.
+        """
+        rows = [[min(j, max_distance + 1) for j in range(len(query) + 1)]]
+        # best[d] is the distance between the query and the closest of key[:1..d]
+        best = [rows[0][-1]]
+        previous = ""
+        i = start
+        while i < end:
+            key = keys[i][: len(query) + max_distance]
+            shared = 0
+            while (
+                shared < min(len(key), len(previous), len(rows) - 1)
+                and key[shared] == previous[shared]
+            ):
+                shared += 1
+            del rows[shared + 1 :]
+            del best[shared + 1 :]
+
+            pruned = False
+            for key_char in key[len(rows) - 1 :]:
+                row = _next_row(rows[-1], query, key_char, len(rows), max_distance)
+                if min(row) > max_distance:
+                    pruned = True
+                    break
+                rows.append(row)
+                best.append(min(best[-1], row[-1]))
+
+            next_i = i + 1
+            if pruned:
+                # rows[d] is the distance to key[:d], so every key starting with
+                # key[:len(rows)] ends up with the same distance
+                next_i = bisect.bisect_left(
+                    keys, cls._successor(key[: len(rows)]), next_i, end
+                )
+            distance = best[-1]
+            if distance <= max_distance:
+                for match in range(i, next_i):
+                    yield match, distance
+            previous = key
+            i = next_i
+
+
+class _LocalIndex:
+    """The index for this process, refreshed from the Redis snapshot."""
+
+    def __init__(self) -> None:
+        self.index: Optional[OrgAutocompleteIndex] = None
+        self.checked_at = 0.0
+        self._lock = threading.Lock()
+        self._refreshing = False
+
+    def set(self, index: OrgAutocompleteIndex) -> None:
+        # A slow refresh must not replace an index rebuilt after it started
+        if self.index is None or index.version >= self.index.version:
+            self.index = index
+        self.checked_at = time.monotonic()
+
+    def clear(self) -> None:
+        self.index = None
+        self.checked_at = 0.0
+
+    def is_stale(self) -> bool:
+        return time.monotonic() - self.checked_at > ORG_AUTOCOMPLETE_REFRESH_SECONDS
+
+    def refresh_in_background(self, refresh: Callable[[], None]) -> None:
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+            # Checked again after ORG_AUTOCOMPLETE_REFRESH_SECONDS even if this fails
+            self.checked_at = time.monotonic()
+
+        app = (
+            flask.current_app._get_current_object()  # type: ignore[attr-defined] # "Flask" has no attribute "_get_current_object"
+            if flask.has_app_context()
+            else None
+        )
+
+        def run() -> None:
+            try:
+                if app is None:
+                    refresh()
+                else:
+                    with app.app_context():
+                        try:
+                            refresh()
+                        finally:
+                            db.session.remove()
+            except Exception as e:
+                log.exception("Failed to refresh org autocomplete index", error=str(e))
+            finally:
+                self._refreshing = False
+
+        threading.Thread(
+            target=run, name="org-autocomplete-refresh", daemon=True
+        ).start()
+
+
+local_index = _LocalIndex()
+
+_client: Optional[redis.Redis] = None
+_client_lock = threading.Lock()
+
+
+def _redis() -> redis.Redis:
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = redis_client(
+                    decode_responses=True,
+                    skip_on_fatal_exceptions=True,
+                    default_tags=["caller:org_search"],
+                )
+    return _client
 
 
 class OrganizationSearchAutocomplete:
     """
-    A redis based system to provide autocomplete for organization names when users are onboarding
+    An in-process index, shared through a Redis snapshot, to provide autocomplete for
+    organization names when users are onboarding
     """
 
     REDIS_KEY = "org_autocomplete"
+    SNAPSHOT_KEY = f"{REDIS_KEY}:snapshot"
+    VERSION_KEY = f"{REDIS_KEY}:version"
+    REBUILD_LOCK_KEY = f"{REDIS_KEY}:rebuild_lock"
 
     def get_autocomplete_results(self, query):  # type: ignore[no-untyped-def] # Function is missing a type annotation
-        results = []
         # return up to 10 suggestions
         count = 10
-        # org names are capped at 50 char, and we want to allow some overlap with prefixes
-        lookup_entries = 100
-        r = redis_client(
-            decode_responses=True,
-            skip_on_fatal_exceptions=True,
-            default_tags=["caller:org_search"],
+        start = time.perf_counter()
+
+        index = local_index.index
+        if index is None:
+            index = self._load_local_index()
+        elif local_index.is_stale():
+            local_index.refresh_in_background(self._refresh_local_index)
+
+        if index is None:
+            results = []
+        else:
+            results = [
+                {"id": str(entry.id), "name": entry.name}
+                for entry in index.search(query, limit=count)
+            ]
+
+        stats.histogram(
+            metric_name=f"{METRIC_PREFIX}.search.duration_ms",
+            pod_name=stats.PodNames.ENROLLMENTS,
+            metric_value=(time.perf_counter() - start) * 1000,
+            tags=[f"has_results:{bool(results)}".lower()],
         )
-        if not r.exists(self.REDIS_KEY):
-            self.load_orgs_autocomplete()
-        start = r.zrank(self.REDIS_KEY, query)
-        if start:
-            while len(results) != count:
-                range = r.zrange(self.REDIS_KEY, start, start + lookup_entries - 1)
-                start += lookup_entries
-                if not range or len(range) == 0:
-                    break
-                for entry in range:
-                    minlen = min(len(entry), len(query))
-                    if entry[0:minlen] != query[0:minlen]:
-                        count = len(results)
-                        break
-                    if entry[-1] == "%" and len(results) != count:
-                        split_entry = entry.split(":")
-                        org_name = split_entry[1]
-                        org_id = split_entry[-1][:-1]
-                        results.append({"id": org_id, "name": org_name})
         return results
 
-    def load_orgs_autocomplete(self):  # type: ignore[no-untyped-def] # Function is missing a return type annotation
-        r = redis_client(
-            skip_on_fatal_exceptions=True, default_tags=["caller:org_search"]
-        )
+    def load_orgs_autocomplete(self) -> OrgAutocompleteIndex:
+        """Build the index from the database and share it through Redis."""
+        version = time.time_ns()
         orgs = (
             db.session.query(
                 Organization.display_name, Organization.name, Organization.id
@@ -67,21 +375,75 @@ class OrganizationSearchAutocomplete:
             )
             .all()
         )
+        index = OrgAutocompleteIndex(
+            (
+                (org.id, (org.display_name or org.name).replace("_", " "))
+                for org in orgs
+            ),
+            version=version,
+        )
 
-        pipeline = r.pipeline()
-        for org in orgs:
-            name = org.display_name or org.name
-            name = name.replace("_", " ")
-            formatted_name = f"{name.lower()}:{name}:{org.id}"
-            for l in range(1, len(name)):
-                prefix = formatted_name[0:l]
-                pipeline.zadd(self.REDIS_KEY, {prefix: 0})
-            pipeline.zadd(self.REDIS_KEY, {formatted_name + "%": 0})
+        snapshot = json.dumps(
+            {
+                "version": index.version,
+                "orgs": [[entry.id, entry.name] for entry in index.entries],
+            }
+        )
+        pipeline = _redis().pipeline()
+        pipeline.set(
+            self.SNAPSHOT_KEY, snapshot, ex=ORG_AUTOCOMPLETE_SNAPSHOT_TTL_SECONDS
+        )
+        pipeline.set(
+            self.VERSION_KEY, index.version, ex=ORG_AUTOCOMPLETE_SNAPSHOT_TTL_SECONDS
+        )
         pipeline.execute()
 
+        local_index.set(index)
+        return index
+
     def reload_orgs(self):  # type: ignore[no-untyped-def] # Function is missing a return type annotation
-        r = redis_client(
-            skip_on_fatal_exceptions=True, default_tags=["caller:org_search"]
-        )
-        r.delete(self.REDIS_KEY)
+        # Drop the sorted set used before the in-process index
+        _redis().delete(self.REDIS_KEY)
         self.load_orgs_autocomplete()
+
+    def _load_local_index(self) -> Optional[OrgAutocompleteIndex]:
+        index = self._read_snapshot()
+        if index is None:
+            # Don't rebuild on the request path, this request goes without suggestions
+            local_index.refresh_in_background(self._refresh_local_index)
+            return None
+        local_index.set(index)
+        return index
+
+    def _refresh_local_index(self) -> None:
+        version = _redis().get(self.VERSION_KEY)
+        current = local_index.index
+        if (
+            version is not None
+            and current is not None
+            and int(version) == current.version
+        ):
+            local_index.set(current)
+            return
+
+        index = self._read_snapshot()
+        if index is not None:
+            local_index.set(index)
+        elif _redis().set(self.REBUILD_LOCK_KEY, 1, nx=True, ex=REBUILD_LOCK_SECONDS):
+            # Only one process rebuilds an expired snapshot, the others pick it up
+            # on their next check.
+            self.load_orgs_autocomplete()
+
+    def _read_snapshot(self) -> Optional[OrgAutocompleteIndex]:
+        snapshot = _redis().get(self.SNAPSHOT_KEY)
+        if snapshot is None:
+            return None
+        try:
+            data = json.loads(snapshot)
+            return OrgAutocompleteIndex(
+                ((org_id, name) for org_id, name in data["orgs"]),
+                version=data["version"],
+            )
+        except (KeyError, TypeError, ValueError) as e:
+            log.warning("Invalid org autocomplete snapshot", error=str(e))
+            return None
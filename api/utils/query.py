@@ -1,3 +1,8 @@
+from typing import Any, Iterable
+
+from sqlalchemy import inspect
+
+
 def paginate(q, col, size=100, chunk=False):  # type: ignore[no-untyped-def] # Function is missing a type annotation
     """
     Yields a SQLAlchemy query of param size, useful for minimizing memory use of large result sets.
@@ -24,3 +29,9 @@ def paginate(q, col, size=100, chunk=False):  # type: ignore[no-untyped-def] # F
         else:
             for row in _chunk:
                 yield row
+
+
+def has_changes(instance: Any, attributes: Iterable[str]) -> bool:
+    """Whether any of the attributes of an ORM instance changed since it was loaded."""
+    attrs = inspect(instance).attrs
+    return any(attrs[attribute].history.has_changes() for attribute in attributes)
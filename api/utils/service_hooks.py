@@ -10,13 +10,34 @@ def register_worker_shutdown_hook(app):  # type: ignore[no-untyped-def] # Functi
     atexit.register(_shutdown_hook, app)
 
 
+def dispose_db_engines(app):  # type: ignore[no-untyped-def] # Function is missing a type annotation
+    if app.config["SQLALCHEMY_BINDS"]:
+        for k in app.config["SQLALCHEMY_BINDS"]:
+            log.debug(f"[dispose_db_engines] about to close connections for bind {k}")
+            engine = db.get_engine(app, k)
+            engine.dispose()
+
+
+def reinitialize_after_fork(app):  # type: ignore[no-untyped-def] # Function is missing a type annotation
+    """
+    Replace the fork-unsafe resources a worker inherits from a preloaded master.
+
+    Sockets opened by the master must not be shared between processes, so the DB
+    connection pools and the flask_redis pools are emptied and refill on first use.
+    Redis clients built by utils.cache.redis_client are created per call, gRPC channels
+    per request, and ddtrace and utils.log restart their writer threads in forked
+    children on their own.
+    """
+    from appointments.utils.flask_redis_ext import flask_redis
+
+    dispose_db_engines(app)
+    flask_redis.reset_connection_pools()
+    log.info("maven app instance reinitialized after fork")
+
+
 def _shutdown_hook(app):  # type: ignore[no-untyped-def] # Function is missing a type annotation
     try:
-        if app.config["SQLALCHEMY_BINDS"]:
-            for k in app.config["SQLALCHEMY_BINDS"]:
-                log.debug(f"[shutdown_hook] about to close connections for bind {k}")
-                engine = db.get_engine(app, k)
-                engine.dispose()
+        dispose_db_engines(app)
     except Exception as e:
         log.error(f"[shutdown_hook] exception when closing DB connections: {e}")
     log.info(
@@ -6,10 +6,23 @@ from utils.log import logger
 log = logger(__name__)
 
 
+# The reverse indexes of the ViewCache implementations before keys were namespaced
+# by generation. They never expired, the new indexes expire with their entries.
+LEGACY_VIEW_CACHE_KEYS = [
+    ("posts_PostsViewCache_all_uris", "posts_view_cache_*"),
+    ("practitioners_PractitionersViewCache_all_uris", "practitioners_view_cache_*"),
+    (
+        "vertical_groups_VerticalGroupsViewCache_all_uris",
+        "vertical_groups_view_cache_*",
+    ),
+]
+
+
 def gc_view_caches() -> None:
     # this utility is created for manually garbage collection all the Redis memory space taken by
     # the ViewCache implementations to fix the memory leak issues
     # this should be run during off-peak hours to avoid service disruptions and monitor related metrics closely
+    # it is only needed once, to remove the keys left over by the previous ViewCache implementation
     new_client = redis_client()
     try:
         stop_migration_ttl = 2 * 60 * 60
@@ -17,19 +30,13 @@ def gc_view_caches() -> None:
         # in another console, set this to be 1 will stop the GC run if something happens during the process
         new_client.setex(stop_migration_key, stop_migration_ttl, 0)
 
-        gc_run(
-            new_client,
-            all_uris_key="posts_PostsViewCache_all_uris",
-            match_pattern="posts_view_cache_*",
-            stop_migration_key=stop_migration_key,
-        )
-        # re-enable this if we want to clean up CategoriesViewCache as well
-        # gc_run(
-        #     new_client,
-        #     all_uris_key="categories_CategoriesViewCache_all_uris",
-        #     match_pattern="categories_view_cache_*",
-        #     stop_migration_key=stop_migration_key,
-        # )
+        for all_uris_key, match_pattern in LEGACY_VIEW_CACHE_KEYS:
+            gc_run(
+                new_client,
+                all_uris_key=all_uris_key,
+                match_pattern=match_pattern,
+                stop_migration_key=stop_migration_key,
+            )
     except Exception as ex:
         log.error(f"[gc_view_caches] encountered exception when running gc run {ex}")
         return
@@ -9,6 +9,7 @@ from typing import FrozenSet, Iterable, List, Mapping, Optional, Tuple
 import ddtrace
 import tenacity
 from flask import abort, request
+from flask_babel import get_locale
 from httpproblem import Problem
 from marshmallow import Schema, fields
 from maven import feature_flags
@@ -60,6 +61,7 @@ from storage.connection import db
 from tracks.service.tracks import TrackSelectionService
 from utils.launchdarkly import user_context
 from utils.log import logger
+from views import dashboard_sections
 from views.tracks import AvailableTrackSchema, get_user_active_track
 from wallet.models.constants import WalletState
 from wallet.models.reimbursement_organization_settings import (
@@ -458,30 +460,67 @@ def locate_org_library(org_id: int, track_name: str) -> Iterable[Resource]:
     return query(db.session()).params(org_id=org_id, track_name=track_name).all()
 
 
+def _dump_library_resources(resources: List[DashboardLibraryResource]) -> List[dict]:
+    return [dataclasses.asdict(r) for r in resources]
+
+
+def _restore_library_resources(resources: List[dict]) -> List[DashboardLibraryResource]:
+    return [DashboardLibraryResource(**r) for r in resources]
+
+
+def _get_maven_library(
+    track_name: str, phase_name: str
+) -> List[DashboardLibraryResource]:
+    return [
+        DashboardLibraryResource(
+            id=r.id,
+            title=r.title,
+            group=r.content_type,
+            url=r.content_url,
+            icon=r.image and r.image.asset_url(),
+            tagline=trim_chars_ish(r.subhead) if r.subhead else None,
+        )
+        for r in locate_maven_library(track_name, phase_name)
+    ]
+
+
+def _get_org_library(org_id: int, track_name: str) -> List[DashboardLibraryResource]:
+    return [
+        DashboardLibraryResource(
+            id=r.id, title=r.title, group=r.content_type, url=r.custom_url
+        )
+        for r in locate_org_library(org_id, track_name)
+    ]
+
+
+def _current_locale() -> str:
+    return str(get_locale() or "default")
+
+
 @ddtrace.tracer.wrap()
 def get_library_resources(
     user: User, track_name: str, phase_name: str, org: Optional[DashboardOrg]
 ) -> DashboardLibraryResources:
-    """Fetch all Maven and Organization resources for a given user."""
+    """Fetch all Maven and Organization resources for a given user.
+
+    Nothing here is specific to the user, so both libraries are shared between
+    members through the dashboard library cache.
+    """
+    locale = _current_locale()
     return DashboardLibraryResources(
-        maven=[
-            DashboardLibraryResource(
-                id=r.id,
-                title=r.title,
-                group=r.content_type,
-                url=r.content_url,
-                icon=r.image and r.image.asset_url(),
-                tagline=trim_chars_ish(r.subhead) if r.subhead else None,
-            )
-            for r in locate_maven_library(track_name, phase_name)
-        ],
+        maven=dashboard_sections.library_cache.get_or_load(
+            key=f"maven:{track_name}:{phase_name}:{locale}",
+            load=functools.partial(_get_maven_library, track_name, phase_name),
+            dump=_dump_library_resources,
+            restore=_restore_library_resources,
+        ),
         org=(
-            [
-                DashboardLibraryResource(
-                    id=r.id, title=r.title, group=r.content_type, url=r.custom_url
-                )
-                for r in locate_org_library(org.id, track_name)
-            ]
+            dashboard_sections.library_cache.get_or_load(
+                key=f"org:{org.id}:{track_name}:{locale}",
+                load=functools.partial(_get_org_library, org.id, track_name),
+                dump=_dump_library_resources,
+                restore=_restore_library_resources,
+            )
             if org
             else []
         ),
@@ -684,9 +723,15 @@ def trim_chars_ish(
 
 @ddtrace.tracer.wrap()
 def get_wallet_status(user: User, org_id: int) -> DashboardUserWalletStatus:
+    return get_wallet_status_for_user_id(user.id, org_id)
+
+
+def get_wallet_status_for_user_id(
+    user_id: int, org_id: int
+) -> DashboardUserWalletStatus:
     # If user has a wallet, we don't need to check organization status
     all_wallet_states = ReimbursementWalletRepository().get_wallet_states_for_user(
-        user.id
+        user_id
     )
     if WalletState.QUALIFIED.value in all_wallet_states:
         return DashboardUserWalletStatus.ENROLLED
@@ -700,39 +745,82 @@ def get_wallet_status(user: User, org_id: int) -> DashboardUserWalletStatus:
     # this was approved by product
     org_settings: List[
         ReimbursementOrganizationSettings
-    ] = get_eligible_wallet_org_settings(user.id, organization_id=org_id)
+    ] = get_eligible_wallet_org_settings(user_id, organization_id=org_id)
     if org_settings:
         return DashboardUserWalletStatus.ELIGIBLE
     return DashboardUserWalletStatus.INELIGIBLE
 
 
+def has_enrollable_tracks(user_id: int, org_id: int) -> bool:
+    track_service = tracks.TrackSelectionService()
+    enrollable_tracks: List[TrackConfig] = track_service.get_enrollable_tracks_for_org(  # type: ignore[assignment] # Incompatible types in assignment (expression has type "List[ClientTrack]", variable has type "List[TrackConfig]")
+        user_id=user_id, organization_id=org_id
+    )
+    return len(enrollable_tracks) > 0
+
+
 @ddtrace.tracer.wrap()
 def get_dashboard_user(user: User, org: Optional[DashboardOrg]) -> DashboardUser:
-    care_advocate = get_care_advocate(user)
-    scheduled_care = get_scheduled_care(user)
-    risk_flags = get_risk_flags(user)
-    has_had_intro_appointment = AvailabilityTools.has_had_ca_intro_appointment(user)
-    wallet_status = get_wallet_status(user, org.id) if org else None
-    track_service = tracks.TrackSelectionService()
-    enrollable_tracks: List[TrackConfig] = (
-        track_service.get_enrollable_tracks_for_org(  # type: ignore[assignment] # Incompatible types in assignment (expression has type "List[ClientTrack]", variable has type "List[TrackConfig]")
-            user_id=user.id, organization_id=org.id
+    # Sections that only need ids are loaded through the section loader, so they can
+    # run alongside the ones below that work with the request's ORM objects.
+    loader = dashboard_sections.SectionLoader(
+        parallel=feature_flags.bool_variation(
+            "release-dashboard-metadata-parallel-sections",
+            user_context(user),
+            default=False,
         )
-        if org
-        else []
     )
-
     eligibility_service = eligibility.get_verification_service()
-    is_known_to_be_eligible = eligibility_service.is_user_known_to_be_eligible_for_org(
-        user_id=user.id,
-        organization_id=org.id if org else None,
-        timeout=ELIGIBILITY_TIMEOUT_SECONDS,
-    )
-    hp_service = HealthProfileService(user)
-    fertility_treatment_status = hp_service.get_fertility_treatment_status()
-    is_matched_to_care_coach = (
-        ProviderService().is_member_matched_to_coach_for_active_track(user)
+    loader.submit(
+        "is_known_to_be_eligible",
+        functools.partial(
+            eligibility_service.is_user_known_to_be_eligible_for_org,
+            user_id=user.id,
+            organization_id=org.id if org else None,
+            timeout=ELIGIBILITY_TIMEOUT_SECONDS,
+        ),
+        fallback=False,
+        timeout_seconds=ELIGIBILITY_TIMEOUT_SECONDS + 0.5,
     )
+    if org:
+        loader.submit(
+            "wallet_status",
+            functools.partial(get_wallet_status_for_user_id, user.id, org.id),
+            fallback=None,
+        )
+        loader.submit(
+            "has_available_tracks",
+            functools.partial(has_enrollable_tracks, user.id, org.id),
+            fallback=False,
+        )
+
+    with dashboard_sections.timed_section("care_advocate"):
+        care_advocate = get_care_advocate(user)
+    with dashboard_sections.timed_section("scheduled_care"):
+        scheduled_care = get_scheduled_care(user)
+    with dashboard_sections.timed_section("risk_flags"):
+        risk_flags = get_risk_flags(user)
+    with dashboard_sections.timed_section("has_had_intro_appointment"):
+        has_had_intro_appointment = AvailabilityTools.has_had_ca_intro_appointment(user)
+    with dashboard_sections.timed_section("health_profile"):
+        hp_service = HealthProfileService(user)
+        fertility_treatment_status = hp_service.get_fertility_treatment_status()
+    with dashboard_sections.timed_section("care_coaching"):
+        is_matched_to_care_coach = (
+            ProviderService().is_member_matched_to_coach_for_active_track(user)
+        )
+        is_eligible_for_care_coaching = (
+            is_matched_to_care_coach
+            and CareCoachingEligibilityService().is_user_eligible_for_care_coaching(
+                user=user, fertility_treatment_status=fertility_treatment_status
+            )
+        )
+    with dashboard_sections.timed_section("subscribed_to_promotional_email"):
+        subscribed_to_promotional_email = get_member_communications_preference(user.id)
+
+    wallet_status = loader.result("wallet_status") if org else None
+    has_available_tracks = loader.result("has_available_tracks") if org else False
+    is_known_to_be_eligible = loader.result("is_known_to_be_eligible")
     return DashboardUser(
         id=user.id,
         organization=org,
@@ -741,11 +829,8 @@ def get_dashboard_user(user: User, org: Optional[DashboardOrg]) -> DashboardUser
         has_had_intro_appointment=has_had_intro_appointment,
         wallet_status=wallet_status,
         first_name=user.first_name,  # type: ignore[arg-type] # Argument "first_name" to "DashboardUser" has incompatible type "Optional[str]"; expected "str"
-        has_available_tracks=(len(enrollable_tracks) > 0),
-        is_eligible_for_care_coaching=is_matched_to_care_coach
-        and CareCoachingEligibilityService().is_user_eligible_for_care_coaching(
-            user=user, fertility_treatment_status=fertility_treatment_status
-        ),
+        has_available_tracks=has_available_tracks,
+        is_eligible_for_care_coaching=is_eligible_for_care_coaching,
         is_matched_to_care_coach=is_matched_to_care_coach,
         health_profile=DashboardUserHealthProfile(
             due_date=user.health_profile
@@ -754,7 +839,7 @@ def get_dashboard_user(user: User, org: Optional[DashboardOrg]) -> DashboardUser
             fertility_treatment_status=fertility_treatment_status,
         ),
         has_care_plan=user.member_profile.has_care_plan,
-        subscribed_to_promotional_email=get_member_communications_preference(user.id),
+        subscribed_to_promotional_email=subscribed_to_promotional_email,
         country=user.member_profile.country_code,
         is_known_to_be_eligible=is_known_to_be_eligible,
         current_risk_flags=risk_flags,
@@ -765,21 +850,29 @@ def get_dashboard_user(user: User, org: Optional[DashboardOrg]) -> DashboardUser
 def get_dashboard_metadata(
     user: User, track_id: int, phase_name: str = None  # type: ignore[assignment] # Incompatible default for argument "phase_name" (default has type "None", argument has type "str")
 ) -> DashboardMetadata:
-    member_track, phase_name = locate_member_track_and_phase(user, track_id, phase_name)
-    program = get_dashboard_program(member_track, phase_name)
-    organization: Optional[DashboardOrg] = get_org(user)
-    resources = get_library_resources(
-        user=user,
-        track_name=member_track.name,
-        phase_name=phase_name,
-        org=organization,
-    )
+    with dashboard_sections.timed_section("program"):
+        member_track, phase_name = locate_member_track_and_phase(
+            user, track_id, phase_name
+        )
+        program = get_dashboard_program(member_track, phase_name)
+    with dashboard_sections.timed_section("organization"):
+        organization: Optional[DashboardOrg] = get_org(user)
+    with dashboard_sections.timed_section("resources"):
+        resources = get_library_resources(
+            user=user,
+            track_name=member_track.name,
+            phase_name=phase_name,
+            org=organization,
+        )
+    dashboard_user = get_dashboard_user(user, organization)
+    with dashboard_sections.timed_section("additional_tracks"):
+        additional_tracks = [
+            get_additional_track(t) for t in user.active_tracks if t.id != track_id
+        ]
     return DashboardMetadata(
-        user=get_dashboard_user(user, organization),
+        user=dashboard_user,
         program=program,
-        additional_tracks=[
-            get_additional_track(t) for t in user.active_tracks if t.id != track_id
-        ],
+        additional_tracks=additional_tracks,
         resources=resources,
     )
 
@@ -0,0 +1,281 @@
+"""
+Building blocks for assembling the member dashboard.
+
+The dashboard is made of sections. Shared sections, like the library resources, only
+depend on the track, phase, organization and locale, so they are cached in Redis and
+shared between members. The cache is versioned: committing a change to a Resource or
+its track and phase assignments bumps the version, which orphans every cached entry.
+Content that lives outside of MySQL (e.g. Contentful thumbnails) ages out after
+DASHBOARD_SHARED_CACHE_TTL_SECONDS.
+
+Per-user sections are loaded through a SectionLoader, which times every section and,
+when parallel loading is enabled, runs the independent ones in a thread pool, each
+within its own latency budget. A section that fails or runs out of time is replaced
+by its fallback value rather than failing the whole dashboard.
+"""
+from __future__ import annotations
+
+import contextlib
+import dataclasses
+import os
+import time
+from concurrent import futures
+from typing import Any, Callable, Dict, Iterator, Optional, TypeVar
+
+import ddtrace
+import flask
+import redis
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from caching.redis import RedisTTLCache
+from common import stats
+from models.marketing import Resource, ResourceTrack, ResourceTrackPhase
+from storage.connection import db
+from utils.log import logger
+
+log = logger(__name__)
+
+T = TypeVar("T")
+
+METRIC_PREFIX = "api.views.dashboard_metadata"
+DASHBOARD_SHARED_CACHE_ENABLED = (
+    os.environ.get("DASHBOARD_SHARED_CACHE_ENABLED", "true").lower() == "true"
+)
+DASHBOARD_SHARED_CACHE_TTL_SECONDS = int(
+    os.environ.get("DASHBOARD_SHARED_CACHE_TTL_SECONDS", 600)
+)
+DASHBOARD_SECTION_TIMEOUT_SECONDS = float(
+    os.environ.get("DASHBOARD_SECTION_TIMEOUT_SECONDS", 2.0)
+)
+DASHBOARD_SECTION_MAX_WORKERS = int(os.environ.get("DASHBOARD_SECTION_MAX_WORKERS", 16))
+
+_PENDING_INVALIDATION_KEY = "dashboard_shared_cache_invalidation"
+
+# Shared by every request in the process. Sections that overrun their budget keep
+# their worker until they finish, so this also caps how much work can pile up behind
+# a slow dependency.
+_executor = futures.ThreadPoolExecutor(
+    max_workers=DASHBOARD_SECTION_MAX_WORKERS, thread_name_prefix="dashboard-section"
+)
+
+
+def _record_section(name: str, outcome: str, duration_ms: float) -> None:
+    stats.histogram(
+        metric_name=f"{METRIC_PREFIX}.section.duration_ms",
+        pod_name=stats.PodNames.ENROLLMENTS,
+        metric_value=duration_ms,
+        tags=[f"section:{name}", f"outcome:{outcome}"],
+    )
+
+
+@contextlib.contextmanager
+def timed_section(name: str) -> Iterator[None]:
+    """Time a section that is loaded inline, errors are re-raised."""
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        _record_section(name, outcome, (time.perf_counter() - start) * 1000)
+
+
+@dataclasses.dataclass
+class _PendingSection:
+    fallback: Any
+    deadline: float
+    future: Optional[futures.Future] = None
+    value: Any = None
+
+
+class SectionLoader:
+    """
+    Load independent dashboard sections, optionally in parallel.
+
+    Sections must not touch ORM objects loaded by the request; pass ids instead. In
+    parallel mode each section runs in its own app context and database session.
+
+    Usage:
+        loader = SectionLoader(parallel=True)
+        loader.submit("wallet_status", functools.partial(f, user_id), fallback=None)
+        ...
+        wallet_status = loader.result("wallet_status")
+    """
+
+    def __init__(self, parallel: bool = False) -> None:
+        self.parallel = parallel
+        self._sections: Dict[str, _PendingSection] = {}
+
+    def submit(
+        self,
+        name: str,
+        func: Callable[[], T],
+        fallback: T,
+        timeout_seconds: float = DASHBOARD_SECTION_TIMEOUT_SECONDS,
+    ) -> None:
+        section = _PendingSection(
+            fallback=fallback, deadline=time.monotonic() + timeout_seconds
+        )
+        self._sections[name] = section
+        if self.parallel:
+            section.future = _executor.submit(
+                _run_in_app_context,
+                flask.current_app._get_current_object(),  # type: ignore[attr-defined] # "Flask" has no attribute "_get_current_object"
+                ddtrace.tracer.current_trace_context(),
+                name,
+                func,
+            )
+        else:
+            section.value = self._run_inline(name, func, fallback)
+
+    def result(self, name: str) -> Any:
+        section = self._sections[name]
+        if section.future is None:
+            return section.value
+
+        remaining = max(section.deadline - time.monotonic(), 0)
+        try:
+            return section.future.result(timeout=remaining)
+        except futures.TimeoutError:
+            log.warning("Dashboard section timed out", section=name)
+            stats.increment(
+                metric_name=f"{METRIC_PREFIX}.section.timeout",
+                pod_name=stats.PodNames.ENROLLMENTS,
+                tags=[f"section:{name}"],
+            )
+        except Exception as e:
+            log.exception("Dashboard section failed", section=name, error=str(e))
+        return section.fallback
+
+    @staticmethod
+    def _run_inline(name: str, func: Callable[[], T], fallback: T) -> T:
+        try:
+            with timed_section(name):
+                return func()
+        except Exception as e:
+            log.exception("Dashboard section failed", section=name, error=str(e))
+            return fallback
+
+
+def _run_in_app_context(  # type: ignore[no-untyped-def] # Function is missing a type annotation for one or more arguments
+    app: flask.Flask, dd_context, name: str, func: Callable[[], T]
+) -> T:
+    # Ties the section to the request in Datadog traces.
+    ddtrace.tracer.context_provider.activate(dd_context)
+    with app.app_context():
+        try:
+            with timed_section(name):
+                return func()
+        finally:
+            db.session.remove()
+
+
+class SharedSectionCache:
+    """A versioned Redis cache for dashboard sections shared between members."""
+
+    def __init__(
+        self,
+        namespace: str,
+        ttl_in_seconds: int = DASHBOARD_SHARED_CACHE_TTL_SECONDS,
+        redis_cache: Optional[RedisTTLCache] = None,
+    ) -> None:
+        self.namespace = namespace
+        self.redis_cache = redis_cache or RedisTTLCache(
+            namespace=namespace,
+            ttl_in_seconds=ttl_in_seconds,
+            pod_name=stats.PodNames.ENROLLMENTS,
+        )
+
+    @property
+    def version_key(self) -> str:
+        return f"{self.namespace}:version"
+
+    def get_or_load(
+        self,
+        key: str,
+        load: Callable[[], T],
+        dump: Callable[[T], Any],
+        restore: Callable[[Any], T],
+    ) -> T:
+        """
+        Get a cached section or load and cache it.
+
+        `dump` converts the section to something JSON serializable and `restore`
+        converts it back.
+        """
+        if not DASHBOARD_SHARED_CACHE_ENABLED:
+            return load()
+
+        version = self._version()
+        if version is None:
+            return load()
+
+        versioned_key = f"{version}:{key}"
+        cached = self.redis_cache.get(versioned_key)
+        if cached is not None:
+            try:
+                return restore(cached)
+            except (KeyError, TypeError) as e:
+                log.warning(
+                    "Invalid cached dashboard section", key=versioned_key, error=str(e)
+                )
+
+        value = load()
+        try:
+            self.redis_cache.add(versioned_key, dump(value))
+        except TypeError as e:
+            log.warning(
+                "Dashboard section is not serializable", key=versioned_key, error=str(e)
+            )
+        return value
+
+    def invalidate(self) -> None:
+        try:
+            self.redis_cache.get_client().incr(self.version_key)
+        except redis.RedisError as e:
+            log.error(
+                "Failed to invalidate dashboard section cache",
+                namespace=self.namespace,
+                error=str(e),
+            )
+
+    def _version(self) -> Optional[int]:
+        try:
+            version = self.redis_cache.get_client().get(self.version_key)
+        except redis.RedisError as e:
+            log.warning(
+                "Failed to read dashboard section cache version",
+                namespace=self.namespace,
+                error=str(e),
+            )
+            return None
+        try:
+            return int(version or 0)
+        except (TypeError, ValueError):
+            return 0
+
+
+library_cache = SharedSectionCache(namespace="dashboard_library")
+
+_LIBRARY_MODELS = (Resource, ResourceTrack, ResourceTrackPhase)
+
+
+@event.listens_for(Session, "before_flush")
+def collect_library_invalidation(session, flush_context, instances):  # type: ignore[no-untyped-def] # Function is missing a type annotation
+    if any(
+        isinstance(instance, _LIBRARY_MODELS)
+        for instance in (*session.new, *session.dirty, *session.deleted)
+    ):
+        session.info[_PENDING_INVALIDATION_KEY] = True
+
+
+@event.listens_for(Session, "after_commit")
+def invalidate_library_cache(session):  # type: ignore[no-untyped-def] # Function is missing a type annotation
+    if session.info.pop(_PENDING_INVALIDATION_KEY, False):
+        library_cache.invalidate()
+
+
+@event.listens_for(Session, "after_rollback")
+def discard_library_invalidation(session):  # type: ignore[no-untyped-def] # Function is missing a type annotation
+    session.info.pop(_PENDING_INVALIDATION_KEY, None)
@@ -0,0 +1,222 @@
+import tempfile
+from unittest.mock import MagicMock, patch
+
+import pytest
+import redis
+
+from storage.connection import db
+from wallet.models.constants import WalletState
+from wallet.models.reimbursement_wallet_debit_card import ReimbursementWalletDebitCard
+from wallet.pytests.factories import (
+    ReimbursementWalletDebitCardFactory,
+    ReimbursementWalletFactory,
+)
+from wallet.utils.alegeus.edi_processing.edi_import_pipeline import (
+    ImportCheckpoint,
+    batched,
+    get_debit_cards_by_proxy_number,
+    get_qualified_wallets_by_alegeus_id,
+    iter_edi_records,
+    run_stage,
+)
+from wallet.utils.alegeus.edi_processing.process_edi_transactions import (
+    _process_alegeus_transactions_batch,
+    _sync_alegeus_transactions_batch,
+)
+
+
+@pytest.fixture
+def mock_checkpoint_redis():
+    with patch(
+        "wallet.utils.alegeus.edi_processing.edi_import_pipeline.get_redis_client"
+    ) as mock_get_client:
+        client = MagicMock()
+        client.get.return_value = None
+        mock_get_client.return_value = client
+        yield client
+
+
+@pytest.fixture
+def records_file():
+    f = tempfile.TemporaryFile()
+    f.write(b"EK,2\r\n EK,a,1\r\n EK,b,2\r\n EM,1\r\n EM,c,3\r\n")
+    f.seek(0)
+    return f
+
+
+def test_iter_edi_records_skips_headers(records_file):
+    records = list(iter_edi_records(records_file))
+
+    assert [(r.line_number, r.record_type, r.items) for r in records] == [
+        (2, "EK", ["EK", "a", "1"]),
+        (3, "EK", ["EK", "b", "2"]),
+        (5, "EM", ["EM", "c", "3"]),
+    ]
+    assert records[2].line == "EM,c,3"
+
+
+def test_iter_edi_records_starts_after_line(records_file):
+    records = list(iter_edi_records(records_file, start_after=3))
+
+    assert [r.line_number for r in records] == [5]
+
+
+def test_batched(records_file):
+    batches = list(batched(iter_edi_records(records_file), 2))
+
+    assert [[r.line_number for r in batch] for batch in batches] == [[2, 3], [5]]
+
+
+def test_run_stage_checkpoints_every_batch(records_file, mock_checkpoint_redis):
+    process_batch = MagicMock()
+
+    metrics = run_stage("test", "file.exp", records_file, process_batch, batch_size=2)
+
+    assert process_batch.call_count == 2
+    assert metrics.num_records == 3
+    assert metrics.num_batches == 2
+    assert dict(metrics.records_by_type) == {"EK": 2, "EM": 1}
+    assert [c.args for c in mock_checkpoint_redis.set.call_args_list] == [
+        ("alegeus_edi_import:file.exp:test", 3),
+        ("alegeus_edi_import:file.exp:test", 5),
+    ]
+
+
+def test_run_stage_resumes_from_checkpoint(records_file, mock_checkpoint_redis):
+    mock_checkpoint_redis.get.return_value = b"3"
+    process_batch = MagicMock()
+
+    run_stage("test", "file.exp", records_file, process_batch, batch_size=2)
+
+    process_batch.assert_called_once()
+    assert [r.line_number for r in process_batch.call_args[0][0]] == [5]
+
+
+def test_run_stage_failed_batch_keeps_checkpoint(records_file, mock_checkpoint_redis):
+    process_batch = MagicMock(side_effect=[None, ValueError("boom")])
+
+    with pytest.raises(ValueError):
+        run_stage("test", "file.exp", records_file, process_batch, batch_size=2)
+
+    assert [c.args[1] for c in mock_checkpoint_redis.set.call_args_list] == [3]
+    mock_checkpoint_redis.delete.assert_not_called()
+
+
+def test_run_stage_syncs_committed_batches(records_file, mock_checkpoint_redis):
+    calls = MagicMock()
+
+    with patch(
+        "wallet.utils.alegeus.edi_processing.edi_import_pipeline.db.session.commit",
+        calls.commit,
+    ):
+        run_stage(
+            "test",
+            "file.exp",
+            records_file,
+            calls.process_batch,
+            batch_size=2,
+            sync_batch=calls.sync_batch,
+        )
+
+    assert [c[0] for c in calls.mock_calls] == [
+        "process_batch",
+        "commit",
+        "sync_batch",
+    ] * 2
+    assert [r.line_number for r in calls.sync_batch.call_args[0][0]] == [5]
+
+
+def test_import_checkpoint_ignores_redis_errors(mock_checkpoint_redis):
+    mock_checkpoint_redis.get.side_effect = redis.ConnectionError()
+
+    assert ImportCheckpoint("file.exp", "test").get() == 0
+
+
+def test_get_qualified_wallets_by_alegeus_id_uses_latest_wallet():
+    ReimbursementWalletFactory.create(alegeus_id="123", state=WalletState.QUALIFIED)
+    latest = ReimbursementWalletFactory.create(
+        alegeus_id="123", state=WalletState.QUALIFIED
+    )
+    ReimbursementWalletFactory.create(alegeus_id="456", state=WalletState.PENDING)
+
+    wallets = get_qualified_wallets_by_alegeus_id(["123", "456", None])
+
+    assert wallets == {"123": latest}
+
+
+def test_get_debit_cards_by_proxy_number(qualified_alegeus_wallet_hra):
+    debit_card = ReimbursementWalletDebitCardFactory.create(
+        reimbursement_wallet_id=qualified_alegeus_wallet_hra.id,
+        card_proxy_number="1100054071243581",
+    )
+
+    assert get_debit_cards_by_proxy_number(["1100054071243581", "missing"]) == {
+        "1100054071243581": debit_card
+    }
+
+
+def test_process_alegeus_transactions_batch_leaves_api_calls_to_the_sync(
+    export_file, qualified_alegeus_wallet_hra
+):
+    records = list(iter_edi_records(export_file))
+
+    with patch(
+        "wallet.utils.alegeus.edi_processing.process_edi_transactions.get_all_debit_card_transactions"
+    ) as mock_get_transactions, patch(
+        "wallet.utils.alegeus.edi_processing.process_edi_transactions._process_em_record"
+    ) as mock_process_em_record:
+        _process_alegeus_transactions_batch(records)
+
+    mock_process_em_record.assert_called_once()
+    mock_get_transactions.assert_not_called()
+
+
+def test_sync_alegeus_transactions_batch_loads_wallets_once(
+    export_file, qualified_alegeus_wallet_hra
+):
+    records = list(iter_edi_records(export_file))
+
+    with patch(
+        "wallet.utils.alegeus.edi_processing.process_edi_transactions.get_qualified_wallets_by_alegeus_id",
+        return_value={"456": qualified_alegeus_wallet_hra},
+    ) as mock_get_wallets, patch(
+        "wallet.utils.alegeus.edi_processing.process_edi_transactions.get_all_debit_card_transactions"
+    ) as mock_get_transactions:
+        _sync_alegeus_transactions_batch(records, set())
+
+    mock_get_wallets.assert_called_once()
+    # Each wallet's transactions are committed by their own sync
+    mock_get_transactions.assert_called_once_with(
+        qualified_alegeus_wallet_hra, timeout=10
+    )
+
+
+def test_process_alegeus_transactions_batch_skips_failed_record(
+    records_file, qualified_alegeus_wallet_hra
+):
+    records = list(iter_edi_records(records_file))
+
+    def add_debit_card(record, lookups):
+        db.session.add(
+            ReimbursementWalletDebitCard(
+                reimbursement_wallet_id=qualified_alegeus_wallet_hra.id,
+                card_proxy_number=str(record.line_number),
+                # The record on line 3 fails to flush
+                card_last_4_digits=None if record.line_number == 3 else "1234",
+            )
+        )
+
+    with patch(
+        "wallet.utils.alegeus.edi_processing.process_edi_transactions._process_alegeus_transaction",
+        side_effect=add_debit_card,
+    ), patch(
+        "wallet.utils.alegeus.edi_processing.process_edi_transactions.log"
+    ) as mock_log:
+        _process_alegeus_transactions_batch(records)
+
+    debit_cards = ReimbursementWalletDebitCard.query.filter_by(
+        reimbursement_wallet_id=qualified_alegeus_wallet_hra.id
+    ).all()
+    assert {debit_card.card_proxy_number for debit_card in debit_cards} == {"2", "5"}
+    mock_log.exception.assert_called_once()
+    assert mock_log.exception.call_args.kwargs["line_number"] == 3
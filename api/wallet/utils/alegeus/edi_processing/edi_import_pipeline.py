@@ -0,0 +1,255 @@
+"""
+Streaming building blocks for importing Alegeus EDI export files.
+
+Export files are read one line at a time and processed in batches. Each batch
+resolves what it needs (wallets, debit cards, transactions) with one query per kind of
+record instead of one per line, applies its changes and commits once. After every
+committed batch the last line number is checkpointed in Redis, so a run that dies
+part way through a file resumes after the last committed batch when it is retried.
+Checkpoints are kept until the whole import of the file succeeds, so a retry also
+skips the stages that already completed.
+"""
+from __future__ import annotations
+
+import collections
+import dataclasses
+import itertools
+import os
+import time
+from datetime import timedelta
+from typing import IO, Callable, Dict, Iterable, Iterator, List, Optional
+
+import redis
+from sqlalchemy.orm import joinedload
+
+from caching.redis import get_redis_client
+from common import stats
+from storage.connection import db
+from utils.log import logger
+from wallet.models.constants import WalletState
+from wallet.models.reimbursement import ReimbursementTransaction
+from wallet.models.reimbursement_wallet import ReimbursementWallet
+from wallet.models.reimbursement_wallet_debit_card import ReimbursementWalletDebitCard
+
+log = logger(__name__)
+
+METRIC_PREFIX = "api.wallet.utils.alegeus.edi_processing.edi_import"
+EDI_IMPORT_BATCH_SIZE = int(os.environ.get("ALEGEUS_EDI_IMPORT_BATCH_SIZE", 500))
+CHECKPOINT_TTL = timedelta(days=3)
+
+
+@dataclasses.dataclass(frozen=True)
+class EdiRecord:
+    line_number: int
+    record_type: str
+    # The line without surrounding whitespace
+    line: str
+    items: List[str]
+
+
+def iter_edi_records(file: IO[bytes], start_after: int = 0) -> Iterator[EdiRecord]:
+    """
+    Lazily parse the records of an export file, skipping the section headers and
+    the lines up to and including `start_after`.
+    """
+    file.seek(0)
+    for line_number, raw_line in enumerate(file, start=1):
+        if line_number <= start_after:
+            continue
+        line = raw_line.decode("utf-8").strip()
+        items = line.split(",")
+        if len(items) == 2:
+            # Section header with the number of records that follow
+            log.info(f"iter_edi_records: Processing {items[1]} {items[0]} records.")
+            continue
+        yield EdiRecord(
+            line_number=line_number, record_type=items[0], line=line, items=items
+        )
+
+
+def batched(records: Iterable[EdiRecord], size: int) -> Iterator[List[EdiRecord]]:
+    iterator = iter(records)
+    while batch := list(itertools.islice(iterator, size)):
+        yield batch
+
+
+class ImportCheckpoint:
+    """The last line of a file committed by a stage of the import."""
+
+    def __init__(self, file_name: str, stage: str) -> None:
+        self.key = f"alegeus_edi_import:{file_name}:{stage}"
+
+    def get(self) -> int:
+        try:
+            value = get_redis_client().get(self.key)
+        except redis.RedisError as e:
+            log.warning("ImportCheckpoint: Unable to read checkpoint", error=str(e))
+            return 0
+        try:
+            return int(value or 0)
+        except (TypeError, ValueError):
+            return 0
+
+    def save(self, line_number: int) -> None:
+        try:
+            get_redis_client().set(self.key, line_number, ex=CHECKPOINT_TTL)
+        except redis.RedisError as e:
+            log.warning("ImportCheckpoint: Unable to save checkpoint", error=str(e))
+
+    def clear(self) -> None:
+        try:
+            get_redis_client().delete(self.key)
+        except redis.RedisError as e:
+            log.warning("ImportCheckpoint: Unable to clear checkpoint", error=str(e))
+
+
+class StageMetrics:
+    """Counts and throughput for one stage of an import."""
+
+    def __init__(self, stage: str) -> None:
+        self.stage = stage
+        self.records_by_type: Dict[str, int] = collections.Counter()
+        self.num_batches = 0
+        self.seconds = 0.0
+
+    @property
+    def num_records(self) -> int:
+        return sum(self.records_by_type.values())
+
+    def batch_processed(self, batch: List[EdiRecord], seconds: float) -> None:
+        self.num_batches += 1
+        self.seconds += seconds
+        self.records_by_type.update(record.record_type for record in batch)
+        stats.histogram(
+            metric_name=f"{METRIC_PREFIX}.batch.duration",
+            pod_name=stats.PodNames.PAYMENTS_POD,
+            metric_value=seconds,
+            tags=[f"stage:{self.stage}"],
+        )
+
+    def report(self) -> None:
+        for record_type, count in self.records_by_type.items():
+            stats.increment(
+                metric_name=f"{METRIC_PREFIX}.records",
+                pod_name=stats.PodNames.PAYMENTS_POD,
+                metric_value=count,
+                tags=[f"stage:{self.stage}", f"record_type:{record_type}"],
+            )
+        if self.seconds:
+            stats.histogram(
+                metric_name=f"{METRIC_PREFIX}.records_per_second",
+                pod_name=stats.PodNames.PAYMENTS_POD,
+                metric_value=self.num_records / self.seconds,
+                tags=[f"stage:{self.stage}"],
+            )
+        log.info(
+            "StageMetrics: EDI import stage completed",
+            stage=self.stage,
+            num_records=self.num_records,
+            num_batches=self.num_batches,
+            seconds=round(self.seconds, 3),
+            records_by_type=dict(self.records_by_type),
+        )
+
+
+def run_stage(
+    stage: str,
+    file_name: str,
+    file: IO[bytes],
+    process_batch: Callable[[List[EdiRecord]], None],
+    batch_size: int = EDI_IMPORT_BATCH_SIZE,
+    sync_batch: Optional[Callable[[List[EdiRecord]], None]] = None,
+) -> StageMetrics:
+    """
+    Run `process_batch` over the records of a file, committing and checkpointing
+    after every batch. `process_batch` is expected to process each record in a
+    savepoint and skip the records that fail, anything else rolls back the batch and
+    stops the stage.
+
+    `sync_batch` is called with every committed batch before it is checkpointed, for
+    calls to external APIs that must not hold the batch transaction open. It commits
+    its own changes.
+    """
+    checkpoint = ImportCheckpoint(file_name, stage)
+    start_after = checkpoint.get()
+    if start_after:
+        log.info(
+            "run_stage: Resuming EDI import from checkpoint",
+            stage=stage,
+            file_name=file_name,
+            start_after=start_after,
+        )
+
+    metrics = StageMetrics(stage)
+    for batch in batched(iter_edi_records(file, start_after), batch_size):
+        start = time.perf_counter()
+        try:
+            process_batch(batch)
+            db.session.commit()
+            if sync_batch is not None:
+                sync_batch(batch)
+        except Exception:
+            db.session.rollback()
+            raise
+        checkpoint.save(batch[-1].line_number)
+        metrics.batch_processed(batch, time.perf_counter() - start)
+
+    metrics.report()
+    return metrics
+
+
+def clear_checkpoints(file_name: str, *stages: str) -> None:
+    for stage in stages:
+        ImportCheckpoint(file_name, stage).clear()
+
+
+def get_qualified_wallets_by_alegeus_id(
+    alegeus_ids: Iterable[str],
+) -> Dict[str, ReimbursementWallet]:
+    """The latest qualified wallet for each Alegeus employee id."""
+    alegeus_ids = {alegeus_id for alegeus_id in alegeus_ids if alegeus_id}
+    if not alegeus_ids:
+        return {}
+    wallets = (
+        ReimbursementWallet.query.filter(
+            ReimbursementWallet.alegeus_id.in_(alegeus_ids),
+            ReimbursementWallet.state == WalletState.QUALIFIED,
+        )
+        .order_by(ReimbursementWallet.id)
+        .all()
+    )
+    # Later wallets replace earlier ones
+    return {wallet.alegeus_id: wallet for wallet in wallets}
+
+
+def get_debit_cards_by_proxy_number(
+    card_proxy_numbers: Iterable[str],
+) -> Dict[str, ReimbursementWalletDebitCard]:
+    card_proxy_numbers = {number for number in card_proxy_numbers if number}
+    if not card_proxy_numbers:
+        return {}
+    debit_cards = ReimbursementWalletDebitCard.query.filter(
+        ReimbursementWalletDebitCard.card_proxy_number.in_(card_proxy_numbers)
+    ).all()
+    return {debit_card.card_proxy_number: debit_card for debit_card in debit_cards}
+
+
+def get_transactions_by_key(
+    transaction_keys: Iterable[str],
+) -> Dict[str, ReimbursementTransaction]:
+    """The first transaction for each Alegeus transaction key, with its request."""
+    transaction_keys = {key for key in transaction_keys if key}
+    if not transaction_keys:
+        return {}
+    transactions = (
+        ReimbursementTransaction.query.options(
+            joinedload(ReimbursementTransaction.reimbursement_request)
+        )
+        .filter(ReimbursementTransaction.alegeus_transaction_key.in_(transaction_keys))
+        .order_by(ReimbursementTransaction.id)
+        .all()
+    )
+    transactions_by_key: Dict[str, ReimbursementTransaction] = {}
+    for transaction in transactions:
+        transactions_by_key.setdefault(transaction.alegeus_transaction_key, transaction)
+    return transactions_by_key
@@ -1,8 +1,11 @@
 from __future__ import annotations
 
 import csv
+import dataclasses
 import enum
+import functools
 from datetime import datetime, timedelta
+from typing import Dict, List, Optional
 
 from audit_log.utils import emit_audit_log_create, emit_audit_log_update
 from common import stats
@@ -28,11 +31,22 @@ from wallet.utils.alegeus.edi_processing.common import (
     get_versioned_file,
     map_edi_results_header,
 )
+from wallet.utils.alegeus.edi_processing.edi_import_pipeline import (
+    EdiRecord,
+    clear_checkpoints,
+    get_debit_cards_by_proxy_number,
+    get_qualified_wallets_by_alegeus_id,
+    get_transactions_by_key,
+    run_stage,
+)
 
 log = logger(__name__)
 
 metric_prefix = "api.wallet.utils.alegeus.edi_processing.process_edi_transactions"
 
+INSUFFICIENT_TRANSACTIONS_STAGE = "insufficient_transactions"
+TRANSACTIONS_STAGE = "transactions"
+
 
 class AlegeusTransactionCode(str, enum.Enum):
     AUPI = "AUPI"  # Transaction status code for an Insufficient Documentation transaction in Alegeus.
@@ -75,27 +89,26 @@ def download_and_process_alegeus_transactions_export(is_retry: bool = False) ->
             )
         if export_file in files:
             export_temp = create_temp_file(export_file, sftp)
-            # Iterate over the temp file first to  check for insufficient transaction codes.
-            for line in export_temp:
-                try:
-                    _process_insufficient_transactions(line)
-                except Exception as e:
-                    log.exception(
-                        "_process_insufficient_transactions."
-                        "Unable to process record.",
-                        error=e,
-                    )
-            db.session.commit()
-            export_temp.seek(0)
-
-            for line in export_temp:
-                try:
-                    _process_alegeus_transactions(line, processed_alegeus_employee_ids)
-                except Exception as e:
-                    log.exception(
-                        "_process_alegeus_transactions.Unable to process record.",
-                        error=e,
-                    )
+            # Mark insufficient transactions first so the API sync below can't override them.
+            run_stage(
+                INSUFFICIENT_TRANSACTIONS_STAGE,
+                export_file,
+                export_temp,
+                _process_insufficient_transactions_batch,
+            )
+            run_stage(
+                TRANSACTIONS_STAGE,
+                export_file,
+                export_temp,
+                _process_alegeus_transactions_batch,
+                sync_batch=functools.partial(
+                    _sync_alegeus_transactions_batch,
+                    processed_alegeus_employee_ids=processed_alegeus_employee_ids,
+                ),
+            )
+            clear_checkpoints(
+                export_file, INSUFFICIENT_TRANSACTIONS_STAGE, TRANSACTIONS_STAGE
+            )
             success = True
             log.info(
                 f"download_and_process_alegeus_transactions_export: Total members updated - EN_EK {EN_EK_RECORD_COUNTER},"
@@ -151,39 +164,128 @@ def _process_edi_response(file):  # type: ignore[no-untyped-def] # Function is m
             i += 1
 
 
-def _process_alegeus_transactions(line: str, processed_alegeus_employee_id: set):  # type: ignore[no-untyped-def] # Function is missing a return type annotation
+@dataclasses.dataclass
+class EdiBatchLookups:
+    """Wallets and debit cards referenced by a batch of records, loaded up front."""
+
+    wallets_by_alegeus_id: Dict[str, ReimbursementWallet]
+    debit_cards_by_proxy_number: Dict[str, ReimbursementWalletDebitCard]
+
+
+def _process_alegeus_transactions_batch(records: List[EdiRecord]) -> None:
     """
-    Cleans the line data, reads what type of file and sends it to the correct processor. Each
-    type of file has its own header that has the number of records for that type (EN, EM, EK).
+    Sends each record of a batch to the processor for its type, with the wallets and debit cards for the whole
+    batch loaded in two queries. EN and EK records call the Alegeus API and are synced once the batch is
+    committed, see _sync_alegeus_transactions_batch.
 
-    @param line: A line item from the downloaded export file.
-    @param processed_alegeus_employee_id: A set that holds the employee id of records already processed
+    @param records: A batch of records from the downloaded export file.
     """
-    cleaned_line = line.decode("utf-8").strip()  # type: ignore[attr-defined] # "str" has no attribute "decode"; maybe "encode"?
-    line_items = cleaned_line.split(",")
-    if len(line_items) == 2:
-        log.info(
-            f"process_alegeus_transactions: Processing {line_items[1]} transactions."
-        )  # Log the number of transactions being processed.
-    else:
-        record_type = line_items[0]
-        if record_type == AlegeusExportRecordTypes.EN.name:
-            en_dict = map_en_records(line_items)
-            _process_en_ek_record(
-                en_dict,
-                processed_alegeus_employee_id,
-                AlegeusExportRecordTypes.EN,
+    em_dicts = [
+        map_em_records(record.line)
+        for record in records
+        if record.record_type == AlegeusExportRecordTypes.EM.name
+    ]
+    debit_cards = get_debit_cards_by_proxy_number(
+        em_dict.get("card_proxy_number") for em_dict in em_dicts if em_dict
+    )
+    # Only EM records for cards we don't have yet need a wallet
+    em_employee_ids = {
+        em_dict.get("employee_id")
+        for em_dict in em_dicts
+        if em_dict and em_dict.get("card_proxy_number") not in debit_cards
+    }
+    lookups = EdiBatchLookups(
+        wallets_by_alegeus_id=get_qualified_wallets_by_alegeus_id(em_employee_ids),
+        debit_cards_by_proxy_number=debit_cards,
+    )
+
+    for record in records:
+        try:
+            # A record that fails to flush only rolls back its own changes
+            with db.session.begin_nested():
+                _process_alegeus_transaction(record, lookups)
+        except Exception as e:
+            log.exception(
+                "_process_alegeus_transactions_batch.Unable to process record.",
+                line_number=record.line_number,
+                error=e,
+            )
+
+
+def _process_alegeus_transaction(record: EdiRecord, lookups: EdiBatchLookups) -> None:
+    record_type = record.record_type
+    if record_type == AlegeusExportRecordTypes.EM.name:
+        _process_em_record(record.line, lookups=lookups)
+    elif record_type not in (
+        AlegeusExportRecordTypes.EN.name,
+        AlegeusExportRecordTypes.EK.name,
+    ):
+        log.info(f"_process_alegeus_transaction: Record type not found: {record_type}")
+
+
+def _sync_alegeus_transactions_batch(
+    records: List[EdiRecord], processed_alegeus_employee_ids: set
+) -> None:
+    """
+    Syncs the transactions of the members in the EN and EK records of a committed batch from the Alegeus API.
+    Each member's transactions are committed on their own, so no transaction is held open across the API calls
+    of the whole batch.
+
+    @param records: A batch of records from the downloaded export file.
+    @param processed_alegeus_employee_ids: A set that holds the employee id of records already processed
+    """
+    en_ek_dicts = []
+    for record in records:
+        if record.record_type == AlegeusExportRecordTypes.EN.name:
+            en_ek_dicts.append(
+                (map_en_records(record.items), AlegeusExportRecordTypes.EN)
             )
-        elif record_type == AlegeusExportRecordTypes.EM.name:
-            _process_em_record(cleaned_line)
-        elif record_type == AlegeusExportRecordTypes.EK.name:
-            ek_dict = map_ek_records(line_items)
-            _process_en_ek_record(
-                ek_dict, processed_alegeus_employee_id, AlegeusExportRecordTypes.EK
+        elif record.record_type == AlegeusExportRecordTypes.EK.name:
+            en_ek_dicts.append(
+                (map_ek_records(record.items), AlegeusExportRecordTypes.EK)
             )
-        else:
-            log.info(
-                f"_process_alegeus_transactions: Record type not found: {record_type}"
+    employee_ids = {
+        line_dict.get("employee_id")
+        for line_dict, _ in en_ek_dicts
+        if line_dict and line_dict.get("card_proxy_number")
+    }
+    wallets = get_qualified_wallets_by_alegeus_id(
+        employee_ids - processed_alegeus_employee_ids
+    )
+    # End the read before the first API call
+    db.session.commit()
+    for line_dict, record_type in en_ek_dicts:
+        _process_en_ek_record(
+            line_dict, processed_alegeus_employee_ids, record_type, wallets=wallets
+        )
+
+
+def _process_insufficient_transactions_batch(records: List[EdiRecord]) -> None:
+    """
+    Processes a batch of records with the insufficient status, loading their transactions in one query.
+
+    @param records: A batch of records from the downloaded export file.
+    """
+    transaction_dicts = [
+        (record, transaction_dict)
+        for record, transaction_dict in (
+            (record, _map_insufficient_transaction(record.items)) for record in records
+        )
+        if transaction_dict
+    ]
+    transactions_by_key = get_transactions_by_key(
+        transaction_dict.get("transaction_key")
+        for _, transaction_dict in transaction_dicts
+    )
+    for record, transaction_dict in transaction_dicts:
+        try:
+            with db.session.begin_nested():
+                _update_insufficient_transaction(transaction_dict, transactions_by_key)
+        except Exception as e:
+            log.exception(
+                "_process_insufficient_transactions_batch.Unable to process record.",
+                line_number=record.line_number,
+                error=e,
             )
 
 
@@ -198,34 +300,47 @@ def _process_insufficient_transactions(line):  # type: ignore[no-untyped-def] #
     @param line: A line item from the downloaded export file.
     """
     cleaned_line = line.decode("utf-8").strip()
-    line_items = cleaned_line.split(",")
-    if len(line_items) == 2:
-        return
+    transaction_dict = _map_insufficient_transaction(cleaned_line.split(","))
+    if transaction_dict:
+        _update_insufficient_transaction(
+            transaction_dict,
+            get_transactions_by_key([transaction_dict.get("transaction_key")]),
+        )
 
+
+def _map_insufficient_transaction(line_items: list) -> Optional[dict]:
+    """Maps an EN or EK record, if it is a card transaction with the insufficient status."""
     record_type = line_items[0]
     if record_type == AlegeusExportRecordTypes.EN.name:
         transaction_dict = map_en_records(line_items)
     elif record_type == AlegeusExportRecordTypes.EK.name:
         transaction_dict = map_ek_records(line_items)
     else:
-        return
+        return None
 
-    transaction_status = transaction_dict.get("transaction_status")
     if (
-        transaction_status == AlegeusTransactionCode.AUPI.value
+        transaction_dict
+        and transaction_dict.get("transaction_status")
+        == AlegeusTransactionCode.AUPI.value
         and transaction_dict.get("card_proxy_number")
     ):
-        transaction_key = transaction_dict.get("transaction_key")
-        reimbursement_transaction = ReimbursementTransaction.query.filter_by(
-            alegeus_transaction_key=transaction_key
-        ).first()
-        if reimbursement_transaction:
-            reimbursement_request = reimbursement_transaction.reimbursement_request
-            emit_audit_log_update(reimbursement_request)
-            reimbursement_request.update_state(
-                ReimbursementRequestState.INSUFFICIENT_RECEIPT
-            )
-            db.session.add(reimbursement_request)
+        return transaction_dict
+    return None
+
+
+def _update_insufficient_transaction(
+    transaction_dict: dict, transactions_by_key: Dict[str, ReimbursementTransaction]
+) -> None:
+    reimbursement_transaction = transactions_by_key.get(
+        transaction_dict.get("transaction_key")  # type: ignore[arg-type] # Argument 1 to "get" of "dict" has incompatible type "Optional[Any]"
+    )
+    if reimbursement_transaction:
+        reimbursement_request = reimbursement_transaction.reimbursement_request
+        emit_audit_log_update(reimbursement_request)
+        reimbursement_request.update_state(
+            ReimbursementRequestState.INSUFFICIENT_RECEIPT
+        )
+        db.session.add(reimbursement_request)
 
 
 def map_en_records(line: list):  # type: ignore[no-untyped-def] # Function is missing a return type annotation
@@ -337,6 +452,7 @@ def _process_en_ek_record(  # type: ignore[no-untyped-def] # Function is missing
     line_dict: dict,
     processed_records: set,
     record_type: AlegeusExportRecordTypes,
+    wallets: Optional[Dict[str, ReimbursementWallet]] = None,
 ):
     """
     Query for associated wallet and calls the get_all_debit_card_transactions to process the users transactions.
@@ -344,6 +460,7 @@ def _process_en_ek_record(  # type: ignore[no-untyped-def] # Function is missing
     @param line_dict: A dictionary of mapped line items from the downloaded export file.
     @param processed_records: A set that holds the employee id of records already processed.
     @param record_type: The enum type of record returned from export file line item.
+    @param wallets: Qualified wallets by alegeus_id loaded for the batch, the wallet is queried if not given.
     """
 
     # skip if missing data or if not a card transaction
@@ -351,14 +468,10 @@ def _process_en_ek_record(  # type: ignore[no-untyped-def] # Function is missing
         employee_id = line_dict.get("employee_id")
         if employee_id and employee_id not in processed_records:
             try:
-                wallet = (
-                    ReimbursementWallet.query.filter_by(
-                        alegeus_id=employee_id,
-                        state=WalletState.QUALIFIED,
-                    )
-                    .order_by(ReimbursementWallet.id.desc())
-                    .one_or_none()
-                )
+                if wallets is None:
+                    wallet = _get_qualified_wallet(employee_id)
+                else:
+                    wallet = wallets.get(employee_id)
                 if wallet:
                     get_all_debit_card_transactions(wallet, timeout=10)
                     processed_records.add(employee_id)
@@ -374,7 +487,15 @@ def _process_en_ek_record(  # type: ignore[no-untyped-def] # Function is missing
                 )
 
 
-def _process_em_record(line: str) -> bool:
+def _process_em_record(line: str, lookups: Optional[EdiBatchLookups] = None) -> bool:
+    """
+    Creates or updates the debit card in an EM record.
+
+    @param line: A cleaned EM line from the downloaded export file.
+    @param lookups: Wallets and debit cards loaded for the batch. When given, changes are left for the caller
+    to commit with the rest of the batch, otherwise they are looked up and committed here.
+    """
+
     def tag_successful(successful: bool, reason: str | None = None) -> None:
         metric_name = f"{metric_prefix}._process_em_record"
         if successful:
@@ -393,9 +514,12 @@ def _process_em_record(line: str) -> bool:
         card_proxy = em_dict.get("card_proxy_number")
 
         try:
-            debit_card = ReimbursementWalletDebitCard.query.filter_by(
-                card_proxy_number=card_proxy
-            ).one_or_none()
+            if lookups is None:
+                debit_card = ReimbursementWalletDebitCard.query.filter_by(
+                    card_proxy_number=card_proxy
+                ).one_or_none()
+            else:
+                debit_card = lookups.debit_cards_by_proxy_number.get(card_proxy)  # type: ignore[arg-type] # Argument 1 to "get" of "dict" has incompatible type "Optional[Any]"
             card_status, card_status_reason = map_alegeus_card_status_codes(
                 int(em_dict.get("status_code"))
             )
@@ -427,14 +551,10 @@ def _process_em_record(line: str) -> bool:
                         "shipment_tracking_number"
                     )
             elif not debit_card:
-                wallet = (
-                    ReimbursementWallet.query.filter_by(
-                        alegeus_id=employee_id,
-                        state=WalletState.QUALIFIED,
-                    )
-                    .order_by(ReimbursementWallet.id.desc())
-                    .one_or_none()
-                )
+                if lookups is None:
+                    wallet = _get_qualified_wallet(employee_id)
+                else:
+                    wallet = lookups.wallets_by_alegeus_id.get(employee_id)  # type: ignore[arg-type] # Argument 1 to "get" of "dict" has incompatible type "Optional[Any]"
 
                 if wallet:
                     debit_card = ReimbursementWalletDebitCard(
@@ -445,6 +565,9 @@ def _process_em_record(line: str) -> bool:
                         card_status_reason=card_status_reason,
                     )
                     emit_audit_log_create(debit_card)
+                    if lookups is not None:
+                        # Later records for the same card in this batch update it
+                        lookups.debit_cards_by_proxy_number[card_proxy] = debit_card  # type: ignore[index] # Invalid index type "Optional[Any]"
                     if em_dict.get("creation_date"):
                         try:
                             debit_card.created_date = datetime.strptime(
@@ -489,7 +612,8 @@ def _process_em_record(line: str) -> bool:
                 return False
 
             db.session.add(debit_card)
-            db.session.commit()
+            if lookups is None:
+                db.session.commit()
             tag_successful(True)
             _count_em_rows()
             return True
@@ -510,6 +634,17 @@ def _process_em_record(line: str) -> bool:
     return False
 
 
+def _get_qualified_wallet(employee_id: str | None) -> ReimbursementWallet | None:
+    return (
+        ReimbursementWallet.query.filter_by(
+            alegeus_id=employee_id,
+            state=WalletState.QUALIFIED,
+        )
+        .order_by(ReimbursementWallet.id.desc())
+        .one_or_none()
+    )
+
+
 def _count_en_ek_rows() -> None:
     global EN_EK_RECORD_COUNTER
     EN_EK_RECORD_COUNTER += 1